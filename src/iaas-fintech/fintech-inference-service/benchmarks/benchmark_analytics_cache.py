@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Benchmark cold vs. cached dashboard analytics
+
+Usage:
+    python benchmarks/benchmark_analytics_cache.py [--customers 10000] [--repeats 20]
+"""
+
+import argparse
+import statistics
+
+import pandas as pd
+
+from common import synthetic_transactions, timed
+from api.routes import customers
+from data.customer_store import CustomerDataStore
+
+
+def run(num_customers: int, repeats: int) -> None:
+    """Time the first (computing) request and the cached repeats for each endpoint"""
+    transactions = synthetic_transactions(num_customers)
+    store = CustomerDataStore(pd.DataFrame({"customer_id": transactions["customer_id"].unique()}),
+                              transactions, pd.DataFrame())
+    customers.data_store = store
+    customers.customers_df = store.customers
+    customers.transactions_df = store.transactions
+    
+    print(f"{num_customers} customers, {len(transactions)} transactions")
+    print(f"{'endpoint':<28} {'cold (ms)':>10} {'cached p50 (ms)':>16}")
+    
+    endpoints = [
+        ("/analytics/customers", customers._get_customer_analytics, ()),
+        ("/analytics/transactions 30", customers._get_transaction_analytics, (30,)),
+        ("/analytics/transactions 90", customers._get_transaction_analytics, (90,)),
+    ]
+    for name, handler, args in endpoints:
+        cold, _ = timed(handler, *args)
+        cached = statistics.median(timed(handler, *args)[0] for _ in range(repeats))
+        print(f"{name:<28} {cold * 1e3:10.1f} {cached * 1e3:16.3f}")
+    
+    print(customers.analytics_cache.stats())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--customers", type=int, default=10_000)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+    
+    run(args.customers, args.repeats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Benchmark batch scoring jobs: chunked fraud scoring of a transaction file into Parquet parts
+
+Writes a synthetic transaction table, then runs a fraud job over it at a
+few chunk sizes and reports end-to-end throughput, including reading,
+scoring, writing the parts and recording progress.
+
+Usage:
+    python benchmarks/benchmark_batch_jobs.py [--customers 20000] [--chunk-sizes 10000 50000 200000]
+"""
+
+import argparse
+import asyncio
+import logging
+import tempfile
+from pathlib import Path
+
+from common import timed, synthetic_transactions
+from api.jobs import BatchJobRunner, BatchJobStore
+from data.storage import write_frame
+
+
+def run(customers: int, chunk_sizes) -> None:
+    """Time a fraud job over the same input per chunk size"""
+    logging.disable(logging.INFO)
+    root = Path(tempfile.mkdtemp())
+    source = write_frame(synthetic_transactions(customers), root / "transactions.parquet")
+    runner = BatchJobRunner(BatchJobStore(root / "jobs.db"), root / "results", root)
+    
+    print(f"{'chunk size':>11} {'chunks':>7} {'records':>9} {'time (s)':>9} {'records/s':>11}")
+    for chunk_size in chunk_sizes:
+        job = runner.submit("fraud", str(source), {"chunk_size": chunk_size})
+        elapsed, job = timed(asyncio.run, runner.run(job["job_id"]))
+        print(f"{chunk_size:>11} {job['processed_chunks']:>7} {job['processed_records']:>9} "
+              f"{elapsed:9.2f} {job['processed_records'] / elapsed:11.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--customers", type=int, default=20_000)
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[10_000, 50_000, 200_000])
+    args = parser.parse_args()
+    
+    run(args.customers, args.chunk_sizes)
+
+
+if __name__ == "__main__":
+    main()
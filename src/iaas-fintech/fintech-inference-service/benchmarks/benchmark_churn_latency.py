@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark single-request churn latency: prepare_features path vs. fast path
+
+Scores one customer per call, as the /churn-score endpoint does, through the
+DataFrame path (``build_feature_frame`` + ``predict_churn_probability``) and
+through the NumPy fast path, and reports p50/p99 latency for each. Batch
+timings for both paths follow.
+
+Usage:
+    python benchmarks/benchmark_churn_latency.py [--requests 2000] [--sizes 10 100 1000]
+"""
+
+import argparse
+import contextlib
+import io
+import statistics
+import time
+
+import numpy as np
+
+from common import timed
+from api.schemas.models import CustomerInput
+from api.serving import ChurnModelServer
+from models.churn_model import CHURN_FEATURE_COLUMNS
+
+
+def make_customers(n: int, seed: int = 42):
+    """Customers with random values for every churn feature"""
+    rng = np.random.default_rng(seed)
+    values = rng.uniform(0, 100, size=(n, len(CHURN_FEATURE_COLUMNS)))
+    return [
+        CustomerInput(customer_id=f"CUST_{i:06d}", features=dict(zip(CHURN_FEATURE_COLUMNS, row.tolist())))
+        for i, row in enumerate(values)
+    ]
+
+
+def score_slow(server: ChurnModelServer, customers):
+    """The pre-existing path through prepare_features"""
+    return server.to_predictions(server.predict_frame(server.build_feature_frame(customers)))
+
+
+def latencies(score, server: ChurnModelServer, customers):
+    """Per-call latency in microseconds for scoring each customer alone"""
+    score(server, customers[:1])  # warm up
+    samples = []
+    for customer in customers:
+        start = time.perf_counter()
+        score(server, [customer])
+        samples.append((time.perf_counter() - start) * 1e6)
+    return sorted(samples)
+
+
+def run(requests: int, sizes) -> None:
+    """Time single-row latency and batch throughput for both paths"""
+    server = ChurnModelServer()
+    with contextlib.redirect_stdout(io.StringIO()):
+        server.ensure_loaded()
+    print(f"Model: {server.model_file}")
+    
+    customers = make_customers(requests)
+    paths = {"prepare_features": score_slow, "fast path": ChurnModelServer.score_fast}
+    
+    print(f"\n{'path':>16} {'p50 (us)':>9} {'p99 (us)':>9} {'mean (us)':>10}")
+    for name, score in paths.items():
+        with contextlib.redirect_stdout(io.StringIO()):
+            samples = latencies(score, server, customers)
+        print(f"{name:>16} {statistics.median(samples):9.0f} {samples[int(len(samples) * 0.99)]:9.0f} "
+              f"{statistics.fmean(samples):10.0f}")
+    
+    print(f"\n{'batch':>7} {'prepare_features (ms)':>22} {'fast path (ms)':>15} {'speedup':>8}")
+    for size in sizes:
+        batch = make_customers(size)
+        with contextlib.redirect_stdout(io.StringIO()):
+            slow = statistics.median(timed(score_slow, server, batch)[0] for _ in range(5))
+        fast = statistics.median(timed(server.score_fast, batch)[0] for _ in range(5))
+        print(f"{size:>7} {slow * 1000:22.2f} {fast * 1000:15.2f} {slow / fast:7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2_000, help="Single-customer requests to time per path")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1_000])
+    args = parser.parse_args()
+    
+    run(args.requests, args.sizes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark churn scoring latency and throughput by batch size
+
+Compares one vectorized ``predict_proba`` call per batch with scoring the
+same customers one at a time.
+
+Usage:
+    python benchmarks/benchmark_churn_serving.py [--sizes 1 10 100 1000 10000] [--repeats 5]
+"""
+
+import argparse
+import contextlib
+import io
+import statistics
+import time
+
+import numpy as np
+
+from common import timed
+from api.schemas.models import CustomerInput
+from api.serving import ChurnModelServer
+from models.churn_model import CHURN_FEATURE_COLUMNS
+
+
+def make_customers(n: int, seed: int = 42):
+    """Customers with random values for every churn feature"""
+    rng = np.random.default_rng(seed)
+    values = rng.uniform(0, 100, size=(n, len(CHURN_FEATURE_COLUMNS)))
+    return [
+        CustomerInput(customer_id=f"CUST_{i:06d}", features=dict(zip(CHURN_FEATURE_COLUMNS, row.tolist())))
+        for i, row in enumerate(values)
+    ]
+
+
+def run(sizes, repeats: int, sequential_max: int) -> None:
+    """Time batch and sequential scoring for each batch size"""
+    server = ChurnModelServer()
+    with contextlib.redirect_stdout(io.StringIO()):
+        server.ensure_loaded()
+    print(f"Model: {server.model_file}")
+    print(f"{'batch':>7} {'batch p50 (ms)':>15} {'batch rows/s':>13} {'sequential (ms)':>16} {'seq rows/s':>11}")
+    
+    for size in sizes:
+        customers = make_customers(size)
+        
+        with contextlib.redirect_stdout(io.StringIO()):
+            server.score(customers[:1])  # warm up
+            batch_times = [timed(server.score, customers)[0] for _ in range(repeats)]
+            sequential_time = None
+            if size <= sequential_max:
+                start = time.perf_counter()
+                for customer in customers:
+                    server.score([customer])
+                sequential_time = time.perf_counter() - start
+        
+        batch_p50 = statistics.median(batch_times)
+        sequential_text = (f"{sequential_time * 1000:16.1f} {size / sequential_time:11.0f}"
+                           if sequential_time is not None else f"{'skipped':>16} {'-':>11}")
+        print(f"{size:>7} {batch_p50 * 1000:15.1f} {size / batch_p50:13.0f} {sequential_text}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100, 1_000, 10_000])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--sequential-max", type=int, default=1_000,
+                        help="Largest batch to also score one customer at a time")
+    args = parser.parse_args()
+    
+    run(args.sizes, args.repeats, args.sequential_max)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark API cold start: import-time profile and time to /live and /ready
+
+Profiles ``import api.main`` with ``python -X importtime`` and lists the
+slowest top-level packages, then launches ``start_api.py`` on a free port
+and polls /live and /ready until the service reports itself ready. Every
+run is a fresh interpreter, so nothing is shared between them.
+
+Usage:
+    python benchmarks/benchmark_cold_start.py [--runs 3] [--top 12] [--timeout 120]
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from common import SRC_PATH
+
+SERVICE_ROOT = SRC_PATH.parent
+
+
+def import_profile(module: str = "api.main") -> tuple:
+    """Total import time, and cumulative microseconds for each package where it was first imported"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SERVICE_ROOT, env={**os.environ, "PYTHONPATH": str(SRC_PATH)},
+        capture_output=True, text=True, check=True
+    )
+    
+    packages = {}
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        
+        # Nesting is shown by indentation; top-level entries sum to the whole import
+        if len(name) - len(name.lstrip()) == 1:
+            total += int(cumulative_us)
+        # A package's root module is imported once and its time includes everything it pulled in
+        if "." not in name.strip():
+            packages[name.strip()] = int(cumulative_us)
+    
+    return total / 1e6, sorted(packages.items(), key=lambda item: -item[1])
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(url: str, deadline: float, accept=lambda body: True) -> float:
+    """Poll ``url`` until it answers 200 with an accepted body; returns the time it did"""
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200 and accept(json.loads(response.read())):
+                    return time.perf_counter()
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.02)
+    raise TimeoutError(f"{url} not ready in time")
+
+
+def cold_start(timeout: float) -> tuple:
+    """Seconds from launching start_api.py until /live and /ready succeed"""
+    port = free_port()
+    env = {**os.environ, "API_HOST": "127.0.0.1", "API_PORT": str(port), "DEBUG": "false"}
+    
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "start_api.py"], cwd=SERVICE_ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = start + timeout
+        live = wait_for(f"http://127.0.0.1:{port}/live", deadline)
+        ready = wait_for(f"http://127.0.0.1:{port}/ready", deadline, lambda body: body.get("status") == "ready")
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/ready") as response:
+            phases = json.loads(response.read()).get("phases", {})
+        return live - start, ready - start, phases
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def run(runs: int, top: int, timeout: float) -> None:
+    """Print the import profile and cold-start timings"""
+    totals, profiles = [], []
+    for _ in range(runs):
+        total, packages = import_profile()
+        totals.append(total)
+        profiles.append(dict(packages))
+    
+    print(f"import api.main: {statistics.median(totals):.2f} s (median of {runs})")
+    print(f"\n{'package':>20} {'cumulative (ms)':>16}")
+    names = sorted(profiles[0], key=lambda name: -profiles[0][name])[:top]
+    for name in names:
+        print(f"{name:>20} {statistics.median(p.get(name, 0) for p in profiles) / 1000:16.1f}")
+    
+    print(f"\n{'run':>4} {'/live (s)':>10} {'/ready (s)':>11}")
+    for i in range(runs):
+        live, ready, phases = cold_start(timeout)
+        print(f"{i + 1:>4} {live:10.2f} {ready:11.2f}")
+    if phases:
+        print("\nStartup phases (last run):")
+        for name, phase in phases.items():
+            print(f"  {name:>16}: {phase.get('status')} in {phase.get('seconds') or 0:.2f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=12, help="Slowest top-level packages to list")
+    parser.add_argument("--timeout", type=float, default=120, help="Seconds to wait for /ready")
+    args = parser.parse_args()
+    
+    run(args.runs, args.top, args.timeout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Benchmark the compiled tree-ensemble scorer against the native XGBoost predictor
+
+Times ``Booster.inplace_predict`` and ``CompiledTreeEnsemble.predict_proba``
+on the saved churn model for each batch size, and checks that both return
+the same probabilities.
+
+Usage:
+    python benchmarks/benchmark_compiled_scorer.py [--sizes 1 10 100 1000 10000] [--rows 20000]
+"""
+
+import argparse
+import contextlib
+import io
+import statistics
+
+import numpy as np
+
+from common import timed
+from api.serving import ChurnModelServer
+from models.compiled_trees import CompiledTreeEnsemble
+
+
+def run(sizes, rows: int) -> None:
+    """Time native and compiled scoring on about ``rows`` rows per batch size"""
+    server = ChurnModelServer(scorer_backend="native")
+    with contextlib.redirect_stdout(io.StringIO()):
+        model = server.ensure_loaded()
+    booster = model.model.get_booster()
+    
+    elapsed, ensemble = timed(CompiledTreeEnsemble.from_estimator, model.model)
+    print(f"Model: {server.model_file}")
+    print(f"Compiled {ensemble.n_trees} trees, {ensemble.n_nodes} nodes, depth {ensemble.max_depth} "
+          f"in {elapsed * 1000:.1f} ms")
+    
+    rng = np.random.default_rng(42)
+    X = rng.uniform(0, 100, size=(max(sizes), len(model.feature_columns)))
+    max_error = np.abs(ensemble.predict_proba(X) - booster.inplace_predict(X)).max()
+    print(f"Max |compiled - native| over {len(X)} rows: {max_error:.2e}")
+    
+    print(f"\n{'batch':>7} {'native p50 (us)':>16} {'compiled p50 (us)':>18} {'native rows/s':>14} "
+          f"{'compiled rows/s':>16} {'speedup':>8}")
+    for size in sizes:
+        batch = X[:size]
+        repeats = max(5, rows // size)
+        native = statistics.median(timed(booster.inplace_predict, batch)[0] for _ in range(repeats))
+        compiled = statistics.median(timed(ensemble.predict_proba, batch)[0] for _ in range(repeats))
+        print(f"{size:>7} {native * 1e6:16.0f} {compiled * 1e6:18.0f} {size / native:14.0f} "
+              f"{size / compiled:16.0f} {native / compiled:7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100, 1_000, 10_000])
+    parser.add_argument("--rows", type=int, default=20_000, help="Rows scored per batch size and path")
+    args = parser.parse_args()
+    
+    run(args.sizes, args.rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Benchmark the per-customer and vectorized customer feature engines
+
+Usage:
+    python benchmarks/benchmark_customer_features.py [--sizes 1000 10000 100000] [--loop-max 10000]
+"""
+
+import argparse
+import contextlib
+import io
+
+from common import synthetic_transactions, timed
+from data.feature_engineering import FeatureEngineer
+
+
+def run(sizes, loop_max: int, avg_transactions: int) -> None:
+    """Time both engines for each customer count"""
+    print(f"{'customers':>10} {'transactions':>13} {'loop (s)':>10} {'vectorized (s)':>15} {'speedup':>8}")
+    
+    for num_customers in sizes:
+        df = synthetic_transactions(num_customers, avg_transactions=avg_transactions)
+        
+        # Silence the engines' progress prints
+        with contextlib.redirect_stdout(io.StringIO()):
+            vectorized_time, _ = timed(FeatureEngineer(vectorized=True).create_customer_features, df.copy())
+            loop_time = None
+            if num_customers <= loop_max:
+                loop_time, _ = timed(FeatureEngineer().create_customer_features, df.copy())
+        
+        loop_text = f"{loop_time:10.2f}" if loop_time is not None else f"{'skipped':>10}"
+        speedup = f"{loop_time / vectorized_time:7.1f}x" if loop_time is not None else f"{'-':>8}"
+        print(f"{num_customers:>10} {len(df):>13} {loop_text} {vectorized_time:15.2f} {speedup}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--loop-max", type=int, default=10_000,
+                        help="Largest customer count to run the per-customer loop on")
+    parser.add_argument("--avg-transactions", type=int, default=50)
+    args = parser.parse_args()
+    
+    run(args.sizes, args.loop_max, args.avg_transactions)
+
+
+if __name__ == "__main__":
+    main()
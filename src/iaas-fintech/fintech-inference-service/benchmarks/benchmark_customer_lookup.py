@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-customer transaction lookups: boolean masks vs. the indexed store
+
+Usage:
+    python benchmarks/benchmark_customer_lookup.py [--sizes 1000 10000 100000] [--lookups 200]
+"""
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+import pandas as pd
+
+from common import synthetic_transactions
+from data.customer_store import CustomerDataStore
+
+
+def time_lookups(lookup, customer_ids) -> float:
+    """Median latency in microseconds over the given customers"""
+    latencies = []
+    for customer_id in customer_ids:
+        start = time.perf_counter()
+        lookup(customer_id)
+        latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies) * 1e6
+
+
+def run(sizes, lookups: int) -> None:
+    """Compare point and date-range lookups for each customer count"""
+    print(f"{'customers':>10} {'transactions':>13} {'index build (s)':>16} "
+          f"{'mask (us)':>10} {'index (us)':>11} {'mask+range (us)':>16} {'index+range (us)':>17}")
+    
+    for num_customers in sizes:
+        transactions = synthetic_transactions(num_customers)
+        customers = pd.DataFrame({"customer_id": transactions["customer_id"].unique()})
+        
+        start = time.perf_counter()
+        store = CustomerDataStore(customers, transactions, pd.DataFrame())
+        build_time = time.perf_counter() - start
+        
+        rng = np.random.default_rng(0)
+        customer_ids = rng.choice(customers["customer_id"].to_numpy(), size=lookups)
+        date_from, date_to = pd.Timestamp("2024-02-01"), pd.Timestamp("2024-03-01")
+        
+        def mask_lookup(customer_id):
+            return transactions[transactions["customer_id"] == customer_id]
+        
+        def mask_range_lookup(customer_id):
+            rows = transactions[transactions["customer_id"] == customer_id]
+            return rows[(rows["transaction_date"] >= date_from) & (rows["transaction_date"] <= date_to)]
+        
+        mask = time_lookups(mask_lookup, customer_ids)
+        indexed = time_lookups(store.get_transactions, customer_ids)
+        mask_range = time_lookups(mask_range_lookup, customer_ids)
+        indexed_range = time_lookups(lambda c: store.get_transactions(c, date_from, date_to), customer_ids)
+        
+        print(f"{num_customers:>10} {len(transactions):>13} {build_time:16.2f} "
+              f"{mask:10.0f} {indexed:11.0f} {mask_range:16.0f} {indexed_range:17.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--lookups", type=int, default=200)
+    args = parser.parse_args()
+    
+    run(args.sizes, args.lookups)
+
+
+if __name__ == "__main__":
+    main()
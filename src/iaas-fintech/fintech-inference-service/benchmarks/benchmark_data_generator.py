@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark TransactionDataGenerator: per-transaction loop vs. vectorized blocks vs. parallel shards
+
+Usage:
+    python benchmarks/benchmark_data_generator.py [--loop-customers 500] [--customers 10000 100000]
+                                                  [--workers 1 2 4]
+"""
+
+import argparse
+import resource
+import tempfile
+from pathlib import Path
+
+from common import timed
+from data.data_generator import TransactionDataGenerator
+from data.storage import TableStorage
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run(loop_customers: int, sizes, chunk_customers: int, num_months: int, workers) -> None:
+    """Compare in-memory generation speed, then stream and shard larger datasets to Parquet"""
+    print(f"{'engine':<12} {'customers':>10} {'transactions':>13} {'time (s)':>9} {'rows/s':>10}")
+    for vectorized in (False, True):
+        elapsed, (df, _) = timed(
+            TransactionDataGenerator().generate_dataset, loop_customers, num_months, vectorized=vectorized
+        )
+        label = "vectorized" if vectorized else "loop"
+        print(f"{label:<12} {loop_customers:>10} {len(df):>13} {elapsed:9.2f} {len(df) / elapsed:10.0f}")
+    
+    print(f"\n{'streamed':<12} {'customers':>10} {'transactions':>13} {'time (s)':>9} {'rows/s':>10} "
+          f"{'file (MB)':>10} {'peak RSS (MB)':>14}")
+    for num_customers in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = TableStorage(Path(tmp)).path("transactions")
+            elapsed, summary = timed(
+                TransactionDataGenerator().write_dataset, str(path), num_customers, num_months, chunk_customers
+            )
+            rows = summary["num_transactions"]
+            print(f"{'parquet':<12} {num_customers:>10} {rows:>13} {elapsed:9.2f} {rows / elapsed:10.0f} "
+                  f"{path.stat().st_size / 1e6:10.1f} {peak_rss_mb():14.0f}")
+    
+    num_customers = max(sizes)
+    print(f"\n{'workers':<12} {'customers':>10} {'transactions':>13} {'time (s)':>9} {'rows/s':>10} {'speedup':>8}")
+    baseline = None
+    for num_workers in workers:
+        with tempfile.TemporaryDirectory() as tmp:
+            elapsed, summary = timed(
+                TransactionDataGenerator().write_partitioned_dataset, tmp, num_customers, num_months,
+                chunk_customers, num_workers
+            )
+            baseline = baseline or elapsed
+            rows = summary["num_transactions"]
+            print(f"{num_workers:<12} {num_customers:>10} {rows:>13} {elapsed:9.2f} {rows / elapsed:10.0f} "
+                  f"{baseline / elapsed:7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--loop-customers", type=int, default=500)
+    parser.add_argument("--customers", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--chunk-customers", type=int, default=10_000)
+    parser.add_argument("--months", type=int, default=6)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+    
+    run(args.loop_customers, args.customers, args.chunk_customers, args.months, args.workers)
+
+
+if __name__ == "__main__":
+    main()
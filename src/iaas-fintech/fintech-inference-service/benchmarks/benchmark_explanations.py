@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark SHAP explanations: per-row explain_prediction vs. batched, cached and indexed
+
+Compares ``BaseModel.explain_prediction`` called once per customer with one
+vectorized ExplanationService call over the batch, cold and from the cache,
+then times building the precomputed ShapIndex and looking customers up in it.
+
+Usage:
+    python benchmarks/benchmark_explanations.py [--sizes 1 100 1000 10000] [--per-row-max 200]
+                                                [--index-customers 100000]
+"""
+
+import argparse
+import contextlib
+import io
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from common import timed
+from api.explanations import ExplanationService
+from api.serving import ChurnModelServer
+from models.churn_model import CHURN_FEATURE_COLUMNS
+from models.shap_index import ShapIndex
+
+
+def make_features(n: int, seed: int = 42) -> pd.DataFrame:
+    """Customers with random values for every churn feature"""
+    rng = np.random.default_rng(seed)
+    features = pd.DataFrame(rng.uniform(0, 100, size=(n, len(CHURN_FEATURE_COLUMNS))), columns=CHURN_FEATURE_COLUMNS)
+    features.insert(0, "customer_id", [f"CUST_{i:06d}" for i in range(n)])
+    return features
+
+
+def explain_per_row(model, features: pd.DataFrame) -> None:
+    """The pre-existing path: one explain_prediction call per customer"""
+    for row in range(len(features)):
+        model.explain_prediction(features.iloc[row:row + 1])
+
+
+def run_index(model, num_customers: int, lookups: int = 10_000) -> None:
+    """Build a SHAP index over ``num_customers`` and time single-customer lookups"""
+    features = make_features(num_customers)
+    elapsed, index = timed(ShapIndex.build, model, features, "benchmark")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "index.joblib"
+        index.save(path)
+        size_mb = path.stat().st_size / 1e6
+    
+    customer_ids = features["customer_id"].sample(lookups, replace=True, random_state=0).tolist()
+    latencies = []
+    for customer_id in customer_ids:
+        start = time.perf_counter()
+        index.lookup(customer_id, 10)
+        latencies.append(time.perf_counter() - start)
+    
+    print(f"\nIndex over {num_customers} customers: built in {elapsed:.1f} s "
+          f"({num_customers / elapsed:.0f} rows/s), {size_mb:.1f} MB on disk")
+    print(f"Lookup p50 {statistics.median(latencies) * 1e6:.1f} us, "
+          f"p99 {sorted(latencies)[int(len(latencies) * 0.99)] * 1e6:.1f} us")
+
+
+def run(sizes, per_row_max: int, index_customers: int) -> None:
+    """Time each explanation path for every batch size"""
+    server = ChurnModelServer()
+    with contextlib.redirect_stdout(io.StringIO()):
+        model = server.ensure_loaded()
+    print(f"Model: {server.model_file}")
+    print(f"{'customers':>9} {'per-row (ms)':>13} {'batch cold (ms)':>16} {'batch cached (ms)':>18} "
+          f"{'cold rows/s':>12} {'cached rows/s':>14}")
+    
+    for size in sizes:
+        features = make_features(size)
+        service = ExplanationService(server)
+        
+        per_row_text = f"{'skipped':>13}"
+        if size <= per_row_max:
+            with contextlib.redirect_stdout(io.StringIO()):
+                per_row, _ = timed(explain_per_row, model, features)
+            per_row_text = f"{per_row * 1000:13.1f}"
+        
+        cold, _ = timed(service.explain_frame, features)
+        cached, _ = timed(service.explain_frame, features)
+        print(f"{size:>9} {per_row_text} {cold * 1000:16.1f} {cached * 1000:18.1f} "
+              f"{size / cold:12.0f} {size / cached:14.0f}")
+    
+    if index_customers:
+        run_index(model, index_customers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 1_000, 10_000])
+    parser.add_argument("--per-row-max", type=int, default=200,
+                        help="Largest batch to also explain one customer at a time")
+    parser.add_argument("--index-customers", type=int, default=100_000,
+                        help="Customers to build the SHAP index over (0 to skip)")
+    args = parser.parse_args()
+    
+    run(args.sizes, args.per_row_max, args.index_customers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark batch fraud scoring: per-transaction loop vs. vectorized arrays vs. the endpoint
+
+The scorer's state is built from the first part of a synthetic transaction
+table, then batches of later transactions are scored one at a time with
+``process``, as arrays with ``score_arrays``, through ``predict_batch``
+(building response models) and through
+``POST /inference/fraud-batch`` in-process.
+
+Usage:
+    python benchmarks/benchmark_fraud_batch.py [--sizes 100 1000 10000] [--customers 20000]
+"""
+
+import argparse
+import gc
+import logging
+import statistics
+
+from fastapi.testclient import TestClient
+
+from common import synthetic_transactions, timed
+from api.fraud import StreamingFraudScorer, fraud_scorer
+from api.main import app
+from api.schemas.models import TransactionInput
+
+
+def to_payload(transactions) -> list:
+    rows = transactions.assign(transaction_date=transactions["transaction_date"].dt.strftime("%Y-%m-%dT%H:%M:%S"))
+    return rows[["customer_id", "transaction_date", "amount", "merchant", "category", "mode", "location"]].to_dict("records")
+
+
+def score_loop(scorer: StreamingFraudScorer, arrays: dict) -> None:
+    """One ``process`` call per transaction; this also updates the state, as the single endpoint does"""
+    for row in range(len(arrays["seconds"])):
+        scorer.process(arrays["customer_ids"][row], arrays["seconds"][row], arrays["amounts"][row],
+                       arrays["merchants"][row], arrays["categories"][row], arrays["locations"][row])
+
+
+def median_time(func, *args, repeats: int = 5) -> float:
+    return statistics.median(timed(func, *args)[0] for _ in range(repeats))
+
+
+def run(sizes, customers: int, freeze: bool) -> None:
+    """Time each path for every batch size"""
+    transactions = synthetic_transactions(customers)
+    history = transactions.iloc[:len(transactions) - sum(sizes)]
+    fraud_scorer.replay(history)
+    if freeze:
+        gc.freeze()  # as the API does once startup has loaded its long-lived state
+    print(f"State: {len(fraud_scorer.states)} customers from {len(history)} transactions (gc.freeze: {freeze})\n")
+    
+    client = TestClient(app)
+    logging.disable(logging.INFO)  # one request log line per call would swamp the table
+    print(f"{'batch':>7} {'loop (ms)':>10} {'arrays (ms)':>12} {'predict_batch (ms)':>19} {'endpoint (ms)':>14} "
+          f"{'arrays txn/s':>13}")
+    
+    offset = len(history)
+    for size in sizes:
+        batch = transactions.iloc[offset:offset + size]
+        offset += size
+        inputs = [TransactionInput(**row) for row in to_payload(batch)]
+        arrays = fraud_scorer.batch_arrays(inputs)
+        
+        arrays_time = median_time(fraud_scorer.score_arrays, arrays)
+        predict_time = median_time(fraud_scorer.predict_batch, inputs)
+        
+        payload = {"transactions": to_payload(batch)}
+        endpoint_time = median_time(
+            lambda: client.post("/api/v1/inference/fraud-batch", params={"update_state": False}, json=payload)
+        )
+        
+        # Last, since the loop adds the batch to the state
+        loop_time, _ = timed(score_loop, fraud_scorer, arrays)
+        
+        print(f"{size:>7} {loop_time * 1000:10.1f} {arrays_time * 1000:12.1f} {predict_time * 1000:19.1f} "
+              f"{endpoint_time * 1000:14.1f} {size / arrays_time:13.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1_000, 10_000])
+    parser.add_argument("--customers", type=int, default=20_000)
+    parser.add_argument("--no-freeze", action="store_true", help="Leave the state in the collector's generations")
+    args = parser.parse_args()
+    
+    run(args.sizes, args.customers, not args.no_freeze)
+
+
+if __name__ == "__main__":
+    main()
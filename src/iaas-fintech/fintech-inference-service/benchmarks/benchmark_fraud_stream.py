@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Benchmark the streaming fraud scorer replaying a transactions table
+
+Replays data/raw/transactions.csv (or a synthetic table of the same shape
+when it is missing) through a fresh StreamingFraudScorer in date order and
+reports transactions/sec for building state alone and for scoring every
+transaction, next to the offline transaction feature engine.
+
+Usage:
+    python benchmarks/benchmark_fraud_stream.py [--customers 10000] [--avg-transactions 50]
+"""
+
+import argparse
+import contextlib
+import io
+
+import pandas as pd
+
+from common import SRC_PATH, synthetic_transactions, timed
+from api.fraud import StreamingFraudScorer
+from data.feature_engineering import FeatureEngineer
+
+TRANSACTIONS_CSV = SRC_PATH.parent / "data" / "raw" / "transactions.csv"
+
+
+def load_transactions(customers: int, avg_transactions: int) -> pd.DataFrame:
+    if TRANSACTIONS_CSV.exists():
+        print(f"Replaying {TRANSACTIONS_CSV}")
+        return pd.read_csv(TRANSACTIONS_CSV, parse_dates=["transaction_date"])
+    print(f"{TRANSACTIONS_CSV} not found; replaying synthetic transactions for {customers} customers")
+    return synthetic_transactions(customers, avg_transactions=avg_transactions)
+
+
+def score_all(scorer: StreamingFraudScorer, transactions: pd.DataFrame) -> int:
+    """Score every transaction as the endpoint would, minus the HTTP layer"""
+    return sum(probability > scorer.threshold for _, probability, _, _ in scorer.iter_scores(transactions))
+
+
+def run(customers: int, avg_transactions: int) -> None:
+    """Time state building, scoring and the offline engine over the same table"""
+    transactions = load_transactions(customers, avg_transactions)
+    n = len(transactions)
+    print(f"{n} transactions, {transactions['customer_id'].nunique()} customers\n")
+    
+    state_time, _ = timed(StreamingFraudScorer().replay, transactions)
+    scorer = StreamingFraudScorer()
+    score_time, flagged = timed(score_all, scorer, transactions)
+    with contextlib.redirect_stdout(io.StringIO()):
+        offline_time, _ = timed(FeatureEngineer(vectorized=True).create_transaction_features, transactions)
+    
+    print(f"{'path':>22} {'seconds':>9} {'txn/s':>10} {'us/txn':>8}")
+    for name, elapsed in [("stream: state only", state_time), ("stream: score", score_time),
+                          ("offline features", offline_time)]:
+        print(f"{name:>22} {elapsed:9.2f} {n / elapsed:10.0f} {elapsed / n * 1e6:8.2f}")
+    print(f"\nFlagged {flagged} transactions ({flagged / n:.1%}); state for {len(scorer.states)} customers")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--customers", type=int, default=10_000, help="Synthetic customers when there is no CSV")
+    parser.add_argument("--avg-transactions", type=int, default=50)
+    args = parser.parse_args()
+    
+    run(args.customers, args.avg_transactions)
+
+
+if __name__ == "__main__":
+    main()
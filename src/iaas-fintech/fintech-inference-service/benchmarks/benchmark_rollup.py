@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Benchmark /analytics/transactions windows: full scan vs. the rollup cube
+
+Usage:
+    python benchmarks/benchmark_rollup.py [--customers 1000 10000] [--days 7 30 90 365]
+"""
+
+import argparse
+from datetime import timedelta
+
+from common import synthetic_transactions, timed
+from data.rollup import TransactionRollup
+
+
+def scan_window(transactions, start_date) -> int:
+    """The per-request work the endpoint used to do over the raw frame"""
+    filtered = transactions[transactions["transaction_date"] >= start_date]
+    filtered.groupby(filtered["transaction_date"].dt.date).agg({"amount": ["sum", "mean"], "is_fraud": "sum"})
+    filtered.groupby("category").agg({"amount": ["sum", "mean"], "is_fraud": "sum"})
+    filtered.groupby(filtered["transaction_date"].dt.hour)["amount"].count()
+    filtered.groupby(filtered["transaction_date"].dt.day_name())["amount"].count()
+    filtered["merchant"].value_counts().head(10)
+    filtered["mode"].value_counts()
+    return filtered["customer_id"].nunique()
+
+
+def run(sizes, windows) -> None:
+    """Time cube construction and each window against a full scan"""
+    print(f"{'customers':>10} {'transactions':>13} {'cube rows':>10} {'build (s)':>10} "
+          f"{'days':>5} {'scan (ms)':>10} {'cube (ms)':>10}")
+    
+    for num_customers in sizes:
+        transactions = synthetic_transactions(num_customers)
+        build_time, rollup = timed(TransactionRollup, transactions)
+        
+        for days in windows:
+            start_date = rollup.end_date - timedelta(days=days)
+            scan_time, _ = timed(scan_window, transactions, start_date)
+            cube_time, _ = timed(rollup.transaction_analytics, start_date)
+            print(f"{num_customers:>10} {len(transactions):>13} {len(rollup):>10} {build_time:10.2f} "
+                  f"{days:>5} {scan_time * 1e3:10.1f} {cube_time * 1e3:10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--customers", type=int, nargs="+", default=[1_000, 10_000])
+    parser.add_argument("--days", type=int, nargs="+", default=[7, 30, 90, 365])
+    args = parser.parse_args()
+    
+    run(args.customers, args.days)
+
+
+if __name__ == "__main__":
+    main()
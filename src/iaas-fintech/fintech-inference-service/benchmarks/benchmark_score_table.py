@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark the precomputed churn score table against live scoring
+
+Runs a full-base scoring pass over a synthetic customer_features table,
+then times answering batches of stored customers from the score table
+next to resolving their stored features and scoring them live.
+
+Usage:
+    python benchmarks/benchmark_score_table.py [--customers 200000] [--sizes 1 100 10000]
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from common import timed
+from api.jobs import BatchJobRunner, BatchJobStore
+from api.schemas.models import CustomerInput
+from api.score_table import ChurnScoreTable
+from api.serving import churn_server
+from data.storage import TableStorage, write_frame
+from models.churn_model import CHURN_FEATURE_COLUMNS
+
+
+def customer_features(n: int, seed: int = 42) -> pd.DataFrame:
+    """Random values for every churn feature"""
+    rng = np.random.default_rng(seed)
+    features = pd.DataFrame(rng.uniform(0, 100, size=(n, len(CHURN_FEATURE_COLUMNS))), columns=CHURN_FEATURE_COLUMNS)
+    features.insert(0, "customer_id", [f"CUST_{i:07d}" for i in range(n)])
+    return features
+
+
+def median_time(func, *args, repeats: int = 5) -> float:
+    return statistics.median(timed(func, *args)[0] for _ in range(repeats))
+
+
+def run(customers: int, sizes) -> None:
+    """Time the scoring pass, then stored and live answers per batch size"""
+    logging.disable(logging.INFO)
+    root = Path(tempfile.mkdtemp())
+    features = customer_features(customers)
+    write_frame(features, TableStorage(root).path("customer_features", "parquet"))
+    
+    version = churn_server.current().version
+    stored_features = features.set_index("customer_id")
+    churn_server.feature_lookup = lambda customer_ids: stored_features.loc[customer_ids]
+    
+    table = ChurnScoreTable(BatchJobRunner(BatchJobStore(root / "jobs.db"), root / "results", root))
+    pass_time, job = timed(asyncio.run, table.run_pass())
+    print(f"Scoring pass over {job['processed_records']} customers: {pass_time:.2f} s "
+          f"({job['processed_records'] / pass_time:.0f} customers/s)\n")
+    
+    rng = np.random.default_rng(0)
+    print(f"{'batch':>7} {'score table (ms)':>17} {'live (ms)':>10} {'speedup':>8}")
+    for size in sizes:
+        customer_ids = features["customer_id"].to_numpy()[rng.choice(customers, size, replace=False)].tolist()
+        requests = [CustomerInput(customer_id=customer_id) for customer_id in customer_ids]
+        stored_time = median_time(table.lookup, customer_ids, version)
+        live_time = median_time(churn_server.score, requests)
+        print(f"{size:>7} {stored_time * 1000:17.3f} {live_time * 1000:10.3f} {live_time / stored_time:7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--customers", type=int, default=200_000)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 10_000])
+    args = parser.parse_args()
+    
+    run(args.customers, args.sizes)
+
+
+if __name__ == "__main__":
+    main()
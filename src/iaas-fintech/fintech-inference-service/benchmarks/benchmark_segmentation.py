@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark customer segmentation: MiniBatchKMeans training and centroid-table assignment
+
+Trains CustomerSegmentationModel on a synthetic customer feature table,
+then assigns batches through the precomputed centroid table, next to the
+clusterer's own ``predict``, and folds new customers in with
+``partial_fit``.
+
+Usage:
+    python benchmarks/benchmark_segmentation.py [--customers 1000000] [--sizes 1 100 10000]
+"""
+
+import argparse
+import contextlib
+import io
+import statistics
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from common import timed
+from models.segmentation_model import CustomerSegmentationModel, SEGMENT_FEATURE_COLUMNS
+
+
+def customer_features(n: int, seed: int = 0) -> pd.DataFrame:
+    """Features drawn around a handful of behavioral profiles"""
+    rng = np.random.default_rng(seed)
+    profiles = rng.uniform(1, 500, size=(8, len(SEGMENT_FEATURE_COLUMNS)))
+    group = rng.integers(len(profiles), size=n)
+    values = profiles[group] * rng.lognormal(0, 0.3, size=(n, len(SEGMENT_FEATURE_COLUMNS)))
+    return pd.DataFrame(values, columns=SEGMENT_FEATURE_COLUMNS)
+
+
+def median_time(func, *args, repeats: int = 7) -> float:
+    return statistics.median(timed(func, *args)[0] for _ in range(repeats))
+
+
+def run(customers: int, sizes) -> None:
+    """Time training, assignment per batch size and an incremental update"""
+    features = customer_features(customers)
+    model = CustomerSegmentationModel(model_path=tempfile.mkdtemp())
+    with contextlib.redirect_stdout(io.StringIO()):
+        train_time, metrics = timed(model.train, features)
+    print(f"Trained {model.n_segments} segments on {customers} customers in {train_time:.2f} s "
+          f"({customers / train_time:.0f} customers/s, mean confidence {metrics['mean_confidence']:.2f})\n")
+    
+    X = model.feature_matrix(customer_features(max(sizes), seed=1)).to_numpy()
+    print(f"{'batch':>7} {'centroid table (ms)':>20} {'MiniBatchKMeans.predict (ms)':>29} {'customers/s':>12}")
+    for size in sizes:
+        batch = X[:size]
+        table_time = median_time(model.assign, batch)
+        predict_time = median_time(lambda: model.model.predict(model.index.transform(batch)))
+        print(f"{size:>7} {table_time * 1000:20.3f} {predict_time * 1000:29.3f} {size / table_time:12.0f}")
+    
+    update = customer_features(10_000, seed=2)
+    update_time, _ = timed(model.partial_fit, update)
+    print(f"\npartial_fit with {len(update)} new customers: {update_time * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--customers", type=int, default=1_000_000)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 10_000])
+    args = parser.parse_args()
+    
+    run(args.customers, args.sizes)
+
+
+if __name__ == "__main__":
+    main()
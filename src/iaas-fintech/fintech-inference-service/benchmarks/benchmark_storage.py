@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Benchmark table load time and memory: plain CSV vs. typed CSV vs. Parquet
+
+Usage:
+    python benchmarks/benchmark_storage.py [--customers 1000 10000] [--repeats 3]
+"""
+
+import argparse
+import statistics
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+from common import synthetic_transactions, timed
+from data.storage import TableStorage
+
+
+FEATURE_STORE_COLUMNS = ["customer_id", "transaction_date", "amount", "merchant", "category", "mode", "location"]
+
+
+def load_variants(root: Path):
+    """(label, loader) pairs for each way of reading the transactions table"""
+    csv_storage = TableStorage(root / "csv", format="csv")
+    parquet_storage = TableStorage(root / "parquet")
+    csv_path = csv_storage.path("transactions")
+    
+    return [
+        ("pd.read_csv (before)", lambda: pd.read_csv(csv_path, parse_dates=["transaction_date"])),
+        ("typed CSV", lambda: csv_storage.read("transactions")),
+        ("Parquet", lambda: parquet_storage.read("transactions")),
+        ("Parquet, 7 columns", lambda: parquet_storage.read("transactions", columns=FEATURE_STORE_COLUMNS)),
+    ]
+
+
+def run(sizes, repeats: int) -> None:
+    """Write each dataset in both formats and time loading it back"""
+    print(f"{'customers':>10} {'rows':>9} {'variant':<22} {'file (MB)':>10} {'load (s)':>9} {'memory (MB)':>12}")
+    
+    for num_customers in sizes:
+        transactions = synthetic_transactions(num_customers)
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            file_sizes = {
+                "csv": TableStorage(root / "csv", format="csv").write(transactions, "transactions").stat().st_size,
+                "parquet": TableStorage(root / "parquet").write(transactions, "transactions").stat().st_size,
+            }
+            
+            for label, loader in load_variants(root):
+                load_time = statistics.median(timed(loader)[0] for _ in range(repeats))
+                memory = loader().memory_usage(deep=True).sum()
+                file_size = file_sizes["parquet" if label.startswith("Parquet") else "csv"]
+                print(f"{num_customers:>10} {len(transactions):>9} {label:<22} {file_size / 1e6:10.1f} "
+                      f"{load_time:9.3f} {memory / 1e6:12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--customers", type=int, nargs="+", default=[1_000, 10_000])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    
+    run(args.customers, args.repeats)
+
+
+if __name__ == "__main__":
+    main()
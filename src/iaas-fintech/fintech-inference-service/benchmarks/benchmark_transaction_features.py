@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Benchmark the iterrows and streaming transaction feature engines
+
+Usage:
+    python benchmarks/benchmark_transaction_features.py [--sizes 100 1000 10000] [--loop-max 1000]
+"""
+
+import argparse
+import contextlib
+import io
+
+from common import synthetic_transactions, timed
+from data.feature_engineering import FeatureEngineer
+
+
+def run(sizes, loop_max: int, avg_transactions: int) -> None:
+    """Time both engines for each customer count"""
+    print(f"{'customers':>10} {'transactions':>13} {'loop (s)':>10} {'streaming (s)':>14} {'us/txn':>8}")
+    
+    for num_customers in sizes:
+        df = synthetic_transactions(num_customers, avg_transactions=avg_transactions)
+        
+        # Silence the engines' progress prints
+        with contextlib.redirect_stdout(io.StringIO()):
+            streaming_time, _ = timed(FeatureEngineer(vectorized=True).create_transaction_features, df)
+            loop_time = None
+            if num_customers <= loop_max:
+                loop_time, _ = timed(FeatureEngineer().create_transaction_features, df)
+        
+        loop_text = f"{loop_time:10.2f}" if loop_time is not None else f"{'skipped':>10}"
+        per_transaction = streaming_time / len(df) * 1e6
+        print(f"{num_customers:>10} {len(df):>13} {loop_text} {streaming_time:14.2f} {per_transaction:8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1_000, 10_000, 100_000])
+    parser.add_argument("--loop-max", type=int, default=1_000,
+                        help="Largest customer count to run the iterrows loop on")
+    parser.add_argument("--avg-transactions", type=int, default=50)
+    args = parser.parse_args()
+    
+    run(args.sizes, args.loop_max, args.avg_transactions)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-worker memory for the churn model with and without memory-mapping
+
+Starts several worker processes at once, as uvicorn or the process executor
+would, and has each load the churn artifact, its compiled trees and a SHAP
+index over ``--customers`` customers, then answer index lookups. Each worker
+reports how much its RSS, USS (pages private to it) and PSS (its fair share
+of pages it shares) grew from loading, with ``settings.model_mmap`` off and on.
+
+Linux only: memory is read from /proc/self/smaps_rollup.
+
+Usage:
+    python benchmarks/benchmark_worker_memory.py [--workers 4] [--customers 100000]
+"""
+
+import argparse
+import contextlib
+import io
+import multiprocessing
+import shutil
+import statistics
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from common import timed
+from api.serving import ChurnModelServer, resolve_model_file
+from models.base_model import artifact_version
+from models.churn_model import CHURN_FEATURE_COLUMNS, ChurnPredictionModel
+from models.compiled_trees import CompiledTreeEnsemble, compiled_trees_path
+from models.shap_index import ShapIndex, shap_index_path
+from utils.config import settings
+
+
+def memory_mb() -> dict:
+    """RSS, USS and PSS of this process in MB"""
+    fields = {}
+    for line in Path("/proc/self/smaps_rollup").read_text().splitlines()[1:]:
+        name, value = line.split(":")
+        fields[name] = int(value.split()[0]) / 1024
+    return {
+        "rss": fields["Rss"],
+        "uss": fields["Private_Clean"] + fields["Private_Dirty"],
+        "pss": fields["Pss"]
+    }
+
+
+def worker(model_file: str, mmap: bool, lookups: int, results, release) -> None:
+    """Load the model the way the serving layer does and report memory growth"""
+    from api.explanations import ExplanationService
+    
+    settings.model_mmap = mmap
+    before = memory_mb()
+    
+    server = ChurnModelServer(model_file=Path(model_file), scorer_backend="compiled")
+    with contextlib.redirect_stdout(io.StringIO()):
+        server.load()
+    service = ExplanationService(server)
+    service._prepare()
+    
+    # Serve lookups spread over the whole customer base
+    index = service.index
+    for row in np.random.default_rng().integers(0, len(index), size=lookups):
+        index.lookup(str(index.customer_ids[row]))
+    
+    after = memory_mb()
+    results.put({name: after[name] - before[name] for name in after})
+    release.wait()  # stay alive until every worker has measured, so shared pages are counted as shared
+
+
+def measure(model_file: Path, mmap: bool, workers: int, lookups: int) -> list:
+    """Per-worker memory growth with all workers loaded at the same time"""
+    context = multiprocessing.get_context("spawn")
+    results, release = context.Queue(), context.Event()
+    processes = [
+        context.Process(target=worker, args=(str(model_file), mmap, lookups, results, release))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    
+    deltas = [results.get() for _ in processes]
+    release.set()
+    for process in processes:
+        process.join()
+    return deltas
+
+
+def prepare_artifacts(workdir: Path, customers: int) -> Path:
+    """Copy the churn model and write its compiled trees and a synthetic SHAP index next to it"""
+    source = resolve_model_file("churn_prediction")
+    model_file = workdir / "churn_prediction_model.joblib"
+    shutil.copy2(source, model_file)
+    
+    model = ChurnPredictionModel(model_path=str(workdir))
+    with contextlib.redirect_stdout(io.StringIO()):
+        model.load_model(str(model_file))
+    CompiledTreeEnsemble.from_estimator(model.model).save(compiled_trees_path(model_file), artifact_version(model_file))
+    
+    rng = np.random.default_rng(42)
+    features = pd.DataFrame(rng.uniform(0, 100, size=(customers, len(CHURN_FEATURE_COLUMNS))),
+                            columns=CHURN_FEATURE_COLUMNS)
+    features.insert(0, "customer_id", [f"CUST_{i:06d}" for i in range(customers)])
+    
+    elapsed, index = timed(ShapIndex.build, model, features, artifact_version(model_file))
+    index.save(shap_index_path(model_file))
+    print(f"Model: {source}")
+    print(f"SHAP index over {customers} customers built in {elapsed:.1f} s, "
+          f"{shap_index_path(model_file).stat().st_size / 1e6:.1f} MB on disk")
+    return model_file
+
+
+def run(workers: int, customers: int, lookups: int) -> None:
+    """Compare per-worker memory with copies vs. memory-mapped artifacts"""
+    with tempfile.TemporaryDirectory() as tmp:
+        model_file = prepare_artifacts(Path(tmp), customers)
+        
+        print(f"\nPer-worker growth from loading, {workers} workers alive at once (MB, mean)")
+        print(f"{'mode':>10} {'RSS':>8} {'USS':>8} {'PSS':>8} {'total PSS':>10}")
+        for mmap in (False, True):
+            deltas = measure(model_file, mmap, workers, lookups)
+            mean = {name: statistics.fmean(delta[name] for delta in deltas) for name in deltas[0]}
+            print(f"{'mmap' if mmap else 'copy':>10} {mean['rss']:8.1f} {mean['uss']:8.1f} {mean['pss']:8.1f} "
+                  f"{mean['pss'] * workers:10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--customers", type=int, default=100_000, help="Customers in the SHAP index")
+    parser.add_argument("--lookups", type=int, default=20_000, help="Index lookups per worker after loading")
+    args = parser.parse_args()
+    
+    run(args.workers, args.customers, args.lookups)
+
+
+if __name__ == "__main__":
+    main()
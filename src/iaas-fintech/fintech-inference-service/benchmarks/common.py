@@ -0,0 +1,61 @@
+"""
+Shared helpers for the benchmark scripts
+"""
+
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Add src directory to Python path
+SRC_PATH = Path(__file__).parent.parent / "src"
+sys.path.insert(0, str(SRC_PATH))
+
+CATEGORIES = ["grocery", "restaurant", "gas", "retail", "entertainment",
+              "healthcare", "utilities", "transport", "banking", "income"]
+MERCHANTS_PER_CATEGORY = 6
+PAYMENT_MODES = ["Credit Card", "Debit Card", "Bank Transfer", "UPI", "Cash", "Check"]
+LOCATIONS = ["New York", "Los Angeles", "Chicago", "Houston", "Phoenix", "Philadelphia",
+             "San Antonio", "San Diego", "Dallas", "San Jose", "Austin", "Jacksonville"]
+
+
+def synthetic_transactions(num_customers: int, avg_transactions: int = 50,
+                           num_days: int = 180, seed: int = 42) -> pd.DataFrame:
+    """Build a transaction frame shaped like data/raw/transactions.csv using NumPy draws"""
+    rng = np.random.default_rng(seed)
+    counts = rng.poisson(avg_transactions, size=num_customers).clip(min=1)
+    n = int(counts.sum())
+    
+    customer_index = np.repeat(np.arange(num_customers), counts)
+    category_index = rng.integers(0, len(CATEGORIES), size=n)
+    merchant_index = rng.integers(0, MERCHANTS_PER_CATEGORY, size=n)
+    amounts = np.round(rng.uniform(5, 300, size=n), 2)
+    is_income = category_index == CATEGORIES.index("income")
+    
+    start = np.datetime64("2024-01-01T00:00")
+    minutes = rng.integers(0, num_days * 24 * 60, size=n).astype("timedelta64[m]")
+    
+    categories = np.array(CATEGORIES)[category_index]
+    df = pd.DataFrame({
+        "transaction_id": np.char.add("TXN_", np.arange(n).astype(str)),
+        "customer_id": np.char.add("CUST_", np.char.zfill((customer_index + 1).astype(str), 6)),
+        "transaction_date": start + minutes,
+        "amount": np.where(is_income, amounts * 10, -amounts),
+        "merchant": np.char.add(np.char.add(categories, "_merchant_"), merchant_index.astype(str)),
+        "category": categories,
+        "mode": np.array(PAYMENT_MODES)[rng.integers(0, len(PAYMENT_MODES), size=n)],
+        "location": np.array(LOCATIONS)[rng.integers(0, len(LOCATIONS), size=n)],
+        "is_fraud": rng.random(n) < 0.02,
+    })
+    
+    return df.sort_values("transaction_date").reset_index(drop=True)
+
+
+def timed(func: Callable, *args, **kwargs) -> Tuple[float, object]:
+    """Run ``func`` once and return (elapsed seconds, result)"""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
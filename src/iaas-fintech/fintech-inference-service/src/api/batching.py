@@ -0,0 +1,126 @@
+"""
+Dynamic micro-batching of concurrent inference requests
+"""
+
+import asyncio
+import logging
+import time
+import weakref
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingBatch:
+    """Requests collected on one event loop while the batch window is open"""
+    
+    __slots__ = ("items", "futures", "enqueued_at", "timer")
+    
+    def __init__(self):
+        self.items: List[Any] = []
+        self.futures: List[asyncio.Future] = []
+        self.enqueued_at: List[float] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class MicroBatcher:
+    """Coalesce concurrent single-item requests into one vectorized call
+    
+    Items submitted within ``max_wait_ms`` of the first pending item, or until
+    ``max_batch_size`` is reached, are passed together to ``score_fn``, which
+    must return one result per item in the same order. Each caller awaits
+    only its own result.
+    """
+    
+    def __init__(self, score_fn: Callable[[List[Any]], List[Any]],
+                 max_batch_size: int = 256, max_wait_ms: float = 2.0):
+        """Initialize the batcher around a batch scoring function"""
+        self.score_fn = score_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        
+        # Optional InferenceExecutor to run score_fn off the event loop
+        self.executor = None
+        
+        self.batch_sizes = Histogram([1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024])
+        self.queue_wait_ms = Histogram([0.1, 0.5, 1, 2, 5, 10, 25, 50, 100, 250])
+        
+        # Batches are bound to the loop their futures belong to
+        self._pending: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _PendingBatch]" = weakref.WeakKeyDictionary()
+    
+    async def submit(self, item: Any) -> Any:
+        """Queue an item for the next batch and wait for its result"""
+        loop = asyncio.get_running_loop()
+        batch = self._pending.get(loop)
+        if batch is None:
+            batch = self._pending[loop] = _PendingBatch()
+        
+        future = loop.create_future()
+        batch.items.append(item)
+        batch.futures.append(future)
+        batch.enqueued_at.append(time.perf_counter())
+        
+        if len(batch.items) >= self.max_batch_size:
+            self._flush(loop)
+        elif batch.timer is None:
+            batch.timer = loop.call_later(self.max_wait_ms / 1000, self._flush, loop)
+        
+        return await future
+    
+    def _flush(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Close the current batch for ``loop`` and score it"""
+        batch = self._pending.pop(loop, None)
+        if batch is None:
+            return
+        if batch.timer is not None:
+            batch.timer.cancel()
+        
+        flushed_at = time.perf_counter()
+        for enqueued_at in batch.enqueued_at:
+            self.queue_wait_ms.observe((flushed_at - enqueued_at) * 1000)
+        self.batch_sizes.observe(len(batch.items))
+        
+        if self.executor is None:
+            try:
+                results = self.score_fn(batch.items)
+            except Exception as e:
+                self._set_exception(batch.futures, e)
+            else:
+                self._set_results(batch.futures, results)
+            return
+        
+        scoring = loop.create_task(self.executor.run(self.score_fn, batch.items))
+        scoring.add_done_callback(lambda done: self._complete(batch.futures, done))
+    
+    def _complete(self, futures: List[asyncio.Future], done: asyncio.Future) -> None:
+        """Resolve callers once an executor-backed batch finishes"""
+        if done.cancelled():
+            self._set_exception(futures, asyncio.CancelledError())
+        elif done.exception() is not None:
+            self._set_exception(futures, done.exception())
+        else:
+            self._set_results(futures, done.result())
+    
+    @staticmethod
+    def _set_results(futures: List[asyncio.Future], results: List[Any]) -> None:
+        for future, result in zip(futures, results):
+            if not future.done():  # caller may have disconnected
+                future.set_result(result)
+    
+    @staticmethod
+    def _set_exception(futures: List[asyncio.Future], error: BaseException) -> None:
+        logger.error(f"Micro-batch scoring failed for {len(futures)} requests: {error}")
+        for future in futures:
+            if not future.done():
+                future.set_exception(error)
+    
+    def stats(self) -> Dict:
+        """Configuration plus batch size and queue wait histograms"""
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_wait_ms": self.queue_wait_ms.snapshot()
+        }
@@ -0,0 +1,169 @@
+"""
+Bounded worker pool for CPU-bound inference and analytics work
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+
+from utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutorSaturatedError(HTTPException):
+    """Raised when the worker pool already holds its maximum number of pending tasks"""
+    
+    def __init__(self, max_pending: int):
+        super().__init__(
+            status_code=503,
+            detail=f"Inference workers saturated ({max_pending} pending tasks), retry shortly",
+            headers={"Retry-After": "1"}
+        )
+
+
+def _invoke_in_worker(fn: Callable, args: Tuple, kwargs: Dict) -> Tuple:
+    """Run ``fn`` in a worker process, returning HTTP errors as plain data
+    
+    HTTPException cannot be pickled back to the parent, so it is re-raised
+    there from its status code and detail.
+    """
+    try:
+        return ("ok", fn(*args, **kwargs))
+    except HTTPException as e:
+        return ("http_error", e.status_code, e.detail)
+
+
+def _preload_worker() -> None:
+    """Process pool initializer: load models and data once per worker
+    
+    Workers get the same feature store and churn and segment models as the
+    API process, so pooled scoring (batch jobs and full-base score passes
+    included) resolves features and segments exactly like the live path.
+    """
+    from api.routes import customers, inference
+    
+    customers.load_data()
+    inference.load_models()
+
+
+class InferenceExecutor:
+    """Thread or process pool with a bounded number of pending tasks
+    
+    ``submit`` raises ExecutorSaturatedError (a 503) instead of queueing
+    without limit, so overload sheds requests rather than growing latency.
+    """
+    
+    def __init__(self, kind: str = "thread", max_workers: int = 4, max_pending: int = 64,
+                 initializer: Optional[Callable] = _preload_worker):
+        """Initialize the executor; the pool is created on first use"""
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind: {kind}")
+        
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.initializer = initializer
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self._pool: Optional[Executor] = None
+        self._lock = threading.Lock()
+    
+    @property
+    def pool(self) -> Executor:
+        """The underlying concurrent.futures pool"""
+        with self._lock:
+            if self._pool is None:
+                if self.kind == "process":
+                    self._pool = ProcessPoolExecutor(max_workers=self.max_workers, initializer=self.initializer)
+                else:
+                    self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+                logger.info(f"Started {self.kind} pool with {self.max_workers} workers")
+            return self._pool
+    
+    def submit(self, fn: Callable, *args, **kwargs) -> asyncio.Future:
+        """Schedule ``fn`` on the pool and return an awaitable future"""
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise ExecutorSaturatedError(self.max_pending)
+            self.pending += 1
+        
+        try:
+            if self.kind == "process":
+                future = self.pool.submit(_invoke_in_worker, fn, args, kwargs)
+            else:
+                future = self.pool.submit(fn, *args, **kwargs)
+        except Exception:
+            with self._lock:
+                self.pending -= 1
+            raise
+        
+        future.add_done_callback(self._task_done)
+        return asyncio.wrap_future(future)
+    
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run ``fn`` on the pool and wait for its result"""
+        result = await self.submit(fn, *args, **kwargs)
+        
+        if self.kind == "process":
+            if result[0] == "http_error":
+                raise HTTPException(status_code=result[1], detail=result[2])
+            return result[1]
+        return result
+    
+    def _task_done(self, _future) -> None:
+        with self._lock:
+            self.pending -= 1
+            self.completed += 1
+    
+    def stats(self) -> Dict:
+        """Pool configuration and load counters"""
+        return {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected
+        }
+    
+    def recycle(self) -> None:
+        """Replace process workers with freshly preloaded ones, e.g. after a model reload
+        
+        The new workers are started and initialized before the swap; tasks
+        already running on the old pool finish there. Thread pools share the
+        parent's models and need no recycling.
+        """
+        if self.kind != "process":
+            return
+        
+        pool = ProcessPoolExecutor(max_workers=self.max_workers, initializer=self.initializer)
+        wait([pool.submit(os.getpid) for _ in range(self.max_workers)])
+        
+        with self._lock:
+            old, self._pool = self._pool, pool
+        if old is not None:
+            old.shutdown(wait=False)
+        logger.info(f"Recycled process pool with {self.max_workers} workers")
+    
+    def shutdown(self) -> None:
+        """Stop the pool, waiting for running tasks"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+
+# Shared executor configured from settings
+inference_executor = InferenceExecutor(
+    kind=settings.inference_executor,
+    max_workers=settings.inference_workers,
+    max_pending=settings.inference_max_pending
+)
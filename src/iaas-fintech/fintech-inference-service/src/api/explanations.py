@@ -0,0 +1,273 @@
+"""
+Batched SHAP explanations for the churn model, cached per feature vector
+"""
+
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from models.churn_model import ChurnPredictionModel
+from models.shap_index import ShapIndex, shap_index_path
+from utils.cache import VersionedCache
+from utils.config import settings
+
+from .schemas.models import (
+    CustomerInput, DriverRanking, ExplanationBatchResponse, FeatureContribution, ModelExplanation
+)
+from .serving import ChurnModelServer, LoadedModel, churn_server
+
+logger = logging.getLogger(__name__)
+
+
+def build_explanation(customer_id: str, probability: float, risk_level: str,
+                      drivers: List[FeatureContribution], source: str) -> ModelExplanation:
+    """Explanation response with a plain-language summary of the strongest drivers"""
+    reasons = [
+        f"{d.feature_name} = {d.feature_value:g} {'raises' if d.contribution > 0 else 'lowers'} churn risk"
+        for d in drivers[:3]
+    ]
+    
+    return ModelExplanation(
+        customer_id=customer_id,
+        prediction=bool(ChurnPredictionModel.classify(probability)),
+        probability=[1 - probability, probability],
+        feature_contributions=drivers,
+        explanation_summary=f"Churn probability {probability:.0%} ({risk_level} risk). Main drivers: {'; '.join(reasons)}.",
+        source=source
+    )
+
+
+class ExplanationBatch:
+    """SHAP contributions for a batch of customers, one row per customer"""
+    
+    def __init__(self, customer_ids: List[str], feature_names: List[str], values: np.ndarray,
+                 contributions: np.ndarray, probabilities: np.ndarray, risk_levels: np.ndarray,
+                 importance: Dict[str, float], cached_rows: int):
+        self.customer_ids = customer_ids
+        self.feature_names = feature_names
+        self.values = values
+        self.contributions = contributions
+        self.probabilities = probabilities
+        self.risk_levels = risk_levels
+        self.importance = importance
+        self.cached_rows = cached_rows
+    
+    def __len__(self) -> int:
+        return len(self.customer_ids)
+    
+    def explanation(self, row: int, top_k: Optional[int] = None) -> ModelExplanation:
+        """One customer's explanation, drivers ordered by absolute contribution"""
+        contributions = self.contributions[row]
+        probability = float(self.probabilities[row])
+        
+        drivers = [
+            FeatureContribution(
+                feature_name=self.feature_names[i],
+                feature_value=float(self.values[row, i]),
+                contribution=float(contributions[i]),
+                importance=self.importance.get(self.feature_names[i], 0.0)
+            )
+            for i in np.argsort(-np.abs(contributions), kind="stable")[:top_k]
+        ]
+        
+        return build_explanation(self.customer_ids[row], probability, self.risk_levels[row], drivers, "computed")
+    
+    def top_drivers(self, top_k: int = 5) -> List[DriverRanking]:
+        """Features ranked by mean absolute contribution across the batch"""
+        if not len(self):
+            return []
+        
+        magnitudes = np.abs(self.contributions)
+        mean_abs = magnitudes.mean(axis=0)
+        mean = self.contributions.mean(axis=0)
+        increases = (self.contributions > 0).mean(axis=0)
+        top_share = np.bincount(magnitudes.argmax(axis=1), minlength=len(self.feature_names)) / len(self)
+        
+        return [
+            DriverRanking(
+                feature_name=self.feature_names[i],
+                mean_abs_contribution=float(mean_abs[i]),
+                mean_contribution=float(mean[i]),
+                increases_risk_share=float(increases[i]),
+                top_driver_share=float(top_share[i])
+            )
+            for i in np.argsort(-mean_abs, kind="stable")[:top_k]
+        ]
+
+
+class ExplanationService:
+    """Explains churn scores with one SHAP explainer per loaded model
+    
+    Stored customers are answered from the precomputed ShapIndex when one
+    was built for the loaded artifact. Otherwise explanations are cached by a
+    hash of the model's feature vector, so an unchanged customer - or any
+    customer with identical features - is served without touching SHAP. A
+    batch computes all of its misses in a single vectorized explainer call,
+    and loading another model invalidates the cache.
+    """
+    
+    def __init__(self, server: ChurnModelServer, max_entries: int = 50_000):
+        """Initialize the service over a churn model server"""
+        self.server = server
+        self.cache = VersionedCache(max_entries=max_entries)
+        self.index: Optional[ShapIndex] = None
+        self._index_stamp = None
+        self._model: Optional[ChurnPredictionModel] = None
+        self._importance: Dict[str, float] = {}
+        self._lock = threading.Lock()
+    
+    def _prepare(self) -> LoadedModel:
+        """The served model, with its explainer and importances set up once per model"""
+        loaded = self.server.current()
+        model = loaded.model
+        
+        with self._lock:
+            if self._model is not model:
+                model.get_explainer()
+                importance = model.feature_importance
+                self._importance = (
+                    dict(zip(importance["feature"], importance["importance"].astype(float)))
+                    if importance is not None else {}
+                )
+                self._model = model
+                self._index_stamp = None
+                logger.info(f"Explainer ready for churn model {loaded.version}")
+            
+            self._refresh_index(loaded.model_file)
+        
+        return loaded
+    
+    def _refresh_index(self, model_file: Path) -> None:
+        """Pick up a SHAP index written for the loaded artifact (caller holds the lock)"""
+        path = shap_index_path(model_file)
+        stamp = path.stat().st_mtime_ns if path.exists() else None
+        if stamp == self._index_stamp:
+            return
+        
+        self._index_stamp = stamp
+        mmap_mode = "r" if settings.model_mmap else None
+        self.index = ShapIndex.load_for(model_file, mmap_mode=mmap_mode) if stamp is not None else None
+        if self.index is not None:
+            logger.info(f"SHAP index loaded for {len(self.index)} customers")
+        elif stamp is not None:
+            logger.warning(f"SHAP index at {path} was built for another model version; ignoring it")
+    
+    def explain_indexed(self, customer_id: str, top_k: Optional[int] = None) -> Optional[ModelExplanation]:
+        """A stored customer's explanation from the SHAP index, or None if it cannot answer"""
+        model = self._prepare().model
+        index = self.index
+        if index is None or (top_k or index.top_k) > index.top_k:
+            return None
+        
+        entry = index.lookup(customer_id, top_k)
+        if entry is None:
+            return None
+        
+        probability = entry["churn_probability"]
+        drivers = [
+            FeatureContribution(**driver, importance=index.importance.get(driver["feature_name"], 0.0))
+            for driver in entry["drivers"]
+        ]
+        risk_level = model.categorize_risk(np.array([probability]))[0]
+        
+        return build_explanation(customer_id, probability, risk_level, drivers, "index")
+    
+    def explain_frame(self, frame: pd.DataFrame) -> ExplanationBatch:
+        """Explain every row of a customer feature frame"""
+        loaded = self._prepare()
+        model, version = loaded.model, loaded.version
+        
+        X = model.feature_matrix(frame)
+        keys = pd.util.hash_pandas_object(X, index=False).to_numpy()
+        
+        entries = self.cache.get_many(keys.tolist(), version)
+        cached_rows = sum(1 for key in keys.tolist() if key in entries)
+        
+        missing = np.flatnonzero([key not in entries for key in keys.tolist()])
+        if len(missing):
+            # Customers sharing a feature vector are explained once
+            missing_keys, first = np.unique(keys[missing], return_index=True)
+            unique_rows = X.iloc[missing[first]]
+            
+            contributions, _ = model.shap_values(unique_rows)
+            probabilities = model.model.predict_proba(unique_rows)[:, 1]
+            
+            computed = dict(zip(missing_keys.tolist(), zip(contributions, probabilities.astype(float))))
+            self.cache.put_many(computed, version)
+            entries.update(computed)
+        
+        rows = [entries[key] for key in keys.tolist()]
+        contributions = np.array([row[0] for row in rows]).reshape(len(rows), len(model.feature_columns))
+        probabilities = np.array([row[1] for row in rows], dtype=float)
+        
+        return ExplanationBatch(
+            customer_ids=frame["customer_id"].astype(str).tolist() if "customer_id" in frame else [""] * len(X),
+            feature_names=list(model.feature_columns),
+            values=X.to_numpy(),
+            contributions=contributions,
+            probabilities=probabilities,
+            risk_levels=model.categorize_risk(probabilities),
+            importance=self._importance,
+            cached_rows=cached_rows
+        )
+    
+    def stats(self) -> Dict:
+        """Explanation cache counters and the loaded SHAP index"""
+        index = self.index
+        return {
+            "cache": self.cache.stats(),
+            "index": {
+                "customers": len(index),
+                "top_k": index.top_k,
+                "model_version": index.model_version,
+                "built_at": index.built_at.isoformat()
+            } if index is not None else None
+        }
+
+
+# Process-wide service over the shared churn server
+explanation_service = ExplanationService(churn_server, max_entries=settings.explanation_cache_entries)
+
+
+def explain_customers(customers: List[CustomerInput], top_k: Optional[int] = None) -> List[ModelExplanation]:
+    """Explain each customer with this process's service (picklable for worker pools)
+    
+    Customers sent without features are answered from the SHAP index when
+    possible; the rest are explained together in one batch.
+    """
+    explanations = {}
+    for position, customer in enumerate(customers):
+        if not customer.features:
+            indexed = explanation_service.explain_indexed(customer.customer_id, top_k)
+            if indexed is not None:
+                explanations[position] = indexed
+    
+    pending = [position for position in range(len(customers)) if position not in explanations]
+    if pending:
+        batch = explanation_service.explain_frame(churn_server.build_feature_frame([customers[p] for p in pending]))
+        explanations.update((position, batch.explanation(row, top_k)) for row, position in enumerate(pending))
+    
+    return [explanations[position] for position in range(len(customers))]
+
+
+def explain_batch(customers: List[CustomerInput], top_k: int = 5, include_explanations: bool = False,
+                  skip_missing: bool = False) -> ExplanationBatchResponse:
+    """Rank churn drivers across customers in one explainer call (picklable for worker pools)"""
+    frame = churn_server.build_feature_frame(customers, skip_missing=skip_missing)
+    batch = explanation_service.explain_frame(frame)
+    
+    return ExplanationBatchResponse(
+        top_drivers=batch.top_drivers(top_k),
+        explanations=[batch.explanation(row, top_k) for row in range(len(batch))] if include_explanations else None,
+        summary={
+            "total_customers": len(batch),
+            "skipped_customers": len(customers) - len(batch),
+            "cached_explanations": batch.cached_rows,
+            "predicted_churners": int(ChurnPredictionModel.classify(batch.probabilities).sum()),
+            "avg_churn_probability": float(batch.probabilities.mean()) if len(batch) else 0.0
+        }
+    )
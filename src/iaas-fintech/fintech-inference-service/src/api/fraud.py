@@ -0,0 +1,495 @@
+"""
+Streaming fraud scoring over compact per-customer transaction state
+"""
+
+import logging
+import math
+import threading
+from bisect import bisect_left
+from collections import Counter, OrderedDict, deque
+from datetime import datetime
+from itertools import chain
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.config import settings
+
+from .fraud_rules import FraudRuleEngine, RuleSet, fraud_rules
+from .schemas.models import FraudPrediction, TransactionInput
+
+logger = logging.getLogger(__name__)
+
+# The context features FeatureEngineer.create_transaction_features computes offline
+TRANSACTION_FEATURE_COLUMNS = [
+    "amount", "abs_amount", "is_first_transaction", "days_since_last_transaction",
+    "amount_vs_avg_ratio", "frequency_last_7_days", "frequency_last_30_days",
+    "merchant_seen_before", "category_seen_before", "location_seen_before"
+]
+
+SECONDS_PER_DAY = 86_400
+EPOCH = datetime(1970, 1, 1)
+
+
+def to_seconds(timestamp: datetime) -> float:
+    """Seconds since the epoch on the transaction's own wall clock
+    
+    Timezone-aware timestamps keep their local time rather than being
+    converted to UTC, so weekday and hour are the ones the customer saw and
+    day differences match pandas on naive dates.
+    """
+    return (timestamp.replace(tzinfo=None) - EPOCH).total_seconds()
+
+
+def wall_clock_dates(dates: pd.Series) -> np.ndarray:
+    """A transaction_date column as datetime64[us] on its own wall clock, like ``to_seconds``"""
+    dates = pd.to_datetime(dates)
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_localize(None)
+    return dates.to_numpy().astype("datetime64[us]")
+
+
+def rule_columns(features: Dict, zscore, seconds, merchant, category, location) -> Dict:
+    """What the fraud rules see: the features plus raw fields, weekday (0 is Monday), hour and |z-score|
+    
+    Works the same on one transaction and on column arrays; day 0 (1970-01-01) was a Thursday.
+    """
+    if isinstance(seconds, (int, float)):
+        day, second_of_day = divmod(seconds, SECONDS_PER_DAY)
+        weekday, hour = (int(day) + 3) % 7, int(second_of_day // 3600)
+    else:
+        day, second_of_day = np.divmod(np.asarray(seconds, dtype=float), SECONDS_PER_DAY)
+        weekday, hour = (day.astype(np.int64) + 3) % 7, (second_of_day // 3600).astype(np.int64)
+    return {**features, "merchant": merchant, "category": category, "location": location,
+            "weekday": weekday, "hour": hour, "abs_zscore": abs(zscore)}
+
+
+class CustomerFraudState:
+    """What the scorer remembers about one customer
+    
+    A ring buffer of recent timestamps for the 7- and 30-day velocity
+    counts, running count, sum, mean and variance of amounts (Welford), and
+    the merchants, categories and locations seen so far. Everything is
+    updated in constant time per transaction.
+    """
+    
+    __slots__ = ("timestamps", "ordered", "count", "total", "mean", "m2", "merchants", "categories", "locations")
+    
+    def __init__(self, window: int):
+        self.timestamps = deque(maxlen=window)
+        self.ordered = True  # arrivals in date order let the window counts bisect
+        self.count = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.merchants = set()
+        self.categories = set()
+        self.locations = set()
+    
+    def features(self, seconds: float, amount: float, merchant: str, category: str, location: str) -> Dict:
+        """Context features of a transaction against the history before it"""
+        if self.count == 0:
+            return {
+                "amount": amount,
+                "abs_amount": abs(amount),
+                "is_first_transaction": 1,
+                "days_since_last_transaction": 0,
+                "amount_vs_avg_ratio": 1,
+                "frequency_last_7_days": 0,
+                "frequency_last_30_days": 0,
+                "merchant_seen_before": 0,
+                "category_seen_before": 0,
+                "location_seen_before": 0
+            }
+        
+        last_7_days, last_30_days = self.window_counts(seconds)
+        average = self.total / self.count
+        return {
+            "amount": amount,
+            "abs_amount": abs(amount),
+            "is_first_transaction": 0,
+            "days_since_last_transaction": int((seconds - self.timestamps[-1]) // SECONDS_PER_DAY),
+            "amount_vs_avg_ratio": amount / average if average != 0 else 1,
+            "frequency_last_7_days": last_7_days,
+            "frequency_last_30_days": last_30_days,
+            "merchant_seen_before": int(merchant in self.merchants),
+            "category_seen_before": int(category in self.categories),
+            "location_seen_before": int(location in self.locations)
+        }
+    
+    def window_counts(self, seconds: float) -> Tuple[int, int]:
+        """Remembered transactions in [t - 7 days, t] and [t - 30 days, t]
+        
+        The buffer holds only the most recent ``window`` timestamps, which caps
+        both counts.
+        """
+        timestamps = self.timestamps
+        week_start = seconds - 7 * SECONDS_PER_DAY
+        month_start = seconds - 30 * SECONDS_PER_DAY
+        if self.ordered:
+            return (len(timestamps) - bisect_left(timestamps, week_start),
+                    len(timestamps) - bisect_left(timestamps, month_start))
+        return (sum(1 for timestamp in timestamps if timestamp >= week_start),
+                sum(1 for timestamp in timestamps if timestamp >= month_start))
+    
+    def amount_zscore(self, amount: float) -> float:
+        """How many standard deviations ``amount`` is from this customer's mean (0 without spread)"""
+        if self.count < 2 or self.m2 <= 0:
+            return 0.0
+        return (amount - self.mean) / math.sqrt(self.m2 / (self.count - 1))
+    
+    def update(self, seconds: float, amount: float, merchant: str, category: str, location: str) -> None:
+        if self.timestamps and seconds < self.timestamps[-1]:
+            self.ordered = False
+        self.timestamps.append(seconds)
+        self.count += 1
+        self.total += amount
+        delta = amount - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (amount - self.mean)
+        self.merchants.add(merchant)
+        self.categories.add(category)
+        self.locations.add(location)
+
+
+class StreamingFraudScorer:
+    """Scores each transaction against its customer's history, then remembers it
+    
+    Features are the ones ``FeatureEngineer.create_transaction_features``
+    computes offline, for transactions arriving in date order. Per-customer
+    state is kept for at most ``max_customers`` customers, evicting the least
+    recently active first. Risk factors and the fraud probability come from
+    the compiled rules of ``rules``, the service's rules file by default.
+    """
+    
+    def __init__(self, window: Optional[int] = None, max_customers: Optional[int] = None,
+                 threshold: Optional[float] = None, rules: Optional[FraudRuleEngine] = None):
+        """Initialize with the velocity buffer size, state capacity and decision threshold from settings"""
+        self.window = window or settings.fraud_velocity_window
+        self.max_customers = max_customers or settings.fraud_state_max_customers
+        self.threshold = threshold if threshold is not None else settings.fraud_threshold
+        self.rules = rules or fraud_rules
+        self.states: "OrderedDict[str, CustomerFraudState]" = OrderedDict()
+        self.processed = 0
+        self._lock = threading.Lock()
+    
+    def _state(self, customer_id: str) -> CustomerFraudState:
+        state = self.states.get(customer_id)
+        if state is None:
+            state = self.states[customer_id] = CustomerFraudState(self.window)
+            if len(self.states) > self.max_customers:
+                self.states.popitem(last=False)
+        else:
+            self.states.move_to_end(customer_id)
+        return state
+    
+    def observe(self, customer_id: str, seconds: float, amount: float, merchant: str,
+                category: str, location: str) -> Tuple[Dict, float]:
+        """Features and amount z-score of a transaction, after which it joins the customer's history"""
+        with self._lock:
+            state = self._state(customer_id)
+            features = state.features(seconds, amount, merchant, category, location)
+            zscore = state.amount_zscore(amount)
+            state.update(seconds, amount, merchant, category, location)
+            self.processed += 1
+        return features, zscore
+    
+    def score(self, features: Dict, zscore: float, seconds: float, merchant: str, category: str,
+              location: str) -> Tuple[float, List[str]]:
+        """Fraud probability and the risk factors (matching rules) that contributed to it"""
+        return self.rules.current.score_one(rule_columns(features, zscore, seconds, merchant, category, location))
+    
+    def process(self, customer_id: str, seconds: float, amount: float, merchant: str,
+                category: str, location: str) -> Tuple[float, float, List[str]]:
+        """Score one transaction and add it to the customer's state: (probability, anomaly score, factors)"""
+        features, zscore = self.observe(customer_id, seconds, amount, merchant, category, location)
+        probability, factors = self.score(features, zscore, seconds, merchant, category, location)
+        return probability, abs(zscore), factors
+    
+    def predict(self, transaction: TransactionInput) -> FraudPrediction:
+        """Score a transaction from the API"""
+        probability, anomaly_score, factors = self.process(
+            transaction.customer_id, to_seconds(transaction.transaction_date), transaction.amount,
+            transaction.merchant, getattr(transaction.category, "value", transaction.category), transaction.location
+        )
+        return FraudPrediction(
+            transaction_id=getattr(transaction, "transaction_id", None),
+            customer_id=transaction.customer_id,
+            fraud_probability=probability,
+            fraud_prediction=probability > self.threshold,
+            anomaly_score=anomaly_score,
+            risk_factors=factors
+        )
+    
+    def features_batch(self, customer_ids: np.ndarray, seconds: np.ndarray, amounts: np.ndarray,
+                       merchants: np.ndarray, categories: np.ndarray,
+                       locations: np.ndarray) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+        """Features and amount z-scores for a whole batch as arrays, in input order
+        
+        Each row sees the state before the batch plus the batch's earlier rows
+        for the same customer, exactly as if the batch were processed one row
+        at a time in date order. The state itself is not changed. ``n`` must
+        be at least 1.
+        """
+        n = len(seconds)
+        seconds = np.asarray(seconds, dtype=float)
+        amounts = np.asarray(amounts, dtype=float)
+        codes, customers = pd.factorize(np.asarray(customer_ids, dtype=object))
+        
+        # Rows grouped by customer and in date order within each customer
+        order = np.lexsort((seconds, codes))
+        group, s, x = codes[order], seconds[order], amounts[order]
+        index = np.arange(n)
+        is_start = np.r_[True, group[1:] != group[:-1]]
+        start = np.maximum.accumulate(np.where(is_start, index, 0))
+        position = index - start  # earlier batch rows of the same customer
+        
+        values = {name: np.asarray(column, dtype=object)[order]
+                  for name, column in [("merchant", merchants), ("category", categories), ("location", locations)]}
+        
+        with self._lock:
+            states = [self.states.get(customer_id) for customer_id in customers]
+            count0 = np.array([state.count if state else 0 for state in states], dtype=float)
+            total0 = np.array([state.total if state else 0.0 for state in states])
+            mean0 = np.array([state.mean if state else 0.0 for state in states])
+            m2_0 = np.array([state.m2 if state else 0.0 for state in states])
+            last0 = np.array([state.timestamps[-1] if state else np.nan for state in states])
+            
+            # Lookups into each customer's buffer and seen sets are per row; the rest is vectorized
+            lookups = [
+                (*state.window_counts(timestamp), merchant in state.merchants,
+                 category in state.categories, location in state.locations)
+                if state is not None else (0, 0, False, False, False)
+                for state, timestamp, merchant, category, location in zip(
+                    [states[code] for code in group.tolist()], s.tolist(), values["merchant"].tolist(),
+                    values["category"].tolist(), values["location"].tolist()
+                )
+            ]
+        
+        history_7, history_30, *seen_before = np.fromiter(chain.from_iterable(lookups), dtype=np.int64,
+                                                          count=5 * n).reshape(n, 5).T
+        seen = {name: flags.astype(bool) for name, flags in zip(["merchant", "category", "location"], seen_before)}
+        
+        # Seen earlier in this batch: not the first row of its (customer, value) pair
+        for name, column in values.items():
+            value_codes = pd.factorize(column)[0]
+            pair = group.astype(np.int64) * (value_codes.max(initial=0) + 1) + value_codes
+            _, first = np.unique(pair, return_index=True)
+            repeat = np.ones(n, dtype=bool)
+            repeat[first] = False
+            seen[name] |= repeat
+        
+        prior = count0[group] + position
+        is_first = prior == 0
+        
+        # Running sums over the state and earlier batch rows; amounts are shifted by each
+        # customer's first batch amount so equal amounts leave exactly zero spread
+        shift = x[start]
+        y = x - shift
+        batch_sum = pd.Series(y).groupby(group).cumsum().to_numpy() - y
+        batch_squares = pd.Series(y * y).groupby(group).cumsum().to_numpy() - y * y
+        
+        with np.errstate(divide="ignore", invalid="ignore"):
+            average = (total0[group] + batch_sum + position * shift) / prior
+            ratio = np.where(is_first | (average == 0), 1.0, x / average)
+            
+            batch_mean = np.where(position > 0, batch_sum / position, 0.0)
+            batch_m2 = np.where(position > 0, batch_squares - batch_sum * batch_mean, 0.0)
+            n0 = count0[group]
+            delta = batch_mean + shift - mean0[group]
+            mean = np.where(prior > 0, (n0 * mean0[group] + position * (batch_mean + shift)) / prior, 0.0)
+            m2 = m2_0[group] + batch_m2 + np.where(n0 * position > 0, delta * delta * n0 * position / prior, 0.0)
+            zscore = np.where((prior >= 2) & (m2 > 0), (x - mean) / np.sqrt(m2 / (prior - 1)), 0.0)
+        
+        previous = np.where(is_start, last0[group], np.r_[np.nan, s[:-1]])
+        days = np.where(is_first, 0, np.floor((s - np.where(is_first, s, previous)) / SECONDS_PER_DAY)).astype(int)
+        
+        # Earlier batch rows inside each window: ranking the times turns (customer, time) into
+        # one sortable integer key, and rows sorted by it are already in key order
+        week_cutoff = s - 7 * SECONDS_PER_DAY
+        month_cutoff = s - 30 * SECONDS_PER_DAY
+        times = np.unique(np.concatenate([s, week_cutoff, month_cutoff]))
+        stride = len(times) + 1
+        batch_keys = group.astype(np.int64) * stride + np.searchsorted(times, s)
+        
+        def window_count(history: np.ndarray, cutoff: np.ndarray) -> np.ndarray:
+            cutoff_keys = group.astype(np.int64) * stride + np.searchsorted(times, cutoff)
+            in_batch = index - np.searchsorted(batch_keys, cutoff_keys)
+            # The buffer only remembers the last ``window`` timestamps
+            return np.minimum(history + in_batch, self.window)
+        
+        sorted_features = {
+            "amount": x,
+            "abs_amount": np.abs(x),
+            "is_first_transaction": is_first.astype(int),
+            "days_since_last_transaction": days,
+            "amount_vs_avg_ratio": ratio,
+            "frequency_last_7_days": np.where(is_first, 0, window_count(history_7, week_cutoff)),
+            "frequency_last_30_days": np.where(is_first, 0, window_count(history_30, month_cutoff)),
+            "merchant_seen_before": seen["merchant"].astype(int),
+            "category_seen_before": seen["category"].astype(int),
+            "location_seen_before": seen["location"].astype(int)
+        }
+        
+        # Back to input order
+        inverse = np.empty(n, dtype=np.intp)
+        inverse[order] = index
+        return {name: column[inverse] for name, column in sorted_features.items()}, zscore[inverse]
+    
+    def score_batch(self, features: Dict[str, np.ndarray], zscore: np.ndarray, seconds: np.ndarray,
+                    merchants: np.ndarray, categories: np.ndarray,
+                    locations: np.ndarray) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """Fraud probabilities and a mask per rule, the vectorized form of ``score``"""
+        columns = rule_columns(features, np.asarray(zscore), seconds, np.asarray(merchants, dtype=object),
+                               np.asarray(categories, dtype=object), np.asarray(locations, dtype=object))
+        return self.rules.current.score(columns)
+    
+    def update_many(self, customer_ids: List[str], seconds: np.ndarray, amounts: np.ndarray,
+                    merchants: List[str], categories: List[str], locations: List[str]) -> None:
+        """Add a batch to the state in date order without scoring it"""
+        order = np.argsort(np.asarray(seconds, dtype=float), kind="stable").tolist()
+        with self._lock:
+            for row in order:
+                self._state(customer_ids[row]).update(float(seconds[row]), float(amounts[row]),
+                                                      merchants[row], categories[row], locations[row])
+            self.processed += len(order)
+    
+    @staticmethod
+    def batch_arrays(transactions: List[TransactionInput]) -> Dict:
+        """Column arrays of API transactions, as taken by ``features_batch`` and ``update_many``"""
+        return {
+            "customer_ids": [t.customer_id for t in transactions],
+            "seconds": np.array([to_seconds(t.transaction_date) for t in transactions], dtype=float),
+            "amounts": np.array([t.amount for t in transactions], dtype=float),
+            "merchants": [t.merchant for t in transactions],
+            "categories": [getattr(t.category, "value", t.category) for t in transactions],
+            "locations": [t.location for t in transactions]
+        }
+    
+    def score_arrays(self, arrays: Dict) -> Dict:
+        """Column-wise results for a batch from ``batch_arrays``: probability, decision, anomaly score, risk factors
+        
+        The probability is the rule score, as in ``score``; no fraud model is involved.
+        """
+        if len(arrays["seconds"]) == 0:
+            return {"fraud_probability": [], "fraud_prediction": [], "anomaly_score": [], "risk_factors": []}
+        
+        features, zscore = self.features_batch(**arrays)
+        probabilities, masks = self.score_batch(features, zscore, arrays["seconds"], arrays["merchants"],
+                                                arrays["categories"], arrays["locations"])
+        
+        # Factor names per row, in the same order ``score`` lists them
+        names = np.array(list(masks), dtype=object)
+        factor_matrix = np.column_stack(list(masks.values()))
+        flagged_rows = set(np.flatnonzero(factor_matrix.any(axis=1)).tolist())
+        
+        return {
+            "fraud_probability": probabilities.tolist(),
+            "fraud_prediction": (probabilities > self.threshold).tolist(),
+            "anomaly_score": np.abs(zscore).tolist(),
+            "risk_factors": [names[factor_matrix[row]].tolist() if row in flagged_rows else []
+                             for row in range(len(probabilities))]
+        }
+    
+    def batch_records(self, transactions: List[TransactionInput], results: Dict) -> List[Dict]:
+        """Plain dicts shaped like FraudPrediction; building models row by row dominates large batches"""
+        return [
+            {
+                "transaction_id": getattr(transaction, "transaction_id", None),
+                "customer_id": transaction.customer_id,
+                "fraud_probability": probability,
+                "fraud_prediction": prediction,
+                "anomaly_score": anomaly_score,
+                "risk_factors": factors
+            }
+            for transaction, probability, prediction, anomaly_score, factors in zip(
+                transactions, results["fraud_probability"], results["fraud_prediction"],
+                results["anomaly_score"], results["risk_factors"]
+            )
+        ]
+    
+    def predict_batch(self, transactions: List[TransactionInput]) -> List[FraudPrediction]:
+        """Score API transactions together without adding them to the state"""
+        results = self.score_arrays(self.batch_arrays(transactions))
+        return [FraudPrediction(**record) for record in self.batch_records(transactions, results)]
+    
+    @staticmethod
+    def summarize(results: Dict) -> Dict:
+        """Batch summary statistics for ``FraudBatchResponse`` from ``score_arrays`` results"""
+        probabilities = np.asarray(results["fraud_probability"], dtype=float)
+        flagged = int(np.sum(results["fraud_prediction"]))
+        total = len(probabilities)
+        return {
+            "total_transactions": total,
+            "flagged_transactions": flagged,
+            "fraud_rate": flagged / total if total else 0.0,
+            "avg_fraud_probability": float(probabilities.mean()) if total else 0.0,
+            "max_fraud_probability": float(probabilities.max()) if total else 0.0,
+            "risk_factor_counts": dict(Counter(chain.from_iterable(results["risk_factors"])))
+        }
+    
+    @staticmethod
+    def frame_arrays(transactions: pd.DataFrame) -> Dict:
+        """Column arrays of a transactions table, as taken by ``features_batch``"""
+        dates = wall_clock_dates(transactions["transaction_date"])
+        arrays = {"seconds": dates.astype(np.int64) / 1e6, "amounts": transactions["amount"].to_numpy(dtype=float)}
+        for name, column in [("customer_ids", "customer_id"), ("merchants", "merchant"),
+                             ("categories", "category"), ("locations", "location")]:
+            arrays[name] = transactions[column].astype(str).to_numpy(dtype=object)
+        return arrays
+    
+    def backtest(self, transactions: pd.DataFrame, rules: Optional[RuleSet] = None) -> pd.DataFrame:
+        """Hits per rule over a historical table, scored as if it had arrived live from an empty state
+        
+        ``rules`` defaults to the active rule set; precision and recall are
+        included when the table has an ``is_fraud`` column. This scorer's own
+        state is not used or changed.
+        """
+        arrays = self.frame_arrays(transactions)
+        features, zscore = StreamingFraudScorer(window=self.window).features_batch(**arrays)
+        columns = rule_columns(features, zscore, arrays["seconds"], arrays["merchants"],
+                               arrays["categories"], arrays["locations"])
+        labels = transactions["is_fraud"].to_numpy(dtype=bool) if "is_fraud" in transactions else None
+        return (rules or self.rules.current).backtest(columns, labels)
+    
+    @staticmethod
+    def _rows(transactions: pd.DataFrame) -> Iterator[Tuple]:
+        """(row, customer_id, seconds, amount, merchant, category, location) in date order"""
+        dates = wall_clock_dates(transactions["transaction_date"])
+        order = np.argsort(dates, kind="stable")
+        seconds = dates.astype(np.int64)[order] / 1e6
+        columns = [transactions[name].astype(str).to_numpy()[order].tolist()
+                   for name in ("customer_id", "merchant", "category", "location")]
+        amounts = transactions["amount"].to_numpy(dtype=float)[order]
+        
+        customer_ids, merchants, categories, locations = columns
+        return zip(order.tolist(), customer_ids, seconds.tolist(), amounts.tolist(), merchants, categories, locations)
+    
+    def iter_replay(self, transactions: pd.DataFrame) -> Iterator[Tuple[int, Dict, float]]:
+        """Feed a transactions table through the state in date order, yielding (row, features, z-score)"""
+        for row, customer_id, seconds, amount, merchant, category, location in self._rows(transactions):
+            features, zscore = self.observe(customer_id, seconds, amount, merchant, category, location)
+            yield row, features, zscore
+    
+    def iter_scores(self, transactions: pd.DataFrame) -> Iterator[Tuple[int, float, float, List[str]]]:
+        """Score a transactions table in date order as if it arrived live, yielding (row, probability, anomaly, factors)"""
+        for row, *transaction in self._rows(transactions):
+            yield (row, *self.process(*transaction))
+    
+    def replay(self, transactions: pd.DataFrame) -> int:
+        """Build state from transaction history without scoring it; returns the rows consumed"""
+        consumed = sum(1 for _ in self.iter_replay(transactions))
+        logger.info(f"Fraud state built from {consumed} transactions for {len(self.states)} customers")
+        return consumed
+    
+    def reset(self) -> None:
+        with self._lock:
+            self.states.clear()
+            self.processed = 0
+    
+    def stats(self) -> Dict:
+        return {"customers": len(self.states), "processed": self.processed, "window": self.window}
+
+
+fraud_scorer = StreamingFraudScorer()
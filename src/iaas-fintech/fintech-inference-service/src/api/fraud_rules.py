@@ -0,0 +1,284 @@
+"""
+Declarative fraud rules compiled into vectorized masks
+"""
+
+import hashlib
+import json
+import logging
+import operator
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Columns a rule can test: the streaming transaction features plus the raw fields and derived values
+RULE_FEATURES = {
+    "amount", "abs_amount", "is_first_transaction", "days_since_last_transaction",
+    "amount_vs_avg_ratio", "frequency_last_7_days", "frequency_last_30_days",
+    "merchant_seen_before", "category_seen_before", "location_seen_before",
+    "merchant", "category", "location", "weekday", "hour", "abs_zscore"
+}
+
+COMPARISONS = {
+    ">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le,
+    "==": operator.eq, "!=": operator.ne
+}
+
+# The rules the service shipped with, used when no rules file exists
+DEFAULT_RULES = {
+    "max_probability": 0.95,
+    "rules": [
+        {"name": "unusual_amount", "weight": 0.3,
+         "when": {"feature": "abs_amount", "op": ">", "value": 1000}},
+        {"name": "unusual_timing", "weight": 0.2,
+         "when": {"all": [{"feature": "weekday", "op": ">=", "value": 5},
+                          {"feature": "hour", "op": ">=", "value": 22}]}},
+        {"name": "high_risk_merchant", "weight": 0.4,
+         "when": {"feature": "merchant", "op": "in", "value": ["Unknown Merchant", "ATM Withdrawal"]}},
+        {"name": "amount_deviation", "weight": 0.3,
+         "when": {"feature": "abs_zscore", "op": ">=", "value": 3.0}},
+        {"name": "new_location", "weight": 0.2,
+         "when": {"all": [{"feature": "is_first_transaction", "op": "==", "value": 0},
+                          {"feature": "location_seen_before", "op": "==", "value": 0}]}},
+        {"name": "new_merchant", "weight": 0.1,
+         "when": {"all": [{"feature": "is_first_transaction", "op": "==", "value": 0},
+                          {"feature": "merchant_seen_before", "op": "==", "value": 0}]}},
+        {"name": "high_velocity", "weight": 0.2,
+         "when": {"feature": "frequency_last_7_days", "op": ">=", "value": 10}}
+    ]
+}
+
+
+class Condition:
+    """A compiled rule condition with a vectorized and a scalar form of the same test"""
+    
+    __slots__ = ("mask", "test", "features")
+    
+    def __init__(self, mask: Callable[[Mapping[str, Any]], np.ndarray], test: Callable[[Mapping[str, Any]], bool],
+                 features: frozenset):
+        self.mask = mask  # columns -> boolean array
+        self.test = test  # one row -> bool
+        self.features = features
+
+
+def _isin(column: Any, values: frozenset, ordered: np.ndarray) -> np.ndarray:
+    """Membership mask; hashing for strings and categoricals, sorting for numbers"""
+    if isinstance(column, pd.Series):
+        return column.isin(values).to_numpy()
+    column = np.asarray(column)
+    if column.dtype.kind in "biuf":
+        return np.isin(column, ordered)
+    return pd.Series(column, copy=False).isin(values).to_numpy()
+
+
+def compile_condition(spec: Dict) -> Condition:
+    """Compile ``{"feature", "op", "value"}`` leaves combined with ``all``, ``any`` and ``not``"""
+    if not isinstance(spec, dict):
+        raise ValueError(f"A condition must be an object, not {spec!r}")
+    
+    if "all" in spec or "any" in spec:
+        combine = "all" if "all" in spec else "any"
+        parts = [compile_condition(part) for part in spec[combine]]
+        if not parts:
+            raise ValueError(f"'{combine}' needs at least one condition")
+        reduce = np.logical_and.reduce if combine == "all" else np.logical_or.reduce
+        scalar = all if combine == "all" else any
+        return Condition(
+            mask=lambda columns: reduce([part.mask(columns) for part in parts]),
+            test=lambda row: scalar(part.test(row) for part in parts),
+            features=frozenset().union(*(part.features for part in parts))
+        )
+    
+    if "not" in spec:
+        part = compile_condition(spec["not"])
+        return Condition(mask=lambda columns: ~part.mask(columns), test=lambda row: not part.test(row),
+                         features=part.features)
+    
+    feature, op, value = spec.get("feature"), spec.get("op"), spec.get("value")
+    if feature not in RULE_FEATURES:
+        raise ValueError(f"Unknown rule feature: {feature!r}")
+    
+    if op in ("in", "not_in"):
+        if not isinstance(value, list):
+            raise ValueError(f"'{op}' on {feature} needs a list of values")
+        values = frozenset(value)
+        ordered = np.array(sorted(value)) if all(isinstance(v, (int, float)) for v in value) else np.array([])
+        negate = op == "not_in"
+        return Condition(
+            mask=lambda columns: _isin(columns[feature], values, ordered) != negate,
+            test=lambda row: (row[feature] in values) != negate,
+            features=frozenset([feature])
+        )
+    
+    if op not in COMPARISONS:
+        raise ValueError(f"Unknown rule operator: {op!r}")
+    compare = COMPARISONS[op]
+    return Condition(
+        mask=lambda columns: np.asarray(compare(columns[feature], value), dtype=bool),
+        test=lambda row: bool(compare(row[feature], value)),
+        features=frozenset([feature])
+    )
+
+
+class RuleSet:
+    """Weighted fraud rules compiled from their declarative form
+    
+    The fraud probability is the sum of the weights of the rules that
+    match, capped at ``max_probability``. ``score`` evaluates every rule as
+    one NumPy mask over column arrays (a batch, or a whole history for
+    backtesting); ``score_one`` runs the same compiled rules on one row.
+    """
+    
+    def __init__(self, spec: Dict, version: Optional[str] = None):
+        """Compile a rule set; raises ValueError if it is malformed"""
+        rules = spec.get("rules")
+        if not isinstance(rules, list) or not rules:
+            raise ValueError("A rule set needs a non-empty 'rules' list")
+        
+        self.names: List[str] = []
+        self.weights: List[float] = []
+        self.conditions: List[Condition] = []
+        for rule in rules:
+            name = rule.get("name")
+            if not name or name in self.names:
+                raise ValueError(f"Rule names must be present and unique: {name!r}")
+            if not isinstance(rule.get("weight"), (int, float)):
+                raise ValueError(f"Rule {name} needs a numeric weight")
+            self.names.append(name)
+            self.weights.append(float(rule["weight"]))
+            self.conditions.append(compile_condition(rule.get("when")))
+        
+        self.max_probability = float(spec.get("max_probability", 1.0))
+        self.features = frozenset().union(*(condition.features for condition in self.conditions))
+        self.spec = spec
+        self.version = version or hashlib.sha1(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:12]
+    
+    def __len__(self) -> int:
+        return len(self.names)
+    
+    def masks(self, columns: Mapping[str, Any]) -> Dict[str, np.ndarray]:
+        """One boolean mask per rule, in rule order"""
+        return {name: condition.mask(columns) for name, condition in zip(self.names, self.conditions)}
+    
+    def score(self, columns: Mapping[str, Any]) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """Fraud probabilities and the per-rule masks for column arrays"""
+        masks = self.masks(columns)
+        weighted = sum(mask * weight for mask, weight in zip(masks.values(), self.weights))
+        return np.round(np.minimum(weighted, self.max_probability), 6), masks
+    
+    def score_one(self, row: Mapping[str, Any]) -> Tuple[float, List[str]]:
+        """Fraud probability and matching rule names for one row"""
+        matched, probability = [], 0.0
+        for name, weight, condition in zip(self.names, self.weights, self.conditions):
+            if condition.test(row):
+                matched.append(name)
+                probability += weight
+        return round(min(probability, self.max_probability), 6), matched
+    
+    def backtest(self, columns: Mapping[str, Any], labels: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """Hits per rule over historical columns, with precision and recall when fraud labels are given"""
+        probabilities, masks = self.score(columns)
+        masks["any_rule"] = np.logical_or.reduce(list(masks.values()))
+        masks["flagged"] = probabilities > settings.fraud_threshold
+        
+        rows = []
+        for name, mask in masks.items():
+            row = {"rule": name, "hits": int(mask.sum()), "hit_rate": float(mask.mean())}
+            if labels is not None:
+                labels = np.asarray(labels, dtype=bool)
+                true_hits = int((mask & labels).sum())
+                row["precision"] = true_hits / row["hits"] if row["hits"] else 0.0
+                row["recall"] = true_hits / int(labels.sum()) if labels.any() else 0.0
+            rows.append(row)
+        return pd.DataFrame(rows)
+    
+    def describe(self) -> Dict:
+        return {
+            "version": self.version,
+            "rules": [{"name": name, "weight": weight} for name, weight in zip(self.names, self.weights)],
+            "max_probability": self.max_probability,
+            "features": sorted(self.features)
+        }
+
+
+def load_rules(path: Union[str, Path, None] = None) -> RuleSet:
+    """Compile the rules file, or the built-in rules when there is none"""
+    path = Path(path if path is not None else settings.fraud_rules_path)
+    if not path.exists():
+        return RuleSet(DEFAULT_RULES, version="default")
+    
+    text = path.read_text()
+    try:
+        spec = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid rules file {path}: {e}")
+    return RuleSet(spec, version=hashlib.sha1(text.encode()).hexdigest()[:12])
+
+
+class FraudRuleEngine:
+    """The active rule set, recompiled when the rules file changes
+    
+    ``current`` stats the file at most every ``check_seconds`` and swaps in
+    a freshly compiled rule set when it changed, so edits take effect
+    without a restart. A file that fails to compile is logged and the
+    previous rules keep serving.
+    """
+    
+    def __init__(self, path: Union[str, Path, None] = None, check_seconds: Optional[float] = None):
+        """Initialize the engine; rules are compiled on first use"""
+        self.path = Path(path if path is not None else settings.fraud_rules_path)
+        self.check_seconds = check_seconds if check_seconds is not None else settings.fraud_rules_check_seconds
+        self.reloads = 0
+        self.last_error: Optional[str] = None
+        self._rules: Optional[RuleSet] = None
+        self._stamp: Optional[int] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+    
+    def _file_stamp(self) -> Optional[int]:
+        return self.path.stat().st_mtime_ns if self.path.exists() else None
+    
+    @property
+    def current(self) -> RuleSet:
+        """The active rule set, picking up changes to the rules file"""
+        now = time.monotonic()
+        if self._rules is None or now - self._checked_at >= self.check_seconds:
+            self._checked_at = now
+            if self._rules is None or self._file_stamp() != self._stamp:
+                try:
+                    self.reload()
+                except ValueError:
+                    if self._rules is None:
+                        raise
+        return self._rules
+    
+    def reload(self) -> RuleSet:
+        """Compile the rules file now and make it active; raises ValueError and keeps the old rules if invalid"""
+        with self._lock:
+            stamp = self._file_stamp()
+            try:
+                rules = load_rules(self.path)
+            except ValueError as e:
+                self.last_error = str(e)
+                self._stamp = stamp  # do not retry the same broken file on every check
+                logger.error(f"Fraud rules not reloaded: {e}")
+                raise
+            
+            self._rules, self._stamp, self.last_error = rules, stamp, None
+            self.reloads += 1
+            logger.info(f"Fraud rules {rules.version} active ({len(rules)} rules)")
+            return rules
+    
+    def status(self) -> Dict:
+        rules = self.current
+        return {**rules.describe(), "path": str(self.path), "reloads": self.reloads, "last_error": self.last_error}
+
+
+fraud_rules = FraudRuleEngine()
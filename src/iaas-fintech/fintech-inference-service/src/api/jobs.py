@@ -0,0 +1,420 @@
+"""
+Persistent batch scoring jobs: chunked input, pooled scoring, Parquet part output
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from fastapi.concurrency import run_in_threadpool
+
+from data.storage import (
+    PARQUET_AVAILABLE, TABLE_PATHS, TableStorage, count_rows, iter_frame_chunks, partition_files,
+    partition_path, write_frame
+)
+from utils.config import settings
+
+from .executor import ExecutorSaturatedError, inference_executor
+from .fraud import fraud_scorer
+from .serving import ModelNotLoadedError, churn_server, segment_server
+
+logger = logging.getLogger(__name__)
+
+JOB_COLUMNS = [
+    "job_id", "processing_type", "data_source", "source_path", "source_version", "parameters", "status",
+    "total_records", "processed_records", "processed_chunks", "results_path", "error",
+    "started_at", "updated_at", "estimated_completion", "completed_at"
+]
+
+# Jobs in these states are picked up again after a restart
+UNFINISHED_STATUSES = ("queued", "running")
+
+
+def score_churn_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Churn probability and risk level per customer feature row"""
+    loaded = churn_server.current()
+    probabilities = np.asarray(loaded.scorer.predict_proba(loaded.model.feature_matrix(chunk).to_numpy()), dtype=float)
+    return pd.DataFrame({
+        "customer_id": chunk["customer_id"].astype(str).to_numpy(),
+        "churn_probability": probabilities,
+        "churn_prediction": loaded.model.classify(probabilities),
+        "risk_level": loaded.model.categorize_risk(probabilities),
+        "model_version": loaded.version
+    })
+
+
+def score_segment_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Nearest segment and confidence per customer feature row"""
+    model = segment_server.current()
+    labels, confidences = model.assign(model.feature_matrix(chunk).to_numpy())
+    return pd.DataFrame({
+        "customer_id": chunk["customer_id"].astype(str).to_numpy(),
+        "segment_id": labels,
+        "segment_name": np.asarray(model.segment_names, dtype=object)[labels],
+        "confidence": confidences,
+        "model_version": segment_server.version
+    })
+
+
+def score_fraud_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Fraud scores per transaction against the live customer state, which is only read"""
+    results = fraud_scorer.score_arrays(fraud_scorer.frame_arrays(chunk))
+    scored = pd.DataFrame({
+        "customer_id": chunk["customer_id"].astype(str).to_numpy(),
+        "fraud_probability": results["fraud_probability"],
+        "fraud_prediction": results["fraud_prediction"],
+        "anomaly_score": results["anomaly_score"],
+        "risk_factors": [",".join(factors) for factors in results["risk_factors"]],
+        "rules_version": fraud_scorer.rules.current.version
+    })
+    if "transaction_id" in chunk.columns:
+        scored.insert(0, "transaction_id", chunk["transaction_id"].astype(str).to_numpy())
+    return scored
+
+
+def score_customers_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Churn and segment per customer, as served from the precomputed score table
+    
+    Customers in the feature store are scored on its features, as the live
+    path would. Segment columns are empty when no segmentation model is loaded.
+    """
+    feature_store = churn_server.feature_store
+    if feature_store is not None:
+        overrides = {customer_id: feature_store.get_features(customer_id) for customer_id in chunk["customer_id"]}
+        overrides = {customer_id: features for customer_id, features in overrides.items() if features}
+        if overrides:
+            chunk = chunk.set_index("customer_id")
+            updated = pd.DataFrame.from_dict(overrides, orient="index")
+            chunk.loc[updated.index, updated.columns.intersection(chunk.columns)] = updated
+            chunk = chunk.reset_index()
+    
+    scored = score_churn_chunk(chunk).rename(columns={"model_version": "churn_model_version"})
+    try:
+        segments = score_segment_chunk(chunk)
+        scored["segment_id"] = segments["segment_id"].to_numpy()
+        scored["segment_name"] = segments["segment_name"].to_numpy()
+        scored["segment_model_version"] = segments["model_version"].to_numpy()
+    except ModelNotLoadedError:
+        scored["segment_id"], scored["segment_name"], scored["segment_model_version"] = -1, None, None
+    scored["scored_at"] = pd.Timestamp.now()
+    return scored
+
+
+# processing_type -> (scoring function, whether it must run in this process)
+# Fraud state lives in this process, so fraud chunks are scored on a thread rather than the worker pool
+CHUNK_SCORERS: Dict[str, tuple] = {
+    "churn": (score_churn_chunk, False),
+    "segment": (score_segment_chunk, False),
+    "fraud": (score_fraud_chunk, True),
+    "scores": (score_customers_chunk, False)
+}
+
+# Input tables for the processing types, when a job names a table rather than a file
+SOURCE_TABLES = {"churn": "customer_features", "segment": "customer_features", "fraud": "transactions",
+                 "scores": "customer_features"}
+
+
+def source_version(path: Path) -> str:
+    """Identity of an input file or partition directory, to refuse resuming over changed input"""
+    files = partition_files(path) if path.is_dir() else [path]
+    return ",".join(f"{file.name}@{file.stat().st_mtime_ns}:{file.stat().st_size}" for file in files)
+
+
+class BatchJobStore:
+    """Jobs and their progress in a local SQLite table
+    
+    Each call opens its own connection, so the store can be used from any
+    thread. Calls block (up to 30 s on a locked database), so async code runs
+    them with ``run_in_threadpool``.
+    """
+    
+    def __init__(self, path: Union[str, Path, None] = None):
+        """Initialize the store; the table is created on first use"""
+        self.path = Path(path if path is not None else settings.batch_jobs_db)
+        self._initialized = False
+    
+    def connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.row_factory = sqlite3.Row
+        if not self._initialized:
+            with connection:
+                connection.execute("""
+                    CREATE TABLE IF NOT EXISTS batch_jobs (
+                        job_id TEXT PRIMARY KEY,
+                        processing_type TEXT NOT NULL,
+                        data_source TEXT NOT NULL,
+                        source_path TEXT NOT NULL,
+                        source_version TEXT NOT NULL,
+                        parameters TEXT,
+                        status TEXT NOT NULL,
+                        total_records INTEGER NOT NULL,
+                        processed_records INTEGER NOT NULL DEFAULT 0,
+                        processed_chunks INTEGER NOT NULL DEFAULT 0,
+                        results_path TEXT NOT NULL,
+                        error TEXT,
+                        started_at TEXT NOT NULL,
+                        updated_at TEXT NOT NULL,
+                        estimated_completion TEXT,
+                        completed_at TEXT
+                    )
+                """)
+                connection.execute("CREATE INDEX IF NOT EXISTS batch_jobs_status ON batch_jobs (status)")
+            self._initialized = True
+        return connection
+    
+    def create(self, job: Dict) -> Dict:
+        now = datetime.now().isoformat()
+        job = {column: None for column in JOB_COLUMNS} | {"started_at": now, "updated_at": now,
+                                                          "processed_records": 0, "processed_chunks": 0} | job
+        job["parameters"] = json.dumps(job["parameters"] or {})
+        connection = self.connect()
+        with connection:
+            connection.execute(
+                f"INSERT INTO batch_jobs ({', '.join(JOB_COLUMNS)}) VALUES ({', '.join('?' * len(JOB_COLUMNS))})",
+                [job[column] for column in JOB_COLUMNS]
+            )
+        connection.close()
+        return self.get(job["job_id"])
+    
+    @staticmethod
+    def to_job(row: sqlite3.Row) -> Dict:
+        job = dict(row)
+        job["parameters"] = json.loads(job["parameters"] or "{}")
+        return job
+    
+    def get(self, job_id: str) -> Optional[Dict]:
+        connection = self.connect()
+        row = connection.execute("SELECT * FROM batch_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        connection.close()
+        return None if row is None else self.to_job(row)
+    
+    def update(self, job_id: str, **fields) -> None:
+        fields["updated_at"] = datetime.now().isoformat()
+        connection = self.connect()
+        with connection:
+            connection.execute(
+                f"UPDATE batch_jobs SET {', '.join(f'{name} = ?' for name in fields)} WHERE job_id = ?",
+                [*fields.values(), job_id]
+            )
+        connection.close()
+    
+    def unfinished(self) -> List[str]:
+        """Ids of jobs that were queued or running, oldest first"""
+        connection = self.connect()
+        rows = connection.execute(
+            f"SELECT job_id FROM batch_jobs WHERE status IN ({', '.join('?' * len(UNFINISHED_STATUSES))}) "
+            "ORDER BY started_at", UNFINISHED_STATUSES
+        ).fetchall()
+        connection.close()
+        return [row["job_id"] for row in rows]
+    
+    def completed(self, processing_type: str, limit: int = 1, offset: int = 0) -> List[Dict]:
+        """Completed jobs of one processing type, newest first; ``limit=-1`` returns all after ``offset``"""
+        connection = self.connect()
+        rows = connection.execute(
+            "SELECT * FROM batch_jobs WHERE processing_type = ? AND status = 'completed' "
+            "ORDER BY completed_at DESC LIMIT ? OFFSET ?", (processing_type, limit, offset)
+        ).fetchall()
+        connection.close()
+        return [self.to_job(row) for row in rows]
+    
+    def delete(self, job_ids: List[str]) -> None:
+        connection = self.connect()
+        with connection:
+            connection.executemany("DELETE FROM batch_jobs WHERE job_id = ?", [(job_id,) for job_id in job_ids])
+        connection.close()
+
+
+class BatchJobRunner:
+    """Scores a job's input chunk by chunk and writes one results part per chunk
+    
+    Input is read ``chunk_size`` rows at a time. Churn and segment chunks are
+    scored on the inference worker pool, at most ``batch_chunks_in_flight``
+    at once per job. Each results part is written under a temporary name and
+    renamed into place, so a part that exists is complete. After a crash,
+    ``resume_pending`` restarts unfinished jobs. Chunks whose part already
+    exists are read but not scored again.
+    """
+    
+    def __init__(self, store: Optional[BatchJobStore] = None, results_root: Union[str, Path, None] = None,
+                 data_root: Union[str, Path, None] = None):
+        """Initialize the runner with the job table and result and data locations from settings"""
+        self.store = store or BatchJobStore()
+        self.results_root = Path(results_root if results_root is not None else settings.batch_results_path)
+        self.data_root = Path(data_root if data_root is not None else settings.data_path)
+        self.format = "parquet" if PARQUET_AVAILABLE else "csv"
+        self.tasks: Dict[str, asyncio.Task] = {}
+    
+    def resolve_source(self, data_source: str, processing_type: str) -> Path:
+        """A stored table name (or "default" for the processing type's table), else a file or directory path"""
+        table = SOURCE_TABLES[processing_type] if data_source == "default" else data_source
+        if table in TABLE_PATHS:
+            path = TableStorage(self.data_root).resolve(table)
+            if path is None:
+                raise FileNotFoundError(f"No stored data for table '{table}'")
+            return path
+        
+        path = Path(data_source)
+        if not path.exists():
+            raise FileNotFoundError(f"Data source not found: {data_source}")
+        return path
+    
+    def submit(self, processing_type: str, data_source: str, parameters: Optional[Dict] = None) -> Dict:
+        """Validate and record a new job; ``run`` does the work"""
+        if processing_type not in CHUNK_SCORERS:
+            raise ValueError(f"Unknown processing type: {processing_type} (expected one of {', '.join(CHUNK_SCORERS)})")
+        parameters = dict(parameters or {})
+        chunk_size = int(parameters.setdefault("chunk_size", settings.batch_chunk_size))
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be positive")
+        
+        source = self.resolve_source(data_source, processing_type)
+        job_id = uuid.uuid4().hex
+        return self.store.create({
+            "job_id": job_id,
+            "processing_type": processing_type,
+            "data_source": data_source,
+            "source_path": str(source),
+            "source_version": source_version(source),
+            "parameters": parameters,
+            "status": "queued",
+            "total_records": count_rows(source),
+            "results_path": str(self.results_root / job_id)
+        })
+    
+    async def score(self, processing_type: str, chunk: pd.DataFrame) -> pd.DataFrame:
+        """Score one chunk where its model lives, waiting for room on a saturated pool"""
+        fn, in_process = CHUNK_SCORERS[processing_type]
+        if in_process:
+            return await run_in_threadpool(fn, chunk)
+        while True:
+            try:
+                return await inference_executor.run(fn, chunk)
+            except ExecutorSaturatedError:
+                await asyncio.sleep(0.1)
+    
+    def write_part(self, scored: pd.DataFrame, part: Path) -> None:
+        staging = part.with_name(f".{part.name}")
+        write_frame(scored, staging)
+        os.replace(staging, part)
+    
+    async def process_chunk(self, processing_type: str, chunk: pd.DataFrame, part: Path) -> int:
+        scored = await self.score(processing_type, chunk)
+        await run_in_threadpool(self.write_part, scored, part)
+        return len(scored)
+    
+    def prepare(self, job: Dict) -> Tuple[int, int]:
+        """Check the input and clear partial parts; returns (records, chunks) already written"""
+        source = Path(job["source_path"])
+        if not source.exists() or source_version(source) != job["source_version"]:
+            raise RuntimeError("The data source changed or disappeared since the job was submitted")
+        
+        output = Path(job["results_path"])
+        output.mkdir(parents=True, exist_ok=True)
+        for staging in output.glob(".part-*"):
+            staging.unlink()  # partial writes from a crash
+        
+        # Progress is whatever parts made it to disk
+        completed = partition_files(output)
+        return sum(count_rows(part) for part in completed), len(completed)
+    
+    async def run(self, job_id: str) -> Dict:
+        """Run (or resume) a job to completion; failures are recorded on the job, not raised
+        
+        Job table reads and writes run on the thread pool, so a contended
+        job database never blocks the event loop.
+        """
+        job = await run_in_threadpool(self.store.get, job_id)
+        if job is None:
+            raise KeyError(job_id)
+        
+        pending = set()
+        try:
+            source, output = Path(job["source_path"]), Path(job["results_path"])
+            processed, processed_chunks = await run_in_threadpool(self.prepare, job)
+            await run_in_threadpool(self.store.update, job_id, status="running", processed_records=processed,
+                                    processed_chunks=processed_chunks)
+            logger.info(f"Batch job {job_id} running ({processed}/{job['total_records']} records already done)")
+            
+            start, resumed_from = time.monotonic(), processed
+            
+            async def record_progress(done) -> None:
+                nonlocal processed, processed_chunks
+                for task in done:
+                    processed += task.result()
+                    processed_chunks += 1
+                rate = (processed - resumed_from) / max(time.monotonic() - start, 1e-9)
+                remaining = max(job["total_records"] - processed, 0)
+                await run_in_threadpool(
+                    self.store.update, job_id, processed_records=processed, processed_chunks=processed_chunks,
+                    estimated_completion=(datetime.now() + timedelta(seconds=remaining / rate)).isoformat() if rate else None
+                )
+            
+            chunks = iter_frame_chunks(source, job["parameters"]["chunk_size"], SOURCE_TABLES[job["processing_type"]])
+            index = 0
+            while True:
+                chunk = await run_in_threadpool(next, chunks, None)
+                if chunk is None:
+                    break
+                part = partition_path(output, index, self.format)
+                index += 1
+                if part.exists():
+                    continue
+                
+                pending.add(asyncio.ensure_future(self.process_chunk(job["processing_type"], chunk, part)))
+                if len(pending) >= settings.batch_chunks_in_flight:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    await record_progress(done)
+            
+            if pending:
+                done, pending = await asyncio.wait(pending)
+                await record_progress(done)
+            
+            now = datetime.now().isoformat()
+            await run_in_threadpool(self.store.update, job_id, status="completed", completed_at=now,
+                                    estimated_completion=now)
+            logger.info(f"Batch job {job_id} completed: {processed} records in {time.monotonic() - start:.1f}s")
+        
+        except asyncio.CancelledError:
+            # Shutdown: the job stays running in the table and resumes from its written parts
+            for task in pending:
+                task.cancel()
+            raise
+        except Exception as e:
+            for task in pending:
+                task.cancel()
+            logger.error(f"Batch job {job_id} failed: {e}")
+            await run_in_threadpool(self.store.update, job_id, status="failed", error=str(e))
+        
+        return await run_in_threadpool(self.store.get, job_id)
+    
+    def start(self, job_id: str) -> asyncio.Task:
+        """Run a job on the current event loop, keeping a reference until it finishes"""
+        task = asyncio.create_task(self.run(job_id))
+        self.tasks[job_id] = task
+        task.add_done_callback(lambda _: self.tasks.pop(job_id, None))
+        return task
+    
+    async def resume_pending(self) -> int:
+        """Restart the jobs a previous process left queued or running; returns how many"""
+        job_ids = await run_in_threadpool(self.store.unfinished)
+        for job_id in job_ids:
+            if job_id not in self.tasks:
+                self.start(job_id)
+        if job_ids:
+            logger.info(f"Resuming {len(job_ids)} unfinished batch jobs")
+        return len(job_ids)
+
+
+batch_jobs = BatchJobRunner()
@@ -3,12 +3,17 @@ Main FastAPI application for the Fintech Inference Service
 """
 
 from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from datetime import datetime
+import asyncio
+import gc
 import uvicorn
 import logging
+import time
 from pathlib import Path
+from typing import Optional
 import sys
 
 # Add src to path for imports
@@ -20,6 +25,11 @@ from api.schemas.models import (
     TransactionInput, CustomerInput, ModelExplanation
 )
 from api.routes import inference, health, customers
+from api.executor import inference_executor
+from api.jobs import batch_jobs
+from api.score_table import churn_scores
+from api.serving import churn_server, segment_server, model_registry
+from api.startup import startup_phases
 from utils.config import settings
 
 # Configure logging
@@ -83,10 +93,10 @@ async def root():
 async def get_models_status():
     """Get status of all loaded models"""
     try:
-        # This would typically load model status from a model registry
+        loaded = churn_server.loaded
         models_status = {
-            "churn_prediction": True,
-            "customer_segmentation": True,
+            "churn_prediction": loaded is not None,
+            "customer_segmentation": segment_server.is_loaded,
             "fraud_detection": True
         }
         
@@ -94,6 +104,11 @@ async def get_models_status():
             "models": models_status,
             "total_models": len(models_status),
             "loaded_models": sum(models_status.values()),
+            "serving": {
+                "churn_prediction": loaded.describe() if loaded is not None else None,
+                "customer_segmentation": segment_server.version
+            },
+            "registry": {name: model_registry.status(name) for name in ("churn_prediction", "customer_segmentation")},
             "timestamp": datetime.now()
         }
     except Exception as e:
@@ -101,13 +116,20 @@ async def get_models_status():
         raise HTTPException(status_code=500, detail="Failed to get models status")
 
 @app.post("/models/reload")
-async def reload_models(background_tasks: BackgroundTasks):
-    """Reload all models (background task)"""
+async def reload_models(background_tasks: BackgroundTasks, version: Optional[str] = None):
+    """Reload all models (background task), optionally activating a registered churn version first"""
+    if version is not None:
+        try:
+            model_registry.activate("churn_prediction", version)
+        except ValueError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+    
     try:
         background_tasks.add_task(reload_models_task)
         return {
             "message": "Model reload initiated",
             "status": "in_progress",
+            "active_version": model_registry.active_version("churn_prediction"),
             "timestamp": datetime.now()
         }
     except Exception as e:
@@ -118,28 +140,70 @@ async def reload_models_task():
     """Background task to reload models"""
     try:
         logger.info("Starting model reload...")
-        # Model reload logic would go here
-        logger.info("Model reload completed")
+        # Loading and warming happen off the event loop; requests keep the old model until the swap
+        swapped = await run_in_threadpool(inference.reload_models)
+        logger.info(f"Model reload completed (swapped={swapped})")
     except Exception as e:
         logger.error(f"Model reload failed: {e}")
 
 # Startup and shutdown events
 @app.on_event("startup")
 async def startup_event():
-    """Initialize application on startup"""
+    """Start loading data and models in the background so /live answers at once"""
     logger.info(f"Starting {settings.app_name} v{settings.app_version}")
+    app.state.startup_task = asyncio.create_task(run_startup())
+
+async def run_startup():
+    """Run the tracked startup phases; /ready reports ready once the required ones are done"""
+    start = time.perf_counter()
+    
+    await startup_phases.run("directories", settings.ensure_directories)
+    await startup_phases.run("data", customers.load_data)
+    if settings.fraud_replay_on_startup:
+        await startup_phases.run("fraud_state", inference.load_fraud_state)
+    else:
+        startup_phases.skip("fraud_state")
+    # Load trained models once so requests hit a warm model
+    await startup_phases.run("models", inference.load_models)
+    
+    if settings.analytics_warm_on_startup:
+        await startup_phases.run("analytics_cache", inference_executor.run, customers.warm_analytics_cache)
+    else:
+        startup_phases.skip("analytics_cache")
     
-    # Create necessary directories
-    settings.model_path.mkdir(parents=True, exist_ok=True)
-    settings.data_path.mkdir(parents=True, exist_ok=True)
+    # Batch jobs interrupted by the last shutdown or crash carry on from their last written part
+    if settings.batch_jobs_resume_on_startup:
+        await startup_phases.run("batch_jobs", batch_jobs.resume_pending)
+    else:
+        startup_phases.skip("batch_jobs")
     
-    # Initialize models (in production, load pre-trained models)
-    logger.info("Application startup completed")
+    # Churn requests are answered from the last full-base scoring pass while its scores are fresh
+    await startup_phases.run("score_table", run_in_threadpool, churn_scores.refresh)
+    app.state.score_watch_task = asyncio.create_task(churn_scores.watch())
+    if settings.score_table_refresh_hour is not None:
+        app.state.score_refresh_task = asyncio.create_task(churn_scores.run_nightly(settings.score_table_refresh_hour))
+    
+    # Loaded data, models and fraud history live for the whole process; keeping them out of the
+    # collector's generations stops full collections from rescanning millions of objects per request
+    gc.freeze()
+    
+    logger.info(f"Application startup completed in {time.perf_counter() - start:.2f}s "
+                f"(ready={startup_phases.ready})")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on application shutdown"""
     logger.info("Shutting down application")
+    
+    # Stop background work first; interrupted batch jobs and scoring passes resume on the next start
+    tasks = [getattr(app.state, name, None) for name in ("startup_task", "score_watch_task", "score_refresh_task")]
+    tasks = [task for task in tasks + list(batch_jobs.tasks.values()) if task is not None and not task.done()]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    
+    # Waits for chunks still running on the pool, so keep it off the event loop
+    await run_in_threadpool(inference_executor.shutdown)
 
 if __name__ == "__main__":
     uvicorn.run(
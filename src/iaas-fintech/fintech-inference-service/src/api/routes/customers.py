@@ -10,25 +10,57 @@ import logging
 from datetime import datetime, timedelta
 
 from ..schemas.models import ErrorResponse
+from ..executor import inference_executor
+from data.customer_store import CustomerDataStore
+from data.storage import TableStorage
+from utils.cache import VersionedCache
+from utils.config import settings
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-# Load data once at module level for better performance
-try:
-    customers_df = pd.read_csv("data/raw/customers.csv")
-    transactions_df = pd.read_csv("data/raw/transactions.csv")
-    customer_features_df = pd.read_csv("data/processed/customer_features.csv")
+# Data is loaded and indexed by load_data() during startup, not at import time
+table_storage = TableStorage(settings.data_path, settings.storage_format)
+
+data_store = CustomerDataStore.empty()
+customers_df = data_store.customers
+transactions_df = data_store.transactions
+customer_features_df = data_store.customer_features
+
+# Dashboard aggregates keyed by endpoint and parameters, invalidated with the data version
+analytics_cache = VersionedCache(max_entries=settings.analytics_cache_entries)
+
+
+def reload_data() -> str:
+    """Reload the data tables; cached analytics are dropped if the files changed"""
+    global data_store, customers_df, transactions_df, customer_features_df
     
-    # Convert date columns
-    transactions_df['transaction_date'] = pd.to_datetime(transactions_df['transaction_date'])
+    data_store = CustomerDataStore.from_storage(table_storage)
+    customers_df = data_store.customers
+    transactions_df = data_store.transactions
+    customer_features_df = data_store.customer_features
     
-    logger.info(f"Loaded {len(customers_df)} customers and {len(transactions_df)} transactions")
-except Exception as e:
-    logger.error(f"Error loading data: {e}")
-    customers_df = pd.DataFrame()
-    transactions_df = pd.DataFrame()
-    customer_features_df = pd.DataFrame()
+    logger.info(f"Reloaded {len(customers_df)} customers and {len(transactions_df)} transactions")
+    return str(data_store.version)
+
+
+def load_data() -> bool:
+    """Load the data tables at startup; the store stays empty if they cannot be read"""
+    try:
+        reload_data()
+        return True
+    except Exception as e:
+        logger.error(f"Error loading data: {e}")
+        return False
+
+
+def warm_analytics_cache() -> None:
+    """Precompute the default dashboard aggregates"""
+    try:
+        _get_customer_analytics()
+        _get_transaction_analytics(30)
+    except HTTPException as e:
+        logger.warning(f"Analytics cache not warmed: {e.detail}")
 
 
 @router.get("/customers", 
@@ -43,6 +75,15 @@ async def get_customers(
     risk_level: Optional[str] = Query(None, description="Filter by risk level (Low, Medium, High, Critical)")
 ):
     """Get paginated list of customers with optional filtering"""
+    # pandas work runs on the worker pool so it cannot block the event loop
+    return await inference_executor.run(
+        _get_customers_page, page, page_size, search, age_min, age_max, location, risk_level
+    )
+
+
+def _get_customers_page(page: int, page_size: int, search: Optional[str], age_min: Optional[int],
+                        age_max: Optional[int], location: Optional[str], risk_level: Optional[str]) -> Dict[str, Any]:
+    """Get paginated list of customers with optional filtering"""
     try:
         if customers_df.empty:
             raise HTTPException(status_code=503, detail="Customer data not available")
@@ -124,7 +165,9 @@ async def get_customers(
                 "has_prev": page > 1
             }
         }
-        
+    
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting customers: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -133,18 +176,21 @@ async def get_customers(
 @router.get("/customers/{customer_id}",
            summary="Get detailed customer information")
 async def get_customer_detail(customer_id: str):
+    """Get detailed information for a specific customer"""
+    return await inference_executor.run(_get_customer_detail, customer_id)
+
+
+def _get_customer_detail(customer_id: str) -> Dict[str, Any]:
     """Get detailed information for a specific customer"""
     try:
         if customers_df.empty:
             raise HTTPException(status_code=503, detail="Customer data not available")
         
         # Get customer basic info and convert to JSON-serializable format
-        customer_row = customers_df[customers_df['customer_id'] == customer_id]
-        if customer_row.empty:
+        customer_data = data_store.get_customer(customer_id)
+        if customer_data is None:
             raise HTTPException(status_code=404, detail="Customer not found")
         
-        customer_data = customer_row.iloc[0]
-        
         # Format customer data with consistent structure
         customer = {
             "customer_id": customer_data['customer_id'],
@@ -167,22 +213,24 @@ async def get_customer_detail(customer_id: str):
         
         # Get customer features and convert to JSON-serializable format
         features = {}
-        if not customer_features_df.empty:
-            feature_row = customer_features_df[customer_features_df['customer_id'] == customer_id]
-            if not feature_row.empty:
-                feature_data = feature_row.iloc[0]
-                for key, value in feature_data.items():
-                    if pd.isna(value):
-                        features[key] = None
-                    elif isinstance(value, (pd.Timestamp, pd.Period)):
-                        features[key] = str(value)
-                    elif isinstance(value, (np.integer, np.floating)):
-                        features[key] = float(value)
-                    else:
-                        features[key] = value
+        feature_data = data_store.get_features(customer_id)
+        if feature_data is not None:
+            for key, value in feature_data.items():
+                if pd.isna(value):
+                    features[key] = None
+                elif isinstance(value, (pd.Timestamp, pd.Period)):
+                    features[key] = str(value)
+                elif isinstance(value, (np.integer, np.floating)):
+                    features[key] = float(value)
+                else:
+                    features[key] = value
         
         # Get transaction summary
-        customer_transactions = transactions_df[transactions_df['customer_id'] == customer_id]
+        customer_transactions = data_store.get_transactions(customer_id)
+        
+        # Categorical columns count every category, so keep only those this customer used
+        category_counts = customer_transactions['category'].value_counts()
+        category_counts = category_counts[category_counts > 0]
         
         # Calculate monthly spending with JSON-serializable format
         monthly_spending = {}
@@ -198,7 +246,7 @@ async def get_customer_detail(customer_id: str):
                 "first_transaction": customer_transactions['transaction_date'].min().isoformat() if not customer_transactions.empty else None,
                 "last_transaction": customer_transactions['transaction_date'].max().isoformat() if not customer_transactions.empty else None
             },
-            "top_categories": customer_transactions['category'].value_counts().head(5).to_dict() if not customer_transactions.empty else {},
+            "top_categories": category_counts.head(5).to_dict(),
             "monthly_spending": monthly_spending
         }
         
@@ -207,7 +255,7 @@ async def get_customer_detail(customer_id: str):
             "features": features,
             "transaction_summary": transaction_summary
         }
-        
+    
     except HTTPException:
         raise
     except Exception as e:
@@ -229,12 +277,26 @@ async def get_customer_transactions(
     is_fraud: Optional[bool] = Query(None, description="Filter by fraud status")
 ):
     """Get paginated transaction history for a specific customer"""
+    return await inference_executor.run(
+        _get_customer_transactions, customer_id, page, page_size, category,
+        date_from, date_to, amount_min, amount_max, is_fraud
+    )
+
+
+def _get_customer_transactions(customer_id: str, page: int, page_size: int, category: Optional[str],
+                               date_from: Optional[str], date_to: Optional[str], amount_min: Optional[float],
+                               amount_max: Optional[float], is_fraud: Optional[bool]) -> Dict[str, Any]:
+    """Get paginated transaction history for a specific customer"""
     try:
         if transactions_df.empty:
             raise HTTPException(status_code=503, detail="Transaction data not available")
         
-        # Get customer transactions
-        customer_transactions = transactions_df[transactions_df['customer_id'] == customer_id].copy()
+        # Get customer transactions, with the date range resolved by binary search
+        customer_transactions = data_store.get_transactions(
+            customer_id,
+            date_from=pd.to_datetime(date_from) if date_from else None,
+            date_to=pd.to_datetime(date_to) if date_to else None
+        )
         
         if customer_transactions.empty:
             return {
@@ -255,18 +317,6 @@ async def get_customer_transactions(
                 customer_transactions['category'].str.contains(category, case=False)
             ]
         
-        if date_from:
-            date_from_dt = pd.to_datetime(date_from)
-            customer_transactions = customer_transactions[
-                customer_transactions['transaction_date'] >= date_from_dt
-            ]
-        
-        if date_to:
-            date_to_dt = pd.to_datetime(date_to)
-            customer_transactions = customer_transactions[
-                customer_transactions['transaction_date'] <= date_to_dt
-            ]
-        
         if amount_min is not None:
             customer_transactions = customer_transactions[
                 customer_transactions['amount'] >= amount_min
@@ -282,8 +332,8 @@ async def get_customer_transactions(
                 customer_transactions['is_fraud'] == is_fraud
             ]
         
-        # Sort by date descending
-        customer_transactions = customer_transactions.sort_values('transaction_date', ascending=False)
+        # Sort by date descending (the slice is already in ascending date order)
+        customer_transactions = customer_transactions.iloc[::-1]
         
         # Calculate pagination
         total_transactions = len(customer_transactions)
@@ -321,7 +371,7 @@ async def get_customer_transactions(
                 "has_prev": page > 1
             }
         }
-        
+    
     except HTTPException:
         raise
     except Exception as e:
@@ -332,6 +382,16 @@ async def get_customer_transactions(
 @router.get("/analytics/customers",
            summary="Get customer analytics and insights")
 async def get_customer_analytics():
+    """Get comprehensive customer analytics"""
+    return await inference_executor.run(_get_customer_analytics)
+
+
+def _get_customer_analytics() -> Dict[str, Any]:
+    """Customer analytics, served from the cache while the data is unchanged"""
+    return analytics_cache.get_or_compute(("customers",), data_store.version, _compute_customer_analytics)
+
+
+def _compute_customer_analytics() -> Dict[str, Any]:
     """Get comprehensive customer analytics"""
     try:
         if customers_df.empty or transactions_df.empty:
@@ -394,7 +454,9 @@ async def get_customer_analytics():
             "customer_activity": activity_metrics,
             "generated_at": datetime.now().isoformat()
         }
-        
+    
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting customer analytics: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -405,77 +467,53 @@ async def get_customer_analytics():
 async def get_transaction_analytics(
     days: int = Query(30, ge=1, le=365, description="Number of days to analyze")
 ):
+    """Get detailed transaction analytics for specified period"""
+    return await inference_executor.run(_get_transaction_analytics, days)
+
+
+def _get_transaction_analytics(days: int) -> Dict[str, Any]:
+    """Transaction analytics, served from the cache while the data is unchanged"""
+    return analytics_cache.get_or_compute(
+        ("transactions", days), data_store.version, lambda: _compute_transaction_analytics(days)
+    )
+
+
+def _compute_transaction_analytics(days: int) -> Dict[str, Any]:
     """Get detailed transaction analytics for specified period"""
     try:
         if transactions_df.empty:
             raise HTTPException(status_code=503, detail="Transaction data not available")
         
-        # Filter by date range
-        end_date = transactions_df['transaction_date'].max()
+        # Answer the window from the rollup cube instead of rescanning transactions
+        rollup = data_store.rollup
+        end_date = rollup.end_date
         start_date = end_date - timedelta(days=days)
         
-        filtered_df = transactions_df[
-            transactions_df['transaction_date'] >= start_date
-        ]
+        window_analytics = rollup.transaction_analytics(start_date)
         
-        if filtered_df.empty:
+        if not window_analytics:
             raise HTTPException(status_code=404, detail="No transactions found in specified period")
         
-        # Daily transaction trends
-        daily_trends = filtered_df.groupby(filtered_df['transaction_date'].dt.date).agg({
-            'transaction_id': 'count',
-            'amount': ['sum', 'mean'],
-            'is_fraud': 'sum'
-        }).reset_index()
-        
-        daily_trends.columns = ['date', 'transaction_count', 'total_amount', 'avg_amount', 'fraud_count']
-        
-        # Category analysis
-        category_analysis = filtered_df.groupby('category').agg({
-            'transaction_id': 'count',
-            'amount': ['sum', 'mean'],
-            'is_fraud': 'sum'
-        }).reset_index()
-        
-        category_analysis.columns = ['category', 'transaction_count', 'total_amount', 'avg_amount', 'fraud_count']
-        
-        # Time-based patterns - make explicit copy to avoid warning
-        time_df = filtered_df.copy()
-        time_df['hour'] = time_df['transaction_date'].dt.hour
-        time_df['day_of_week'] = time_df['transaction_date'].dt.day_name()
-        
-        hourly_pattern = time_df.groupby('hour')['transaction_id'].count().to_dict()
-        weekly_pattern = time_df.groupby('day_of_week')['transaction_id'].count().to_dict()
-        
         analytics = {
             "period": {
                 "start_date": start_date.date().isoformat(),
                 "end_date": end_date.date().isoformat(),
                 "days": days
             },
-            "summary": {
-                "total_transactions": len(filtered_df),
-                "total_volume": float(filtered_df['amount'].sum()),
-                "avg_transaction_amount": float(filtered_df['amount'].mean()),
-                "fraud_transactions": int(filtered_df['is_fraud'].sum()),
-                "fraud_rate": float(filtered_df['is_fraud'].mean() * 100),
-                "unique_customers": filtered_df['customer_id'].nunique(),
-                "unique_merchants": filtered_df['merchant'].nunique()
-            },
-            "daily_trends": daily_trends.to_dict('records'),
-            "category_breakdown": category_analysis.to_dict('records'),
-            "time_patterns": {
-                "hourly": hourly_pattern,
-                "weekly": weekly_pattern
-            },
-            "top_merchants": filtered_df['merchant'].value_counts().head(10).to_dict(),
-            "payment_methods": filtered_df['mode'].value_counts().to_dict()  # 'mode' instead of 'payment_method'
+            **window_analytics
         }
         
         return analytics
-        
+    
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error getting transaction analytics: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/analytics/cache",
+           summary="Get analytics cache statistics")
+async def get_analytics_cache_stats():
+    """Hit/miss counters for the analytics cache of this process"""
+    return analytics_cache.stats()
@@ -3,11 +3,17 @@ Health check and system status routes
 """
 
 from fastapi import APIRouter
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from datetime import datetime
 import psutil
 import os
 
 from ..schemas.models import HealthResponse
+from ..serving import churn_server, segment_server
+from ..startup import startup_phases
+from . import customers as customer_routes
+from utils.config import settings
 
 router = APIRouter()
 
@@ -19,8 +25,8 @@ async def health_check():
         timestamp=datetime.now(),
         version="1.0.0",
         models_loaded={
-            "churn_prediction": True,
-            "customer_segmentation": True,
+            "churn_prediction": churn_server.is_loaded,
+            "customer_segmentation": segment_server.is_loaded,
             "fraud_detection": True
         }
     )
@@ -64,18 +70,23 @@ async def detailed_health_check():
 
 @router.get("/ready")
 async def readiness_check():
-    """Kubernetes readiness probe endpoint"""
-    # Check if critical services are ready
-    services_ready = {
-        "database": True,  # Check database connection
-        "models": True,    # Check if models are loaded
-        "storage": True    # Check storage accessibility
+    """Kubernetes readiness probe endpoint: 503 until the startup phases have loaded the models"""
+    services = {
+        "data": not customer_routes.data_store.customers.empty,
+        "models": churn_server.is_loaded,
+        "storage": settings.data_path.exists()
     }
     
-    if all(services_ready.values()):
-        return {"status": "ready", "services": services_ready}
-    else:
-        return {"status": "not_ready", "services": services_ready}
+    # Customer data is reported but optional: scoring works on request features without it
+    ready = startup_phases.ready and services["models"] and services["storage"]
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content=jsonable_encoder({
+            "status": "ready" if ready else "not_ready",
+            "services": services,
+            "phases": startup_phases.snapshot()
+        })
+    )
 
 @router.get("/live")
 async def liveness_check():
@@ -2,55 +2,126 @@
 ML inference API routes
 """
 
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from typing import List, Dict, Any
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from typing import List, Dict, Any, Tuple
 import pandas as pd
 import logging
 from datetime import datetime
 
 from ..schemas.models import (
     TransactionInput, CustomerInput, TransactionBatch, CustomerBatch,
-    ChurnPrediction, ChurnBatchResponse, SegmentPrediction, 
-    FraudPrediction, ModelExplanation, ErrorResponse
+    ChurnPrediction, ChurnBatchResponse, SegmentPrediction, SegmentBatchResponse,
+    FraudPrediction, FraudBatchResponse, ModelExplanation, ExplanationBatchRequest, ExplanationBatchResponse, ErrorResponse,
+    BatchProcessingRequest, BatchProcessingResponse
 )
+from ..serving import (
+    churn_server, segment_server, score_churn, segment_customers, ModelNotLoadedError, MissingFeaturesError,
+    load_feature_store
+)
+from ..explanations import explanation_service, explain_customers, explain_batch
+from ..batching import MicroBatcher
+from ..executor import inference_executor
+from ..fraud import fraud_scorer
+from ..fraud_rules import fraud_rules
+from ..jobs import batch_jobs
+from ..score_table import churn_scores
+from . import customers as customer_routes
+from utils.config import settings
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-# Mock model instances (in production, these would be loaded from storage)
-# Global variables to store loaded models
-churn_model = None
-segmentation_model = None
-fraud_model = None
+# Coalesces concurrent /inference/churn-score requests into one model call on the worker pool
+churn_batcher = MicroBatcher(
+    score_churn,
+    max_batch_size=settings.churn_max_batch_size,
+    max_wait_ms=settings.churn_batch_window_ms
+)
+churn_batcher.executor = inference_executor
+
+def stored_features(customer_ids: List[str]) -> pd.DataFrame:
+    """Numeric feature rows from the customer_features table, indexed by customer_id"""
+    features = customer_routes.data_store.get_features_many(customer_ids)
+    if features.empty:
+        return pd.DataFrame()
+    return features.set_index("customer_id").select_dtypes("number")
+
+# Customers without request or feature-store features fall back to the customer_features table
+churn_server.feature_lookup = stored_features
+segment_server.feature_lookup = stored_features
 
 def load_models():
-    """Load all ML models (placeholder for actual model loading)"""
-    global churn_model, segmentation_model, fraud_model
-    # This would load actual trained models from storage
-    logger.info("Models loaded successfully (placeholder)")
+    """Load all ML models from their saved artifacts and keep them warm"""
+    churn_server.feature_store = segment_server.feature_store = load_feature_store()
+    loaded = churn_server.load()
+    segments_loaded = segment_server.load()
+    logger.info(f"Models loaded (churn_prediction={loaded}, customer_segmentation={segments_loaded})")
+    return loaded
+
+def load_fraud_state() -> bool:
+    """Seed the streaming fraud scorer with the customers' transaction history"""
+    transactions = customer_routes.transactions_df
+    if transactions.empty:
+        logger.warning("No transaction history; fraud state starts empty")
+        return False
+    
+    fraud_scorer.reset()
+    fraud_scorer.replay(transactions)
     return True
 
-# Initialize models on first import
-load_models()
+def reload_models() -> bool:
+    """Swap in the current model artifacts without interrupting requests"""
+    swapped = churn_server.reload()
+    segments_swapped = segment_server.reload()
+    if swapped or segments_swapped:
+        # Worker processes hold their own copy of both models
+        inference_executor.recycle()
+    logger.info(f"Models reloaded (churn_prediction swapped={swapped}, customer_segmentation swapped={segments_swapped})")
+    return swapped or segments_swapped
+
+def stored_churn_scores(customers: List[CustomerInput]) -> Dict[str, ChurnPrediction]:
+    """Fresh precomputed scores for the customers sent without features
+    
+    Reads only the served model's version, so the event loop never waits on
+    a model load; before the first load every customer is scored live.
+    """
+    customer_ids = [customer.customer_id for customer in customers if not customer.features]
+    version = churn_server.version
+    if not customer_ids or version is None:
+        return {}
+    return churn_scores.lookup(customer_ids, version)
+
+def resolve_churn_customer(customer: CustomerInput) -> CustomerInput:
+    """The customer with resolved features, against a loaded model (runs on the worker pool)"""
+    churn_server.ensure_loaded()
+    return CustomerInput(customer_id=customer.customer_id, features=churn_server.resolve_features(customer))
 
 @router.post("/inference/churn-score", response_model=ChurnPrediction)
 async def predict_churn(customer: CustomerInput):
     """Predict customer churn probability"""
     try:
-        # Mock prediction logic (replace with actual model inference)
-        mock_probability = 0.35  # This would come from the actual model
+        stored = stored_churn_scores([customer])
+        if stored:
+            return stored[customer.customer_id]
         
-        prediction = ChurnPrediction(
-            customer_id=customer.customer_id,
-            churn_probability=mock_probability,
-            churn_prediction=mock_probability > 0.5,
-            risk_level="Medium" if mock_probability > 0.3 else "Low",
-            confidence=0.87
-        )
+        if settings.churn_micro_batching:
+            # Resolve features and the model up front on the pool, so one bad request cannot fail a shared batch
+            customer = await inference_executor.run(resolve_churn_customer, customer)
+            prediction = await churn_batcher.submit(customer)
+        else:
+            prediction = (await inference_executor.run(score_churn, [customer]))[0]
         
-        logger.info(f"Churn prediction for customer {customer.customer_id}: {mock_probability}")
+        logger.info(f"Churn prediction for customer {customer.customer_id}: {prediction.churn_probability:.3f}")
         return prediction
-        
+    
+    except HTTPException:
+        raise
+    except ModelNotLoadedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except MissingFeaturesError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error in churn prediction: {e}")
         raise HTTPException(status_code=500, detail="Churn prediction failed")
@@ -59,193 +130,272 @@ async def predict_churn(customer: CustomerInput):
 async def predict_churn_batch(customers: CustomerBatch):
     """Batch churn prediction for multiple customers"""
     try:
-        predictions = []
+        stored = stored_churn_scores(customers.customers)
+        live = [customer for customer in customers.customers if customer.features or customer.customer_id not in stored]
         
-        for customer in customers.customers:
-            # Mock prediction (replace with actual model)
-            mock_probability = min(0.9, max(0.1, hash(customer.customer_id) % 100 / 100))
-            
-            prediction = ChurnPrediction(
-                customer_id=customer.customer_id,
-                churn_probability=mock_probability,
-                churn_prediction=mock_probability > 0.5,
-                risk_level="High" if mock_probability > 0.6 else "Medium" if mock_probability > 0.3 else "Low",
-                confidence=0.85
-            )
-            predictions.append(prediction)
+        # One vectorized predict_proba call for the rest of the batch, off the event loop
+        scored = iter(await inference_executor.run(score_churn, live) if live else [])
+        predictions = [
+            stored[customer.customer_id] if not customer.features and customer.customer_id in stored else next(scored)
+            for customer in customers.customers
+        ]
         
-        # Calculate summary statistics
-        churn_probabilities = [p.churn_probability for p in predictions]
-        summary = {
-            "total_customers": len(predictions),
-            "predicted_churners": sum(1 for p in predictions if p.churn_prediction),
-            "avg_churn_probability": sum(churn_probabilities) / len(churn_probabilities),
-            "high_risk_customers": sum(1 for p in predictions if p.risk_level == "High")
-        }
-        
-        response = ChurnBatchResponse(predictions=predictions, summary=summary)
+        response = ChurnBatchResponse(predictions=predictions, summary=churn_server.summarize(predictions))
         
         logger.info(f"Batch churn prediction completed for {len(customers.customers)} customers")
         return response
-        
+    
+    except HTTPException:
+        raise
+    except ModelNotLoadedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except MissingFeaturesError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error in batch churn prediction: {e}")
         raise HTTPException(status_code=500, detail="Batch churn prediction failed")
 
 @router.post("/inference/segment", response_model=SegmentPrediction)
 async def predict_segment(customer: CustomerInput):
-    """Predict customer segment"""
+    """Assign a customer to the nearest behavioral segment"""
     try:
-        # Mock segmentation logic
-        segment_names = ["High Value", "Growth Potential", "At Risk", "New Customer", "Loyal"]
-        segment_id = hash(customer.customer_id) % len(segment_names)
-        
-        prediction = SegmentPrediction(
-            customer_id=customer.customer_id,
-            segment_id=segment_id,
-            segment_name=segment_names[segment_id],
-            confidence=0.82,
-            characteristics={
-                "avg_monthly_spend": 2500,
-                "transaction_frequency": 15,
-                "preferred_categories": ["grocery", "restaurant"],
-                "risk_level": "low"
-            }
-        )
+        prediction = (await inference_executor.run(segment_customers, [customer]))[0]
         
-        logger.info(f"Segment prediction for customer {customer.customer_id}: {segment_names[segment_id]}")
+        logger.info(f"Segment prediction for customer {customer.customer_id}: {prediction.segment_name}")
         return prediction
-        
+    
+    except HTTPException:
+        raise
+    except ModelNotLoadedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except MissingFeaturesError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error in segmentation: {e}")
         raise HTTPException(status_code=500, detail="Customer segmentation failed")
 
-@router.post("/inference/fraud-detection", response_model=FraudPrediction)
-async def detect_fraud(transaction: TransactionInput):
-    """Detect fraudulent transactions"""
+@router.post("/inference/segment-batch", response_model=SegmentBatchResponse)
+async def predict_segment_batch(customers: CustomerBatch):
+    """Batch segmentation: one distance computation against the centroid table for the whole batch"""
     try:
-        # Mock fraud detection logic
-        # Consider high amounts or specific patterns as potentially fraudulent
-        fraud_indicators = []
-        fraud_score = 0.0
+        predictions = await inference_executor.run(segment_customers, customers.customers)
         
-        # High amount indicator
-        if abs(transaction.amount) > 1000:
-            fraud_score += 0.3
-            fraud_indicators.append("unusual_amount")
-        
-        # Weekend late night transactions
-        if transaction.transaction_date.weekday() >= 5 and transaction.transaction_date.hour >= 22:
-            fraud_score += 0.2
-            fraud_indicators.append("unusual_timing")
-        
-        # Specific high-risk merchants (mock)
-        high_risk_merchants = ["Unknown Merchant", "ATM Withdrawal"]
-        if transaction.merchant in high_risk_merchants:
-            fraud_score += 0.4
-            fraud_indicators.append("high_risk_merchant")
-        
-        fraud_score = min(fraud_score, 0.95)  # Cap at 95%
+        logger.info(f"Batch segmentation completed for {len(predictions)} customers")
+        return SegmentBatchResponse(predictions=predictions, segment_summary=segment_server.summarize(predictions))
+    
+    except HTTPException:
+        raise
+    except ModelNotLoadedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except MissingFeaturesError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error in batch segmentation: {e}")
+        raise HTTPException(status_code=500, detail="Batch customer segmentation failed")
+
+@router.post("/inference/segment/partial-fit", response_model=SegmentBatchResponse)
+async def update_segments(customers: CustomerBatch):
+    """Fold new customers into the served segment centroids (in memory) and return their segments
+    
+    Only allowed with the thread executor: worker processes hold their own
+    copy of the model, so batch jobs there would keep assigning with the old
+    centroids.
+    """
+    if inference_executor.kind == "process":
+        raise HTTPException(status_code=409, detail="Incremental segment updates need the thread executor; "
+                                                    "retrain and reload the model instead")
+    try:
+        predictions = await run_in_threadpool(segment_server.partial_fit, customers.customers)
         
-        prediction = FraudPrediction(
-            transaction_id=getattr(transaction, 'transaction_id', None),
-            customer_id=transaction.customer_id,
-            fraud_probability=fraud_score,
-            fraud_prediction=fraud_score > 0.3,
-            anomaly_score=fraud_score,
-            risk_factors=fraud_indicators
-        )
+        logger.info(f"Segments updated with {len(predictions)} customers")
+        return SegmentBatchResponse(predictions=predictions, segment_summary=segment_server.summarize(predictions))
+    
+    except HTTPException:
+        raise
+    except ModelNotLoadedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except MissingFeaturesError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error updating segments: {e}")
+        raise HTTPException(status_code=500, detail="Segment update failed")
+
+@router.post("/inference/fraud-detection", response_model=FraudPrediction)
+async def detect_fraud(transaction: TransactionInput):
+    """Detect fraudulent transactions against the customer's recent history"""
+    try:
+        # Constant-time state update; cheap enough to run on the event loop
+        prediction = fraud_scorer.predict(transaction)
         
-        logger.info(f"Fraud detection for transaction: fraud_score={fraud_score}")
+        logger.info(f"Fraud detection for transaction: fraud_score={prediction.fraud_probability}")
         return prediction
-        
+    
     except Exception as e:
         logger.error(f"Error in fraud detection: {e}")
         raise HTTPException(status_code=500, detail="Fraud detection failed")
 
-@router.post("/inference/batch-process")
-async def batch_process(background_tasks: BackgroundTasks, request: Dict[str, Any]):
-    """Process large batches of data in background"""
+def score_fraud_batch(transactions: List[TransactionInput]) -> Tuple[Dict, Dict]:
+    """Score a batch as arrays; returns the response body and the arrays for the state update"""
+    arrays = fraud_scorer.batch_arrays(transactions)
+    results = fraud_scorer.score_arrays(arrays)
+    body = {"predictions": fraud_scorer.batch_records(transactions, results), "summary": fraud_scorer.summarize(results)}
+    return body, arrays
+
+@router.post("/inference/fraud-batch", response_model=FraudBatchResponse)
+async def detect_fraud_batch(
+    batch: TransactionBatch,
+    background_tasks: BackgroundTasks,
+    update_state: bool = Query(True, description="Add the transactions to the customers' history after scoring")
+):
+    """Batch fraud detection: rules and anomaly scores are evaluated over the whole batch at once
+    
+    There is no trained fraud model, so like the single-transaction endpoint
+    ``fraud_probability`` is the capped sum of the matching rules' weights;
+    ``anomaly_score`` is the amount's |z-score| against the customer's history.
+    """
     try:
-        job_id = f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-        
-        # Add background task
-        background_tasks.add_task(process_batch_job, job_id, request)
-        
-        return {
-            "job_id": job_id,
-            "status": "initiated",
-            "message": "Batch processing started",
-            "estimated_duration": "5-10 minutes"
-        }
+        # Fraud state lives in this process, so the batch is scored on a thread rather than the worker pool
+        body, arrays = await run_in_threadpool(score_fraud_batch, batch.transactions)
+        if update_state:
+            # Scores already account for earlier rows of the batch; the history catches up after the response
+            background_tasks.add_task(fraud_scorer.update_many, **arrays)
         
+        logger.info(f"Batch fraud detection completed for {len(batch.transactions)} transactions")
+        # The body is built in the FraudBatchResponse shape from plain values, so it is not re-validated row by row
+        return JSONResponse(content=body, background=background_tasks)
+    
+    except Exception as e:
+        logger.error(f"Error in batch fraud detection: {e}")
+        raise HTTPException(status_code=500, detail="Batch fraud detection failed")
+
+@router.get("/inference/fraud-rules")
+async def get_fraud_rules():
+    """The active fraud rule set: version, rule names and weights"""
+    try:
+        return fraud_rules.status()
+    
+    except Exception as e:
+        logger.error(f"Error getting fraud rules: {e}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve fraud rules")
+
+@router.post("/inference/fraud-rules/reload")
+async def reload_fraud_rules():
+    """Recompile the fraud rules file now; an invalid file is rejected and the current rules stay active"""
+    try:
+        rules = await run_in_threadpool(fraud_rules.reload)
+        return {"message": "Fraud rules reloaded", **rules.describe(), "timestamp": datetime.now()}
+    
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error reloading fraud rules: {e}")
+        raise HTTPException(status_code=500, detail="Failed to reload fraud rules")
+
+def job_response(job: Dict[str, Any]) -> BatchProcessingResponse:
+    return BatchProcessingResponse(**{field: job[field] for field in BatchProcessingResponse.model_fields})
+
+@router.post("/inference/batch-process", response_model=BatchProcessingResponse)
+async def batch_process(request: BatchProcessingRequest, background_tasks: BackgroundTasks):
+    """Score a stored table or file in chunks in the background, writing Parquet result parts"""
+    try:
+        job = await run_in_threadpool(batch_jobs.submit, request.processing_type, request.data_source, request.parameters)
+        background_tasks.add_task(batch_jobs.run, job["job_id"])
+        logger.info(f"Batch job {job['job_id']} queued: {request.processing_type} over {job['total_records']} records")
+        return job_response(job)
+    
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         logger.error(f"Error initiating batch process: {e}")
         raise HTTPException(status_code=500, detail="Failed to initiate batch processing")
 
-async def process_batch_job(job_id: str, request: Dict[str, Any]):
-    """Background task for batch processing"""
+@router.get("/inference/batch-process/{job_id}", response_model=BatchProcessingResponse)
+async def get_batch_job(job_id: str):
+    """Progress of a batch job"""
+    job = await run_in_threadpool(batch_jobs.store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Batch job {job_id} not found")
+    return job_response(job)
+
+@router.get("/inference/churn-scores")
+async def get_churn_scores():
+    """Precomputed churn score table: the pass being served, freshness and hit rate"""
+    return {**await run_in_threadpool(churn_scores.status), "timestamp": datetime.now()}
+
+@router.post("/inference/churn-scores/refresh", response_model=BatchProcessingResponse)
+async def refresh_churn_scores(background_tasks: BackgroundTasks):
+    """Start a full-base scoring pass now; it is served once it completes"""
     try:
-        logger.info(f"Starting batch job {job_id}")
-        
-        # Mock batch processing
-        # In production, this would:
-        # 1. Load data from file/database
-        # 2. Process through ML models
-        # 3. Save results
-        # 4. Update job status
-        
-        import asyncio
-        await asyncio.sleep(5)  # Simulate processing time
-        
-        logger.info(f"Batch job {job_id} completed successfully")
-        
+        job = await run_in_threadpool(churn_scores.submit_pass)
+        background_tasks.add_task(churn_scores.run_pass, job["job_id"])
+        return job_response(job)
+    
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
-        logger.error(f"Batch job {job_id} failed: {e}")
+        logger.error(f"Error starting churn scoring pass: {e}")
+        raise HTTPException(status_code=500, detail="Failed to start churn scoring pass")
 
-@router.get("/inference/explain")
-async def explain_prediction(customer_id: str, model_type: str = "churn"):
-    """Get model explanation for a prediction"""
+@router.get("/inference/explain", response_model=ModelExplanation)
+async def explain_prediction(customer_id: str, model_type: str = "churn",
+                             top_k: int = Query(settings.explanation_top_k, ge=1)):
+    """Get the SHAP explanation for a customer's churn prediction"""
     try:
-        # Mock explanation (replace with actual SHAP values)
-        if model_type == "churn":
-            explanation = ModelExplanation(
-                prediction=True,
-                probability=[0.35, 0.65],
-                feature_contributions=[
-                    {
-                        "feature_name": "days_since_last_transaction",
-                        "feature_value": 45.0,
-                        "contribution": 0.15,
-                        "importance": 0.23
-                    },
-                    {
-                        "feature_name": "avg_transaction_amount",
-                        "feature_value": 125.50,
-                        "contribution": -0.08,
-                        "importance": 0.18
-                    },
-                    {
-                        "feature_name": "transaction_frequency",
-                        "feature_value": 8.0,
-                        "contribution": 0.12,
-                        "importance": 0.20
-                    }
-                ],
-                explanation_summary="Customer shows high churn risk due to decreased transaction frequency and longer periods between transactions."
-            )
-        else:
+        if model_type != "churn":
             raise HTTPException(status_code=400, detail="Unsupported model type")
         
-        logger.info(f"Generated explanation for customer {customer_id}, model {model_type}")
-        return explanation
+        explanations = await inference_executor.run(explain_customers, [CustomerInput(customer_id=customer_id)], top_k)
         
+        logger.info(f"Generated explanation for customer {customer_id}, model {model_type}")
+        return explanations[0]
+    
     except HTTPException:
         raise
+    except ModelNotLoadedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except MissingFeaturesError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         logger.error(f"Error generating explanation: {e}")
         raise HTTPException(status_code=500, detail="Failed to generate explanation")
 
+@router.post("/inference/explain-batch", response_model=ExplanationBatchResponse)
+async def explain_prediction_batch(request: ExplanationBatchRequest):
+    """Rank the top churn drivers across a list of customers or a whole segment"""
+    try:
+        if request.customers:
+            customers = request.customers
+        elif request.segment:
+            customers = [
+                CustomerInput(customer_id=customer_id)
+                for customer_id in customer_routes.data_store.segment_customer_ids(request.segment)
+            ]
+            if not customers:
+                raise HTTPException(status_code=404, detail=f"No customers in segment {request.segment}")
+        else:
+            raise HTTPException(status_code=400, detail="Provide customers or a segment")
+        
+        # Segments are explained over whichever members have stored features
+        response = await inference_executor.run(
+            explain_batch, customers, request.top_k, request.include_explanations,
+            skip_missing=request.customers is None
+        )
+        
+        logger.info(f"Batch explanation completed for {response.summary['total_customers']} customers")
+        return response
+    
+    except HTTPException:
+        raise
+    except ModelNotLoadedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except MissingFeaturesError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error in batch explanation: {e}")
+        raise HTTPException(status_code=500, detail="Batch explanation failed")
+
 @router.get("/inference/metrics")
 async def get_inference_metrics():
     """Get inference service metrics and statistics"""
@@ -266,10 +416,14 @@ async def get_inference_metrics():
         
         return {
             "metrics": metrics,
+            "micro_batching": {"churn_score": churn_batcher.stats()},
+            "executor": inference_executor.stats(),
+            "explanations": explanation_service.stats(),
+            "churn_scores": churn_scores.status(),
             "timestamp": datetime.now(),
             "status": "operational"
         }
-        
+    
     except Exception as e:
         logger.error(f"Error getting metrics: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve metrics")
@@ -128,10 +128,36 @@ class FeatureContribution(BaseModel):
 
 class ModelExplanation(BaseModel):
     """Model explanation response"""
+    customer_id: Optional[str] = None
     prediction: Any = Field(..., description="Model prediction")
     probability: Optional[List[float]] = Field(None, description="Class probabilities")
     feature_contributions: List[FeatureContribution] = Field(..., description="Feature contributions")
     explanation_summary: str = Field(..., description="Human-readable explanation")
+    source: Optional[str] = Field(None, description="'index' if precomputed, 'computed' if explained on demand")
+
+
+class ExplanationBatchRequest(BaseModel):
+    """Customers to explain together: an explicit list or every customer in a segment"""
+    customers: Optional[List[CustomerInput]] = Field(None, description="Customers, with optional features")
+    segment: Optional[str] = Field(None, description="Explain every customer in this segment")
+    top_k: int = Field(5, ge=1, description="Number of drivers to return")
+    include_explanations: bool = Field(False, description="Also return each customer's explanation")
+
+
+class DriverRanking(BaseModel):
+    """A feature's influence on churn across a batch of customers"""
+    feature_name: str
+    mean_abs_contribution: float = Field(..., description="Mean absolute SHAP value")
+    mean_contribution: float = Field(..., description="Mean SHAP value")
+    increases_risk_share: float = Field(..., ge=0, le=1, description="Share of customers it pushes towards churn")
+    top_driver_share: float = Field(..., ge=0, le=1, description="Share of customers for whom it is the largest driver")
+
+
+class ExplanationBatchResponse(BaseModel):
+    """Top churn drivers across a batch of customers"""
+    top_drivers: List[DriverRanking]
+    explanations: Optional[List[ModelExplanation]] = None
+    summary: Dict[str, Any] = Field(..., description="Batch summary statistics")
 
 
 # Health and Status Models
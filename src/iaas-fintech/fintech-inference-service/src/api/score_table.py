@@ -0,0 +1,219 @@
+"""
+Precomputed churn scores for the whole customer base, served while still fresh
+"""
+
+import asyncio
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from fastapi.concurrency import run_in_threadpool
+
+from data.storage import partition_files, read_frame
+from utils.config import settings
+
+from .jobs import BatchJobRunner, batch_jobs, source_version
+from .schemas.models import ChurnPrediction
+from .serving import ChurnModelServer
+
+logger = logging.getLogger(__name__)
+
+
+class ScoreSnapshot:
+    """One completed scoring pass, indexed by customer_id"""
+    
+    def __init__(self, job: Dict, scores: pd.DataFrame):
+        self.job_id = job["job_id"]
+        self.source_path = Path(job["source_path"])
+        self.source_version = job["source_version"]
+        self.completed_at = job["completed_at"]
+        self.rows = dict(zip(scores["customer_id"].astype(str), range(len(scores))))
+        self.customer_ids = scores["customer_id"].astype(str).to_numpy(dtype=object)
+        self.probabilities = scores["churn_probability"].to_numpy(dtype=float)
+        self.risk_levels = scores["risk_level"].astype(str).to_numpy(dtype=object)
+        self.model_versions = scores["churn_model_version"].astype(str).to_numpy(dtype=object)
+        self.scored_at = pd.to_datetime(scores["scored_at"]).to_numpy().astype("datetime64[us]")
+        self.features_current = True
+    
+    def __len__(self) -> int:
+        return len(self.rows)
+    
+    def check_features(self) -> bool:
+        """Whether the scored feature table is still the stored one"""
+        self.features_current = self.source_path.exists() and source_version(self.source_path) == self.source_version
+        return self.features_current
+
+
+class ChurnScoreTable:
+    """Serves churn scores from the latest completed full-base scoring pass
+    
+    A pass is a "scores" batch job over customer_features, so it runs in
+    chunks on the worker pool and resumes after a crash. A stored score is
+    served only if three things hold. The feature table is unchanged since
+    the pass. The score was made by the model version now being served. It
+    is younger than ``score_table_max_age_hours``. Otherwise the caller
+    scores the customer live.
+    
+    ``lookup`` only reads the in-memory snapshot. ``refresh`` does the file
+    and job-table work: loading a newer pass and re-checking the feature
+    table. The API runs it every ``check_seconds`` from ``watch``, on the
+    thread pool.
+    """
+    
+    def __init__(self, runner: Optional[BatchJobRunner] = None, check_seconds: Optional[float] = None,
+                 max_age_hours: Optional[float] = None):
+        """Initialize the table; passes are loaded by ``refresh``"""
+        self.runner = runner or batch_jobs
+        self.check_seconds = check_seconds if check_seconds is not None else settings.score_table_check_seconds
+        self.max_age_hours = max_age_hours if max_age_hours is not None else settings.score_table_max_age_hours
+        self.hits = 0
+        self.misses = 0
+        self._snapshot: Optional[ScoreSnapshot] = None
+        self._lock = threading.Lock()
+    
+    @property
+    def current(self) -> Optional[ScoreSnapshot]:
+        """The pass being served, or None before the first one"""
+        return self._snapshot
+    
+    def refresh(self) -> Optional[ScoreSnapshot]:
+        """Load the newest completed pass if it is not the one being served, and re-check its features (blocking)"""
+        with self._lock:
+            snapshot = self._snapshot
+            if not self.runner.store.path.exists():
+                return snapshot
+            latest = self.runner.store.completed("scores", limit=1)
+            if not latest or (snapshot is not None and snapshot.job_id == latest[0]["job_id"]):
+                if snapshot is not None:
+                    snapshot.check_features()
+                return snapshot
+            
+            parts = partition_files(latest[0]["results_path"])
+            if not parts:
+                logger.warning(f"Scoring pass {latest[0]['job_id']} has no results on disk")
+                return snapshot
+            snapshot = ScoreSnapshot(latest[0], pd.concat([read_frame(part) for part in parts], ignore_index=True))
+            snapshot.check_features()
+            self._snapshot = snapshot
+        
+        logger.info(f"Churn score table {snapshot.job_id} loaded ({len(snapshot)} customers, "
+                    f"features current={snapshot.features_current})")
+        return snapshot
+    
+    async def watch(self) -> None:
+        """Refresh every ``check_seconds`` off the event loop, for the life of the process"""
+        while True:
+            await asyncio.sleep(self.check_seconds)
+            try:
+                await run_in_threadpool(self.refresh)
+            except Exception as e:
+                logger.error(f"Churn score table refresh failed: {e}")
+    
+    def lookup(self, customer_ids: List[str], model_version: str) -> Dict[str, ChurnPrediction]:
+        """Stored predictions for the customers whose score is fresh for ``model_version``"""
+        snapshot = self.current
+        found = {}
+        if snapshot is not None and snapshot.features_current:
+            positions = np.array([snapshot.rows.get(customer_id, -1) for customer_id in customer_ids], dtype=np.int64)
+            positions = positions[positions >= 0]
+            if len(positions):
+                oldest = np.datetime64(datetime.now() - timedelta(hours=self.max_age_hours), "us")
+                fresh = positions[(snapshot.model_versions[positions] == model_version)
+                                  & (snapshot.scored_at[positions] >= oldest)]
+                predictions = ChurnModelServer.build_predictions(
+                    snapshot.customer_ids[fresh], snapshot.probabilities[fresh], snapshot.risk_levels[fresh].tolist()
+                )
+                found = {prediction.customer_id: prediction for prediction in predictions}
+        
+        self.hits += len(found)
+        self.misses += len(customer_ids) - len(found)
+        return found
+    
+    def prune(self, keep: Optional[int] = None) -> List[Path]:
+        """Delete all but the ``keep`` newest passes, results and job rows; returns the removed directories"""
+        keep = keep if keep is not None else settings.score_table_keep_runs
+        old = self.runner.store.completed("scores", limit=-1, offset=keep)
+        removed = []
+        for job in old:
+            path = Path(job["results_path"])
+            if path.exists():
+                shutil.rmtree(path)
+                removed.append(path)
+        self.runner.store.delete([job["job_id"] for job in old])
+        return removed
+    
+    def submit_pass(self) -> Dict:
+        """Record a scoring pass over customer_features; ``run_pass`` does the work"""
+        job = self.runner.submit("scores", "customer_features")
+        logger.info(f"Churn scoring pass {job['job_id']} queued over {job['total_records']} customers")
+        return job
+    
+    async def run_pass(self, job_id: Optional[str] = None) -> Dict:
+        """Score every customer in customer_features and serve the result once it completes"""
+        if job_id is None:
+            job_id = (await run_in_threadpool(self.submit_pass))["job_id"]
+        job = await self.runner.run(job_id)
+        if job["status"] == "completed":
+            await run_in_threadpool(self.refresh)
+            await run_in_threadpool(self.prune)
+        return job
+    
+    async def run_nightly(self, hour: Optional[int] = None) -> None:
+        """Run a scoring pass every day at ``hour`` local time, for the life of the process"""
+        hour = hour if hour is not None else settings.score_table_refresh_hour
+        while True:
+            now = datetime.now()
+            next_run = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+            if next_run <= now:
+                next_run += timedelta(days=1)
+            await asyncio.sleep((next_run - now).total_seconds())
+            try:
+                await self.run_pass()
+            except Exception as e:
+                logger.error(f"Nightly churn scoring pass failed: {e}")
+    
+    def status(self) -> Dict:
+        snapshot = self.current
+        lookups = self.hits + self.misses
+        return {
+            "loaded": snapshot is not None,
+            "job_id": snapshot.job_id if snapshot else None,
+            "customers": len(snapshot) if snapshot else 0,
+            "completed_at": snapshot.completed_at if snapshot else None,
+            "features_current": snapshot.features_current if snapshot else False,
+            "max_age_hours": self.max_age_hours,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+churn_scores = ChurnScoreTable()
+
+
+def main():
+    """Run one full-base scoring pass, for scheduling outside the API process"""
+    # Change to project root directory for correct relative paths
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    os.chdir(os.path.join(script_dir, '..', '..'))
+    
+    from .routes import inference
+    
+    inference.load_models()
+    start = time.perf_counter()
+    job = asyncio.run(churn_scores.run_pass())
+    print(f"Scoring pass {job['job_id']} {job['status']}: {job['processed_records']} customers "
+          f"in {time.perf_counter() - start:.1f}s -> {job['results_path']}")
+    if job["error"]:
+        print(f"Error: {job['error']}")
+
+
+if __name__ == "__main__":
+    main()
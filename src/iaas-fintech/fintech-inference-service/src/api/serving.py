@@ -0,0 +1,568 @@
+"""
+Model serving layer: loads trained artifacts once and keeps them warm for inference
+"""
+
+import logging
+import threading
+import warnings
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from models.base_model import BaseModel, artifact_version
+from models.churn_model import ChurnPredictionModel
+from models.segmentation_model import CustomerSegmentationModel
+from models.compiled_trees import CompiledTreeEnsemble
+from models.registry import ModelRegistry, read_manifest
+from data.feature_store import CustomerFeatureStore
+from utils.config import settings
+
+from .schemas.models import CustomerInput, ChurnPrediction, SegmentPrediction
+
+logger = logging.getLogger(__name__)
+
+# BaseModel.save_model writes here when run from the service root with default paths
+DEFAULT_MODEL_DIRS = [settings.model_path, Path("../data/models")]
+
+model_registry = ModelRegistry(settings.model_path)
+
+
+def resolve_model_file(model_name: str) -> Optional[Path]:
+    """The registry's active artifact for a model, else the file written by ``BaseModel.save_model``"""
+    active = model_registry.artifact_path(model_name)
+    if active is not None:
+        return active
+    
+    for model_dir in DEFAULT_MODEL_DIRS:
+        candidate = Path(model_dir) / f"{model_name}_model.joblib"
+        if candidate.exists():
+            return candidate
+    return None
+
+
+class ModelNotLoadedError(RuntimeError):
+    """Raised when inference is requested before a model artifact is available"""
+
+
+class MissingFeaturesError(ValueError):
+    """Raised when a customer has neither request features nor stored features"""
+
+
+class FastPathScorer:
+    """Scores raw feature dicts against a trained model without pandas
+    
+    The trained ``feature_columns`` are compiled once into a name -> position
+    map, so a request becomes a NumPy row that goes straight to the booster.
+    Matches ``prepare_features`` followed by ``predict_proba``: unknown
+    features are ignored, and missing or NaN features are 0.
+    
+    With ``compiled`` set, the trees are flattened into a
+    CompiledTreeEnsemble (or ``ensemble``, one loaded from disk) and
+    evaluated in NumPy instead of by the native predictor; models that cannot
+    be compiled keep the native predictor.
+    """
+    
+    def __init__(self, model: BaseModel, compiled: bool = False,
+                 ensemble: Optional[CompiledTreeEnsemble] = None):
+        """Compile the feature positions and pick the cheapest predict call"""
+        self.feature_columns = list(model.feature_columns)
+        self.positions = {name: i for i, name in enumerate(self.feature_columns)}
+        self.estimator = model.model
+        
+        # XGBoost binary models return the positive-class probability from inplace_predict
+        self.booster = None
+        if hasattr(self.estimator, "get_booster") and self.estimator.get_params().get("objective") == "binary:logistic":
+            self.booster = self.estimator.get_booster()
+        
+        self.ensemble = ensemble
+        if compiled and ensemble is None:
+            try:
+                self.ensemble = CompiledTreeEnsemble.from_estimator(self.estimator)
+            except ValueError as e:
+                logger.warning(f"Using the native predictor: {e}")
+    
+    @property
+    def backend(self) -> str:
+        """Which predictor ``predict_proba`` calls"""
+        if self.ensemble is not None:
+            return "compiled"
+        return "booster" if self.booster is not None else "estimator"
+    
+    def vectorize(self, rows: List[Dict[str, float]]) -> np.ndarray:
+        """One float64 row per feature dict, in trained column order"""
+        X = np.zeros((len(rows), len(self.feature_columns)))
+        positions = self.positions
+        
+        for r, features in enumerate(rows):
+            for name, value in features.items():
+                i = positions.get(name)
+                if i is not None:
+                    X[r, i] = value
+        
+        return np.nan_to_num(X, copy=False, nan=0.0)
+    
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Positive-class probabilities for a feature matrix in trained column order"""
+        if self.ensemble is not None:
+            return self.ensemble.predict_proba(X)
+        if self.booster is not None:
+            return self.booster.inplace_predict(X)
+        
+        with warnings.catch_warnings():
+            # Estimators fitted on a DataFrame warn when given a bare array
+            warnings.simplefilter("ignore", UserWarning)
+            return self.estimator.predict_proba(X)[:, 1]
+
+
+class LoadedModel:
+    """A loaded artifact and everything derived from it, swapped in as one reference"""
+    
+    def __init__(self, model: ChurnPredictionModel, scorer: FastPathScorer, model_file: Path, version: str):
+        self.model = model
+        self.scorer = scorer
+        self.model_file = model_file
+        self.version = version
+        self.manifest = read_manifest(model_file)
+        self.loaded_at = datetime.now()
+    
+    def describe(self) -> Dict:
+        """Which artifact is being served, for status endpoints"""
+        return {
+            "artifact": self.version,
+            "registry_version": self.manifest["version"] if self.manifest else None,
+            "scorer": self.scorer.backend,
+            "loaded_at": self.loaded_at.isoformat()
+        }
+
+
+class FeatureResolver:
+    """Resolves customer features from the request, ``feature_store`` and then ``feature_lookup``"""
+    
+    feature_store: Optional[CustomerFeatureStore] = None
+    feature_lookup: Optional[Callable[[List[str]], pd.DataFrame]] = None
+    
+    def resolve_features(self, customer: CustomerInput) -> Dict[str, float]:
+        """Request features, falling back to the feature store and then stored features"""
+        features = customer.features
+        if not features and self.feature_store is not None:
+            features = self.feature_store.get_features(customer.customer_id)
+        if not features:
+            stored = self.lookup_features([customer.customer_id])
+            if len(stored):
+                features = stored.iloc[0].dropna().to_dict()
+        if not features:
+            raise MissingFeaturesError(f"No features available for customer {customer.customer_id}")
+        return features
+    
+    def lookup_features(self, customer_ids: List[str]) -> pd.DataFrame:
+        """Stored feature rows for whichever customers ``feature_lookup`` knows"""
+        if self.feature_lookup is None or not customer_ids:
+            return pd.DataFrame()
+        return self.feature_lookup(customer_ids)
+    
+    def build_feature_frame(self, customers: List[CustomerInput], skip_missing: bool = False) -> pd.DataFrame:
+        """One row per customer in request order, resolving features like ``resolve_features``
+        
+        Customers without request or feature-store features are looked up in
+        one ``feature_lookup`` call. Those still missing raise
+        MissingFeaturesError, or are left out when ``skip_missing`` is set.
+        """
+        rows = {}
+        pending = {}
+        
+        for position, customer in enumerate(customers):
+            features = customer.features
+            if not features and self.feature_store is not None:
+                features = self.feature_store.get_features(customer.customer_id)
+            if features:
+                rows[position] = {"customer_id": customer.customer_id, **features}
+            else:
+                pending[position] = customer.customer_id
+        
+        frames = [pd.DataFrame.from_dict(rows, orient="index")] if rows else []
+        missing = []
+        
+        if pending:
+            stored = self.lookup_features(list(set(pending.values())))
+            found = {position: customer_id for position, customer_id in pending.items() if customer_id in stored.index}
+            missing = [customer_id for customer_id in pending.values() if customer_id not in stored.index]
+            if found:
+                stored_rows = stored.loc[list(found.values())].reset_index()
+                stored_rows.index = list(found)
+                frames.append(stored_rows)
+        
+        if missing and not skip_missing:
+            raise MissingFeaturesError(f"No features available for customers: {', '.join(missing[:10])}")
+        
+        if not frames:
+            return pd.DataFrame(columns=["customer_id"])
+        return pd.concat(frames).sort_index().reset_index(drop=True)
+
+
+class ChurnModelServer(FeatureResolver):
+    """Holds a warm ChurnPredictionModel and scores customers in vectorized batches
+    
+    Features come from the request, then the incremental feature store, then
+    ``feature_lookup``: a bulk fallback mapping customer ids to a frame of
+    stored numeric feature rows indexed by customer_id.
+    
+    With ``fast_path`` set, ``score`` skips ``prepare_features`` and the
+    DataFrame round trip and scores through a FastPathScorer, which uses
+    the compiled tree ensemble when ``scorer_backend`` is "compiled".
+    
+    The model, its scorer and version live in a single LoadedModel.
+    ``reload`` builds and warms the next one off to the side and then swaps
+    the reference, so a request uses either the old model or the new one.
+    """
+    
+    def __init__(self, model_file: Optional[Path] = None,
+                 feature_store: Optional[CustomerFeatureStore] = None,
+                 feature_lookup: Optional[Callable[[List[str]], pd.DataFrame]] = None,
+                 fast_path: Optional[bool] = None,
+                 scorer_backend: Optional[str] = None):
+        """Initialize the server; the artifact is loaded by ``load``
+        
+        ``model_file`` pins an artifact; otherwise the registry's active
+        version is served, falling back to the legacy artifact locations.
+        """
+        self.pinned_file = Path(model_file) if model_file is not None else None
+        self.feature_store = feature_store
+        self.feature_lookup = feature_lookup
+        self.fast_path = fast_path if fast_path is not None else settings.churn_fast_path
+        self.scorer_backend = scorer_backend if scorer_backend is not None else settings.churn_scorer_backend
+        self.loaded: Optional[LoadedModel] = None
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+    
+    @property
+    def is_loaded(self) -> bool:
+        return self.loaded is not None
+    
+    @property
+    def model(self) -> Optional[ChurnPredictionModel]:
+        loaded = self.loaded
+        return loaded.model if loaded is not None else None
+    
+    @property
+    def scorer(self) -> Optional[FastPathScorer]:
+        loaded = self.loaded
+        return loaded.scorer if loaded is not None else None
+    
+    @property
+    def version(self) -> Optional[str]:
+        """Identifies the loaded artifact for caches built on the model's output"""
+        loaded = self.loaded
+        return loaded.version if loaded is not None else None
+    
+    @property
+    def model_file(self) -> Optional[Path]:
+        loaded = self.loaded
+        return loaded.model_file if loaded is not None else self.pinned_file
+    
+    def resolve_artifact(self) -> Optional[Path]:
+        """The artifact this server should be serving right now"""
+        return self.pinned_file or resolve_model_file("churn_prediction")
+    
+    def load_artifact(self, model_file: Path) -> LoadedModel:
+        """Load and warm an artifact without touching the served model
+        
+        With ``settings.model_mmap`` the artifact's arrays and its saved
+        compiled trees are memory-mapped, so worker processes share them.
+        """
+        mmap_mode = "r" if settings.model_mmap else None
+        model = ChurnPredictionModel(model_path=str(model_file.parent))
+        model.load_model(str(model_file), mmap_mode=mmap_mode)
+        
+        compiled = self.scorer_backend == "compiled"
+        ensemble = CompiledTreeEnsemble.load_for(model_file, mmap_mode=mmap_mode) if compiled else None
+        
+        loaded = LoadedModel(
+            model=model,
+            scorer=FastPathScorer(model, compiled=compiled, ensemble=ensemble),
+            model_file=model_file,
+            version=artifact_version(model_file)
+        )
+        self.warm(loaded)
+        return loaded
+    
+    def warm(self, loaded: LoadedModel, rows: Optional[int] = None) -> None:
+        """Run dummy predictions so the first real request pays no first-call costs"""
+        rows = rows if rows is not None else settings.model_warmup_rows
+        features = {name: 0.0 for name in loaded.scorer.feature_columns}
+        
+        for size in (1, rows):
+            X = loaded.scorer.vectorize([features] * size)
+            loaded.scorer.predict_proba(X)
+            if not self.fast_path:
+                frame = pd.DataFrame(X, columns=loaded.scorer.feature_columns)
+                loaded.model.predict_churn_probability(frame.assign(customer_id="WARMUP"))
+    
+    def load(self) -> bool:
+        """Load the churn artifact once; later calls are no-ops"""
+        with self._lock:
+            if self.loaded is not None:
+                return True
+            
+            model_file = self.resolve_artifact()
+            if model_file is None:
+                logger.warning("Churn model artifact not found; churn endpoints will return 503")
+                return False
+            
+            self.loaded = self.load_artifact(Path(model_file))
+            
+            logger.info(f"Churn model loaded from {model_file} ({self.loaded.scorer.backend} scorer)")
+            return True
+    
+    def reload(self) -> bool:
+        """Load the current artifact in the background and swap it in if it changed
+        
+        Requests keep using the old model until the new one is loaded and
+        warm. Returns whether a new model was swapped in.
+        """
+        with self._reload_lock:
+            model_file = self.resolve_artifact()
+            if model_file is None:
+                logger.warning("No churn model artifact to reload")
+                return False
+            
+            current = self.loaded
+            if current is not None and artifact_version(model_file) == current.version:
+                return False
+            
+            loaded = self.load_artifact(Path(model_file))
+            with self._lock:
+                self.loaded = loaded
+            
+            logger.info(f"Churn model swapped to {loaded.version} ({loaded.scorer.backend} scorer)")
+            return True
+    
+    def current(self) -> LoadedModel:
+        """The served model bundle, loading it on first use"""
+        loaded = self.loaded
+        if loaded is None and self.load():
+            loaded = self.loaded
+        if loaded is None:
+            raise ModelNotLoadedError("Churn model not available")
+        return loaded
+    
+    def ensure_loaded(self) -> ChurnPredictionModel:
+        """Return the warm model, loading it on first use"""
+        return self.current().model
+    
+    def predict_frame(self, feature_frame: pd.DataFrame) -> pd.DataFrame:
+        """Score a customer feature frame with a single ``predict_proba`` call"""
+        model = self.ensure_loaded()
+        return model.predict_churn_probability(feature_frame)
+    
+    def score(self, customers: List[CustomerInput]) -> List[ChurnPrediction]:
+        """Score customers in one vectorized model call"""
+        if self.fast_path:
+            return self.score_fast(customers)
+        
+        results = self.predict_frame(self.build_feature_frame(customers))
+        return self.to_predictions(results)
+    
+    def score_fast(self, customers: List[CustomerInput]) -> List[ChurnPrediction]:
+        """Score customers from a NumPy matrix, bypassing ``prepare_features``"""
+        loaded = self.current()
+        model, scorer = loaded.model, loaded.scorer
+        
+        if all(customer.features for customer in customers):
+            customer_ids = [customer.customer_id for customer in customers]
+            X = scorer.vectorize([customer.features for customer in customers])
+        else:
+            # Stored features are resolved in bulk as a frame
+            frame = self.build_feature_frame(customers)
+            customer_ids = frame["customer_id"].tolist()
+            X = model.feature_matrix(frame).to_numpy()
+        
+        probabilities = np.asarray(scorer.predict_proba(X), dtype=float)
+        return self.build_predictions(customer_ids, probabilities, model.categorize_risk(probabilities))
+    
+    @classmethod
+    def to_predictions(cls, results: pd.DataFrame) -> List[ChurnPrediction]:
+        """Convert ``predict_churn_probability`` output into response models"""
+        return cls.build_predictions(
+            results["customer_id"].tolist(),
+            results["churn_probability"].to_numpy(dtype=float),
+            results["risk_level"].tolist()
+        )
+    
+    @staticmethod
+    def build_predictions(customer_ids: List[str], probabilities: np.ndarray,
+                          risk_levels: List[str]) -> List[ChurnPrediction]:
+        """Response models from per-customer probabilities and risk levels"""
+        confidences = np.maximum(probabilities, 1 - probabilities)
+        predictions = ChurnPredictionModel.classify(probabilities)
+        
+        return [
+            ChurnPrediction(
+                customer_id=str(customer_id),
+                churn_probability=float(probability),
+                churn_prediction=bool(prediction),
+                risk_level=risk_level,
+                confidence=float(confidence)
+            )
+            for customer_id, probability, prediction, risk_level, confidence in zip(
+                customer_ids, probabilities, predictions, risk_levels, confidences
+            )
+        ]
+    
+    @staticmethod
+    def summarize(predictions: List[ChurnPrediction]) -> Dict:
+        """Batch summary statistics for ``ChurnBatchResponse``"""
+        probabilities = [p.churn_probability for p in predictions]
+        return {
+            "total_customers": len(predictions),
+            "predicted_churners": sum(1 for p in predictions if p.churn_prediction),
+            "avg_churn_probability": sum(probabilities) / len(probabilities) if probabilities else 0.0,
+            "high_risk_customers": sum(1 for p in predictions if p.risk_level in ("High", "Critical"))
+        }
+
+
+class SegmentationServer(FeatureResolver):
+    """Holds a warm CustomerSegmentationModel and assigns segments from its centroid table
+    
+    Features are resolved as for churn. A batch is assigned with one
+    vectorized distance computation. ``partial_fit`` folds new customers
+    into the served model's centroids in memory; registering a retrained
+    model is what makes an update permanent.
+    """
+    
+    def __init__(self, model_file: Optional[Path] = None,
+                 feature_store: Optional[CustomerFeatureStore] = None,
+                 feature_lookup: Optional[Callable[[List[str]], pd.DataFrame]] = None):
+        """Initialize the server; the artifact is loaded by ``load``"""
+        self.pinned_file = Path(model_file) if model_file is not None else None
+        self.feature_store = feature_store
+        self.feature_lookup = feature_lookup
+        self.model: Optional[CustomerSegmentationModel] = None
+        self.version: Optional[str] = None
+        self.characteristics: List[Dict] = []
+        self._lock = threading.Lock()
+    
+    @property
+    def is_loaded(self) -> bool:
+        return self.model is not None
+    
+    def resolve_artifact(self) -> Optional[Path]:
+        return self.pinned_file or resolve_model_file("customer_segmentation")
+    
+    def install(self, model: CustomerSegmentationModel, version: str) -> None:
+        """Serve ``model`` with its precomputed segment characteristics"""
+        characteristics = model.segment_characteristics()
+        with self._lock:
+            self.model, self.version, self.characteristics = model, version, characteristics
+    
+    def load(self, force: bool = False) -> bool:
+        """Load the segmentation artifact; later calls are no-ops unless it changed and ``force`` is set"""
+        model_file = self.resolve_artifact()
+        if model_file is None:
+            logger.warning("Segmentation model artifact not found; segment endpoints will return 503")
+            return False
+        
+        version = artifact_version(model_file)
+        if self.model is not None:
+            if not force:
+                return True
+            if version == self.version:
+                return False
+        
+        model = CustomerSegmentationModel(model_path=str(Path(model_file).parent))
+        model.load_model(str(model_file), mmap_mode="r" if settings.model_mmap else None)
+        self.install(model, version)
+        
+        logger.info(f"Segmentation model loaded from {model_file} ({len(self.characteristics)} segments)")
+        return True
+    
+    def reload(self) -> bool:
+        """Swap in the current artifact if it changed; returns whether it did"""
+        return self.load(force=True)
+    
+    def current(self) -> CustomerSegmentationModel:
+        model = self.model
+        if model is None and self.load():
+            model = self.model
+        if model is None:
+            raise ModelNotLoadedError("Segmentation model not available")
+        return model
+    
+    def segment(self, customers: List[CustomerInput]) -> List[SegmentPrediction]:
+        """Assign every customer to its nearest segment in one distance computation"""
+        model = self.current()
+        frame = self.build_feature_frame(customers)
+        labels, confidences = model.assign(model.feature_matrix(frame).to_numpy())
+        return self.build_predictions(frame["customer_id"].tolist(), labels, confidences, model)
+    
+    def partial_fit(self, customers: List[CustomerInput]) -> List[SegmentPrediction]:
+        """Update this process's segment model with new customers and return their assignments
+        
+        The update lives in memory in this process only; worker processes and
+        the saved artifact keep the old centroids.
+        """
+        model = self.current()
+        frame = self.build_feature_frame(customers)
+        with self._lock:
+            model.partial_fit(frame)
+            self.characteristics = model.segment_characteristics()
+        
+        labels, confidences = model.assign(model.feature_matrix(frame).to_numpy())
+        return self.build_predictions(frame["customer_id"].tolist(), labels, confidences, model)
+    
+    def build_predictions(self, customer_ids: List[str], labels: np.ndarray, confidences: np.ndarray,
+                          model: CustomerSegmentationModel) -> List[SegmentPrediction]:
+        """Response models from segment ids and confidences"""
+        characteristics = self.characteristics
+        return [
+            SegmentPrediction(
+                customer_id=str(customer_id),
+                segment_id=segment_id,
+                segment_name=model.segment_names[segment_id],
+                confidence=round(confidence, 6),
+                characteristics=characteristics[segment_id]
+            )
+            for customer_id, segment_id, confidence in zip(customer_ids, labels.tolist(), confidences.tolist())
+        ]
+    
+    @staticmethod
+    def summarize(predictions: List[SegmentPrediction]) -> Dict:
+        """Segment distribution for ``SegmentBatchResponse``"""
+        counts: Dict[str, int] = {}
+        for prediction in predictions:
+            counts[prediction.segment_name] = counts.get(prediction.segment_name, 0) + 1
+        return {
+            "total_customers": len(predictions),
+            "segment_counts": counts,
+            "avg_confidence": sum(p.confidence for p in predictions) / len(predictions) if predictions else 0.0
+        }
+
+
+def load_feature_store() -> Optional[CustomerFeatureStore]:
+    """Load the persisted customer feature store if one has been built"""
+    store_path = settings.processed_data_path / "customer_feature_store.joblib"
+    if not store_path.exists():
+        return None
+    
+    store = CustomerFeatureStore.load(store_path)
+    logger.info(f"Customer feature store loaded with {len(store)} customers")
+    return store
+
+
+# Process-wide server; worker processes get their own copy via the executor initializer
+churn_server = ChurnModelServer()
+
+# Like churn_server, worker processes load their own copy via the executor initializer
+segment_server = SegmentationServer()
+
+
+def score_churn(customers: List[CustomerInput]) -> List[ChurnPrediction]:
+    """Score customers with this process's churn server (picklable for worker pools)"""
+    return churn_server.score(customers)
+
+
+def segment_customers(customers: List[CustomerInput]) -> List[SegmentPrediction]:
+    """Segment customers with this process's segmentation server (picklable for worker pools)"""
+    return segment_server.segment(customers)
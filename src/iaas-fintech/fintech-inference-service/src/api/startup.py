@@ -0,0 +1,81 @@
+"""
+Tracked startup phases reported by the readiness probe
+"""
+
+import asyncio
+import copy
+import logging
+import time
+from typing import Any, Callable, Dict
+
+from fastapi.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+
+class StartupPhases:
+    """Runs the startup phases and records how each one went
+    
+    Each phase is ``pending``, ``running``, ``done``, ``failed`` or
+    ``skipped``. A phase fails when it raises or returns False. The service
+    is ready once every required phase is done, so ``/ready`` stays 503
+    while data and models are still loading or if they could not be loaded.
+    """
+    
+    def __init__(self, phases: Dict[str, bool]):
+        """Initialize with phase names mapped to whether readiness requires them"""
+        self.phases = {
+            name: {"status": "pending", "required": required, "seconds": None, "error": None}
+            for name, required in phases.items()
+        }
+    
+    async def run(self, name: str, fn: Callable, *args) -> Any:
+        """Run one phase; blocking functions run off the event loop, coroutine functions are awaited"""
+        phase = self.phases[name]
+        phase["status"] = "running"
+        start = time.perf_counter()
+        
+        try:
+            if asyncio.iscoroutinefunction(fn):
+                result = await fn(*args)
+            else:
+                result = await run_in_threadpool(fn, *args)
+        except Exception as e:
+            logger.error(f"Startup phase {name} failed: {e}")
+            phase.update(status="failed", error=str(e), seconds=time.perf_counter() - start)
+            return None
+        
+        phase.update(status="failed" if result is False else "done", seconds=time.perf_counter() - start)
+        logger.info(f"Startup phase {name} {phase['status']} in {phase['seconds']:.2f}s")
+        return result
+    
+    def skip(self, name: str) -> None:
+        self.phases[name]["status"] = "skipped"
+    
+    @property
+    def finished(self) -> bool:
+        return all(phase["status"] not in ("pending", "running") for phase in self.phases.values())
+    
+    @property
+    def ready(self) -> bool:
+        return all(phase["status"] == "done" for phase in self.phases.values() if phase["required"])
+    
+    def snapshot(self) -> Dict[str, Dict]:
+        """A copy of every phase's state for status endpoints"""
+        return copy.deepcopy(self.phases)
+
+
+def create_startup_phases() -> StartupPhases:
+    """The API's startup phases: data is optional since scoring also works on request features"""
+    return StartupPhases({
+        "directories": True,
+        "data": False,
+        "fraud_state": False,
+        "models": True,
+        "analytics_cache": False,
+        "batch_jobs": False,
+        "score_table": False
+    })
+
+
+startup_phases = create_startup_phases()
@@ -10,6 +10,12 @@ import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import requests
 import json
+import sys
+from pathlib import Path
+
+# Add src to path for the shared table storage
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from data.storage import TableStorage
 
 # Import navigation module
 from navigation import (
@@ -44,7 +50,7 @@ def load_sample_data():
     """Load or generate sample data for demo purposes"""
     try:
         # Try to load real data
-        data = pd.read_csv("../data/processed/customer_features.csv")
+        data = TableStorage("../data").read("customer_features")
         return data
     except FileNotFoundError:
         # Generate sample data for demo
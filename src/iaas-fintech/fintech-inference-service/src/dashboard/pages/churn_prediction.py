@@ -11,6 +11,17 @@ from plotly.subplots import make_subplots
 import requests
 from datetime import datetime, timedelta
 import json
+import sys
+from pathlib import Path
+
+# Add src to path for the shared table storage
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from data.storage import TableStorage
+from models.registry import ModelRegistry
+from models.shap_index import ShapIndex, shap_index_path
+
+# Registries that training publishes the churn model to, relative to the service root
+CHURN_MODEL_REGISTRIES = [ModelRegistry("data/models"), ModelRegistry("../data/models")]
 
 # Page configuration
 st.set_page_config(
@@ -26,12 +37,28 @@ def get_api_base_url():
 def load_customer_data():
     """Load customer data for examples"""
     try:
-        customer_features = pd.read_csv("data/processed/customer_features.csv")
+        customer_features = TableStorage("data").read("customer_features")
         return customer_features
     except Exception as e:
         st.error(f"Error loading customer data: {e}")
         return None
 
+@st.cache_resource
+def _load_shap_index(model_file: str, index_mtime: int):
+    """Load the SHAP index once per index file version"""
+    return ShapIndex.load_for(model_file)
+
+def load_shap_index():
+    """Precomputed SHAP drivers for the active churn model, or None if not built yet"""
+    for registry in CHURN_MODEL_REGISTRIES:
+        model_file = registry.artifact_path("churn_prediction")
+        if model_file is None:
+            continue
+        index_file = shap_index_path(model_file)
+        if index_file.exists():
+            return _load_shap_index(str(model_file), index_file.stat().st_mtime_ns)
+    return None
+
 def predict_churn_api(customer_data):
     """Call the churn prediction API"""
     try:
@@ -272,6 +299,28 @@ def main():
     with tab2:
         st.header("📊 Key Features for Churn Prediction")
         
+        shap_index = load_shap_index()
+        
+        if shap_index is not None:
+            # Global drivers precomputed over every customer by the SHAP index
+            st.subheader("🎯 What Drives Churn Across All Customers")
+            drivers_df = pd.DataFrame(shap_index.global_drivers(15))
+            
+            fig = px.bar(
+                drivers_df,
+                x='mean_abs_contribution',
+                y='feature_name',
+                color='increases_risk_share',
+                color_continuous_scale='RdYlGn_r',
+                orientation='h',
+                title=f"Mean |SHAP| over {len(shap_index):,} customers "
+                      f"(index built {shap_index.built_at:%Y-%m-%d %H:%M})",
+                labels={'mean_abs_contribution': 'Mean |SHAP value|', 'feature_name': 'Features',
+                        'increases_risk_share': 'Share pushed towards churn'}
+            )
+            fig.update_layout(height=500, yaxis={'categoryorder':'total ascending'})
+            st.plotly_chart(fig, use_container_width=True)
+        
         # Feature importance visualization
         st.subheader("🎯 Feature Importance Ranking")
         
@@ -544,6 +593,16 @@ def main():
                 
                 selected_customer = sample_customers.iloc[selected_idx]
                 
+                # Why this customer is at risk, straight from the precomputed SHAP index
+                shap_index = load_shap_index()
+                indexed = shap_index.lookup(selected_customer['customer_id'], 5) if shap_index is not None else None
+                if indexed is not None:
+                    with st.expander("🔍 Why is this customer at risk?", expanded=True):
+                        st.metric("Model Churn Probability", f"{indexed['churn_probability']:.1%}")
+                        drivers_df = pd.DataFrame(indexed['drivers'])
+                        drivers_df['direction'] = np.where(drivers_df['contribution'] > 0, 'raises risk', 'lowers risk')
+                        st.dataframe(drivers_df, use_container_width=True)
+                
                 # Display and allow editing of key features
                 st.write("**Editable Features:**")
                 days_since_last = st.slider(
@@ -588,7 +647,7 @@ def main():
                     'unique_merchants': unique_merchants,
                     'avg_transaction_amount': avg_amount
                 }
-                
+            
             else:
                 # Manual input
                 st.write("**Enter Customer Features:**")
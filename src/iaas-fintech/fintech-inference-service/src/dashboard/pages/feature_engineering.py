@@ -8,6 +8,12 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
+import sys
+from pathlib import Path
+
+# Add src to path for the shared table storage
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from data.storage import TableStorage
 
 # Page configuration
 st.set_page_config(
@@ -19,8 +25,9 @@ st.set_page_config(
 def load_feature_data():
     """Load feature data for examples"""
     try:
-        customer_features = pd.read_csv("data/processed/customer_features.csv")
-        transaction_features = pd.read_csv("data/processed/transaction_features.csv")
+        storage = TableStorage("data")
+        customer_features = storage.read("customer_features")
+        transaction_features = storage.read("transaction_features")
         return customer_features, transaction_features
     except Exception as e:
         st.error(f"Error loading feature data: {e}")
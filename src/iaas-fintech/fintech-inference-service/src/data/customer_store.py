@@ -0,0 +1,125 @@
+"""
+Indexed in-memory store for customer and transaction lookups
+"""
+
+import itertools
+import threading
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from data.rollup import TransactionRollup
+from data.storage import TableStorage
+
+
+# Versions for stores built from in-memory frames
+_frame_versions = itertools.count(1)
+
+
+def _row_index(df: pd.DataFrame, key: str = "customer_id") -> Dict[str, int]:
+    """Map each key to the position of its first row"""
+    positions = {}
+    for position, value in enumerate(df[key].tolist() if key in df.columns else []):
+        positions.setdefault(value, position)
+    return positions
+
+
+class CustomerDataStore:
+    """Customers, features and transactions with hash indexes built at load time
+    
+    Transactions are sorted by (customer_id, transaction_date) so each
+    customer's history is one contiguous slice: a point lookup is a dict hit
+    plus a slice, and a date range is two binary searches within that slice.
+    """
+    
+    def __init__(self, customers: pd.DataFrame, transactions: pd.DataFrame,
+                 customer_features: pd.DataFrame, version: Optional[Hashable] = None):
+        """Build the indexes over already-loaded frames
+        
+        ``version`` identifies the data for caches built on top of the store;
+        a fresh one is assigned when not given.
+        """
+        self.version = version if version is not None else f"frames-{next(_frame_versions)}"
+        self.customers = customers.reset_index(drop=True)
+        self.customer_features = customer_features.reset_index(drop=True)
+        self._customer_rows = _row_index(self.customers)
+        self._feature_rows = _row_index(self.customer_features)
+        
+        self._transaction_slices: Dict[str, Tuple[int, int]] = {}
+        self._transaction_dates = np.array([], dtype="datetime64[ns]")
+        
+        if not transactions.empty:
+            transactions = transactions.sort_values(
+                ["customer_id", "transaction_date"], kind="mergesort"
+            ).reset_index(drop=True)
+            
+            customer_ids = transactions["customer_id"].to_numpy()
+            boundaries = np.flatnonzero(customer_ids[1:] != customer_ids[:-1]) + 1
+            starts = np.concatenate(([0], boundaries))
+            stops = np.concatenate((boundaries, [len(customer_ids)]))
+            
+            self._transaction_slices = dict(zip(customer_ids[starts].tolist(), zip(starts.tolist(), stops.tolist())))
+            self._transaction_dates = transactions["transaction_date"].to_numpy()
+        
+        self.transactions = transactions
+        self._rollup: Optional[TransactionRollup] = None
+        self._rollup_lock = threading.Lock()
+    
+    @classmethod
+    def from_storage(cls, storage: Optional[TableStorage] = None) -> "CustomerDataStore":
+        """Load customers, transactions and features from table storage and index them"""
+        storage = storage or TableStorage()
+        tables = ["customers", "transactions", "customer_features"]
+        
+        # Reloading unchanged files keeps the version, and with it any cached aggregates
+        version = storage.version(tables)
+        customers, transactions, customer_features = (storage.read(table) for table in tables)
+        
+        return cls(customers, transactions, customer_features, version=version)
+    
+    @classmethod
+    def empty(cls) -> "CustomerDataStore":
+        """A store with no data, used when loading fails"""
+        return cls(pd.DataFrame(), pd.DataFrame(), pd.DataFrame())
+    
+    @property
+    def rollup(self) -> TransactionRollup:
+        """Daily rollup cube over the transactions, built on first use"""
+        with self._rollup_lock:
+            if self._rollup is None:
+                self._rollup = TransactionRollup(self.transactions)
+            return self._rollup
+    
+    def get_customer(self, customer_id: str) -> Optional[pd.Series]:
+        """Customer profile row, or None if unknown"""
+        position = self._customer_rows.get(customer_id)
+        return None if position is None else self.customers.iloc[position]
+    
+    def get_features(self, customer_id: str) -> Optional[pd.Series]:
+        """Engineered feature row, or None if unknown"""
+        position = self._feature_rows.get(customer_id)
+        return None if position is None else self.customer_features.iloc[position]
+    
+    def get_features_many(self, customer_ids: Iterable[str]) -> pd.DataFrame:
+        """Engineered feature rows for the known customers among ``customer_ids``, in order"""
+        positions = [self._feature_rows[customer_id] for customer_id in customer_ids if customer_id in self._feature_rows]
+        return self.customer_features.iloc[positions]
+    
+    def segment_customer_ids(self, segment: str) -> List[str]:
+        """Ids of the customers assigned to ``segment``"""
+        if "segment" not in self.customers.columns:
+            return []
+        return self.customers.loc[self.customers["segment"] == segment, "customer_id"].tolist()
+    
+    def get_transactions(self, customer_id: str, date_from: Optional[pd.Timestamp] = None,
+                         date_to: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        """A customer's transactions in date order, optionally within [date_from, date_to]"""
+        start, stop = self._transaction_slices.get(customer_id, (0, 0))
+        
+        if start < stop and date_from is not None:
+            start += int(np.searchsorted(self._transaction_dates[start:stop], np.datetime64(date_from), side="left"))
+        if start < stop and date_to is not None:
+            stop = start + int(np.searchsorted(self._transaction_dates[start:stop], np.datetime64(date_to), side="right"))
+        
+        return self.transactions.iloc[start:max(start, stop)]
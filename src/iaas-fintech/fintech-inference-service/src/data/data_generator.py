@@ -2,21 +2,131 @@
 Synthetic transaction data generator for the Fintech Inference Service
 """
 
+import argparse
 import json
 import random
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
 import os
+import sys
 
 import pandas as pd
 import numpy as np
 
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data.storage import TableStorage, TableWriter, decode_categoricals, partition_path, write_frame
+
+
+# Customer segments with different spending behaviors
+CUSTOMER_SEGMENTS = {
+    "high_spender": {
+        "avg_monthly_spend": 5000,
+        "transaction_frequency": 25,
+        "preferred_categories": ["retail", "restaurant", "entertainment"],
+        "churn_probability": 0.1
+    },
+    "moderate_spender": {
+        "avg_monthly_spend": 2500,
+        "transaction_frequency": 15,
+        "preferred_categories": ["grocery", "gas", "restaurant"],
+        "churn_probability": 0.2
+    },
+    "low_spender": {
+        "avg_monthly_spend": 1000,
+        "transaction_frequency": 8,
+        "preferred_categories": ["grocery", "utilities", "transport"],
+        "churn_probability": 0.3
+    },
+    "risky": {
+        "avg_monthly_spend": 3000,
+        "transaction_frequency": 30,
+        "preferred_categories": ["entertainment", "retail", "restaurant"],
+        "churn_probability": 0.5
+    }
+}
+
+# Expense amount ranges by category (income is drawn relative to the customer's spend)
+EXPENSE_RANGES = {
+    "utilities": (50, 300),
+    "grocery": (20, 200),
+    "restaurant": (10, 100),
+    "gas": (30, 80),
+    "retail": (25, 500),
+    "entertainment": (10, 50),
+    "healthcare": (20, 200),
+    "transport": (5, 50),
+    "banking": (5, 35),  # Fees
+}
+DEFAULT_EXPENSE_RANGE = (10, 100)
+
+REMARKS_TEMPLATES = {
+    "grocery": ["Weekly groceries", "Grocery shopping", "Food supplies"],
+    "restaurant": ["Lunch", "Dinner", "Coffee", "Quick bite"],
+    "gas": ["Fuel refill", "Gas station", "Petrol"],
+    "retail": ["Online purchase", "Shopping", "Store purchase"],
+    "entertainment": ["Streaming service", "Movie tickets", "Gaming"],
+    "healthcare": ["Pharmacy", "Medical supplies", "Health checkup"],
+    "utilities": ["Monthly bill", "Utility payment"],
+    "transport": ["Ride share", "Public transport", "Taxi"],
+    "banking": ["Service fee", "Transaction fee"],
+    "income": ["Salary", "Payment received", "Income"]
+}
+
+# Daily activity: chance of any transactions on a day, then how many
+ACTIVE_DAY_PROBABILITY = 0.3
+DAILY_TRANSACTION_COUNTS = [1, 2, 3, 4, 5]
+DAILY_TRANSACTION_WEIGHTS = [60, 25, 10, 4, 1]
+
+FRAUD_RATE = 0.02
+FRAUD_PATTERNS = ["unusual_amount", "unusual_location", "unusual_frequency"]
+FRAUD_REMARKS = [" [SUSPICIOUS_AMOUNT]", " [SUSPICIOUS_LOCATION]", " [SUSPICIOUS_FREQUENCY]"]
+FRAUD_LOCATIONS = ["Las Vegas", "Miami", "International"]
+
+DAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+
+def draw_fraud_patterns(num_transactions: int, rng: np.random.Generator) -> Tuple[np.ndarray, ...]:
+    """Pick exactly ``int(num_transactions * FRAUD_RATE)`` rows and a fraud pattern for each
+    
+    Returns (rows, pattern indices into FRAUD_PATTERNS, replacement amounts,
+    location indices into FRAUD_LOCATIONS), all aligned with ``rows``. The
+    count depends only on ``num_transactions``, so drawing per shard keeps
+    every shard at the exact rate.
+    """
+    rows = rng.choice(num_transactions, size=int(num_transactions * FRAUD_RATE), replace=False)
+    patterns = rng.integers(len(FRAUD_PATTERNS), size=len(rows))
+    amounts = -rng.uniform(1000, 5000, size=len(rows))
+    locations = rng.integers(len(FRAUD_LOCATIONS), size=len(rows))
+    return rows, patterns, amounts, locations
+
+
+def _write_shard(random_state: int, shard_index: int, first_customer: int, num_customers: int,
+                 start_date: pd.Timestamp, num_days: int, transaction_path: str, customer_path: str) -> Dict:
+    """Process pool task: generate one shard and write its partition files"""
+    generator = TransactionDataGenerator(random_state=random_state)
+    customers, transactions = generator._generate_block(shard_index, first_customer, num_customers, start_date, num_days)
+    
+    write_frame(transactions, transaction_path, "transactions")
+    write_frame(customers, customer_path, "customers")
+    
+    return {
+        "num_customers": len(customers),
+        "num_transactions": len(transactions),
+        "num_fraud": int(transactions["is_fraud"].sum()),
+        "first_transaction": transactions["transaction_date"].min(),
+        "last_transaction": transactions["transaction_date"].max()
+    }
+
 
 class TransactionDataGenerator:
     """Generate realistic synthetic transaction data for testing and development"""
     
     def __init__(self, random_state: int = 42):
         """Initialize the data generator with a random state for reproducibility"""
+        self.random_state = random_state
         random.seed(random_state)
         np.random.seed(random_state)
         
@@ -40,36 +150,8 @@ class TransactionDataGenerator:
     
     def generate_customer_profile(self, customer_id: str) -> Dict:
         """Generate a customer profile with spending behavior characteristics"""
-        # Define customer segments with different behaviors
-        segments = {
-            "high_spender": {
-                "avg_monthly_spend": 5000,
-                "transaction_frequency": 25,
-                "preferred_categories": ["retail", "restaurant", "entertainment"],
-                "churn_probability": 0.1
-            },
-            "moderate_spender": {
-                "avg_monthly_spend": 2500,
-                "transaction_frequency": 15,
-                "preferred_categories": ["grocery", "gas", "restaurant"],
-                "churn_probability": 0.2
-            },
-            "low_spender": {
-                "avg_monthly_spend": 1000,
-                "transaction_frequency": 8,
-                "preferred_categories": ["grocery", "utilities", "transport"],
-                "churn_probability": 0.3
-            },
-            "risky": {
-                "avg_monthly_spend": 3000,
-                "transaction_frequency": 30,
-                "preferred_categories": ["entertainment", "retail", "restaurant"],
-                "churn_probability": 0.5
-            }
-        }
-        
-        segment = random.choice(list(segments.keys()))
-        profile = segments[segment].copy()
+        segment = random.choice(list(CUSTOMER_SEGMENTS.keys()))
+        profile = CUSTOMER_SEGMENTS[segment].copy()
         profile["customer_id"] = customer_id
         profile["segment"] = segment
         profile["signup_date"] = datetime.now() - timedelta(days=random.randint(30, 730))
@@ -93,26 +175,8 @@ class TransactionDataGenerator:
         
         if category == "income":
             amount = random.uniform(base_amount * 3, base_amount * 8)  # Positive for income
-        elif category == "utilities":
-            amount = -random.uniform(50, 300)  # Negative for expenses
-        elif category == "grocery":
-            amount = -random.uniform(20, 200)
-        elif category == "restaurant":
-            amount = -random.uniform(10, 100)
-        elif category == "gas":
-            amount = -random.uniform(30, 80)
-        elif category == "retail":
-            amount = -random.uniform(25, 500)
-        elif category == "entertainment":
-            amount = -random.uniform(10, 50)
-        elif category == "healthcare":
-            amount = -random.uniform(20, 200)
-        elif category == "transport":
-            amount = -random.uniform(5, 50)
-        elif category == "banking":
-            amount = -random.uniform(5, 35)  # Fees
         else:
-            amount = -random.uniform(10, 100)
+            amount = -random.uniform(*EXPENSE_RANGES.get(category, DEFAULT_EXPENSE_RANGE))
         
         # Add some randomness
         amount *= random.uniform(0.7, 1.3)
@@ -134,62 +198,308 @@ class TransactionDataGenerator:
     
     def _generate_remarks(self, category: str, merchant: str) -> str:
         """Generate realistic transaction remarks"""
-        remarks_templates = {
-            "grocery": ["Weekly groceries", "Grocery shopping", "Food supplies"],
-            "restaurant": ["Lunch", "Dinner", "Coffee", "Quick bite"],
-            "gas": ["Fuel refill", "Gas station", "Petrol"],
-            "retail": ["Online purchase", "Shopping", "Store purchase"],
-            "entertainment": ["Streaming service", "Movie tickets", "Gaming"],
-            "healthcare": ["Pharmacy", "Medical supplies", "Health checkup"],
-            "utilities": ["Monthly bill", "Utility payment"],
-            "transport": ["Ride share", "Public transport", "Taxi"],
-            "banking": ["Service fee", "Transaction fee"],
-            "income": ["Salary", "Payment received", "Income"]
-        }
-        
-        templates = remarks_templates.get(category, ["Purchase"])
+        templates = REMARKS_TEMPLATES.get(category, ["Purchase"])
         return f"{random.choice(templates)} - {merchant}"
     
-    def introduce_fraud_patterns(self, transactions: List[Dict]) -> List[Dict]:
-        """Introduce fraudulent transaction patterns"""
-        fraud_rate = 0.02  # 2% fraud rate
-        num_fraud = int(len(transactions) * fraud_rate)
+    def introduce_fraud_patterns(self, transactions: List[Dict],
+                                 rng: Optional[np.random.Generator] = None) -> List[Dict]:
+        """Introduce fraudulent transaction patterns
         
-        fraud_indices = random.sample(range(len(transactions)), num_fraud)
+        Exactly FRAUD_RATE of ``transactions`` (rounded down) are marked, so the
+        rate holds for each shard when applied shard by shard. ``rng`` defaults
+        to one seeded from the ``random`` module state.
+        """
+        rng = rng or np.random.default_rng(random.getrandbits(64))
+        rows, patterns, amounts, locations = draw_fraud_patterns(len(transactions), rng)
         
-        for idx in fraud_indices:
+        for idx, pattern, amount, location in zip(rows, patterns, amounts, locations):
             transaction = transactions[idx]
-            
-            # Fraud patterns
-            fraud_type = random.choice(["unusual_amount", "unusual_location", "unusual_frequency"])
+            fraud_type = FRAUD_PATTERNS[pattern]
             
             if fraud_type == "unusual_amount":
                 # Unusually high amount
-                transaction["amount"] = -random.uniform(1000, 5000)
-                transaction["remarks"] += " [SUSPICIOUS_AMOUNT]"
+                transaction["amount"] = float(amount)
             
             elif fraud_type == "unusual_location":
                 # Transaction in unusual location
-                unusual_locations = ["Las Vegas", "Miami", "International"]
-                transaction["location"] = random.choice(unusual_locations)
-                transaction["remarks"] += " [SUSPICIOUS_LOCATION]"
-            
-            elif fraud_type == "unusual_frequency":
-                # Multiple transactions in short time
-                transaction["remarks"] += " [SUSPICIOUS_FREQUENCY]"
+                transaction["location"] = FRAUD_LOCATIONS[location]
             
+            # "unusual_frequency": multiple transactions in short time, flagged in remarks only
+            transaction["remarks"] += FRAUD_REMARKS[pattern]
             transaction["is_fraud"] = True
         
         return transactions
     
+    def _generate_block(self, block_index: int, first_customer: int, num_customers: int,
+                        start_date: pd.Timestamp, num_days: int) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Draw customers and their transactions for one block as NumPy arrays
+        
+        Each block has its own generator seeded from (random_state, block_index),
+        so a block's output does not depend on the blocks generated before it.
+        """
+        rng = np.random.default_rng([self.random_state, block_index])
+        
+        # Lookup tables over categories, merchants and remarks
+        categories = list(self.merchants.keys())
+        segment_names = list(CUSTOMER_SEGMENTS.keys())
+        merchant_counts = np.array([len(self.merchants[c]) for c in categories])
+        merchant_offsets = np.concatenate(([0], np.cumsum(merchant_counts)[:-1]))
+        template_counts = np.array([len(REMARKS_TEMPLATES.get(c, ["Purchase"])) for c in categories])
+        remark_offsets = np.concatenate(([0], np.cumsum(template_counts * merchant_counts)[:-1]))
+        remark_strings = np.array([
+            f"{template} - {merchant}"
+            for category in categories
+            for template in REMARKS_TEMPLATES.get(category, ["Purchase"])
+            for merchant in self.merchants[category]
+        ], dtype=object)
+        preferred = np.array([
+            [categories.index(c) for c in CUSTOMER_SEGMENTS[segment]["preferred_categories"]]
+            for segment in segment_names
+        ])
+        expense_low, expense_high = np.array(
+            [EXPENSE_RANGES.get(c, DEFAULT_EXPENSE_RANGE) for c in categories], dtype=float
+        ).T
+        
+        # Customer profiles
+        segment_index = rng.integers(len(segment_names), size=num_customers)
+        customer_numbers = np.arange(first_customer + 1, first_customer + num_customers + 1)
+        customer_ids = np.array([f"CUST_{number:06d}" for number in customer_numbers], dtype=object)
+        spend = np.array([CUSTOMER_SEGMENTS[s]["avg_monthly_spend"] for s in segment_names], dtype=float)[segment_index]
+        frequency = np.array([CUSTOMER_SEGMENTS[s]["transaction_frequency"] for s in segment_names])[segment_index]
+        signup_days = rng.integers(30, 731, size=num_customers)
+        
+        customers = pd.DataFrame({
+            "avg_monthly_spend": spend.astype(int),
+            "transaction_frequency": frequency,
+            "preferred_categories": [list(CUSTOMER_SEGMENTS[segment_names[i]]["preferred_categories"]) for i in segment_index],
+            "churn_probability": np.array([CUSTOMER_SEGMENTS[s]["churn_probability"] for s in segment_names])[segment_index],
+            "customer_id": customer_ids,
+            "segment": np.array(segment_names, dtype=object)[segment_index],
+            "signup_date": start_date + pd.Timedelta(days=num_days) - pd.to_timedelta(signup_days, unit="D")
+        })
+        
+        # Active days per customer, then transactions per active day
+        customer_index, day_index = np.nonzero(rng.random((num_customers, num_days)) < ACTIVE_DAY_PROBABILITY)
+        weights = np.array(DAILY_TRANSACTION_WEIGHTS, dtype=float)
+        per_day = rng.choice(DAILY_TRANSACTION_COUNTS, size=len(customer_index), p=weights / weights.sum())
+        customer_index = np.repeat(customer_index, per_day)
+        day_index = np.repeat(day_index, per_day)
+        n = len(customer_index)
+        
+        minutes = day_index * 1440 + rng.integers(6, 24, size=n) * 60 + rng.integers(0, 60, size=n)
+        
+        # 70% of transactions fall in one of the customer's preferred categories
+        use_preferred = rng.random(n) < 0.7
+        category_index = np.where(
+            use_preferred,
+            preferred[segment_index[customer_index], rng.integers(preferred.shape[1], size=n)],
+            rng.integers(len(categories), size=n)
+        )
+        merchant_local = (rng.random(n) * merchant_counts[category_index]).astype(int)
+        merchant_index = merchant_offsets[category_index] + merchant_local
+        template_index = (rng.random(n) * template_counts[category_index]).astype(int)
+        remarks = remark_strings[
+            remark_offsets[category_index] + template_index * merchant_counts[category_index] + merchant_local
+        ]
+        
+        # Income scales with the customer's spend; expenses use per-category ranges
+        is_income = category_index == categories.index("income")
+        base_amount = (spend / frequency)[customer_index]
+        low = np.where(is_income, base_amount * 3, expense_low[category_index])
+        high = np.where(is_income, base_amount * 8, expense_high[category_index])
+        amount = low + (high - low) * rng.random(n)
+        amount = np.round(np.where(is_income, amount, -amount) * rng.uniform(0.7, 1.3, size=n), 2)
+        
+        mode_index = rng.integers(len(self.payment_modes), size=n)
+        location_index = rng.integers(len(self.locations), size=n)
+        
+        # Exactly FRAUD_RATE of the block's transactions follow a fraud pattern
+        fraud_rows, fraud_patterns, fraud_amounts, fraud_locations = draw_fraud_patterns(n, rng)
+        is_fraud = np.zeros(n, dtype=bool)
+        is_fraud[fraud_rows] = True
+        unusual_amount = fraud_patterns == FRAUD_PATTERNS.index("unusual_amount")
+        amount[fraud_rows[unusual_amount]] = fraud_amounts[unusual_amount]
+        unusual_location = fraud_patterns == FRAUD_PATTERNS.index("unusual_location")
+        location_index[fraud_rows[unusual_location]] = len(self.locations) + fraud_locations[unusual_location]
+        remarks[fraud_rows] = remarks[fraud_rows] + np.array(FRAUD_REMARKS, dtype=object)[fraud_patterns]
+        
+        # Per-customer sequence numbers make transaction IDs unique across blocks
+        sequence = np.arange(n) - np.searchsorted(customer_index, customer_index, side="left")
+        id_prefixes = np.array([f"TXN_{number:06d}_" for number in customer_numbers], dtype=object)
+        id_suffixes = np.array([f"{k:04d}" for k in range(sequence.max() + 1 if n else 0)], dtype=object)
+        transaction_ids = id_prefixes[customer_index] + id_suffixes[sequence]
+        
+        transaction_date = pd.DatetimeIndex(start_date.to_datetime64() + minutes.astype("timedelta64[m]"))
+        weekday = transaction_date.weekday.to_numpy()
+        merchant_names = [m for c in categories for m in self.merchants[c]]
+        
+        transactions = pd.DataFrame({
+            "transaction_id": transaction_ids,
+            "customer_id": customer_ids[customer_index],
+            "transaction_date": transaction_date,
+            "amount": amount,
+            "merchant": pd.Categorical.from_codes(merchant_index, categories=merchant_names),
+            "category": pd.Categorical.from_codes(category_index, categories=categories),
+            "mode": pd.Categorical.from_codes(mode_index, categories=self.payment_modes),
+            "location": pd.Categorical.from_codes(location_index, categories=self.locations + FRAUD_LOCATIONS),
+            "remarks": remarks,
+            "is_fraud": is_fraud,
+            "day_of_week": pd.Categorical.from_codes(weekday, categories=DAY_NAMES),
+            "hour": transaction_date.hour.to_numpy().astype(np.int8),
+            "is_weekend": weekday >= 5,
+            "abs_amount": np.abs(amount)
+        })
+        
+        # Sort by date
+        transactions = transactions.sort_values("transaction_date", kind="stable").reset_index(drop=True)
+        
+        return customers, transactions
+    
+    def iter_chunks(self, num_customers: int = 1000, num_months: int = 6, chunk_customers: int = 10_000,
+                    end_date: Optional[datetime] = None) -> Iterator[Tuple[pd.DataFrame, pd.DataFrame]]:
+        """Yield (customers, transactions) blocks of ``chunk_customers`` customers
+        
+        Transactions are date-sorted within each block. Output is reproducible
+        for a given random_state, chunk size and ``end_date`` (default: today).
+        """
+        end_date = pd.Timestamp(end_date or datetime.now()).normalize()
+        num_days = num_months * 30
+        start_date = end_date - pd.Timedelta(days=num_days)
+        
+        for block_index, first_customer in enumerate(range(0, num_customers, chunk_customers)):
+            yield self._generate_block(
+                block_index, first_customer, min(chunk_customers, num_customers - first_customer),
+                start_date, num_days
+            )
+    
+    def write_dataset(self, output_path: str, num_customers: int = 1000, num_months: int = 6,
+                      chunk_customers: int = 10_000, end_date: Optional[datetime] = None) -> Dict:
+        """Generate a dataset block by block, streaming each block to disk
+        
+        Memory stays bounded by one block regardless of the dataset size.
+        Customer profiles go next to the transactions, as in ``generate_dataset``.
+        """
+        print(f"Generating transaction data for {num_customers} customers over {num_months} months "
+              f"in blocks of {chunk_customers}...")
+        
+        customer_path = output_path.replace("transactions", "customers")
+        num_fraud = 0
+        first_dates, last_dates = [], []
+        
+        with TableWriter(output_path, "transactions") as transaction_writer:
+            with TableWriter(customer_path, "customers") as customer_writer:
+                for customers, transactions in self.iter_chunks(num_customers, num_months, chunk_customers, end_date):
+                    transaction_writer.write(transactions)
+                    customer_writer.write(customers)
+                    
+                    num_fraud += int(transactions["is_fraud"].sum())
+                    first_dates.append(transactions["transaction_date"].min())
+                    last_dates.append(transactions["transaction_date"].max())
+                    print(f"  {customer_writer.rows} customers, {transaction_writer.rows} transactions written")
+        
+        print(f"Dataset saved to {output_path}")
+        print(f"Customer profiles saved to {customer_path}")
+        
+        return {
+            "num_customers": customer_writer.rows,
+            "num_transactions": transaction_writer.rows,
+            "fraud_rate": num_fraud / transaction_writer.rows if transaction_writer.rows else 0.0,
+            "first_transaction": min(first_dates, default=None),
+            "last_transaction": max(last_dates, default=None)
+        }
+    
+    def write_partitioned_dataset(self, output_dir: str, num_customers: int = 1000, num_months: int = 6,
+                                  shard_customers: int = 10_000, workers: Optional[int] = None,
+                                  end_date: Optional[datetime] = None, file_format: str = "parquet") -> Dict:
+        """Generate shards of customers across a process pool, one partition file per shard
+        
+        Shard ``i`` covers the same customers and uses the same seed as block
+        ``i`` of ``iter_chunks``, so the partitions do not depend on ``workers``.
+        Files go to ``<output_dir>/transactions/part-NNNNN`` and
+        ``<output_dir>/customers/part-NNNNN``, which TableStorage reads as tables.
+        """
+        end_date = pd.Timestamp(end_date or datetime.now()).normalize()
+        num_days = num_months * 30
+        start_date = end_date - pd.Timedelta(days=num_days)
+        
+        shards = list(enumerate(range(0, num_customers, shard_customers)))
+        print(f"Generating {num_customers} customers over {num_months} months in {len(shards)} shards...")
+        
+        tables = {}
+        for table in ("transactions", "customers"):
+            tables[table] = Path(output_dir) / table
+            tables[table].mkdir(parents=True, exist_ok=True)
+            # Stale partitions from a larger earlier run would otherwise be read back
+            for stale in tables[table].glob("part-*"):
+                stale.unlink()
+        
+        tasks = [
+            (self.random_state, shard_index, first_customer, min(shard_customers, num_customers - first_customer),
+             start_date, num_days,
+             str(partition_path(tables["transactions"], shard_index, file_format)),
+             str(partition_path(tables["customers"], shard_index, file_format)))
+            for shard_index, first_customer in shards
+        ]
+        
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_write_shard, *zip(*tasks))) if tasks else []
+        
+        num_transactions = sum(result["num_transactions"] for result in results)
+        num_fraud = sum(result["num_fraud"] for result in results)
+        print(f"Wrote {num_transactions} transactions in {len(results)} partitions to {output_dir}")
+        
+        return {
+            "num_customers": sum(result["num_customers"] for result in results),
+            "num_transactions": num_transactions,
+            "num_partitions": len(results),
+            "fraud_rate": num_fraud / num_transactions if num_transactions else 0.0,
+            "first_transaction": min((result["first_transaction"] for result in results), default=None),
+            "last_transaction": max((result["last_transaction"] for result in results), default=None)
+        }
+    
     def generate_dataset(self, 
                         num_customers: int = 1000, 
                         num_months: int = 6, 
-                        output_path: Optional[str] = None) -> pd.DataFrame:
-        """Generate a complete transaction dataset"""
+                        output_path: Optional[str] = None,
+                        vectorized: bool = False) -> pd.DataFrame:
+        """Generate a complete transaction dataset
+        
+        With ``vectorized``, transactions are drawn as NumPy arrays per block of
+        customers (see ``iter_chunks``) instead of one Python call per
+        transaction; use ``write_dataset`` for datasets too large for memory.
+        """
         
         print(f"Generating transaction data for {num_customers} customers over {num_months} months...")
         
+        if vectorized:
+            blocks = list(self.iter_chunks(num_customers, num_months))
+            customer_df = pd.concat([customers for customers, _ in blocks], ignore_index=True)
+            df = pd.concat([transactions for _, transactions in blocks], ignore_index=True)
+            df = decode_categoricals(df)
+        else:
+            df, customer_df = self._generate_dataset_iterative(num_customers, num_months)
+        
+        # Sort by date
+        df = df.sort_values("transaction_date", kind="stable").reset_index(drop=True)
+        
+        print(f"Generated {len(df)} transactions")
+        print(f"Fraud rate: {df['is_fraud'].mean():.2%}")
+        
+        # Save to file if path provided
+        if output_path:
+            write_frame(df, output_path, "transactions")
+            print(f"Dataset saved to {output_path}")
+        
+        # Save customer profiles
+        if output_path:
+            customer_path = output_path.replace("transactions", "customers")
+            write_frame(customer_df, customer_path, "customers")
+            print(f"Customer profiles saved to {customer_path}")
+        
+        return df, customer_df
+    
+    def _generate_dataset_iterative(self, num_customers: int, num_months: int) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Generate customers and transactions one Python call per transaction"""
         customers = []
         transactions = []
         
@@ -209,11 +519,11 @@ class TransactionDataGenerator:
             
             while current_date < datetime.now():
                 # Determine if customer should have transactions on this day
-                if random.random() < 0.3:  # 30% chance of transaction on any given day
+                if random.random() < ACTIVE_DAY_PROBABILITY:
                     # Number of transactions for this day
                     daily_transactions = random.choices(
-                        [1, 2, 3, 4, 5], 
-                        weights=[60, 25, 10, 4, 1]
+                        DAILY_TRANSACTION_COUNTS, 
+                        weights=DAILY_TRANSACTION_WEIGHTS
                     )[0]
                     
                     for _ in range(daily_transactions):
@@ -243,25 +553,7 @@ class TransactionDataGenerator:
         df["is_weekend"] = df["transaction_date"].dt.weekday >= 5
         df["abs_amount"] = df["amount"].abs()
         
-        # Sort by date
-        df = df.sort_values("transaction_date").reset_index(drop=True)
-        
-        print(f"Generated {len(df)} transactions")
-        print(f"Fraud rate: {df['is_fraud'].mean():.2%}")
-        
-        # Save to file if path provided
-        if output_path:
-            df.to_csv(output_path, index=False)
-            print(f"Dataset saved to {output_path}")
-        
-        # Save customer profiles
-        customer_df = pd.DataFrame(customers)
-        if output_path:
-            customer_path = output_path.replace("transactions", "customers")
-            customer_df.to_csv(customer_path, index=False)
-            print(f"Customer profiles saved to {customer_path}")
-        
-        return df, customer_df
+        return df, pd.DataFrame(customers)
 
 
 def main():
@@ -271,21 +563,42 @@ def main():
     project_root = os.path.join(script_dir, '..', '..')
     os.chdir(project_root)
     
+    parser = argparse.ArgumentParser(description="Generate synthetic customers and transactions")
+    parser.add_argument("--customers", type=int, default=1000, help="Number of customers")
+    parser.add_argument("--months", type=int, default=6, help="Months of history")
+    parser.add_argument("--chunk-customers", type=int, default=10_000, help="Customers generated and written per block")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes; above 1, shards are written as partition files in parallel")
+    args = parser.parse_args()
+    
     generator = TransactionDataGenerator(random_state=42)
+    storage = TableStorage("data")
     
     # Generate dataset
-    transactions_df, customers_df = generator.generate_dataset(
-        num_customers=1000,
-        num_months=6,
-        output_path="data/raw/transactions.csv"
-    )
+    if args.workers > 1:
+        summary = generator.write_partitioned_dataset(
+            output_dir="data/raw",
+            num_customers=args.customers,
+            num_months=args.months,
+            shard_customers=args.chunk_customers,
+            workers=args.workers,
+            file_format=storage.format
+        )
+    else:
+        summary = generator.write_dataset(
+            output_path=str(storage.path("transactions")),
+            num_customers=args.customers,
+            num_months=args.months,
+            chunk_customers=args.chunk_customers
+        )
     
     print("\nDataset Summary:")
-    print(f"Total customers: {customers_df.shape[0]}")
-    print(f"Total transactions: {transactions_df.shape[0]}")
-    print(f"Date range: {transactions_df['transaction_date'].min()} to {transactions_df['transaction_date'].max()}")
-    print(f"Categories: {transactions_df['category'].unique()}")
-    print(f"Average transactions per customer: {len(transactions_df) / len(customers_df):.1f}")
+    print(f"Total customers: {summary['num_customers']}")
+    print(f"Total transactions: {summary['num_transactions']}")
+    print(f"Fraud rate: {summary['fraud_rate']:.2%}")
+    print(f"Date range: {summary['first_transaction']} to {summary['last_transaction']}")
+    print(f"Categories: {list(generator.merchants.keys())}")
+    print(f"Average transactions per customer: {summary['num_transactions'] / summary['num_customers']:.1f}")
 
 
 if __name__ == "__main__":
@@ -7,14 +7,25 @@ import numpy as np
 from typing import Dict, List, Tuple
 from datetime import datetime, timedelta
 import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data.storage import TableStorage
 
 
 class FeatureEngineer:
     """Extract and engineer features from transaction data for ML models"""
     
-    def __init__(self, lookback_days: int = 90):
-        """Initialize feature engineer with lookback period"""
+    def __init__(self, lookback_days: int = 90, vectorized: bool = False):
+        """Initialize feature engineer with lookback period
+        
+        When ``vectorized`` is True, customer features are computed with grouped
+        aggregations over the whole frame instead of one filtered pass per customer,
+        and transaction features with a single sorted pass instead of ``iterrows``.
+        """
         self.lookback_days = lookback_days
+        self.vectorized = vectorized
     
     def create_customer_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """Create customer-level features from transaction data"""
@@ -28,6 +39,20 @@ class FeatureEngineer:
         # Calculate reference date (usually the latest date in data)
         reference_date = df["transaction_date"].max()
         
+        if self.vectorized:
+            feature_df = self._create_customer_features_vectorized(df, reference_date)
+        else:
+            feature_df = self._create_customer_features_iterative(df, reference_date)
+        
+        # Fill missing values
+        feature_df = feature_df.fillna(0)
+        
+        print(f"Created {len(feature_df.columns)-1} features for {len(feature_df)} customers")
+        
+        return feature_df
+    
+    def _create_customer_features_iterative(self, df: pd.DataFrame, reference_date: datetime) -> pd.DataFrame:
+        """Build customer features by filtering the frame once per customer"""
         customer_features = []
         
         for customer_id in df["customer_id"].unique():
@@ -60,14 +85,7 @@ class FeatureEngineer:
             
             customer_features.append(features)
         
-        feature_df = pd.DataFrame(customer_features)
-        
-        # Fill missing values
-        feature_df = feature_df.fillna(0)
-        
-        print(f"Created {len(feature_df.columns)-1} features for {len(feature_df)} customers")
-        
-        return feature_df
+        return pd.DataFrame(customer_features)
     
     def _calculate_recency_features(self, customer_data: pd.DataFrame, reference_date: datetime) -> Dict:
         """Calculate recency-based features"""
@@ -282,6 +300,186 @@ class FeatureEngineer:
         
         return features
     
+    def _create_customer_features_vectorized(self, df: pd.DataFrame, reference_date: datetime) -> pd.DataFrame:
+        """Build customer features with grouped aggregations in a single pass
+        
+        Produces the same columns and values as the per-customer helpers above.
+        Customers keep their order of first appearance, and ties in "most common"
+        features resolve the same way as ``value_counts`` / ``mode`` do there.
+        """
+        codes, customer_ids = pd.factorize(df["customer_id"])
+        valid = codes >= 0
+        
+        # Stable sort by customer, then date, so first-seen tie breaks follow the loop
+        data = df.loc[valid, ["transaction_date", "amount", "merchant", "category", "mode", "location"]]
+        codes = codes[valid]
+        order = np.lexsort((data["transaction_date"].to_numpy(), codes))
+        data = data.iloc[order].reset_index(drop=True)
+        data["group"] = codes[order]
+        
+        customers = pd.RangeIndex(len(customer_ids))
+        grouped = data.groupby("group", sort=True)
+        amount = data["amount"]
+        features = {}
+        
+        # === RECENCY FEATURES ===
+        first_date = grouped["transaction_date"].min()
+        last_date = grouped["transaction_date"].max()
+        lifetime_days = (last_date - first_date).dt.days
+        features["days_since_last_transaction"] = (reference_date - last_date).dt.days
+        features["days_since_first_transaction"] = (reference_date - first_date).dt.days
+        features["customer_lifetime_days"] = lifetime_days
+        
+        # === FREQUENCY FEATURES ===
+        total_transactions = grouped.size()
+        features["total_transactions"] = total_transactions
+        features["unique_merchants"] = grouped["merchant"].nunique()
+        features["unique_categories"] = grouped["category"].nunique()
+        features["unique_locations"] = grouped["location"].nunique()
+        
+        date_range = lifetime_days.where(lifetime_days > 0)
+        features["avg_transactions_per_day"] = total_transactions / date_range
+        features["avg_transactions_per_week"] = total_transactions / (date_range / 7)
+        features["avg_transactions_per_month"] = total_transactions / (date_range / 30)
+        
+        # === MONETARY FEATURES ===
+        amount_stats = grouped["amount"].agg(["sum", "mean", "median", "std", "min", "max"])
+        features["total_amount"] = amount_stats["sum"]
+        features["avg_transaction_amount"] = amount_stats["mean"]
+        features["median_transaction_amount"] = amount_stats["median"]
+        features["std_transaction_amount"] = amount_stats["std"]
+        features["min_transaction_amount"] = amount_stats["min"]
+        features["max_transaction_amount"] = amount_stats["max"]
+        
+        expense_stats = (
+            data[amount < 0].groupby("group")["amount"]
+            .agg(["sum", "mean", "min", "size"]).reindex(customers)
+        )
+        features["total_expenses"] = expense_stats["sum"]
+        features["avg_expense_amount"] = expense_stats["mean"]
+        features["max_expense_amount"] = expense_stats["min"]  # Most negative (largest expense)
+        features["expense_transaction_count"] = expense_stats["size"]
+        
+        income_stats = (
+            data[amount > 0].groupby("group")["amount"]
+            .agg(["sum", "mean", "max", "size"]).reindex(customers)
+        )
+        features["total_income"] = income_stats["sum"]
+        features["avg_income_amount"] = income_stats["mean"]
+        features["max_income_amount"] = income_stats["max"]
+        features["income_transaction_count"] = income_stats["size"]
+        
+        # NaN unless the customer has both income and expenses
+        features["net_cash_flow"] = income_stats["sum"] + expense_stats["sum"]
+        features["income_expense_ratio"] = income_stats["sum"] / expense_stats["sum"].abs()
+        features["savings_rate"] = features["net_cash_flow"] / income_stats["sum"]
+        
+        # === CATEGORY FEATURES ===
+        major_categories = ["grocery", "restaurant", "gas", "retail", "entertainment"]
+        category_spending = (
+            data.groupby(["group", "category"])["amount"]
+            .agg(["sum", "count", "mean"]).unstack("category")
+            .reindex(customers)
+        )
+        
+        def category_stat(stat: str, category: str) -> pd.Series:
+            if category in category_spending[stat].columns:
+                return category_spending[stat][category].fillna(0)
+            return pd.Series(0, index=customers)
+        
+        for category in major_categories:
+            features[f"{category}_total_spend"] = category_stat("sum", category)
+            features[f"{category}_transaction_count"] = category_stat("count", category)
+            features[f"{category}_avg_amount"] = category_stat("mean", category)
+        
+        total_spending = expense_stats["sum"].abs()
+        total_spending = total_spending.where(total_spending > 0)
+        for category in major_categories:
+            features[f"{category}_spend_percentage"] = category_stat("sum", category).abs() / total_spending
+        
+        most_frequent_category = self._most_frequent_by_group(data["group"], data["category"], ties="smallest")
+        features["most_frequent_category"] = most_frequent_category["value"].reindex(customers).fillna("unknown")
+        
+        # === TEMPORAL FEATURES ===
+        hour = data["transaction_date"].dt.hour
+        day_of_week = data["transaction_date"].dt.dayofweek
+        is_weekend = day_of_week.isin([5, 6])
+        
+        features["avg_transaction_hour"] = hour.groupby(data["group"]).mean()
+        features["most_common_hour"] = self._most_frequent_by_group(data["group"], hour, ties="smallest")["value"]
+        features["weekend_transaction_ratio"] = is_weekend.groupby(data["group"]).mean()
+        features["most_common_day"] = self._most_frequent_by_group(data["group"], day_of_week, ties="smallest")["value"]
+        
+        weekend_spending = amount.where(is_weekend, 0).groupby(data["group"]).sum()
+        weekday_spending = amount.where(~is_weekend, 0).groupby(data["group"]).sum()
+        features["weekend_weekday_spending_ratio"] = weekend_spending / weekday_spending.where(weekday_spending != 0)
+        
+        # === TREND FEATURES ===
+        # Least-squares slope over the customer's active months, indexed 0..k-1 like np.polyfit
+        year_month = data["transaction_date"].dt.year * 12 + data["transaction_date"].dt.month
+        monthly_stats = (
+            amount.groupby([data["group"], year_month.rename("year_month")])
+            .agg(["sum", "count"]).reset_index()
+        )
+        monthly_group = monthly_stats["group"]
+        n_months = monthly_group.map(monthly_group.value_counts())
+        centered_month = monthly_stats.groupby("group").cumcount() - (n_months - 1) / 2
+        month_variance = (centered_month ** 2).groupby(monthly_group).sum()
+        has_trend = monthly_group.value_counts().reindex(customers, fill_value=0) >= 2
+        
+        def monthly_trend(values: pd.Series) -> pd.Series:
+            slope = (centered_month * values).groupby(monthly_group).sum() / month_variance
+            return slope.reindex(customers).where(has_trend)
+        
+        features["monthly_spending_trend"] = monthly_trend(monthly_stats["sum"])
+        features["monthly_frequency_trend"] = monthly_trend(monthly_stats["count"])
+        features["spending_volatility"] = monthly_stats.groupby("group")["sum"].std(ddof=0).reindex(customers).where(has_trend)
+        features["frequency_volatility"] = monthly_stats.groupby("group")["count"].std(ddof=0).reindex(customers).where(has_trend)
+        
+        # === BEHAVIORAL FEATURES ===
+        features["most_used_payment_mode"] = self._most_frequent_by_group(data["group"], data["mode"])["value"].reindex(customers).fillna("unknown")
+        features["payment_mode_diversity"] = grouped["mode"].nunique()
+        
+        features["location_diversity"] = grouped["location"].nunique()
+        features["most_common_location"] = self._most_frequent_by_group(data["group"], data["location"])["value"].reindex(customers).fillna("unknown")
+        
+        top_merchant = self._most_frequent_by_group(data["group"], data["merchant"]).reindex(customers)
+        features["merchant_loyalty_score"] = top_merchant["count"] / total_transactions
+        features["top_merchant"] = top_merchant["value"]
+        
+        abs_amount = amount.abs()
+        features["small_transaction_ratio"] = (abs_amount < 50).groupby(data["group"]).sum() / total_transactions
+        features["medium_transaction_ratio"] = ((abs_amount >= 50) & (abs_amount < 200)).groupby(data["group"]).sum() / total_transactions
+        features["large_transaction_ratio"] = (abs_amount >= 200).groupby(data["group"]).sum() / total_transactions
+        
+        feature_df = pd.DataFrame({name: values.reindex(customers) for name, values in features.items()})
+        feature_df.insert(0, "customer_id", customer_ids)
+        
+        return feature_df
+    
+    @staticmethod
+    def _most_frequent_by_group(group: pd.Series, values: pd.Series, ties: str = "first") -> pd.DataFrame:
+        """Most frequent value and its count for each group
+        
+        Ties go to the value seen first (``value_counts`` order) or, with
+        ``ties="smallest"``, to the smallest value (``mode`` order).
+        """
+        frame = pd.DataFrame({
+            "group": group.to_numpy(),
+            "value": values.to_numpy(),
+            "position": np.arange(len(values))
+        }).dropna(subset=["value"])
+        
+        counts = (
+            frame.groupby(["group", "value"], sort=False)["position"]
+            .agg(["size", "min"]).reset_index()
+            .rename(columns={"size": "count", "min": "first_position"})
+        )
+        tie_column = "first_position" if ties == "first" else "value"
+        counts = counts.sort_values(["group", "count", tie_column], ascending=[True, False, True], kind="mergesort")
+        
+        return counts.drop_duplicates("group").set_index("group")[["value", "count"]]
+    
     def create_transaction_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """Create transaction-level features for fraud detection"""
         
@@ -290,6 +488,20 @@ class FeatureEngineer:
         df = df.copy()
         df["transaction_date"] = pd.to_datetime(df["transaction_date"])
         
+        if self.vectorized:
+            feature_df = self._create_transaction_features_streaming(df)
+        else:
+            feature_df = self._create_transaction_features_iterative(df)
+        
+        # Fill missing values
+        feature_df = feature_df.fillna(0)
+        
+        print(f"Created transaction-level features for {len(feature_df)} transactions")
+        
+        return feature_df
+    
+    def _create_transaction_features_iterative(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Build transaction features by rescanning each customer's history per row"""
         # Sort by customer and date
         df = df.sort_values(["customer_id", "transaction_date"])
         
@@ -312,12 +524,53 @@ class FeatureEngineer:
                 
                 transaction_features.append(features)
         
-        feature_df = pd.DataFrame(transaction_features)
-        
-        # Fill missing values
-        feature_df = feature_df.fillna(0)
-        
-        print(f"Created transaction-level features for {len(feature_df)} transactions")
+        return pd.DataFrame(transaction_features)
+    
+    def _create_transaction_features_streaming(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Build transaction features in one pass over (customer, date)-sorted rows
+        
+        History is everything earlier in date order, which matches
+        ``_calculate_transaction_context_features`` for date-sorted input such as
+        the output of ``TransactionDataGenerator``.
+        """
+        df = df.sort_values(["customer_id", "transaction_date"], kind="mergesort").reset_index(drop=True)
+        grouped = df.groupby("customer_id", sort=False)
+        amount = df["amount"]
+        
+        previous_count = grouped.cumcount()
+        is_first = previous_count == 0
+        
+        # Expanding mean of strictly earlier amounts
+        previous_sum = grouped["amount"].cumsum() - amount
+        previous_mean = previous_sum / previous_count.where(~is_first)
+        amount_vs_avg_ratio = (amount / previous_mean.where(previous_mean != 0)).fillna(1)
+        
+        days_since_last = (df["transaction_date"] - grouped["transaction_date"].shift()).dt.days
+        
+        # Time-based windows [t - N days, t], minus the current row itself
+        def window_count(days: int) -> np.ndarray:
+            counts = (
+                df.groupby("customer_id", sort=False)
+                .rolling(f"{days}D", on="transaction_date", closed="both")["amount"]
+                .count()
+            )
+            return counts.to_numpy() - 1
+        
+        feature_df = pd.DataFrame({
+            "transaction_id": df["transaction_id"],
+            "customer_id": df["customer_id"],
+            "amount": amount,
+            "abs_amount": amount.abs(),
+            "is_first_transaction": is_first.astype(int),
+            "days_since_last_transaction": days_since_last.fillna(0).astype(int),
+            "amount_vs_avg_ratio": amount_vs_avg_ratio,
+            "frequency_last_7_days": window_count(7),
+            "frequency_last_30_days": window_count(30),
+        })
+        
+        # Cumulative first-seen flags: a repeat (customer, value) pair was seen before
+        for column in ["merchant", "category", "location"]:
+            feature_df[f"{column}_seen_before"] = df.duplicated(["customer_id", column]).astype(int)
         
         return feature_df
     
@@ -376,20 +629,22 @@ def main():
     
     # Load sample data
     try:
-        df = pd.read_csv("data/raw/transactions.csv")
+        # Plain string columns keep the engines' first-seen tie breaks
+        storage = TableStorage("data")
+        df = storage.read("transactions", categorical=False)
         print(f"Loaded {len(df)} transactions")
         
         # Initialize feature engineer
-        feature_engineer = FeatureEngineer(lookback_days=90)
+        feature_engineer = FeatureEngineer(lookback_days=90, vectorized=True)
         
         # Create customer features
         customer_features = feature_engineer.create_customer_features(df)
-        customer_features.to_csv("data/processed/customer_features.csv", index=False)
+        storage.write(customer_features, "customer_features")
         print(f"Customer features saved: {customer_features.shape}")
         
         # Create transaction features
         transaction_features = feature_engineer.create_transaction_features(df)
-        transaction_features.to_csv("data/processed/transaction_features.csv", index=False)
+        storage.write(transaction_features, "transaction_features")
         print(f"Transaction features saved: {transaction_features.shape}")
         
         print("\nFeature engineering completed successfully!")
@@ -0,0 +1,271 @@
+"""
+Incremental customer feature store backed by running aggregates
+"""
+
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Union
+
+import joblib
+import numpy as np
+import pandas as pd
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data.storage import TableStorage
+
+
+MAJOR_CATEGORIES = ["grocery", "restaurant", "gas", "retail", "entertainment"]
+
+
+def _field(transaction: Any, name: str) -> Any:
+    """Read a field from a TransactionInput-like object or a dict"""
+    value = transaction[name] if isinstance(transaction, dict) else getattr(transaction, name)
+    # Enum fields (category, mode) carry their string in .value
+    return getattr(value, "value", value)
+
+
+class CustomerAggregates:
+    """Running aggregates for one customer, each updated in O(1) per transaction"""
+    
+    __slots__ = (
+        "count", "total", "mean", "m2", "expense_total", "expense_count",
+        "income_total", "income_count", "weekend_count", "first_date", "last_date",
+        "category_totals", "merchant_counts", "top_merchant_count", "modes",
+        "locations", "monthly"
+    )
+    
+    def __init__(self):
+        """Initialize empty aggregates"""
+        self.count = 0
+        self.total = 0.0
+        # Welford running mean and sum of squared deviations for a stable std
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.expense_total = 0.0
+        self.expense_count = 0
+        self.income_total = 0.0
+        self.income_count = 0
+        self.weekend_count = 0
+        self.first_date = None
+        self.last_date = None
+        self.category_totals = {}
+        self.merchant_counts = {}
+        self.top_merchant_count = 0
+        self.modes = set()
+        self.locations = set()
+        # (year, month) -> [sum, count]
+        self.monthly = {}
+    
+    def update(self, transaction_date: datetime, amount: float, merchant: str,
+               category: str, mode: str, location: str) -> None:
+        """Fold a single transaction into the aggregates"""
+        self.count += 1
+        self.total += amount
+        delta = amount - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (amount - self.mean)
+        
+        if amount < 0:
+            self.expense_total += amount
+            self.expense_count += 1
+        elif amount > 0:
+            self.income_total += amount
+            self.income_count += 1
+        
+        if transaction_date.weekday() >= 5:
+            self.weekend_count += 1
+        if self.first_date is None or transaction_date < self.first_date:
+            self.first_date = transaction_date
+        if self.last_date is None or transaction_date > self.last_date:
+            self.last_date = transaction_date
+        
+        self.category_totals[category] = self.category_totals.get(category, 0.0) + amount
+        
+        # Counts only grow, so the running maximum stays exact
+        merchant_count = self.merchant_counts.get(merchant, 0) + 1
+        self.merchant_counts[merchant] = merchant_count
+        self.top_merchant_count = max(self.top_merchant_count, merchant_count)
+        
+        self.modes.add(mode)
+        self.locations.add(location)
+        
+        month = self.monthly.setdefault((transaction_date.year, transaction_date.month), [0.0, 0])
+        month[0] += amount
+        month[1] += 1
+    
+    def to_features(self, reference_date: datetime) -> Dict[str, float]:
+        """Derive the churn model features as of ``reference_date``"""
+        lifetime_days = (self.last_date - self.first_date).days
+        has_income_and_expenses = self.income_count > 0 and self.expense_count > 0
+        
+        features = {
+            "days_since_last_transaction": (reference_date - self.last_date).days,
+            "days_since_first_transaction": (reference_date - self.first_date).days,
+            "customer_lifetime_days": lifetime_days,
+            "total_transactions": self.count,
+            "avg_transactions_per_month": self.count / (lifetime_days / 30) if lifetime_days > 0 else 0.0,
+            "unique_merchants": len(self.merchant_counts),
+            "unique_categories": len(self.category_totals),
+            "total_amount": self.total,
+            "avg_transaction_amount": self.mean,
+            "std_transaction_amount": float(np.sqrt(self.m2 / (self.count - 1))) if self.count > 1 else 0.0,
+            "total_expenses": self.expense_total,
+            "total_income": self.income_total,
+            "net_cash_flow": self.income_total + self.expense_total if has_income_and_expenses else 0.0,
+            "payment_mode_diversity": len(self.modes),
+            "location_diversity": len(self.locations),
+            "merchant_loyalty_score": self.top_merchant_count / self.count,
+            "weekend_transaction_ratio": self.weekend_count / self.count,
+        }
+        
+        for category in MAJOR_CATEGORIES:
+            features[f"{category}_total_spend"] = self.category_totals.get(category, 0.0)
+        
+        features.update(self._trend_features())
+        
+        return features
+    
+    def _trend_features(self) -> Dict[str, float]:
+        """Slope and volatility over active months, matching FeatureEngineer"""
+        if len(self.monthly) < 2:
+            return {"monthly_spending_trend": 0.0, "monthly_frequency_trend": 0.0, "spending_volatility": 0.0}
+        
+        months = np.array([self.monthly[key] for key in sorted(self.monthly)], dtype=float)
+        spending, counts = months[:, 0], months[:, 1]
+        x = np.arange(len(months)) - (len(months) - 1) / 2
+        
+        return {
+            "monthly_spending_trend": float(x @ spending / (x @ x)),
+            "monthly_frequency_trend": float(x @ counts / (x @ x)),
+            "spending_volatility": float(np.std(spending)),
+        }
+
+
+class CustomerFeatureStore:
+    """Per-customer running aggregates that serve fresh churn features
+    
+    Each new transaction updates its customer's aggregates in O(1), so
+    features never require re-reading the transaction history.
+    """
+    
+    def __init__(self):
+        """Initialize an empty feature store"""
+        self.customers: Dict[str, CustomerAggregates] = {}
+        self.latest_transaction_date: Optional[datetime] = None
+    
+    def __len__(self) -> int:
+        return len(self.customers)
+    
+    def __contains__(self, customer_id: str) -> bool:
+        return customer_id in self.customers
+    
+    def update(self, transaction: Union[Dict, Any]) -> None:
+        """Add a TransactionInput (or a dict with the same fields) to the store"""
+        transaction_date = pd.Timestamp(_field(transaction, "transaction_date")).to_pydatetime()
+        customer_id = _field(transaction, "customer_id")
+        
+        aggregates = self.customers.get(customer_id)
+        if aggregates is None:
+            aggregates = self.customers[customer_id] = CustomerAggregates()
+        
+        aggregates.update(
+            transaction_date,
+            float(_field(transaction, "amount")),
+            _field(transaction, "merchant"),
+            _field(transaction, "category"),
+            _field(transaction, "mode"),
+            _field(transaction, "location")
+        )
+        
+        if self.latest_transaction_date is None or transaction_date > self.latest_transaction_date:
+            self.latest_transaction_date = transaction_date
+    
+    def update_many(self, transactions: Union[pd.DataFrame, Iterable]) -> int:
+        """Add many transactions; returns the number added"""
+        if isinstance(transactions, pd.DataFrame):
+            transactions = transactions.to_dict("records")
+        
+        added = 0
+        for transaction in transactions:
+            self.update(transaction)
+            added += 1
+        
+        return added
+    
+    def get_features(self, customer_id: str, reference_date: Optional[datetime] = None) -> Optional[Dict[str, float]]:
+        """Churn features for one customer, or None if the customer is unknown
+        
+        Recency is measured against ``reference_date``, defaulting to the latest
+        transaction in the store (the same reference FeatureEngineer uses).
+        """
+        aggregates = self.customers.get(customer_id)
+        if aggregates is None:
+            return None
+        
+        return aggregates.to_features(reference_date or self.latest_transaction_date)
+    
+    def to_frame(self, reference_date: Optional[datetime] = None) -> pd.DataFrame:
+        """Churn features for every customer in the store"""
+        reference_date = reference_date or self.latest_transaction_date
+        rows = [
+            {"customer_id": customer_id, **aggregates.to_features(reference_date)}
+            for customer_id, aggregates in self.customers.items()
+        ]
+        
+        return pd.DataFrame(rows)
+    
+    def save(self, filepath: Union[str, Path]) -> str:
+        """Persist the store to disk"""
+        joblib.dump({
+            "customers": self.customers,
+            "latest_transaction_date": self.latest_transaction_date
+        }, filepath)
+        
+        return str(filepath)
+    
+    @classmethod
+    def load(cls, filepath: Union[str, Path]) -> "CustomerFeatureStore":
+        """Load a store previously written by ``save``"""
+        state = joblib.load(filepath)
+        
+        store = cls()
+        store.customers = state["customers"]
+        store.latest_transaction_date = state["latest_transaction_date"]
+        
+        return store
+    
+    @classmethod
+    def from_transactions(cls, df: pd.DataFrame) -> "CustomerFeatureStore":
+        """Build a store from a transaction history frame"""
+        store = cls()
+        store.update_many(df)
+        
+        return store
+
+
+def main():
+    """Build the feature store from the raw transaction history"""
+    # Change to project root directory for correct relative paths
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    project_root = os.path.join(script_dir, '..', '..')
+    os.chdir(project_root)
+    
+    try:
+        df = TableStorage("data").read("transactions", columns=[
+            "customer_id", "transaction_date", "amount", "merchant", "category", "mode", "location"
+        ])
+        print(f"Loaded {len(df)} transactions")
+        
+        store = CustomerFeatureStore.from_transactions(df)
+        path = store.save("data/processed/customer_feature_store.joblib")
+        print(f"Feature store with {len(store)} customers saved to {path}")
+    
+    except FileNotFoundError:
+        print("Please run data_generator.py first to create sample data")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Daily transaction rollup cube for windowed analytics
+"""
+
+from datetime import datetime
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+
+
+CUBE_DIMENSIONS = ["date", "category", "mode", "merchant", "hour", "is_fraud"]
+CUBE_MEASURES = ["count", "total", "total_sq", "fraud_count"]
+
+# Each analytics section reads one of these (date, dimension) projections of the cube
+PROJECTED_DIMENSIONS = ["category", "mode", "merchant", "hour"]
+
+
+def _cells(transactions: pd.DataFrame) -> pd.DataFrame:
+    """One unaggregated cube cell per transaction"""
+    dates = transactions["transaction_date"]
+    amount = transactions["amount"].astype(float).to_numpy()
+    is_fraud = transactions["is_fraud"].astype(bool).to_numpy()
+    
+    return pd.DataFrame({
+        "date": dates.dt.normalize(),
+        "category": transactions["category"],
+        "mode": transactions["mode"],
+        "merchant": transactions["merchant"],
+        "hour": dates.dt.hour,
+        "is_fraud": is_fraud,
+        "count": 1,
+        "total": amount,
+        "total_sq": amount * amount,
+        "fraud_count": is_fraud.astype(int)
+    })
+
+
+def _aggregate(transactions: pd.DataFrame) -> pd.DataFrame:
+    """Roll transactions up to one row per cube cell with count, sum and sum of squares"""
+    return _cells(transactions).groupby(CUBE_DIMENSIONS, sort=True, observed=True)[CUBE_MEASURES].sum().reset_index()
+
+
+def _project(cube: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """Sum the cube's measures over every dimension but the date and one other"""
+    return {
+        dimension: cube.groupby(["date", dimension], sort=True, observed=True)[CUBE_MEASURES].sum().reset_index()
+        for dimension in PROJECTED_DIMENSIONS
+    }
+
+
+class TransactionRollup:
+    """Count, sum and sum of squares per date x category x mode x merchant x hour x fraud flag
+    
+    Windowed analytics read daily projections of the cube, whose size is
+    bounded by days x dimension cardinality, so the cost of a request scales
+    with the window length rather than the number of transactions. The
+    window's first, partial day is aggregated from the raw rows so results
+    match a full scan exactly.
+    """
+    
+    def __init__(self, transactions: pd.DataFrame):
+        """Build the cube, its projections and the per-customer last-seen index"""
+        self.transactions = transactions
+        
+        if transactions.empty:
+            self.cube = pd.DataFrame(columns=CUBE_DIMENSIONS + CUBE_MEASURES)
+            dates = np.array([], dtype="datetime64[ns]")
+            self._last_seen = dates
+        else:
+            self.cube = _aggregate(transactions)
+            dates = transactions["transaction_date"].to_numpy(dtype="datetime64[ns]")
+            # A window always ends at the latest transaction, so a customer is active
+            # in it exactly when their last transaction falls on or after its start
+            last_seen = transactions.groupby("customer_id", observed=True)["transaction_date"].max()
+            self._last_seen = np.sort(last_seen.to_numpy(dtype="datetime64[ns]"))
+        
+        self.projections = _project(self.cube)
+        self._projection_dates = {
+            dimension: projection["date"].to_numpy(dtype="datetime64[ns]")
+            for dimension, projection in self.projections.items()
+        }
+        
+        # Row order by date, for the raw rows of a window's partial first day
+        self._date_order = np.argsort(dates, kind="stable")
+        self._sorted_dates = dates[self._date_order]
+        
+        self.end_date = pd.Timestamp(self._sorted_dates[-1]) if len(self._sorted_dates) else None
+    
+    def __len__(self) -> int:
+        return len(self.cube)
+    
+    def window(self, start_date: datetime) -> Dict[str, pd.DataFrame]:
+        """Projections restricted to transactions at or after ``start_date``"""
+        start = np.datetime64(pd.Timestamp(start_date), "ns")
+        next_day = np.datetime64(pd.Timestamp(start_date).normalize() + pd.Timedelta(days=1), "ns")
+        
+        windows = {
+            dimension: projection.iloc[np.searchsorted(self._projection_dates[dimension], next_day, side="left"):]
+            for dimension, projection in self.projections.items()
+        }
+        
+        lo = np.searchsorted(self._sorted_dates, start, side="left")
+        hi = np.searchsorted(self._sorted_dates, next_day, side="left")
+        if lo >= hi:
+            return windows
+        
+        partial_day = _project(_cells(self.transactions.iloc[self._date_order[lo:hi]]))
+        return {
+            dimension: pd.concat([partial_day[dimension], full_days], ignore_index=True)
+            for dimension, full_days in windows.items()
+        }
+    
+    def unique_customers(self, start_date: datetime) -> int:
+        """Customers with at least one transaction at or after ``start_date``"""
+        start = np.datetime64(pd.Timestamp(start_date), "ns")
+        return int(len(self._last_seen) - np.searchsorted(self._last_seen, start, side="left"))
+    
+    def transaction_analytics(self, start_date: datetime) -> Dict[str, Any]:
+        """Summary, trends, breakdowns and patterns for transactions since ``start_date``"""
+        window = self.window(start_date)
+        by_category = window["category"]
+        
+        count = int(by_category["count"].sum())
+        if count == 0:
+            return {}
+        
+        total = float(by_category["total"].sum())
+        fraud_count = int(by_category["fraud_count"].sum())
+        variance = (float(by_category["total_sq"].sum()) - total * total / count) / (count - 1) if count > 1 else 0.0
+        
+        daily = self._breakdown(by_category, "date")
+        weekly = daily.groupby(daily["date"].dt.day_name())["transaction_count"].sum()
+        daily["date"] = daily["date"].dt.date
+        
+        merchants = window["merchant"].groupby("merchant", observed=True)["count"].sum().sort_values(ascending=False, kind="stable")
+        modes = window["mode"].groupby("mode", observed=True)["count"].sum().sort_values(ascending=False, kind="stable")
+        
+        return {
+            "summary": {
+                "total_transactions": count,
+                "total_volume": total,
+                "avg_transaction_amount": total / count,
+                "std_transaction_amount": float(np.sqrt(max(variance, 0.0))),
+                "fraud_transactions": fraud_count,
+                "fraud_rate": fraud_count / count * 100,
+                "unique_customers": self.unique_customers(start_date),
+                "unique_merchants": len(merchants)
+            },
+            "daily_trends": daily.to_dict("records"),
+            "category_breakdown": self._breakdown(by_category, "category").to_dict("records"),
+            "time_patterns": {
+                "hourly": window["hour"].groupby("hour")["count"].sum().to_dict(),
+                "weekly": weekly.to_dict()
+            },
+            "top_merchants": merchants.head(10).to_dict(),
+            "payment_methods": modes.to_dict()
+        }
+    
+    @staticmethod
+    def _breakdown(projection: pd.DataFrame, key: str) -> pd.DataFrame:
+        """Count, total, mean and fraud count per ``key``, as the analytics endpoint reports them"""
+        grouped = projection.groupby(key, observed=True).agg(
+            transaction_count=("count", "sum"),
+            total_amount=("total", "sum"),
+            fraud_count=("fraud_count", "sum")
+        ).reset_index()
+        
+        grouped["avg_amount"] = grouped["total_amount"] / grouped["transaction_count"]
+        return grouped[[key, "transaction_count", "total_amount", "avg_amount", "fraud_count"]]
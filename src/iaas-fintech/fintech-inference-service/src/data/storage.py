@@ -0,0 +1,367 @@
+"""
+Table storage for raw and processed data with Parquet and CSV backends
+"""
+
+import argparse
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+try:
+    import pyarrow  # noqa: F401 - Parquet engine
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+
+FORMAT_SUFFIXES = {"parquet": ".parquet", "csv": ".csv"}
+
+# Table name -> location under the data root, without the format suffix
+TABLE_PATHS = {
+    "transactions": "raw/transactions",
+    "customers": "raw/customers",
+    "customer_features": "processed/customer_features",
+    "transaction_features": "processed/transaction_features",
+}
+
+# Low-cardinality string columns stored dictionary-encoded and read as pandas categoricals
+CATEGORICAL_COLUMNS = ["category", "mode", "location", "merchant"]
+
+# Explicit dtypes per table; columns not listed keep pandas' inference
+TABLE_SCHEMAS: Dict[str, Dict[str, str]] = {
+    "transactions": {
+        **{column: "category" for column in CATEGORICAL_COLUMNS},
+        "amount": "float64",
+        "abs_amount": "float64",
+        "is_fraud": "bool",
+        "is_weekend": "bool",
+        "hour": "int8",
+        "day_of_week": "category",
+    },
+    "customers": {
+        "avg_monthly_spend": "float64",
+        "transaction_frequency": "int64",
+        "churn_probability": "float64",
+        "segment": "category",
+        # Kept in its CSV text form so both backends return the same values
+        "preferred_categories": "str",
+    },
+    "customer_features": {},
+    "transaction_features": {
+        "is_first_transaction": "int8",
+        "merchant_seen_before": "int8",
+        "category_seen_before": "int8",
+        "location_seen_before": "int8",
+    },
+}
+
+TABLE_DATE_COLUMNS: Dict[str, List[str]] = {
+    "transactions": ["transaction_date"],
+    "customers": ["signup_date"],
+}
+
+
+def _format_of(path: Union[str, Path]) -> str:
+    """Backend for a file path, from its suffix"""
+    suffix = Path(path).suffix.lower()
+    for file_format, format_suffix in FORMAT_SUFFIXES.items():
+        if suffix == format_suffix:
+            return file_format
+    raise ValueError(f"Unsupported table file: {path}")
+
+
+def partition_path(directory: Union[str, Path], index: int, format: str = "parquet") -> Path:
+    """File for partition ``index`` of a table stored as a directory of parts"""
+    return Path(directory) / f"part-{index:05d}{FORMAT_SUFFIXES[format]}"
+
+
+def partition_files(directory: Union[str, Path]) -> List[Path]:
+    """A partitioned table's part files in partition order"""
+    directory = Path(directory)
+    if not directory.is_dir():
+        return []
+    return sorted(path for path in directory.glob("part-*") if path.suffix in FORMAT_SUFFIXES.values())
+
+
+def _file_stats(path: Path) -> Tuple[int, int]:
+    """(latest mtime, total size) of a table file or partition directory"""
+    files = partition_files(path) if path.is_dir() else [path]
+    stats = [file.stat() for file in files]
+    return max(stat.st_mtime_ns for stat in stats), sum(stat.st_size for stat in stats)
+
+
+def apply_schema(df: pd.DataFrame, table: Optional[str]) -> pd.DataFrame:
+    """Cast a frame to the table's explicit dtypes, leaving the input untouched"""
+    schema = TABLE_SCHEMAS.get(table, {})
+    df = df.copy(deep=False)
+    
+    for column in TABLE_DATE_COLUMNS.get(table, []):
+        if column in df.columns and not pd.api.types.is_datetime64_any_dtype(df[column]):
+            df[column] = pd.to_datetime(df[column])
+    
+    for column, dtype in schema.items():
+        if column not in df.columns:
+            continue
+        if dtype == "str":
+            df[column] = df[column].map(
+                lambda value: str(list(value)) if isinstance(value, (list, tuple, np.ndarray)) else value
+            )
+        elif str(df[column].dtype) != dtype:
+            df[column] = df[column].astype(dtype)
+    
+    return df
+
+
+def decode_categoricals(df: pd.DataFrame) -> pd.DataFrame:
+    """Turn categorical columns back into plain columns of their category type"""
+    df = df.copy(deep=False)
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype(df[column].cat.categories.dtype)
+    return df
+
+
+def read_frame(path: Union[str, Path], table: Optional[str] = None,
+               columns: Optional[Sequence[str]] = None, categorical: bool = True) -> pd.DataFrame:
+    """Read a Parquet or CSV file (or partition directory), projecting ``columns`` and applying the table schema"""
+    path = Path(path)
+    
+    if path.is_dir():
+        parts = [read_frame(part, table, columns=columns) for part in partition_files(path)]
+        df = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=columns)
+    elif _format_of(path) == "parquet":
+        df = pd.read_parquet(path, columns=list(columns) if columns is not None else None)
+    else:
+        header = pd.read_csv(path, nrows=0).columns
+        usecols = [column for column in header if columns is None or column in columns]
+        schema = TABLE_SCHEMAS.get(table, {})
+        df = pd.read_csv(
+            path,
+            usecols=usecols,
+            dtype={column: dtype for column, dtype in schema.items() if column in usecols and dtype != "str"},
+            parse_dates=[column for column in TABLE_DATE_COLUMNS.get(table, []) if column in usecols]
+        )
+        if columns is not None:
+            df = df[list(columns)]
+    
+    df = apply_schema(df, table)
+    return df if categorical else decode_categoricals(df)
+
+
+def iter_frame_chunks(path: Union[str, Path], chunk_size: int, table: Optional[str] = None) -> Iterator[pd.DataFrame]:
+    """Read a Parquet or CSV file (or partition directory) ``chunk_size`` rows at a time, applying the table schema
+    
+    Chunks never span two partition files, so the chunking of a given input
+    is always the same.
+    """
+    path = Path(path)
+    
+    if path.is_dir():
+        for part in partition_files(path):
+            yield from iter_frame_chunks(part, chunk_size, table)
+        return
+    
+    if _format_of(path) == "parquet":
+        import pyarrow.parquet as pq
+        
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield apply_schema(batch.to_pandas(), table)
+    else:
+        schema = TABLE_SCHEMAS.get(table, {})
+        header = pd.read_csv(path, nrows=0).columns
+        reader = pd.read_csv(
+            path,
+            chunksize=chunk_size,
+            dtype={column: dtype for column, dtype in schema.items() if column in header and dtype != "str"},
+            parse_dates=[column for column in TABLE_DATE_COLUMNS.get(table, []) if column in header]
+        )
+        for chunk in reader:
+            yield apply_schema(chunk, table)
+
+
+def count_rows(path: Union[str, Path]) -> int:
+    """Rows in a Parquet or CSV file (or partition directory) without loading it"""
+    path = Path(path)
+    
+    if path.is_dir():
+        return sum(count_rows(part) for part in partition_files(path))
+    if _format_of(path) == "parquet":
+        import pyarrow.parquet as pq
+        
+        return pq.ParquetFile(path).metadata.num_rows
+    # Parsing one column counts rows correctly even when quoted fields hold newlines
+    return sum(len(chunk) for chunk in pd.read_csv(path, usecols=[0], dtype=str, chunksize=1 << 20))
+
+
+def write_frame(df: pd.DataFrame, path: Union[str, Path], table: Optional[str] = None) -> Path:
+    """Write a frame as Parquet or CSV, chosen by the path suffix"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    df = apply_schema(df, table)
+    
+    if _format_of(path) == "parquet":
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+    
+    return path
+
+
+class TableWriter:
+    """Append frames to a single Parquet or CSV file chunk by chunk
+    
+    Only one chunk is held in memory at a time. Parquet chunks become row
+    groups and must share the first chunk's schema (for categoricals, the
+    same categories).
+    """
+    
+    def __init__(self, path: Union[str, Path], table: Optional[str] = None):
+        """Open a writer for ``path``; the file is created on the first chunk"""
+        self.path = Path(path)
+        self.table = table
+        self.format = _format_of(self.path)
+        self.rows = 0
+        self._parquet_writer = None
+        self._schema = None
+        
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.exists():
+            self.path.unlink()
+    
+    def write(self, df: pd.DataFrame) -> None:
+        """Append one chunk"""
+        df = apply_schema(df, self.table)
+        
+        if self.format == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            
+            chunk = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+            if self._parquet_writer is None:
+                self._schema = chunk.schema
+                self._parquet_writer = pq.ParquetWriter(self.path, self._schema)
+            self._parquet_writer.write_table(chunk)
+        else:
+            df.to_csv(self.path, mode="a", header=self.rows == 0, index=False)
+        
+        self.rows += len(df)
+    
+    def close(self) -> None:
+        """Finish the file"""
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+    
+    def __enter__(self) -> "TableWriter":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class TableStorage:
+    """Named tables under a data root, stored as Parquet (default) or CSV
+    
+    Reads pick whichever of the table's Parquet file, CSV file or partition
+    directory (``<table>/part-NNNNN.*``) was written last, so CSV-only
+    checkouts keep working and a migrated table is used as soon as it exists.
+    """
+    
+    def __init__(self, root: Union[str, Path] = "data", format: str = "parquet"):
+        """Initialize storage rooted at ``root`` that writes ``format`` files"""
+        if format not in FORMAT_SUFFIXES:
+            raise ValueError(f"Unknown storage format: {format}")
+        if format == "parquet" and not PARQUET_AVAILABLE:
+            print("pyarrow not available, storing tables as CSV")
+            format = "csv"
+        
+        self.root = Path(root)
+        self.format = format
+    
+    def path(self, table: str, format: Optional[str] = None) -> Path:
+        """File path of a table in the given (default: configured) format"""
+        return self.root / f"{TABLE_PATHS[table]}{FORMAT_SUFFIXES[format or self.format]}"
+    
+    def resolve(self, table: str) -> Optional[Path]:
+        """The most recently written existing file for a table"""
+        candidates = [
+            self.path(table, file_format) for file_format in FORMAT_SUFFIXES
+            if file_format == "csv" or PARQUET_AVAILABLE
+        ]
+        existing = [path for path in candidates if path.exists()]
+        
+        partitions = self.root / TABLE_PATHS[table]
+        if partition_files(partitions):
+            existing.append(partitions)
+        
+        return max(existing, key=lambda path: _file_stats(path)[0]) if existing else None
+    
+    def exists(self, table: str) -> bool:
+        return self.resolve(table) is not None
+    
+    def read(self, table: str, columns: Optional[Sequence[str]] = None, categorical: bool = True) -> pd.DataFrame:
+        """Load a table, optionally projecting to ``columns``"""
+        path = self.resolve(table)
+        if path is None:
+            raise FileNotFoundError(f"No stored data for table '{table}' under {self.root}")
+        return read_frame(path, table, columns=columns, categorical=categorical)
+    
+    def write(self, df: pd.DataFrame, table: str) -> Path:
+        """Store a table in the configured format"""
+        return write_frame(df, self.path(table), table)
+    
+    def version(self, tables: Sequence[str]) -> Tuple:
+        """Identity of the stored files, which changes whenever one is rewritten"""
+        version = []
+        for table in tables:
+            path = self.resolve(table)
+            if path is None:
+                raise FileNotFoundError(f"No stored data for table '{table}' under {self.root}")
+            version.append((path.name, *_file_stats(path)))
+        return tuple(version)
+    
+    def migrate(self, tables: Optional[Sequence[str]] = None, remove_csv: bool = False) -> List[Path]:
+        """Rewrite CSV tables as Parquet; returns the files written"""
+        if not PARQUET_AVAILABLE:
+            raise RuntimeError("pyarrow is required to write Parquet tables")
+        
+        written = []
+        for table in tables or TABLE_PATHS:
+            csv_path = self.path(table, "csv")
+            if not csv_path.exists():
+                continue
+            
+            parquet_path = write_frame(read_frame(csv_path, table), self.path(table, "parquet"), table)
+            written.append(parquet_path)
+            print(f"{table}: {csv_path.stat().st_size / 1e6:.1f} MB CSV -> "
+                  f"{parquet_path.stat().st_size / 1e6:.1f} MB Parquet ({parquet_path})")
+            
+            if remove_csv:
+                csv_path.unlink()
+        
+        return written
+
+
+def main():
+    """Migrate CSV tables under data/ to Parquet"""
+    # Change to project root directory for correct relative paths
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    project_root = os.path.join(script_dir, '..', '..')
+    os.chdir(project_root)
+    
+    parser = argparse.ArgumentParser(description="Convert raw and processed CSV tables to Parquet")
+    parser.add_argument("--root", default="data", help="Data directory")
+    parser.add_argument("--tables", nargs="+", choices=sorted(TABLE_PATHS), help="Tables to migrate (default: all)")
+    parser.add_argument("--remove-csv", action="store_true", help="Delete each CSV after converting it")
+    args = parser.parse_args()
+    
+    start = time.perf_counter()
+    written = TableStorage(args.root).migrate(args.tables, remove_csv=args.remove_csv)
+    print(f"Migrated {len(written)} tables in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,15 +2,34 @@
 Base model class for all ML models in the fintech inference service
 """
 
+import os
 import joblib
 import pandas as pd
 import numpy as np
 from abc import ABC, abstractmethod
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Any
-from sklearn.model_selection import train_test_split, cross_val_score
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
-import shap
+
+# scikit-learn and shap take over a second to import, so they are imported
+# where they are used; serving a loaded model never needs the training half
+
+
+def artifact_version(filepath) -> str:
+    """Identify a saved model artifact by file name and modification time"""
+    path = Path(filepath)
+    return f"{path.name}@{path.stat().st_mtime_ns}"
+
+
+def atomic_dump(data: Any, filepath) -> None:
+    """``joblib.dump`` to a temporary file renamed over ``filepath``
+    
+    Processes that memory-mapped the previous file keep reading its old
+    contents rather than having it truncated underneath them.
+    """
+    path = Path(filepath)
+    staging = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    joblib.dump(data, staging)
+    os.replace(staging, path)
 
 
 class BaseModel(ABC):
@@ -44,6 +63,9 @@ class BaseModel(ABC):
     
     def train(self, data: pd.DataFrame, test_size: float = 0.2, random_state: int = 42) -> Dict:
         """Train the model with given data"""
+        import shap
+        from sklearn.model_selection import train_test_split, cross_val_score
+        
         print(f"Training {self.model_name} model...")
         
         # Prepare features and target
@@ -133,10 +155,50 @@ class BaseModel(ABC):
         
         return self.model.predict_proba(X)
     
+    def feature_matrix(self, features: pd.DataFrame) -> pd.DataFrame:
+        """Model inputs from an already-engineered feature frame, skipping target preparation"""
+        return features.reindex(columns=self.feature_columns, fill_value=0).fillna(0).astype(float)
+    
+    def get_explainer(self):
+        """The SHAP explainer, built on first use so loading a model never imports shap"""
+        if not self.is_trained:
+            raise ValueError("Model must be trained before it can be explained")
+        if self.explainer is None:
+            import shap
+            
+            self.explainer = shap.TreeExplainer(self.model)
+        return self.explainer
+    
+    def shap_values(self, X: pd.DataFrame) -> Tuple[np.ndarray, float]:
+        """SHAP contributions for already-prepared features in one explainer call
+        
+        Returns an (n_rows, n_features) array for the positive class together
+        with the explainer's base value for that class.
+        """
+        explainer = self.get_explainer()
+        
+        if hasattr(explainer, "shap_values"):
+            values = explainer.shap_values(X)
+            base_value = explainer.expected_value
+        else:
+            explanation = explainer(X)
+            values = explanation.values
+            base_value = np.asarray(explanation.base_values)[0]
+        
+        # Multi-output explainers return one set of values per class
+        if isinstance(values, list):
+            values = values[-1]
+        elif np.ndim(values) == 3:
+            values = values[:, :, -1]
+        if np.ndim(base_value) > 0:
+            base_value = np.asarray(base_value).ravel()[-1]
+        
+        return np.asarray(values, dtype=float), float(base_value)
+    
     def explain_prediction(self, data: pd.DataFrame, sample_idx: int = 0) -> Dict:
         """Get SHAP explanation for a prediction"""
-        if not self.is_trained or self.explainer is None:
-            raise ValueError("Model must be trained and SHAP explainer initialized")
+        if not self.is_trained:
+            raise ValueError("Model must be trained before it can be explained")
         
         # Prepare features
         X, _ = self.prepare_features(data)
@@ -147,7 +209,7 @@ class BaseModel(ABC):
         
         # Get SHAP values for the sample
         sample = X.iloc[sample_idx:sample_idx+1]
-        shap_values = self.explainer(sample)
+        contributions, _ = self.shap_values(sample)
         
         # Prepare explanation
         explanation = {
@@ -159,12 +221,11 @@ class BaseModel(ABC):
             explanation["probability"] = self.model.predict_proba(sample)[0].tolist()
         
         # Get feature contributions
-        if hasattr(shap_values, "values"):
-            for i, feature in enumerate(self.feature_columns):
-                explanation["feature_contributions"][feature] = {
-                    "value": float(sample[feature].iloc[0]),
-                    "contribution": float(shap_values.values[0][i])
-                }
+        for i, feature in enumerate(self.feature_columns):
+            explanation["feature_contributions"][feature] = {
+                "value": float(sample[feature].iloc[0]),
+                "contribution": float(contributions[0][i])
+            }
         
         return explanation
     
@@ -186,14 +247,18 @@ class BaseModel(ABC):
             "model_name": self.model_name
         }
         
-        joblib.dump(model_data, filepath)
+        atomic_dump(model_data, filepath)
         print(f"Model saved to {filepath}")
         
         return str(filepath)
     
-    def load_model(self, filepath: str) -> None:
-        """Load a trained model from disk"""
-        model_data = joblib.load(filepath)
+    def load_model(self, filepath: str, mmap_mode: Optional[str] = None) -> None:
+        """Load a trained model from disk; ``mmap_mode="r"`` maps its NumPy arrays read-only
+        
+        The SHAP explainer is not rebuilt here; ``get_explainer`` creates it
+        when an explanation is first asked for.
+        """
+        model_data = joblib.load(filepath, mmap_mode=mmap_mode)
         
         self.model = model_data["model"]
         self.feature_columns = model_data["feature_columns"]
@@ -203,12 +268,7 @@ class BaseModel(ABC):
         self.model_name = model_data.get("model_name", self.model_name)
         
         self.is_trained = True
-        
-        # Reinitialize SHAP explainer
-        try:
-            self.explainer = shap.TreeExplainer(self.model)
-        except:
-            print("Warning: Could not reinitialize SHAP explainer")
+        self.explainer = None
         
         print(f"Model loaded from {filepath}")
     
@@ -222,6 +282,8 @@ class BaseModel(ABC):
     def _calculate_metrics(self, y_true: np.ndarray, y_pred: np.ndarray, 
                           y_pred_proba: Optional[np.ndarray] = None) -> Dict:
         """Calculate evaluation metrics"""
+        from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
+        
         metrics = {
             "accuracy": accuracy_score(y_true, y_pred),
             "precision": precision_score(y_true, y_pred, average='weighted', zero_division=0),
@@ -4,21 +4,63 @@ Customer churn prediction model
 
 import pandas as pd
 import numpy as np
-from typing import Tuple
+from typing import Dict, Optional, Tuple
 import os
 import sys
-try:
-    from xgboost import XGBClassifier
-    XGBOOST_AVAILABLE = True
-except ImportError:
-    from sklearn.ensemble import RandomForestClassifier as XGBClassifier
-    XGBOOST_AVAILABLE = False
-    print("XGBoost not available, falling back to RandomForestClassifier")
-from sklearn.preprocessing import LabelEncoder
+from importlib.util import find_spec
+
+# xgboost and scikit-learn are imported when a model is created, not when this module is
+XGBOOST_AVAILABLE = find_spec("xgboost") is not None
 
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from models.base_model import BaseModel
+from models.base_model import BaseModel, artifact_version
+from models.compiled_trees import CompiledTreeEnsemble, compiled_trees_path
+from models.shap_index import build_shap_index
+from models.registry import ModelRegistry
+from data.storage import TableStorage
+from utils.config import settings
+
+
+# Customer features used for churn prediction
+CHURN_FEATURE_COLUMNS = [
+    # Recency features
+    "days_since_last_transaction",
+    "days_since_first_transaction",
+    "customer_lifetime_days",
+    
+    # Frequency features
+    "total_transactions",
+    "avg_transactions_per_month",
+    "unique_merchants",
+    "unique_categories",
+    
+    # Monetary features
+    "total_amount",
+    "avg_transaction_amount",
+    "std_transaction_amount",
+    "total_expenses",
+    "total_income",
+    "net_cash_flow",
+    
+    # Category spending
+    "grocery_total_spend",
+    "restaurant_total_spend",
+    "gas_total_spend",
+    "retail_total_spend",
+    "entertainment_total_spend",
+    
+    # Behavioral features
+    "payment_mode_diversity",
+    "location_diversity",
+    "merchant_loyalty_score",
+    "weekend_transaction_ratio",
+    
+    # Trend features
+    "monthly_spending_trend",
+    "monthly_frequency_trend",
+    "spending_volatility",
+]
 
 
 class ChurnPredictionModel(BaseModel):
@@ -29,9 +71,17 @@ class ChurnPredictionModel(BaseModel):
         super().__init__("churn_prediction", model_path)
         self.target_column = "is_churned"
         self.label_encoders = {}
+        # Customer features the SHAP index is rebuilt over whenever the model is saved
+        self.index_features: Optional[pd.DataFrame] = None
     
-    def create_model(self) -> XGBClassifier:
+    def create_model(self):
         """Create XGBoost classifier for churn prediction"""
+        if XGBOOST_AVAILABLE:
+            from xgboost import XGBClassifier
+        else:
+            from sklearn.ensemble import RandomForestClassifier as XGBClassifier
+            print("XGBoost not available, falling back to RandomForestClassifier")
+        
         return XGBClassifier(
             n_estimators=100,
             max_depth=6,
@@ -42,6 +92,32 @@ class ChurnPredictionModel(BaseModel):
             eval_metric='logloss'
         )
     
+    def train(self, data: pd.DataFrame, test_size: float = 0.2, random_state: int = 42) -> Dict:
+        """Train the model and remember the customer base to index on save"""
+        metrics = super().train(data, test_size=test_size, random_state=random_state)
+        
+        if "customer_id" in data.columns and "transaction_date" not in data.columns:
+            self.index_features = data
+        
+        return metrics
+    
+    def save_model(self, filepath: Optional[str] = None) -> str:
+        """Save the model, then rebuild its compiled trees and SHAP driver index so they never disagree"""
+        filepath = super().save_model(filepath)
+        
+        # Stored as plain arrays so serving workers can memory-map and share them
+        try:
+            ensemble = CompiledTreeEnsemble.from_estimator(self.model)
+            ensemble.save(compiled_trees_path(filepath), artifact_version(filepath))
+        except ValueError as e:
+            print(f"Compiled trees not saved: {e}")
+        
+        if self.index_features is not None:
+            index_path = build_shap_index(self, filepath, self.index_features)
+            print(f"SHAP index for {len(self.index_features)} customers saved to {index_path}")
+        
+        return filepath
+    
     def prepare_features(self, data: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series]:
         """Prepare features for churn prediction"""
         
@@ -79,44 +155,7 @@ class ChurnPredictionModel(BaseModel):
                 data.loc[churn_indices, self.target_column] = 1
         
         # Select relevant features for churn prediction
-        feature_columns = [
-            # Recency features
-            "days_since_last_transaction",
-            "days_since_first_transaction",
-            "customer_lifetime_days",
-            
-            # Frequency features
-            "total_transactions",
-            "avg_transactions_per_month",
-            "unique_merchants",
-            "unique_categories",
-            
-            # Monetary features
-            "total_amount",
-            "avg_transaction_amount",
-            "std_transaction_amount",
-            "total_expenses",
-            "total_income",
-            "net_cash_flow",
-            
-            # Category spending
-            "grocery_total_spend",
-            "restaurant_total_spend",
-            "gas_total_spend",
-            "retail_total_spend",
-            "entertainment_total_spend",
-            
-            # Behavioral features
-            "payment_mode_diversity",
-            "location_diversity",
-            "merchant_loyalty_score",
-            "weekend_transaction_ratio",
-            
-            # Trend features
-            "monthly_spending_trend",
-            "monthly_frequency_trend",
-            "spending_volatility",
-        ]
+        feature_columns = CHURN_FEATURE_COLUMNS
         
         # Select available features
         available_features = [col for col in feature_columns if col in data.columns]
@@ -134,6 +173,7 @@ class ChurnPredictionModel(BaseModel):
         categorical_columns = X.select_dtypes(include=['object']).columns
         for col in categorical_columns:
             if col not in self.label_encoders:
+                from sklearn.preprocessing import LabelEncoder
                 self.label_encoders[col] = LabelEncoder()
                 X[col] = self.label_encoders[col].fit_transform(X[col].astype(str))
             else:
@@ -174,13 +214,19 @@ class ChurnPredictionModel(BaseModel):
         results = pd.DataFrame({
             "customer_id": customer_data.get("customer_id", range(len(customer_data))),
             "churn_probability": proba[:, 1],
-            "churn_prediction": proba[:, 1] > 0.5,
-            "risk_level": self._categorize_risk(proba[:, 1])
+            "churn_prediction": self.classify(proba[:, 1]),
+            "risk_level": self.categorize_risk(proba[:, 1])
         })
         
         return results
     
-    def _categorize_risk(self, probabilities: np.ndarray) -> np.ndarray:
+    @staticmethod
+    def classify(probabilities: np.ndarray) -> np.ndarray:
+        """Churn decisions at ``settings.churn_threshold``"""
+        return np.asarray(probabilities) > settings.churn_threshold
+    
+    @staticmethod
+    def categorize_risk(probabilities: np.ndarray) -> np.ndarray:
         """Categorize churn risk into levels"""
         risk_levels = np.full(len(probabilities), "Low", dtype=object)
         risk_levels[probabilities >= 0.3] = "Medium"
@@ -220,7 +266,7 @@ def main():
     
     try:
         # Load customer features
-        customer_features = pd.read_csv("data/processed/customer_features.csv")
+        customer_features = TableStorage("data").read("customer_features")
         print(f"Loaded customer features: {customer_features.shape}")
         
         # Initialize and train model
@@ -231,8 +277,9 @@ def main():
         for metric, value in metrics.items():
             print(f"{metric}: {value:.3f}")
         
-        # Save model
-        churn_model.save_model()
+        # Save the model as a new registry version (one save_model call) for the API to hot-swap
+        manifest = ModelRegistry().register(churn_model)
+        print(f"Registered {manifest['model_name']} {manifest['version']} as the active version")
         
         # Test predictions
         sample_customers = customer_features.head(10)
@@ -247,7 +294,7 @@ def main():
             print(f"{key}: {value}")
         
         print("\nChurn prediction model trained successfully!")
-        
+    
     except FileNotFoundError:
         print("Please run feature_engineering.py first to create customer features")
     except Exception as e:
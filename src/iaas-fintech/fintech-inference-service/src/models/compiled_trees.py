@@ -0,0 +1,247 @@
+"""
+Tree ensembles flattened into NumPy arrays for fast batch scoring
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, List, Optional, Union
+
+import joblib
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.base_model import artifact_version, atomic_dump
+
+
+def compiled_trees_path(model_file: Union[str, Path]) -> Path:
+    """Where the compiled trees for a model artifact are stored: alongside it"""
+    model_file = Path(model_file)
+    return model_file.with_name(f"{model_file.stem}_trees.joblib")
+
+
+def _tree_depth(left: np.ndarray, right: np.ndarray) -> int:
+    """Longest root-to-leaf path of one tree given its child arrays (-1 for none)"""
+    depth = 0
+    stack = [(0, 0)]
+    while stack:
+        node, level = stack.pop()
+        if left[node] < 0:
+            depth = max(depth, level)
+        else:
+            stack.append((left[node], level + 1))
+            stack.append((right[node], level + 1))
+    return depth
+
+
+class CompiledTreeEnsemble:
+    """A binary tree-ensemble classifier as contiguous node arrays
+    
+    Every tree's nodes are concatenated into one set of arrays (split feature,
+    threshold, left/right/missing child and leaf value). Leaves point back at
+    themselves, so a batch is scored by advancing every (row, tree) pair one
+    level per step for ``max_depth`` vectorized steps, then summing leaves.
+    
+    Use ``from_estimator`` to compile a fitted XGBClassifier or
+    RandomForestClassifier. Saved ensembles are plain arrays, so ``load``
+    with ``mmap_mode="r"`` shares them between worker processes.
+    """
+    
+    ARRAYS = ("roots", "features", "thresholds", "children", "missing", "values")
+    
+    def __init__(self, roots: np.ndarray, features: np.ndarray, thresholds: np.ndarray,
+                 children: np.ndarray, missing: np.ndarray, values: np.ndarray,
+                 max_depth: int, strict: bool, link: str, base_margin: float = 0.0):
+        """Initialize from flattened arrays; use ``from_estimator`` or ``load``"""
+        self.roots = roots
+        self.features = features
+        self.thresholds = thresholds
+        self.children = children  # interleaved [left, right] per node so one take picks the next node
+        self.missing = missing
+        self.values = values
+        self.max_depth = max_depth
+        self.strict = strict  # XGBoost goes left on x < t, scikit-learn on x <= t
+        self.link = link  # "logistic" sums margins, "mean" averages leaf probabilities
+        self.base_margin = base_margin
+    
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+    
+    @property
+    def n_nodes(self) -> int:
+        return len(self.features)
+    
+    @classmethod
+    def from_estimator(cls, estimator: Any) -> "CompiledTreeEnsemble":
+        """Compile a fitted XGBClassifier or RandomForestClassifier"""
+        if hasattr(estimator, "get_booster"):
+            return cls.from_xgboost(estimator)
+        if hasattr(estimator, "estimators_") and hasattr(estimator.estimators_[0], "tree_"):
+            return cls.from_random_forest(estimator)
+        raise ValueError(f"Cannot compile estimator of type {type(estimator).__name__}")
+    
+    @classmethod
+    def from_xgboost(cls, estimator: Any) -> "CompiledTreeEnsemble":
+        """Compile a binary:logistic gbtree XGBClassifier from its JSON model dump"""
+        learner = json.loads(estimator.get_booster().save_raw("json"))["learner"]
+        
+        objective = learner["objective"]["name"]
+        if objective != "binary:logistic":
+            raise ValueError(f"Only binary:logistic models can be compiled, not {objective}")
+        if learner["gradient_booster"]["name"] != "gbtree":
+            raise ValueError("Only gbtree boosters can be compiled")
+        
+        booster = learner["gradient_booster"]["model"]
+        trees = booster["trees"]
+        
+        # predict_proba stops at the early-stopping iteration when there is one
+        best_iteration = getattr(estimator, "best_iteration", None)
+        if best_iteration is not None:
+            trees = trees[:booster["iteration_indptr"][best_iteration + 1]]
+        
+        base_score = float(str(learner["learner_model_param"]["base_score"]).strip("[]"))
+        
+        arrays = []
+        for tree in trees:
+            if any(split_type != 0 for split_type in tree["split_type"]):
+                raise ValueError("Categorical splits cannot be compiled")
+            
+            left = np.asarray(tree["left_children"])
+            right = np.asarray(tree["right_children"])
+            default_left = np.asarray(tree["default_left"], dtype=bool)
+            arrays.append((
+                left, right, np.where(default_left, left, right),
+                np.asarray(tree["split_indices"]), np.asarray(tree["split_conditions"], dtype=np.float32)
+            ))
+        
+        return cls._flatten(arrays, strict=True, link="logistic",
+                            base_margin=float(np.log(base_score / (1 - base_score))))
+    
+    @classmethod
+    def from_random_forest(cls, estimator: Any) -> "CompiledTreeEnsemble":
+        """Compile a binary RandomForestClassifier from its fitted ``tree_`` arrays"""
+        if len(estimator.classes_) != 2:
+            raise ValueError("Only binary classifiers can be compiled")
+        
+        arrays = []
+        for tree in (member.tree_ for member in estimator.estimators_):
+            left, right = tree.children_left, tree.children_right
+            missing_left = getattr(tree, "missing_go_to_left", np.zeros(tree.node_count, dtype=bool))
+            
+            # Leaves hold class counts or fractions; scoring uses the positive-class share
+            counts = tree.value[:, 0, :]
+            leaf_values = counts[:, 1] / counts.sum(axis=1)
+            
+            thresholds = np.where(left < 0, leaf_values, tree.threshold)
+            arrays.append((left, right, np.where(missing_left.astype(bool), left, right), tree.feature, thresholds))
+        
+        return cls._flatten(arrays, strict=False, link="mean")
+    
+    @classmethod
+    def _flatten(cls, arrays: List, strict: bool, link: str, base_margin: float = 0.0) -> "CompiledTreeEnsemble":
+        """Concatenate per-tree (left, right, missing, feature, threshold-or-leaf) arrays
+        
+        For leaves the threshold slot carries the leaf value, as in the
+        XGBoost model format.
+        """
+        sizes = [len(tree[0]) for tree in arrays]
+        offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64)
+        
+        parts = {name: [] for name in ("features", "thresholds", "left", "right", "missing", "values")}
+        max_depth = 0
+        
+        for offset, (left, right, missing, feature, threshold) in zip(offsets, arrays):
+            is_leaf = left < 0
+            own = offset + np.arange(len(left))
+            
+            # Leaves loop back to themselves and read column 0 harmlessly
+            parts["left"].append(np.where(is_leaf, own, offset + left))
+            parts["right"].append(np.where(is_leaf, own, offset + right))
+            parts["missing"].append(np.where(is_leaf, own, offset + missing))
+            parts["features"].append(np.where(is_leaf, 0, feature))
+            parts["thresholds"].append(np.where(is_leaf, 0.0, np.asarray(threshold, dtype=np.float64)))
+            parts["values"].append(np.where(is_leaf, np.asarray(threshold, dtype=np.float64), 0.0))
+            max_depth = max(max_depth, _tree_depth(left, right))
+        
+        flat = {name: np.concatenate(values) for name, values in parts.items()}
+        return cls(
+            roots=offsets.astype(np.intp),
+            features=flat["features"].astype(np.intp),
+            thresholds=flat["thresholds"],
+            children=np.stack([flat["left"], flat["right"]], axis=1).ravel().astype(np.intp),
+            missing=flat["missing"].astype(np.intp),
+            values=flat["values"],
+            max_depth=max_depth,
+            strict=strict,
+            link=link,
+            base_margin=base_margin
+        )
+    
+    def save(self, filepath: Union[str, Path], model_version: str) -> str:
+        """Persist the arrays uncompressed, tagged with the artifact they were compiled from"""
+        atomic_dump({
+            "model_version": model_version,
+            "arrays": {name: getattr(self, name) for name in self.ARRAYS},
+            "max_depth": self.max_depth,
+            "strict": self.strict,
+            "link": self.link,
+            "base_margin": self.base_margin
+        }, filepath)
+        
+        return str(filepath)
+    
+    @classmethod
+    def load(cls, filepath: Union[str, Path], mmap_mode: Optional[str] = None,
+             model_version: Optional[str] = None) -> Optional["CompiledTreeEnsemble"]:
+        """Load an ensemble written by ``save``, memory-mapping its arrays with ``mmap_mode="r"``
+        
+        Returns None when ``model_version`` is given and the file was compiled
+        from another artifact.
+        """
+        data = joblib.load(filepath, mmap_mode=mmap_mode)
+        if model_version is not None and data["model_version"] != model_version:
+            return None
+        
+        return cls(**data["arrays"], max_depth=data["max_depth"], strict=data["strict"],
+                   link=data["link"], base_margin=data["base_margin"])
+    
+    @classmethod
+    def load_for(cls, model_file: Union[str, Path],
+                 mmap_mode: Optional[str] = None) -> Optional["CompiledTreeEnsemble"]:
+        """The compiled trees stored alongside a model artifact, if compiled from that exact artifact"""
+        path = compiled_trees_path(model_file)
+        if not path.exists():
+            return None
+        return cls.load(path, mmap_mode=mmap_mode, model_version=artifact_version(model_file))
+    
+    def leaf_values(self, X: np.ndarray) -> np.ndarray:
+        """An (n_rows, n_trees) array of the leaf value each row reaches in each tree"""
+        # Both libraries compare float32 inputs, so round the same way first
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        n_rows, n_columns = X.shape
+        flat = X.ravel()
+        row_offsets = (np.arange(n_rows, dtype=np.intp) * n_columns)[:, None]
+        nodes = np.repeat(self.roots[None, :], n_rows, axis=0)
+        has_missing = np.isnan(flat).any()
+        
+        for _ in range(self.max_depth):
+            values = flat.take(row_offsets + self.features.take(nodes))
+            thresholds = self.thresholds.take(nodes)
+            go_right = values >= thresholds if self.strict else values > thresholds
+            children = self.children.take(2 * nodes + go_right)
+            if has_missing:
+                children = np.where(np.isnan(values), self.missing.take(nodes), children)
+            nodes = children
+        
+        return self.values.take(nodes)
+    
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Positive-class probabilities for a feature matrix in trained column order"""
+        leaves = self.leaf_values(X)
+        
+        if self.link == "logistic":
+            return 1.0 / (1.0 + np.exp(-(leaves.sum(axis=1) + self.base_margin)))
+        return leaves.mean(axis=1)
@@ -0,0 +1,171 @@
+"""
+File-based model registry: versioned artifacts, manifests and an active pointer
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.base_model import BaseModel, artifact_version
+from utils.config import settings
+
+ARTIFACT_FILE = "model.joblib"
+MANIFEST_FILE = "manifest.json"
+ACTIVE_FILE = "ACTIVE"
+
+
+def read_manifest(model_file: Union[str, Path]) -> Optional[Dict]:
+    """The manifest stored next to a registry artifact, or None for a standalone file"""
+    path = Path(model_file).with_name(MANIFEST_FILE)
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+class ModelRegistry:
+    """Versioned model artifacts under ``root``
+    
+    Each registered model gets an immutable version directory holding the
+    artifact and a manifest of its metrics and feature columns; an ACTIVE
+    file names the version to serve::
+        
+        <root>/<model_name>/v0001/model.joblib
+        <root>/<model_name>/v0001/manifest.json
+        <root>/<model_name>/ACTIVE
+    
+    Versions are written to a temporary directory and renamed into place, and
+    the pointer is replaced atomically, so a reader sees either the old or the
+    new version and never a partial write.
+    """
+    
+    def __init__(self, root: Union[str, Path, None] = None):
+        """Initialize the registry; defaults to ``settings.model_path``"""
+        self.root = Path(root if root is not None else settings.model_path)
+    
+    def model_dir(self, model_name: str) -> Path:
+        return self.root / model_name
+    
+    def versions(self, model_name: str) -> List[Dict]:
+        """Manifests of every registered version, oldest first"""
+        model_dir = self.model_dir(model_name)
+        if not model_dir.exists():
+            return []
+        
+        manifests = [read_manifest(path / ARTIFACT_FILE) for path in sorted(model_dir.glob("v*")) if path.is_dir()]
+        return [manifest for manifest in manifests if manifest is not None]
+    
+    def manifest(self, model_name: str, version: Optional[str] = None) -> Optional[Dict]:
+        """A version's manifest; the active version when ``version`` is None"""
+        artifact = self.artifact_path(model_name, version)
+        return read_manifest(artifact) if artifact is not None else None
+    
+    def active_version(self, model_name: str) -> Optional[str]:
+        """The version named by the ACTIVE pointer, if any"""
+        pointer = self.model_dir(model_name) / ACTIVE_FILE
+        if not pointer.exists():
+            return None
+        return pointer.read_text().strip() or None
+    
+    def artifact_path(self, model_name: str, version: Optional[str] = None) -> Optional[Path]:
+        """Artifact file of a version; the active version when ``version`` is None"""
+        version = version or self.active_version(model_name)
+        if version is None:
+            return None
+        
+        path = self.model_dir(model_name) / version / ARTIFACT_FILE
+        return path if path.exists() else None
+    
+    def register(self, model: BaseModel, activate: bool = True) -> Dict:
+        """Save a trained model as a new version and optionally make it active"""
+        model_dir = self.model_dir(model.model_name)
+        model_dir.mkdir(parents=True, exist_ok=True)
+        
+        existing = [int(path.name[1:]) for path in model_dir.glob("v*") if path.name[1:].isdigit()]
+        version = f"v{max(existing, default=0) + 1:04d}"
+        
+        # Build the version off to the side, then publish it with one rename
+        staging = model_dir / f".{version}.{os.getpid()}.tmp"
+        staging.mkdir()
+        try:
+            artifact = staging / ARTIFACT_FILE
+            model.save_model(str(artifact))
+            
+            manifest = {
+                "model_name": model.model_name,
+                "version": version,
+                "created_at": datetime.now().isoformat(),
+                "artifact": ARTIFACT_FILE,
+                "target_column": model.target_column,
+                "feature_columns": list(model.feature_columns),
+                "training_metrics": {name: float(value) for name, value in model.training_metrics.items()}
+            }
+            (staging / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2))
+            
+            staging.rename(model_dir / version)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        
+        if activate:
+            self.activate(model.model_name, version)
+        
+        return manifest
+    
+    def activate(self, model_name: str, version: str) -> None:
+        """Point ACTIVE at an existing version"""
+        if self.artifact_path(model_name, version) is None:
+            raise ValueError(f"Unknown version {version} of {model_name}")
+        
+        pointer = self.model_dir(model_name) / ACTIVE_FILE
+        staging = pointer.with_name(f".{ACTIVE_FILE}.{os.getpid()}.tmp")
+        staging.write_text(version)
+        os.replace(staging, pointer)
+    
+    def status(self, model_name: str) -> Dict:
+        """Registered versions and the active one, for status endpoints"""
+        active = self.active_version(model_name)
+        artifact = self.artifact_path(model_name)
+        return {
+            "active_version": active,
+            "active_artifact": artifact_version(artifact) if artifact is not None else None,
+            "versions": [manifest["version"] for manifest in self.versions(model_name)]
+        }
+
+
+def main():
+    """List registered versions of a model or activate one"""
+    parser = argparse.ArgumentParser(description="Manage versioned model artifacts")
+    parser.add_argument("model_name", nargs="?", default="churn_prediction")
+    parser.add_argument("--activate", metavar="VERSION", help="Make VERSION the one served")
+    args = parser.parse_args()
+    
+    # Change to project root directory for correct relative paths
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    project_root = os.path.join(script_dir, '..', '..')
+    os.chdir(project_root)
+    
+    registry = ModelRegistry()
+    try:
+        if args.activate:
+            registry.activate(args.model_name, args.activate)
+            print(f"{args.model_name} {args.activate} is now active; POST /models/reload to serve it")
+        
+        active = registry.active_version(args.model_name)
+        for manifest in registry.versions(args.model_name):
+            marker = "*" if manifest["version"] == active else " "
+            metrics = ", ".join(f"{name}={value:.3f}" for name, value in manifest["training_metrics"].items())
+            print(f"{marker} {manifest['version']}  {manifest['created_at']}  {metrics}")
+    
+    except ValueError as e:
+        print(f"Error: {e}")
+
+
+if __name__ == "__main__":
+    main()
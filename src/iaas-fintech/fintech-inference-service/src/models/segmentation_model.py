@@ -0,0 +1,322 @@
+"""
+Customer segmentation model: MiniBatchKMeans clusters behind a precomputed centroid table
+"""
+
+import pandas as pd
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+import joblib
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.base_model import BaseModel, atomic_dump
+from models.registry import ModelRegistry
+from data.storage import TableStorage
+from utils.config import settings
+
+
+# Customer features that describe behavior rather than churn risk
+SEGMENT_FEATURE_COLUMNS = [
+    "days_since_last_transaction",
+    "customer_lifetime_days",
+    "total_transactions",
+    "avg_transactions_per_month",
+    "unique_merchants",
+    "unique_categories",
+    "avg_transaction_amount",
+    "total_expenses",
+    "total_income",
+    "merchant_loyalty_score",
+    "weekend_transaction_ratio",
+    "spending_volatility",
+]
+
+# Each name goes to the unnamed cluster scoring highest on (sign * profile mean of feature);
+# expenses are negative, so the biggest spenders have the lowest total_expenses
+SEGMENT_NAMING = [
+    ("At Risk", "days_since_last_transaction", 1),
+    ("New Customer", "customer_lifetime_days", -1),
+    ("High Value", "total_expenses", -1),
+    ("Loyal", "total_transactions", 1),
+    ("Growth Potential", None, 0),
+]
+
+
+def segment_sums(labels: np.ndarray, X: np.ndarray, n_segments: int) -> np.ndarray:
+    """Per-segment column sums of ``X``, (n_segments, n_features)"""
+    return np.column_stack([np.bincount(labels, weights=X[:, j], minlength=n_segments) for j in range(X.shape[1])])
+
+
+def signed_log(X: np.ndarray) -> np.ndarray:
+    """log1p that keeps the sign, so heavy-tailed amounts and counts cluster on a comparable scale"""
+    return np.copysign(np.log1p(np.abs(X)), X)
+
+
+class CentroidIndex:
+    """Cluster centroids in scaled feature space, precomputed for assignment
+    
+    Assigning a batch is one matrix product: squared distances are
+    ``|z|^2 - 2 z.c + |c|^2`` with the centroid norms computed once. All
+    state is plain arrays, which ``mmap_mode="r"`` loads shared.
+    """
+    
+    def __init__(self, center: np.ndarray, scale: np.ndarray, centroids: np.ndarray):
+        self.center = center
+        self.scale = scale
+        self.centroids = centroids
+        self.centroid_norms = np.einsum("ij,ij->i", centroids, centroids)
+    
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        """Raw features in trained column order -> the space the centroids live in"""
+        return (signed_log(np.asarray(X, dtype=float)) - self.center) / self.scale
+    
+    def assign(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Nearest segment per row and a confidence from the two nearest distances
+        
+        Confidence is ``d2 / (d1 + d2)``: 1 on a centroid, 0.5 halfway
+        between the two nearest. ``|z|^2`` does not change which centroid is
+        nearest, so it is only added to the two distances that are kept.
+        """
+        Z = self.transform(X)
+        partial = self.centroid_norms - 2 * (Z @ self.centroids.T)
+        labels = partial.argmin(axis=1)
+        if partial.shape[1] == 1:
+            return labels, np.ones(len(labels))
+        
+        nearest = np.partition(partial, 1, axis=1)[:, :2] + np.einsum("ij,ij->i", Z, Z)[:, None]
+        d1, d2 = np.sqrt(np.maximum(nearest, 0)).T
+        total = d1 + d2
+        confidence = np.divide(d2, total, out=np.full(len(total), 0.5), where=total > 0)
+        return labels, confidence
+
+
+class CustomerSegmentationModel(BaseModel):
+    """Segments customers by behavior with MiniBatchKMeans
+    
+    Training fits on mini-batches of the scaled customer feature matrix, so
+    it scales to millions of customers. The fitted centroids are kept as a
+    CentroidIndex for assignment, together with per-segment feature sums
+    and sizes for the segment profiles. ``partial_fit`` folds new customers
+    into the centroids and profiles without retraining; the scaling stays as
+    trained so the centroids remain comparable.
+    """
+    
+    def __init__(self, model_path: str = "../data/models", n_segments: Optional[int] = None):
+        """Initialize segmentation model"""
+        super().__init__("customer_segmentation", model_path)
+        self.n_segments = n_segments or settings.n_segments
+        self.index: Optional[CentroidIndex] = None
+        self.segment_names: List[str] = []
+        self.profile_sums: Optional[np.ndarray] = None  # (n_segments, n_features) raw feature sums
+        self.counts: Optional[np.ndarray] = None
+    
+    def create_model(self):
+        """Create the MiniBatchKMeans clusterer"""
+        from sklearn.cluster import MiniBatchKMeans
+        
+        return MiniBatchKMeans(
+            n_clusters=self.n_segments,
+            batch_size=settings.segment_batch_size,
+            n_init=3,
+            random_state=settings.random_state
+        )
+    
+    def prepare_features(self, data: pd.DataFrame) -> Tuple[pd.DataFrame, Optional[pd.Series]]:
+        """Segmentation features; there is no target"""
+        columns = self.feature_columns or [col for col in SEGMENT_FEATURE_COLUMNS if col in data.columns]
+        if len(columns) == 0:
+            raise ValueError("No suitable features found for customer segmentation")
+        
+        return data.reindex(columns=columns, fill_value=0).fillna(0).astype(float), None
+    
+    def train(self, data: pd.DataFrame, test_size: float = 0.0, random_state: int = 42) -> Dict:
+        """Fit the segments on a customer feature table; unsupervised, so nothing is held out"""
+        print(f"Training {self.model_name} model...")
+        
+        self.feature_columns = None
+        X, _ = self.prepare_features(data)
+        if len(X) < self.n_segments:
+            raise ValueError(f"Need at least {self.n_segments} customers to fit {self.n_segments} segments")
+        self.feature_columns = X.columns.tolist()
+        
+        logged = signed_log(X.to_numpy())
+        scale = logged.std(axis=0)
+        scale[scale == 0] = 1.0
+        center = logged.mean(axis=0)
+        Z = (logged - center) / scale
+        
+        self.model = self.create_model()
+        self.model.fit(Z)
+        self.index = CentroidIndex(center, scale, self.model.cluster_centers_.copy())
+        
+        labels, confidence = self.index.assign(X.to_numpy())
+        self.profile_sums = segment_sums(labels, X.to_numpy(), self.n_segments)
+        self.counts = np.bincount(labels, minlength=self.n_segments).astype(float)
+        self.segment_names = self._name_segments()
+        
+        self.training_metrics = {
+            "n_customers": len(X),
+            "inertia_per_customer": float(self.model.inertia_) / len(X),
+            "mean_confidence": float(confidence.mean()),
+            "smallest_segment_share": float(self.counts.min() / self.counts.sum())
+        }
+        self.is_trained = True
+        
+        print(f"Training completed. Segment sizes: {self.counts.astype(int).tolist()}")
+        
+        return self.training_metrics
+    
+    def partial_fit(self, data: pd.DataFrame) -> np.ndarray:
+        """Update the segments with new customers and return their segment ids
+        
+        The centroid index is replaced in one assignment, so concurrent
+        ``assign`` calls see either the old centroids or the new ones.
+        """
+        if not self.is_trained:
+            raise ValueError("Model must be trained before it can be updated")
+        
+        X = self.prepare_features(data)[0].to_numpy()
+        
+        # Arrays loaded with mmap_mode="r" are read-only, and the clusterer updates its own in place
+        for name, value in vars(self.model).items():
+            if isinstance(value, np.ndarray) and not value.flags.writeable:
+                setattr(self.model, name, np.array(value))
+        self.model.partial_fit(self.index.transform(X))
+        index = CentroidIndex(self.index.center, self.index.scale, self.model.cluster_centers_.copy())
+        
+        labels, _ = index.assign(X)
+        self.profile_sums = self.profile_sums + segment_sums(labels, X, self.n_segments)
+        self.counts = self.counts + np.bincount(labels, minlength=self.n_segments)
+        self.index = index
+        return labels
+    
+    def assign(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Segment ids and confidences for a feature matrix in trained column order"""
+        if not self.is_trained:
+            raise ValueError("Model must be trained before making predictions")
+        return self.index.assign(X)
+    
+    def predict(self, data: pd.DataFrame) -> np.ndarray:
+        """Segment id per customer row"""
+        return self.assign(self.feature_matrix(data).to_numpy())[0]
+    
+    def profiles(self) -> pd.DataFrame:
+        """Segment name, size and mean raw features per segment"""
+        means = self.profile_sums / np.maximum(self.counts, 1)[:, None]
+        profiles = pd.DataFrame(means, columns=self.feature_columns)
+        profiles.insert(0, "customers", self.counts.astype(int))
+        profiles.insert(0, "segment_name", self.segment_names)
+        profiles.index.name = "segment_id"
+        return profiles
+    
+    def segment_characteristics(self) -> List[Dict]:
+        """One characteristics dict per segment, for responses"""
+        profiles = self.profiles()
+        total = max(float(self.counts.sum()), 1.0)
+        return [
+            {
+                "customers": int(row["customers"]),
+                "share": round(row["customers"] / total, 4),
+                **{name: round(float(row[name]), 2) for name in self.feature_columns}
+            }
+            for _, row in profiles.iterrows()
+        ]
+    
+    def _name_segments(self) -> List[str]:
+        """Names from SEGMENT_NAMING, claimed greedily by the most extreme remaining cluster"""
+        means = self.profile_sums / np.maximum(self.counts, 1)[:, None]
+        names = [f"Segment {segment_id}" for segment_id in range(self.n_segments)]
+        remaining = list(range(self.n_segments))
+        
+        for name, feature, sign in SEGMENT_NAMING:
+            if not remaining:
+                break
+            if feature in self.feature_columns:
+                scores = sign * means[remaining, self.feature_columns.index(feature)]
+                chosen = remaining[int(np.argmax(scores))]
+            else:
+                chosen = remaining[0]
+            names[chosen] = name
+            remaining.remove(chosen)
+        
+        return names
+    
+    def save_model(self, filepath: Optional[str] = None) -> str:
+        """Save the clusterer with its centroid table and segment profiles"""
+        if not self.is_trained:
+            raise ValueError("Model must be trained before saving")
+        
+        if filepath is None:
+            filepath = self.model_path / f"{self.model_name}_model.joblib"
+        
+        # The centroid table is stored as plain arrays so serving workers can memory-map it
+        model_data = {
+            "model": self.model,
+            "feature_columns": self.feature_columns,
+            "target_column": None,
+            "training_metrics": self.training_metrics,
+            "model_name": self.model_name,
+            "center": self.index.center,
+            "scale": self.index.scale,
+            "centroids": self.index.centroids,
+            "segment_names": self.segment_names,
+            "profile_sums": self.profile_sums,
+            "counts": self.counts
+        }
+        
+        atomic_dump(model_data, filepath)
+        print(f"Model saved to {filepath}")
+        
+        return str(filepath)
+    
+    def load_model(self, filepath: str, mmap_mode: Optional[str] = None) -> None:
+        """Load a saved segmentation model; ``mmap_mode="r"`` maps its arrays read-only"""
+        model_data = joblib.load(filepath, mmap_mode=mmap_mode)
+        
+        self.model = model_data["model"]
+        self.feature_columns = model_data["feature_columns"]
+        self.training_metrics = model_data.get("training_metrics", {})
+        self.model_name = model_data.get("model_name", self.model_name)
+        self.index = CentroidIndex(model_data["center"], model_data["scale"], model_data["centroids"])
+        self.segment_names = list(model_data["segment_names"])
+        self.profile_sums = model_data["profile_sums"]
+        self.counts = model_data["counts"]
+        self.n_segments = len(self.segment_names)
+        
+        self.is_trained = True
+        print(f"Model loaded from {filepath}")
+
+
+def main():
+    """Train the segmentation model on the stored customer features"""
+    # Change to project root directory for correct relative paths
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    project_root = os.path.join(script_dir, '..', '..')
+    os.chdir(project_root)
+    
+    try:
+        customer_features = TableStorage("data").read("customer_features")
+        print(f"Loaded customer features: {customer_features.shape}")
+        
+        segmentation_model = CustomerSegmentationModel()
+        segmentation_model.train(customer_features)
+        
+        # Save the model as a new registry version (one save_model call) for the API to hot-swap
+        manifest = ModelRegistry().register(segmentation_model)
+        print(f"Registered {manifest['model_name']} {manifest['version']} as the active version")
+        
+        print("\nSegment Profiles:")
+        print(segmentation_model.profiles().round(2).to_string())
+        
+        print("\nCustomer segmentation model trained successfully!")
+    
+    except FileNotFoundError:
+        print("Please run feature_engineering.py first to create customer features")
+    except Exception as e:
+        print(f"Error: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+Precomputed SHAP driver index over the whole customer base
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import joblib
+import numpy as np
+import pandas as pd
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.base_model import BaseModel, artifact_version, atomic_dump
+from data.storage import TableStorage
+
+
+def shap_index_path(model_file: Union[str, Path]) -> Path:
+    """Where the SHAP index for a model artifact is stored: alongside it"""
+    model_file = Path(model_file)
+    return model_file.with_name(f"{model_file.stem}_shap_index.joblib")
+
+
+class ShapIndex:
+    """Top-k SHAP drivers per customer plus global statistics, for one model version
+    
+    Each customer keeps only their k largest contributions (feature index,
+    contribution and feature value), so the index stays small enough to hold
+    in memory. Global statistics are accumulated over every customer's full
+    SHAP vector while the index is built.
+    
+    Everything per-customer is a plain NumPy array - customer ids included,
+    as fixed-width strings searched through a sorted copy - so ``load`` with
+    ``mmap_mode="r"`` maps the whole index and worker processes share it
+    through the page cache instead of each holding a copy.
+    """
+    
+    def __init__(self, model_version: str, feature_names: List[str], top_k: int, base_value: float,
+                 customer_ids: np.ndarray, top_features: np.ndarray, top_contributions: np.ndarray,
+                 top_values: np.ndarray, probabilities: np.ndarray, global_stats: Dict[str, np.ndarray],
+                 importance: Dict[str, float], built_at: datetime,
+                 sorted_ids: Optional[np.ndarray] = None, sorted_rows: Optional[np.ndarray] = None):
+        """Initialize from built arrays; use ``build`` or ``load``"""
+        self.model_version = model_version
+        self.feature_names = feature_names
+        self.top_k = top_k
+        self.base_value = base_value
+        self.customer_ids = customer_ids
+        self.top_features = top_features
+        self.top_contributions = top_contributions
+        self.top_values = top_values
+        self.probabilities = probabilities
+        self.global_stats = global_stats
+        self.importance = importance
+        self.built_at = built_at
+        
+        if sorted_rows is None:
+            # Indexes saved before ids were stored sorted
+            customer_ids = np.asarray(customer_ids, dtype=str)
+            sorted_rows = np.argsort(customer_ids, kind="stable")
+            sorted_ids = customer_ids[sorted_rows]
+        self.sorted_ids = sorted_ids
+        self.sorted_rows = sorted_rows
+    
+    def __len__(self) -> int:
+        return len(self.customer_ids)
+    
+    def __contains__(self, customer_id: str) -> bool:
+        return self._row(customer_id) is not None
+    
+    def _row(self, customer_id: str) -> Optional[int]:
+        """Row of a customer, by binary search over the sorted ids"""
+        position = int(np.searchsorted(self.sorted_ids, customer_id))
+        if position < len(self.sorted_ids) and self.sorted_ids[position] == customer_id:
+            return int(self.sorted_rows[position])
+        return None
+    
+    @classmethod
+    def build(cls, model: BaseModel, features: pd.DataFrame, model_version: str,
+              top_k: int = 10, batch_size: int = 10_000) -> "ShapIndex":
+        """Explain every row of a customer feature frame in batches of ``batch_size``"""
+        n = len(features)
+        n_features = len(model.feature_columns)
+        top_k = min(top_k, n_features)
+        
+        top_features = np.empty((n, top_k), dtype=np.int16)
+        top_contributions = np.empty((n, top_k), dtype=np.float32)
+        top_values = np.empty((n, top_k), dtype=np.float32)
+        probabilities = np.empty(n, dtype=np.float32)
+        
+        sum_abs = np.zeros(n_features)
+        total = np.zeros(n_features)
+        positive = np.zeros(n_features)
+        top_driver = np.zeros(n_features)
+        base_value = 0.0
+        
+        for start in range(0, n, batch_size):
+            X = model.feature_matrix(features.iloc[start:start + batch_size])
+            contributions, base_value = model.shap_values(X)
+            magnitudes = np.abs(contributions)
+            rows = np.arange(len(X))[:, None]
+            
+            order = np.argsort(-magnitudes, axis=1, kind="stable")[:, :top_k]
+            stop = start + len(X)
+            top_features[start:stop] = order
+            top_contributions[start:stop] = contributions[rows, order]
+            top_values[start:stop] = X.to_numpy()[rows, order]
+            probabilities[start:stop] = model.model.predict_proba(X)[:, 1]
+            
+            sum_abs += magnitudes.sum(axis=0)
+            total += contributions.sum(axis=0)
+            positive += (contributions > 0).sum(axis=0)
+            top_driver += np.bincount(order[:, 0], minlength=n_features)
+        
+        importance = model.feature_importance
+        customer_ids = features["customer_id"].astype(str).to_numpy(dtype=str)
+        sorted_rows = np.argsort(customer_ids, kind="stable")
+        
+        return cls(
+            model_version=model_version,
+            feature_names=list(model.feature_columns),
+            top_k=top_k,
+            base_value=float(base_value),
+            customer_ids=customer_ids,
+            top_features=top_features,
+            top_contributions=top_contributions,
+            top_values=top_values,
+            probabilities=probabilities,
+            global_stats={
+                "mean_abs_contribution": sum_abs / max(n, 1),
+                "mean_contribution": total / max(n, 1),
+                "increases_risk_share": positive / max(n, 1),
+                "top_driver_share": top_driver / max(n, 1)
+            },
+            importance=(dict(zip(importance["feature"], importance["importance"].astype(float)))
+                        if importance is not None else {}),
+            built_at=datetime.now(),
+            sorted_ids=customer_ids[sorted_rows],
+            sorted_rows=sorted_rows
+        )
+    
+    def lookup(self, customer_id: str, top_k: Optional[int] = None) -> Optional[Dict]:
+        """A customer's probability and largest drivers, or None if not indexed"""
+        row = self._row(customer_id)
+        if row is None:
+            return None
+        
+        k = self.top_k if top_k is None else min(top_k, self.top_k)
+        return {
+            "customer_id": customer_id,
+            "churn_probability": float(self.probabilities[row]),
+            "drivers": [
+                {
+                    "feature_name": self.feature_names[feature],
+                    "feature_value": float(value),
+                    "contribution": float(contribution)
+                }
+                for feature, contribution, value in zip(
+                    self.top_features[row, :k], self.top_contributions[row, :k], self.top_values[row, :k]
+                )
+            ]
+        }
+    
+    def global_drivers(self, top_k: Optional[int] = None) -> List[Dict]:
+        """Features ranked by mean absolute contribution across every indexed customer"""
+        stats = self.global_stats
+        order = np.argsort(-stats["mean_abs_contribution"], kind="stable")[:top_k]
+        return [
+            {"feature_name": self.feature_names[i], **{name: float(values[i]) for name, values in stats.items()}}
+            for i in order
+        ]
+    
+    def save(self, filepath: Union[str, Path]) -> str:
+        """Persist the index to disk"""
+        atomic_dump({
+            "model_version": self.model_version,
+            "feature_names": self.feature_names,
+            "top_k": self.top_k,
+            "base_value": self.base_value,
+            "customer_ids": self.customer_ids,
+            "top_features": self.top_features,
+            "top_contributions": self.top_contributions,
+            "top_values": self.top_values,
+            "probabilities": self.probabilities,
+            "global_stats": self.global_stats,
+            "importance": self.importance,
+            "built_at": self.built_at,
+            "sorted_ids": self.sorted_ids,
+            "sorted_rows": self.sorted_rows
+        }, filepath)
+        
+        return str(filepath)
+    
+    @classmethod
+    def load(cls, filepath: Union[str, Path], mmap_mode: Optional[str] = None) -> "ShapIndex":
+        """Load an index previously written by ``save``, memory-mapping its arrays with ``mmap_mode="r"``"""
+        return cls(**joblib.load(filepath, mmap_mode=mmap_mode))
+    
+    @classmethod
+    def load_for(cls, model_file: Union[str, Path], mmap_mode: Optional[str] = None) -> Optional["ShapIndex"]:
+        """The index stored alongside a model artifact, if it was built for that exact artifact"""
+        path = shap_index_path(model_file)
+        if not path.exists():
+            return None
+        
+        index = cls.load(path, mmap_mode=mmap_mode)
+        return index if index.model_version == artifact_version(model_file) else None
+
+
+def build_shap_index(model: BaseModel, model_file: Union[str, Path], features: pd.DataFrame,
+                     top_k: int = 10) -> str:
+    """Build the index for a saved model artifact and store it alongside"""
+    index = ShapIndex.build(model, features, model_version=artifact_version(model_file), top_k=top_k)
+    return index.save(shap_index_path(model_file))
+
+
+def main():
+    """Rebuild the churn SHAP index from the saved model and customer features"""
+    from models.churn_model import ChurnPredictionModel
+    from models.registry import ModelRegistry
+    
+    parser = argparse.ArgumentParser(description="Precompute top-k SHAP drivers for every customer")
+    parser.add_argument("--model-file", default=None,
+                        help="Churn model artifact; defaults to the registry's active version")
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+    
+    # Change to project root directory for correct relative paths
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    project_root = os.path.join(script_dir, '..', '..')
+    os.chdir(project_root)
+    
+    try:
+        model_file = args.model_file or ModelRegistry().artifact_path("churn_prediction")
+        if model_file is None:
+            raise FileNotFoundError("No active churn_prediction version in the model registry")
+        
+        model = ChurnPredictionModel(model_path=str(Path(model_file).parent))
+        model.load_model(str(model_file))
+        
+        features = TableStorage("data").read("customer_features", categorical=False)
+        print(f"Loaded {len(features)} customer feature rows")
+        
+        path = build_shap_index(model, model_file, features, top_k=args.top_k)
+        print(f"SHAP index for {len(features)} customers saved to {path}")
+    
+    except FileNotFoundError:
+        print("Please train the churn model and run feature_engineering.py first")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Versioned in-process cache for materialized aggregates
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+
+
+class VersionedCache:
+    """LRU cache whose entries are tied to a data version
+    
+    An entry computed against one data version is never served for another,
+    so replacing the underlying data invalidates every aggregate built on it
+    without explicit bookkeeping. Concurrent misses on the same key compute
+    the value once; they wait on one of ``lock_stripes`` fixed locks chosen
+    by the key's hash, so lock memory stays bounded however many keys pass
+    through.
+    """
+    
+    def __init__(self, max_entries: int = 256, lock_stripes: int = 64):
+        """Initialize an empty cache holding at most ``max_entries`` values"""
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._version: Optional[Hashable] = None
+        self._lock = threading.Lock()
+        self._key_locks = [threading.Lock() for _ in range(lock_stripes)]
+    
+    def get_or_compute(self, key: Hashable, version: Hashable, compute: Callable[[], Any]) -> Any:
+        """Return the cached value for ``key`` at ``version``, computing it on a miss"""
+        with self._lock:
+            self._check_version(version)
+            if key in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            key_lock = self._key_locks[hash(key) % len(self._key_locks)]
+        
+        with key_lock:
+            # Another thread may have filled the entry while we waited
+            with self._lock:
+                self._check_version(version)
+                if key in self._entries:
+                    self.hits += 1
+                    return self._entries[key]
+                self.misses += 1
+            
+            value = compute()
+            
+            with self._lock:
+                if self._version == version:
+                    self._entries[key] = value
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+            return value
+    
+    def get_many(self, keys: Iterable[Hashable], version: Hashable) -> Dict[Hashable, Any]:
+        """Cached values for whichever ``keys`` are present at ``version``
+        
+        For callers that compute their misses together in one batch and store
+        them with ``put_many``; each key looked up counts as a hit or a miss.
+        """
+        found = {}
+        with self._lock:
+            self._check_version(version)
+            for key in keys:
+                if key in self._entries:
+                    self.hits += 1
+                    self._entries.move_to_end(key)
+                    found[key] = self._entries[key]
+                else:
+                    self.misses += 1
+        return found
+    
+    def put_many(self, items: Dict[Hashable, Any], version: Hashable) -> None:
+        """Store values computed against ``version``; dropped if the version has moved on"""
+        with self._lock:
+            if self._version != version:
+                return
+            for key, value in items.items():
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def _check_version(self, version: Hashable) -> None:
+        """Drop every entry if the data version changed (caller holds the lock)"""
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+    
+    def clear(self) -> None:
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "data_version": str(self._version)
+            }
@@ -30,6 +30,7 @@ class Settings(BaseSettings):
     data_path: Path = Path("./data")
     raw_data_path: Path = Path("./data/raw")
     processed_data_path: Path = Path("./data/processed")
+    storage_format: str = "parquet"  # "parquet" or "csv"; reads use whichever file is newer
     
     # ML Model Parameters
     random_state: int = 42
@@ -49,6 +50,47 @@ class Settings(BaseSettings):
     churn_threshold: float = 0.5
     fraud_threshold: float = 0.3
     n_segments: int = 5
+    segment_batch_size: int = 4096  # MiniBatchKMeans rows per centroid update
+    
+    # Inference Serving
+    churn_micro_batching: bool = True
+    churn_fast_path: bool = True  # score NumPy rows directly instead of via prepare_features
+    churn_scorer_backend: str = "native"  # "native" or "compiled" (flattened trees; fastest for small batches)
+    model_mmap: bool = True  # memory-map artifact arrays so worker processes share them
+    model_warmup_rows: int = 32  # dummy batch scored before a loaded model starts serving
+    churn_batch_window_ms: float = 2.0
+    churn_max_batch_size: int = 256
+    inference_executor: str = "thread"  # "thread" or "process" (models preloaded per worker)
+    inference_workers: int = 4
+    inference_max_pending: int = 64
+    
+    # Streaming Fraud Scoring
+    fraud_velocity_window: int = 64  # recent timestamps kept per customer for the 7/30-day counts
+    fraud_state_max_customers: int = 1_000_000  # least recently active customers are evicted beyond this
+    fraud_rules_path: Path = Path("./config/fraud_rules.json")  # built-in rules are used when it is missing
+    fraud_rules_check_seconds: float = 5.0  # how often the rules file is checked for changes
+    fraud_replay_on_startup: bool = True  # build fraud state from the transactions table at startup
+    
+    # Batch Jobs
+    batch_jobs_db: Path = Path("./data/batch_jobs.db")  # SQLite job table with progress for resuming
+    batch_results_path: Path = Path("./data/batch_results")  # one directory of part files per job
+    batch_chunk_size: int = 50_000
+    batch_chunks_in_flight: int = 2  # chunks of one job being scored at once
+    batch_jobs_resume_on_startup: bool = True
+    
+    # Precomputed Churn Scores
+    score_table_refresh_hour: Optional[int] = 2  # local hour of the nightly full-base scoring pass; None disables it
+    score_table_max_age_hours: float = 36.0  # older stored scores are rescored live
+    score_table_check_seconds: float = 5.0  # how often a newer completed scoring pass is looked for
+    score_table_keep_runs: int = 2  # completed scoring passes whose results stay on disk
+    
+    # Analytics Cache
+    analytics_cache_entries: int = 256
+    analytics_warm_on_startup: bool = True
+    
+    # Model Explanations
+    explanation_cache_entries: int = 50_000  # one per distinct feature vector
+    explanation_top_k: int = 10
     
     # Logging
     log_level: str = "INFO"
@@ -57,13 +99,12 @@ class Settings(BaseSettings):
     class Config:
         env_file = ".env"
         case_sensitive = False
+    
+    def ensure_directories(self) -> None:
+        """Create the model and data directories; run at startup rather than on import"""
+        for path in (self.model_path, self.data_path, self.raw_data_path, self.processed_data_path):
+            path.mkdir(parents=True, exist_ok=True)
 
 
 # Global settings instance
 settings = Settings()
-
-# Create necessary directories
-settings.model_path.mkdir(parents=True, exist_ok=True)
-settings.data_path.mkdir(parents=True, exist_ok=True)
-settings.raw_data_path.mkdir(parents=True, exist_ok=True)
-settings.processed_data_path.mkdir(parents=True, exist_ok=True)
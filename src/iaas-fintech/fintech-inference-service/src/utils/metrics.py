@@ -0,0 +1,48 @@
+"""
+Lightweight in-process metrics for tuning the inference service
+"""
+
+import bisect
+import threading
+from typing import Dict, List, Sequence
+
+
+class Histogram:
+    """Fixed-bucket histogram with count, sum and max, safe to update from any thread"""
+    
+    def __init__(self, buckets: Sequence[float]):
+        """Initialize with ascending upper bounds; an overflow bucket is added"""
+        self.buckets: List[float] = sorted(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+    
+    def observe(self, value: float) -> None:
+        """Record a single observation"""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += value
+            self.max = max(self.max, value)
+    
+    def snapshot(self) -> Dict:
+        """JSON-serializable view of the histogram"""
+        with self._lock:
+            labels = [f"<={bound:g}" for bound in self.buckets] + [f">{self.buckets[-1]:g}"]
+            return {
+                "count": self.count,
+                "mean": self.total / self.count if self.count else 0.0,
+                "max": self.max,
+                "buckets": dict(zip(labels, self.counts))
+            }
+    
+    def reset(self) -> None:
+        """Clear all observations"""
+        with self._lock:
+            self.counts = [0] * (len(self.buckets) + 1)
+            self.count = 0
+            self.total = 0.0
+            self.max = 0.0
@@ -15,12 +15,14 @@ sys.path.insert(0, str(src_path))
 # Import and start the app
 if __name__ == "__main__":
     import uvicorn
-    from api.main import app
+    from utils.config import settings
     
+    # An import string lets the reloader re-import the app; the app module itself
+    # is imported by uvicorn, and models and data load in its startup phase
     uvicorn.run(
-        app,
-        host="0.0.0.0",
-        port=8000,
+        "api.main:app",
+        host=settings.api_host,
+        port=settings.api_port,
         log_level="info",
-        reload=True
+        reload=settings.debug
     )
@@ -0,0 +1,23 @@
+"""
+Fixtures shared across the test modules
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from api.serving import segment_server
+from tests.test_segmentation import train_segments
+
+
+@pytest.fixture
+def served_segments(tmp_path, monkeypatch):
+    """A trained model installed on the API's segment server"""
+    model = train_segments(tmp_path)
+    for name in ("model", "version", "characteristics"):
+        monkeypatch.setattr(segment_server, name, getattr(segment_server, name))
+    segment_server.install(model, "test")
+    return model
@@ -0,0 +1,138 @@
+"""
+Tests for the versioned analytics cache
+"""
+
+import threading
+import time
+
+import pandas as pd
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from api.routes import customers
+from data.customer_store import CustomerDataStore
+from utils.cache import VersionedCache
+from tests.test_feature_engineering import make_transactions
+
+
+class TestVersionedCache:
+    """Hit/miss accounting and version invalidation"""
+    
+    def test_hits_after_first_compute(self):
+        """A key is computed once per data version"""
+        cache = VersionedCache()
+        calls = []
+        
+        for _ in range(3):
+            value = cache.get_or_compute("key", 1, lambda: calls.append(1) or len(calls))
+        
+        assert value == 1
+        assert len(calls) == 1
+        assert cache.stats()["hits"] == 2
+        assert cache.stats()["misses"] == 1
+    
+    def test_version_change_invalidates(self):
+        """Entries computed for an old version are not served"""
+        cache = VersionedCache()
+        cache.get_or_compute("key", 1, lambda: "old")
+        
+        assert cache.get_or_compute("key", 2, lambda: "new") == "new"
+        assert cache.stats()["invalidations"] == 1
+    
+    def test_errors_are_not_cached(self):
+        """A failed computation is retried on the next lookup"""
+        cache = VersionedCache()
+        
+        def fail():
+            raise ValueError("no data")
+        
+        with pytest.raises(ValueError):
+            cache.get_or_compute("key", 1, fail)
+        assert cache.get_or_compute("key", 1, lambda: "ok") == "ok"
+    
+    def test_lru_bound(self):
+        """The least recently used entry is evicted past max_entries"""
+        cache = VersionedCache(max_entries=2)
+        for key in ("a", "b", "c"):
+            cache.get_or_compute(key, 1, lambda: key)
+        
+        assert cache.stats()["entries"] == 2
+        cache.get_or_compute("a", 1, lambda: "recomputed")
+        assert cache.stats()["misses"] == 4
+    
+    def test_concurrent_misses_compute_once(self):
+        """Threads missing on the same key share one computation"""
+        cache = VersionedCache()
+        calls = []
+        
+        def slow():
+            calls.append(1)
+            time.sleep(0.05)
+            return "value"
+        
+        threads = [threading.Thread(target=cache.get_or_compute, args=("key", 1, slow)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert len(calls) == 1
+    
+    def test_key_locks_stay_bounded(self):
+        """Distinct keys share a fixed set of locks rather than adding one each"""
+        cache = VersionedCache(max_entries=4, lock_stripes=8)
+        for key in range(1000):
+            cache.get_or_compute(key, 1, lambda: key)
+        
+        assert len(cache._key_locks) == 8
+        assert cache.stats()["entries"] == 4
+
+
+class TestCachedAnalytics:
+    """Analytics handlers reuse aggregates until the data store changes"""
+    
+    @pytest.fixture
+    def loaded_store(self, monkeypatch):
+        transactions = make_transactions()
+        store = CustomerDataStore(
+            pd.DataFrame({"customer_id": transactions["customer_id"].unique()}),
+            transactions,
+            pd.DataFrame()
+        )
+        monkeypatch.setattr(customers, "data_store", store)
+        monkeypatch.setattr(customers, "customers_df", store.customers)
+        monkeypatch.setattr(customers, "transactions_df", store.transactions)
+        monkeypatch.setattr(customers, "analytics_cache", VersionedCache())
+        return store
+    
+    def test_repeated_requests_hit_cache(self, loaded_store):
+        """Identical parameters are served from the cache"""
+        first = customers._get_transaction_analytics(30)
+        second = customers._get_transaction_analytics(30)
+        customers._get_transaction_analytics(60)
+        
+        assert second is first
+        stats = customers.analytics_cache.stats()
+        assert (stats["hits"], stats["misses"]) == (1, 2)
+    
+    def test_new_data_version_recomputes(self, loaded_store, monkeypatch):
+        """Replacing the data store invalidates cached analytics"""
+        first = customers._get_customer_analytics()
+        
+        transactions = loaded_store.transactions.iloc[:100]
+        store = CustomerDataStore(loaded_store.customers, transactions, pd.DataFrame())
+        monkeypatch.setattr(customers, "data_store", store)
+        monkeypatch.setattr(customers, "transactions_df", store.transactions)
+        
+        second = customers._get_customer_analytics()
+        
+        assert first["transactions"]["total_transactions"] == len(loaded_store.transactions)
+        assert second["transactions"]["total_transactions"] == 100
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
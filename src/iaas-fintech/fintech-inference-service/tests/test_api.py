@@ -12,7 +12,12 @@ from pathlib import Path
 # Add src to path for imports
 sys.path.append(str(Path(__file__).parent.parent / "src"))
 
+import pandas as pd
+
 from api.main import app
+from api.jobs import BatchJobStore, batch_jobs
+from api.routes import customers
+from data.customer_store import CustomerDataStore
 
 client = TestClient(app)
 
@@ -36,12 +41,16 @@ class TestHealthEndpoints:
         assert "timestamp" in data
         assert "models_loaded" in data
     
-    def test_readiness_check(self):
-        """Test readiness probe"""
-        response = client.get("/ready")
+    def test_readiness_check(self, tmp_path, monkeypatch):
+        """Test readiness probe once the startup phases have run"""
+        monkeypatch.setattr(batch_jobs, "store", BatchJobStore(tmp_path / "jobs.db"))
+        with TestClient(app) as started:
+            started.portal.call(asyncio.wait_for, app.state.startup_task, 120)
+            response = started.get("/ready")
         assert response.status_code == 200
         data = response.json()
         assert "status" in data
+        assert "phases" in data
     
     def test_liveness_check(self):
         """Test liveness probe"""
@@ -97,7 +106,7 @@ class TestInferenceEndpoints:
         assert "summary" in data
         assert len(data["predictions"]) == 2
     
-    def test_customer_segmentation(self):
+    def test_customer_segmentation(self, served_segments):
         """Test customer segmentation"""
         customer_data = {
             "customer_id": "TEST_001",
@@ -138,8 +147,12 @@ class TestInferenceEndpoints:
         assert "risk_factors" in data
         assert 0 <= data["fraud_probability"] <= 1
     
-    def test_model_explanation(self):
+    def test_model_explanation(self, monkeypatch):
         """Test model explanation endpoint"""
+        features = pd.DataFrame([{"customer_id": "TEST_001", "days_since_last_transaction": 45.0,
+                                  "total_transactions": 8.0, "avg_transaction_amount": 125.50}])
+        monkeypatch.setattr(customers, "data_store", CustomerDataStore(pd.DataFrame(), pd.DataFrame(), features))
+        
         response = client.get("/api/v1/inference/explain?customer_id=TEST_001&model_type=churn")
         assert response.status_code == 200
         
@@ -158,6 +171,46 @@ class TestInferenceEndpoints:
         assert "timestamp" in data
         assert "status" in data
 
+class TestChurnServing:
+    """Test churn endpoints against the loaded model"""
+    
+    def test_batch_matches_single_predictions(self):
+        """Vectorized batch scoring returns the same probabilities as single requests"""
+        customers = [
+            {"customer_id": f"TEST_{i:03d}", "features": {
+                "days_since_last_transaction": 10 * i,
+                "total_transactions": 100 - 9 * i,
+                "avg_transactions_per_month": 20 - 2 * i
+            }}
+            for i in range(8)
+        ]
+        
+        batch = client.post("/api/v1/inference/churn-batch", json={"customers": customers})
+        assert batch.status_code == 200
+        
+        batch_probabilities = {p["customer_id"]: p["churn_probability"] for p in batch.json()["predictions"]}
+        for customer in customers:
+            single = client.post("/api/v1/inference/churn-score", json=customer).json()
+            assert single["churn_probability"] == pytest.approx(batch_probabilities[customer["customer_id"]])
+    
+    def test_predictions_vary_with_features(self):
+        """Scores come from the model rather than a constant"""
+        batch = client.post("/api/v1/inference/churn-batch", json={"customers": [
+            {"customer_id": "ACTIVE", "features": {"days_since_last_transaction": 1, "total_transactions": 300,
+                                                   "avg_transactions_per_month": 45}},
+            {"customer_id": "DORMANT", "features": {"days_since_last_transaction": 150, "total_transactions": 3,
+                                                    "avg_transactions_per_month": 0.5}}
+        ]})
+        assert batch.status_code == 200
+        
+        probabilities = [p["churn_probability"] for p in batch.json()["predictions"]]
+        assert probabilities[0] != probabilities[1]
+    
+    def test_missing_features_rejected(self):
+        """Customers without request or stored features get a 400"""
+        response = client.post("/api/v1/inference/churn-score", json={"customer_id": "NO_FEATURES_001"})
+        assert response.status_code == 400
+
 class TestModelEndpoints:
     """Test model management endpoints"""
     
@@ -0,0 +1,144 @@
+"""
+Tests for persistent, resumable batch scoring jobs
+"""
+
+import asyncio
+import pandas as pd
+import pytest
+import sys
+from pathlib import Path
+from fastapi.testclient import TestClient
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from api.main import app
+from api.jobs import BatchJobStore, batch_jobs
+from data.storage import count_rows, iter_frame_chunks, partition_files, read_frame
+from tests.test_segmentation import make_segment_features
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def runner(tmp_path, monkeypatch):
+    """The API's job runner pointed at a temporary job table and results directory"""
+    monkeypatch.setattr(batch_jobs, "store", BatchJobStore(tmp_path / "jobs.db"))
+    monkeypatch.setattr(batch_jobs, "results_root", tmp_path / "results")
+    monkeypatch.setattr(batch_jobs, "data_root", tmp_path / "data")
+    return batch_jobs
+
+
+def write_customers(tmp_path: Path, n: int = 250, suffix: str = ".csv") -> Path:
+    path = tmp_path / f"customers{suffix}"
+    features = make_segment_features(n, seed=3)
+    if suffix == ".csv":
+        features.to_csv(path, index=False)
+    else:
+        features.to_parquet(path, index=False)
+    return path
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".parquet"])
+def test_chunked_reads_cover_the_file(tmp_path, suffix):
+    path = write_customers(tmp_path, suffix=suffix)
+    chunks = list(iter_frame_chunks(path, 100, "customer_features"))
+    
+    assert [len(chunk) for chunk in chunks] == [100, 100, 50]
+    assert count_rows(path) == 250
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), read_frame(path, "customer_features"),
+                                  check_dtype=False)
+
+
+def test_store_round_trip(tmp_path):
+    store = BatchJobStore(tmp_path / "jobs.db")
+    job = store.create({
+        "job_id": "abc", "processing_type": "churn", "data_source": "x.csv", "source_path": "x.csv",
+        "source_version": "v1", "parameters": {"chunk_size": 10}, "status": "queued",
+        "total_records": 30, "results_path": "out"
+    })
+    assert job["parameters"] == {"chunk_size": 10} and job["processed_records"] == 0
+    
+    store.update("abc", status="running", processed_records=10)
+    assert store.get("abc")["processed_records"] == 10
+    assert store.unfinished() == ["abc"]
+    store.update("abc", status="completed")
+    assert store.unfinished() == []
+    assert store.get("missing") is None
+
+
+def test_segment_job_writes_one_part_per_chunk(tmp_path, runner, served_segments):
+    path = write_customers(tmp_path)
+    job = runner.submit("segment", str(path), {"chunk_size": 100})
+    assert job["status"] == "queued" and job["total_records"] == 250
+    
+    job = asyncio.run(runner.run(job["job_id"]))
+    assert job["status"] == "completed", job["error"]
+    assert job["processed_records"] == 250 and job["processed_chunks"] == 3
+    
+    parts = partition_files(job["results_path"])
+    assert len(parts) == 3
+    results = pd.concat([read_frame(part) for part in parts], ignore_index=True)
+    assert results["customer_id"].tolist() == make_segment_features(250, seed=3)["customer_id"].tolist()
+    assert set(results["segment_name"]) <= set(served_segments.segment_names)
+
+
+def test_interrupted_job_resumes_from_written_parts(tmp_path, runner, served_segments, monkeypatch):
+    path = write_customers(tmp_path)
+    job = runner.submit("segment", str(path), {"chunk_size": 100})
+    asyncio.run(runner.run(job["job_id"]))
+    
+    # Simulate a crash partway: the last part never made it to disk, one was mid-write
+    parts = partition_files(job["results_path"])
+    parts[-1].rename(parts[-1].with_name(f".{parts[-1].name}"))
+    runner.store.update(job["job_id"], status="running", processed_records=0)
+    
+    scored = []
+    original = runner.score
+    
+    async def counting_score(processing_type, chunk):
+        scored.append(len(chunk))
+        return await original(processing_type, chunk)
+    
+    monkeypatch.setattr(runner, "score", counting_score)
+    
+    async def resume():
+        assert await runner.resume_pending() == 1
+        return await runner.tasks[job["job_id"]]
+    
+    job = asyncio.run(resume())
+    assert scored == [50]
+    assert job["status"] == "completed" and job["processed_records"] == 250
+    assert not list(Path(job["results_path"]).glob(".part-*"))
+
+
+def test_changed_source_fails_the_job(tmp_path, runner, served_segments):
+    path = write_customers(tmp_path)
+    job = runner.submit("segment", str(path), {"chunk_size": 100})
+    write_customers(tmp_path, n=10)
+    
+    job = asyncio.run(runner.run(job["job_id"]))
+    assert job["status"] == "failed" and "changed" in job["error"]
+
+
+def test_batch_process_endpoints(tmp_path, runner, served_segments):
+    path = write_customers(tmp_path)
+    response = client.post("/api/v1/inference/batch-process", json={
+        "data_source": str(path), "processing_type": "segment", "parameters": {"chunk_size": 100}
+    })
+    assert response.status_code == 200
+    job_id = response.json()["job_id"]
+    assert response.json()["total_records"] == 250
+    
+    # The test client runs background tasks before returning
+    status = client.get(f"/api/v1/inference/batch-process/{job_id}")
+    assert status.status_code == 200
+    assert status.json()["status"] == "completed"
+    assert status.json()["processed_records"] == 250
+    assert status.json()["estimated_completion"] is not None
+    
+    assert client.get("/api/v1/inference/batch-process/nope").status_code == 404
+    unknown_type = client.post("/api/v1/inference/batch-process", json={"data_source": str(path), "processing_type": "x"})
+    assert unknown_type.status_code == 400
+    missing = client.post("/api/v1/inference/batch-process", json={"data_source": "customer_features", "processing_type": "churn"})
+    assert missing.status_code == 404
@@ -0,0 +1,68 @@
+"""
+Tests for the inference micro-batcher
+"""
+
+import asyncio
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from api.batching import MicroBatcher
+
+
+class TestMicroBatcher:
+    """Test request coalescing and result routing"""
+    
+    def test_concurrent_requests_share_one_call(self):
+        """Requests inside the window are scored together and get their own results"""
+        calls = []
+        
+        def score(items):
+            calls.append(list(items))
+            return [item * 2 for item in items]
+        
+        batcher = MicroBatcher(score, max_batch_size=100, max_wait_ms=5)
+        
+        async def run():
+            return await asyncio.gather(*(batcher.submit(i) for i in range(10)))
+        
+        assert asyncio.run(run()) == [i * 2 for i in range(10)]
+        assert calls == [list(range(10))]
+        assert batcher.stats()["batch_size"]["count"] == 1
+        assert batcher.stats()["queue_wait_ms"]["count"] == 10
+    
+    def test_max_batch_size_flushes_early(self):
+        """A full batch is scored without waiting for the window"""
+        calls = []
+        
+        def score(items):
+            calls.append(len(items))
+            return items
+        
+        batcher = MicroBatcher(score, max_batch_size=4, max_wait_ms=1000)
+        
+        async def run():
+            return await asyncio.wait_for(asyncio.gather(*(batcher.submit(i) for i in range(8))), timeout=0.5)
+        
+        assert asyncio.run(run()) == list(range(8))
+        assert calls == [4, 4]
+    
+    def test_scoring_error_reaches_every_caller(self):
+        """A failed batch raises in each waiting request"""
+        def score(items):
+            raise RuntimeError("model exploded")
+        
+        batcher = MicroBatcher(score, max_wait_ms=1)
+        
+        async def run():
+            return await asyncio.gather(*(batcher.submit(i) for i in range(3)), return_exceptions=True)
+        
+        results = asyncio.run(run())
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
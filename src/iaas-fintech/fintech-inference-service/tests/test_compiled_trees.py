@@ -0,0 +1,136 @@
+"""
+Tests for the compiled tree-ensemble scorer
+"""
+
+import contextlib
+import io
+
+import numpy as np
+import pytest
+import sys
+from pathlib import Path
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from xgboost import XGBClassifier
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from api.schemas.models import CustomerInput
+from api.serving import ChurnModelServer
+from models.compiled_trees import CompiledTreeEnsemble, compiled_trees_path
+from models.churn_model import CHURN_FEATURE_COLUMNS
+
+
+def make_training_data(n: int = 400, n_features: int = 8, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, n_features))
+    y = (X[:, 0] + 0.5 * X[:, 1] - X[:, 2] * X[:, 3] > 0).astype(int)
+    return X, y
+
+
+@pytest.fixture(scope="module")
+def churn_server():
+    """The checked-in churn model, loaded natively and compiled"""
+    native = ChurnModelServer(scorer_backend="native")
+    compiled = ChurnModelServer(scorer_backend="compiled")
+    with contextlib.redirect_stdout(io.StringIO()):
+        native.ensure_loaded()
+        compiled.ensure_loaded()
+    return native, compiled
+
+
+class TestCompiledTreeEnsemble:
+    """Compiled scores against each library's own predict_proba"""
+    
+    def test_xgboost_parity(self):
+        X, y = make_training_data()
+        model = XGBClassifier(n_estimators=30, max_depth=4, learning_rate=0.3).fit(X, y)
+        ensemble = CompiledTreeEnsemble.from_estimator(model)
+        
+        X_new = np.random.default_rng(1).normal(size=(500, X.shape[1]))
+        assert ensemble.n_trees == 30
+        np.testing.assert_allclose(ensemble.predict_proba(X_new), model.predict_proba(X_new)[:, 1], atol=1e-6)
+    
+    def test_xgboost_missing_values_follow_default_direction(self):
+        X, y = make_training_data()
+        X[::7, 0] = np.nan
+        model = XGBClassifier(n_estimators=20, max_depth=3).fit(X, y)
+        ensemble = CompiledTreeEnsemble.from_estimator(model)
+        
+        X_new = np.random.default_rng(2).normal(size=(300, X.shape[1]))
+        X_new[np.random.default_rng(3).random(X_new.shape) < 0.3] = np.nan
+        np.testing.assert_allclose(ensemble.predict_proba(X_new), model.predict_proba(X_new)[:, 1], atol=1e-6)
+    
+    def test_early_stopping_uses_best_iteration(self):
+        X, y = make_training_data()
+        model = XGBClassifier(n_estimators=200, max_depth=3, learning_rate=0.5, early_stopping_rounds=3)
+        model.fit(X[:300], y[:300], eval_set=[(X[300:], y[300:])], verbose=False)
+        ensemble = CompiledTreeEnsemble.from_estimator(model)
+        
+        assert ensemble.n_trees == model.best_iteration + 1
+        np.testing.assert_allclose(ensemble.predict_proba(X), model.predict_proba(X)[:, 1], atol=1e-6)
+    
+    def test_random_forest_parity(self):
+        X, y = make_training_data()
+        model = RandomForestClassifier(n_estimators=25, max_depth=8, random_state=0).fit(X, y)
+        ensemble = CompiledTreeEnsemble.from_estimator(model)
+        
+        X_new = np.random.default_rng(4).normal(size=(500, X.shape[1]))
+        np.testing.assert_allclose(ensemble.predict_proba(X_new), model.predict_proba(X_new)[:, 1], atol=1e-9)
+    
+    def test_unsupported_models_raise(self):
+        X, y = make_training_data()
+        with pytest.raises(ValueError):
+            CompiledTreeEnsemble.from_estimator(LogisticRegression().fit(X, y))
+        with pytest.raises(ValueError):
+            CompiledTreeEnsemble.from_estimator(XGBClassifier(n_estimators=5).fit(X, y % 2 + (X[:, 4] > 1)))
+    
+    
+    def test_saved_ensemble_memory_maps(self, tmp_path):
+        X, y = make_training_data()
+        model = XGBClassifier(n_estimators=10, max_depth=3).fit(X, y)
+        path = tmp_path / "trees.joblib"
+        CompiledTreeEnsemble.from_estimator(model).save(path, model_version="v1")
+        
+        mapped = CompiledTreeEnsemble.load(path, mmap_mode="r")
+        assert isinstance(mapped.thresholds, np.memmap)
+        np.testing.assert_allclose(mapped.predict_proba(X), model.predict_proba(X)[:, 1], atol=1e-6)
+        assert CompiledTreeEnsemble.load(path, model_version="v2") is None
+
+
+class TestCompiledServing:
+    """Selecting the compiled backend when the churn model loads"""
+    
+    def test_backend_selected_at_load(self, churn_server):
+        native, compiled = churn_server
+        assert native.scorer.backend == "booster"
+        assert compiled.scorer.backend == "compiled"
+    
+    def test_saved_trees_are_memory_mapped(self, tmp_path):
+        """Compiled trees saved with the artifact are mapped rather than recompiled"""
+        model = ChurnModelServer(scorer_backend="native")
+        with contextlib.redirect_stdout(io.StringIO()):
+            model_file = tmp_path / "churn_prediction_model.joblib"
+            model.ensure_loaded().save_model(str(model_file))
+            
+            server = ChurnModelServer(model_file=model_file, scorer_backend="compiled")
+            server.load()
+        
+        assert compiled_trees_path(model_file).exists()
+        assert isinstance(server.scorer.ensemble.children, np.memmap)
+    
+    def test_compiled_scores_match_native(self, churn_server):
+        native, compiled = churn_server
+        rng = np.random.default_rng(8)
+        customers = [
+            CustomerInput(customer_id=f"CUST_{i}", features=dict(zip(CHURN_FEATURE_COLUMNS, row.tolist())))
+            for i, row in enumerate(rng.uniform(0, 100, size=(200, len(CHURN_FEATURE_COLUMNS))))
+        ]
+        
+        expected = native.score(customers)
+        actual = compiled.score(customers)
+        
+        np.testing.assert_allclose([p.churn_probability for p in actual], [p.churn_probability for p in expected],
+                                   atol=1e-6)
+        assert [p.risk_level for p in actual] == [p.risk_level for p in expected]
@@ -0,0 +1,65 @@
+"""
+Tests for the indexed customer data store
+"""
+
+import pandas as pd
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from data.customer_store import CustomerDataStore
+from tests.test_feature_engineering import make_transactions
+
+
+@pytest.fixture(scope="module")
+def transactions():
+    return make_transactions(num_customers=30)
+
+
+@pytest.fixture(scope="module")
+def store(transactions):
+    customers = pd.DataFrame({"customer_id": transactions["customer_id"].unique()})
+    features = pd.DataFrame({"customer_id": customers["customer_id"], "total_transactions": 1})
+    return CustomerDataStore(customers, transactions, features)
+
+
+class TestCustomerDataStore:
+    """Indexed lookups agree with full-table boolean masks"""
+    
+    def test_transactions_match_mask(self, store, transactions):
+        """Point lookups return the customer's rows in date order"""
+        for customer_id in transactions["customer_id"].unique():
+            expected = transactions[transactions["customer_id"] == customer_id].sort_values("transaction_date")
+            actual = store.get_transactions(customer_id)
+            assert actual["transaction_id"].tolist() == expected["transaction_id"].tolist()
+    
+    def test_date_range_is_inclusive(self, store, transactions):
+        """Date filters keep rows with date_from <= date <= date_to"""
+        customer_id = transactions["customer_id"].iloc[0]
+        history = store.get_transactions(customer_id)
+        date_from, date_to = history["transaction_date"].iloc[1], history["transaction_date"].iloc[-2]
+        
+        actual = store.get_transactions(customer_id, date_from=date_from, date_to=date_to)
+        
+        expected = history[(history["transaction_date"] >= date_from) & (history["transaction_date"] <= date_to)]
+        assert actual["transaction_id"].tolist() == expected["transaction_id"].tolist()
+        assert len(actual) == len(history) - 2
+    
+    def test_unknown_customer(self, store):
+        """Unknown customers get no rows rather than an error"""
+        assert store.get_customer("CUST_UNKNOWN") is None
+        assert store.get_features("CUST_UNKNOWN") is None
+        assert store.get_transactions("CUST_UNKNOWN").empty
+    
+    def test_empty_store(self):
+        """A store built with no data answers lookups"""
+        store = CustomerDataStore.empty()
+        assert store.get_transactions("CUST_000001").empty
+        assert store.get_customer("CUST_000001") is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,156 @@
+"""
+Tests for the vectorized, chunked transaction data generator
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from data.data_generator import FRAUD_RATE, TransactionDataGenerator
+from data.storage import TableStorage, partition_files
+
+END_DATE = "2025-01-01"
+
+
+def generate(random_state=42, **kwargs):
+    params = {"num_customers": 250, "num_months": 3, "chunk_customers": 100, "end_date": END_DATE, **kwargs}
+    return list(TransactionDataGenerator(random_state=random_state).iter_chunks(**params))
+
+
+class TestVectorizedGenerator:
+    """Block generation is reproducible and shaped like the loop's output"""
+    
+    def test_reproducible(self):
+        """The same random_state yields identical blocks"""
+        for (customers_a, transactions_a), (customers_b, transactions_b) in zip(generate(), generate()):
+            pd.testing.assert_frame_equal(customers_a, customers_b)
+            pd.testing.assert_frame_equal(transactions_a, transactions_b)
+    
+    def test_random_state_changes_output(self):
+        assert not generate(random_state=1)[0][1]["amount"].equals(generate(random_state=2)[0][1]["amount"])
+    
+    def test_blocks(self):
+        """Blocks cover every customer once with date-sorted transactions"""
+        blocks = generate()
+        customers = pd.concat([c for c, _ in blocks])
+        transactions = pd.concat([t for _, t in blocks])
+        
+        assert [len(c) for c, _ in blocks] == [100, 100, 50]
+        assert customers["customer_id"].is_unique
+        assert set(transactions["customer_id"]) <= set(customers["customer_id"])
+        assert transactions["transaction_id"].is_unique
+        assert all(t["transaction_date"].is_monotonic_increasing for _, t in blocks)
+        assert transactions["transaction_date"].max() < pd.Timestamp(END_DATE)
+    
+    def test_exact_fraud_rate_per_block(self):
+        """Each block marks exactly FRAUD_RATE of its transactions as fraud"""
+        for _, transactions in generate():
+            assert transactions["is_fraud"].sum() == int(len(transactions) * FRAUD_RATE)
+    
+    def test_matches_loop_schema(self):
+        """Columns match the per-transaction loop"""
+        loop_df, loop_customers = TransactionDataGenerator().generate_dataset(num_customers=5, num_months=1)
+        vectorized_df, vectorized_customers = TransactionDataGenerator().generate_dataset(
+            num_customers=5, num_months=1, vectorized=True
+        )
+        
+        assert list(vectorized_df.columns) == list(loop_df.columns)
+        assert list(vectorized_customers.columns) == list(loop_customers.columns)
+        assert vectorized_df["transaction_date"].is_monotonic_increasing
+        # Amount signs follow the category, as in generate_transaction
+        normal = vectorized_df[~vectorized_df["is_fraud"]]
+        assert (normal.loc[normal["category"] == "income", "amount"] > 0).all()
+        assert (normal.loc[normal["category"] != "income", "amount"] < 0).all()
+    
+    @pytest.mark.parametrize("file_format", ["parquet", "csv"])
+    def test_write_dataset_streams_blocks(self, tmp_path, file_format):
+        """Streamed output equals the concatenated blocks"""
+        storage = TableStorage(tmp_path, format=file_format)
+        summary = TransactionDataGenerator().write_dataset(
+            str(storage.path("transactions")), num_customers=250, num_months=3,
+            chunk_customers=100, end_date=END_DATE
+        )
+        
+        expected = pd.concat([t for _, t in generate()], ignore_index=True)
+        written = storage.read("transactions")
+        
+        assert summary["num_customers"] == len(storage.read("customers")) == 250
+        assert summary["num_transactions"] == len(written) == len(expected)
+        assert written["transaction_id"].tolist() == expected["transaction_id"].tolist()
+        pd.testing.assert_series_equal(written["amount"], expected["amount"])
+
+
+
+class TestShardedGenerator:
+    """Partitioned output is independent of the worker count"""
+    
+    def write(self, root, workers, file_format="parquet"):
+        return TransactionDataGenerator().write_partitioned_dataset(
+            str(root / "raw"), num_customers=250, num_months=3, shard_customers=100,
+            workers=workers, end_date=END_DATE, file_format=file_format
+        )
+    
+    def test_independent_of_workers(self, tmp_path):
+        """One worker and three workers write identical partitions"""
+        self.write(tmp_path / "one", workers=1)
+        self.write(tmp_path / "three", workers=3)
+        
+        for table in ("transactions", "customers"):
+            pd.testing.assert_frame_equal(
+                TableStorage(tmp_path / "one").read(table),
+                TableStorage(tmp_path / "three").read(table)
+            )
+    
+    def test_partitions_match_blocks(self, tmp_path):
+        """Shard i is block i of iter_chunks, and storage reads the parts in order"""
+        summary = self.write(tmp_path, workers=2)
+        
+        expected = pd.concat([t for _, t in generate()], ignore_index=True)
+        written = TableStorage(tmp_path).read("transactions")
+        
+        assert summary["num_partitions"] == len(partition_files(tmp_path / "raw" / "transactions")) == 3
+        assert written["transaction_id"].tolist() == expected["transaction_id"].tolist()
+        assert isinstance(written["merchant"].dtype, pd.CategoricalDtype)
+    
+    def test_exact_fraud_per_partition(self, tmp_path):
+        self.write(tmp_path, workers=2, file_format="csv")
+        
+        for part in partition_files(tmp_path / "raw" / "transactions"):
+            transactions = pd.read_csv(part)
+            assert transactions["is_fraud"].sum() == int(len(transactions) * FRAUD_RATE)
+    
+    def test_rerun_replaces_partitions(self, tmp_path):
+        """A smaller rerun leaves no stale partitions behind"""
+        self.write(tmp_path, workers=2)
+        TransactionDataGenerator().write_partitioned_dataset(
+            str(tmp_path / "raw"), num_customers=50, num_months=3, shard_customers=100, workers=1, end_date=END_DATE
+        )
+        
+        assert len(TableStorage(tmp_path).read("customers")) == 50
+
+
+class TestFraudPatterns:
+    """introduce_fraud_patterns marks an exact share of each list it is given"""
+    
+    def transactions(self, n):
+        return [{"amount": -10.0, "location": "Dallas", "remarks": "Lunch", "is_fraud": False} for _ in range(n)]
+    
+    @pytest.mark.parametrize("n", [0, 49, 50, 1234])
+    def test_exact_count(self, n):
+        marked = TransactionDataGenerator().introduce_fraud_patterns(self.transactions(n))
+        assert sum(t["is_fraud"] for t in marked) == int(n * FRAUD_RATE)
+    
+    def test_seeded_by_rng(self):
+        """The same generator seed marks the same rows the same way"""
+        first = TransactionDataGenerator().introduce_fraud_patterns(self.transactions(500), np.random.default_rng(3))
+        second = TransactionDataGenerator().introduce_fraud_patterns(self.transactions(500), np.random.default_rng(3))
+        assert first == second
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
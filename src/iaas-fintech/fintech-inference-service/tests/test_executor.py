@@ -0,0 +1,68 @@
+"""
+Tests for the bounded inference worker pool
+"""
+
+import asyncio
+import threading
+import pytest
+import sys
+from pathlib import Path
+
+from fastapi import HTTPException
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from api.executor import InferenceExecutor, ExecutorSaturatedError
+
+
+def square(x):
+    return x * x
+
+
+def not_found(customer_id):
+    raise HTTPException(status_code=404, detail=f"{customer_id} not found")
+
+
+class TestInferenceExecutor:
+    """Test dispatch and backpressure"""
+    
+    def test_saturated_pool_rejects_with_503(self):
+        """Submissions beyond max_pending fail fast instead of queueing"""
+        executor = InferenceExecutor(kind="thread", max_workers=1, max_pending=1)
+        release = threading.Event()
+        
+        async def run():
+            blocked = executor.submit(release.wait, 5)
+            with pytest.raises(ExecutorSaturatedError) as error:
+                executor.submit(square, 3)
+            release.set()
+            await blocked
+            return error.value
+        
+        error = asyncio.run(run())
+        executor.shutdown()
+        
+        assert error.status_code == 503
+        assert executor.stats()["rejected"] == 1
+        assert executor.stats()["pending"] == 0
+    
+    def test_process_pool_round_trips_results_and_http_errors(self):
+        """Process workers return results and surface HTTPException in the parent"""
+        executor = InferenceExecutor(kind="process", max_workers=1, initializer=None)
+        
+        async def run():
+            result = await executor.run(square, 7)
+            with pytest.raises(HTTPException) as error:
+                await executor.run(not_found, "CUST_X")
+            return result, error.value
+        
+        result, error = asyncio.run(run())
+        executor.shutdown()
+        
+        assert result == 49
+        assert error.status_code == 404
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,165 @@
+"""
+Tests for batched, cached SHAP explanations
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+import sys
+from pathlib import Path
+from fastapi.testclient import TestClient
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from api.main import app
+from api.explanations import ExplanationService
+from api.routes import customers
+from api.serving import LoadedModel, churn_server
+from data.customer_store import CustomerDataStore
+from models.churn_model import CHURN_FEATURE_COLUMNS
+from utils.cache import VersionedCache
+
+client = TestClient(app)
+
+
+def make_features(n: int, seed: int = 7) -> pd.DataFrame:
+    """Customer feature rows with random values for every churn feature"""
+    rng = np.random.default_rng(seed)
+    features = pd.DataFrame(rng.uniform(0, 100, size=(n, len(CHURN_FEATURE_COLUMNS))), columns=CHURN_FEATURE_COLUMNS)
+    features.insert(0, "customer_id", [f"CUST_{i:06d}" for i in range(n)])
+    return features
+
+
+@pytest.fixture
+def stored_features(monkeypatch):
+    """Twenty customers with stored features, split across two segments, plus one without features"""
+    features = make_features(20)
+    profiles = pd.DataFrame({
+        "customer_id": features["customer_id"].tolist() + ["CUST_NO_FEATURES"],
+        "segment": ["high_spender", "low_spender"] * 10 + ["high_spender"]
+    })
+    monkeypatch.setattr(customers, "data_store", CustomerDataStore(profiles, pd.DataFrame(), features))
+    return features
+
+
+class TestVersionedCacheBatches:
+    """Batch lookups used by the explanation cache"""
+    
+    def test_get_many_counts_hits_and_misses(self):
+        cache = VersionedCache()
+        cache.put_many({"a": 1}, version=1)  # version not yet seen: dropped
+        assert cache.get_many(["a"], version=1) == {}
+        
+        cache.put_many({"a": 1, "b": 2}, version=1)
+        assert cache.get_many(["a", "b", "c"], version=1) == {"a": 1, "b": 2}
+        assert cache.stats()["hits"] == 2
+        assert cache.stats()["misses"] == 2
+    
+    def test_stale_batch_is_dropped(self):
+        """Values computed for an old version never land in the new one"""
+        cache = VersionedCache()
+        cache.get_many(["a"], version=1)
+        cache.get_many(["a"], version=2)
+        cache.put_many({"a": "old"}, version=1)
+        
+        assert cache.get_many(["a"], version=2) == {}
+
+
+class TestExplanationService:
+    """Batched SHAP values against the model's own per-row explanation"""
+    
+    def test_matches_single_row_explanations(self, stored_features):
+        service = ExplanationService(churn_server)
+        batch = service.explain_frame(stored_features)
+        model = churn_server.ensure_loaded()
+        
+        for row in (0, 7, 19):
+            expected = model.explain_prediction(stored_features, sample_idx=row)
+            contributions = [expected["feature_contributions"][f]["contribution"] for f in model.feature_columns]
+            np.testing.assert_allclose(batch.contributions[row], contributions, rtol=1e-5, atol=1e-6)
+            assert batch.probabilities[row] == pytest.approx(expected["probability"][1])
+    
+    def test_repeat_is_served_from_cache(self, stored_features):
+        """A second request for the same customers skips SHAP entirely"""
+        service = ExplanationService(churn_server)
+        first = service.explain_frame(stored_features)
+        second = service.explain_frame(stored_features.iloc[::-1])
+        
+        assert first.cached_rows == 0
+        assert second.cached_rows == len(stored_features)
+        np.testing.assert_array_equal(second.contributions, first.contributions[::-1])
+        assert second.customer_ids == first.customer_ids[::-1]
+    
+    def test_identical_feature_vectors_explained_once(self, stored_features):
+        service = ExplanationService(churn_server)
+        duplicated = pd.concat([stored_features.iloc[:3]] * 4, ignore_index=True)
+        
+        batch = service.explain_frame(duplicated)
+        
+        assert service.stats()["cache"]["entries"] == 3
+        np.testing.assert_array_equal(batch.contributions[:3], batch.contributions[9:])
+    
+    def test_new_model_version_invalidates(self, stored_features, monkeypatch):
+        service = ExplanationService(churn_server)
+        service.explain_frame(stored_features)
+        
+        loaded = churn_server.current()
+        monkeypatch.setattr(churn_server, "loaded",
+                            LoadedModel(loaded.model, loaded.scorer, loaded.model_file, "retrained"))
+        assert service.explain_frame(stored_features).cached_rows == 0
+
+
+class TestExplanationEndpoints:
+    """Explain endpoints served from stored features"""
+    
+    def test_explain_customer(self, stored_features):
+        response = client.get("/api/v1/inference/explain?customer_id=CUST_000003&model_type=churn&top_k=4")
+        assert response.status_code == 200
+        
+        data = response.json()
+        contributions = [abs(c["contribution"]) for c in data["feature_contributions"]]
+        assert data["customer_id"] == "CUST_000003"
+        assert len(contributions) == 4
+        assert contributions == sorted(contributions, reverse=True)
+        
+        # The explanation describes the same prediction the churn endpoint serves
+        score = client.post("/api/v1/inference/churn-score", json={"customer_id": "CUST_000003"}).json()
+        assert data["probability"][1] == pytest.approx(score["churn_probability"])
+    
+    def test_unknown_customer_not_found(self, stored_features):
+        response = client.get("/api/v1/inference/explain?customer_id=CUST_UNKNOWN")
+        assert response.status_code == 404
+    
+    def test_unsupported_model_type(self, stored_features):
+        response = client.get("/api/v1/inference/explain?customer_id=CUST_000003&model_type=fraud")
+        assert response.status_code == 400
+    
+    def test_segment_drivers(self, stored_features):
+        """A segment is explained over the members that have stored features"""
+        response = client.post("/api/v1/inference/explain-batch", json={"segment": "high_spender", "top_k": 3})
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert data["summary"]["total_customers"] == 10
+        assert data["summary"]["skipped_customers"] == 1
+        assert data["explanations"] is None
+        
+        drivers = [d["mean_abs_contribution"] for d in data["top_drivers"]]
+        assert len(drivers) == 3
+        assert drivers == sorted(drivers, reverse=True)
+    
+    def test_customer_list_with_explanations(self, stored_features):
+        response = client.post("/api/v1/inference/explain-batch", json={
+            "customers": [
+                {"customer_id": "CUST_000001"},
+                {"customer_id": "REQUEST_FEATURES", "features": {"total_transactions": 4, "days_since_last_transaction": 90}}
+            ],
+            "include_explanations": True
+        })
+        assert response.status_code == 200
+        assert [e["customer_id"] for e in response.json()["explanations"]] == ["CUST_000001", "REQUEST_FEATURES"]
+    
+    def test_unknown_segment_and_empty_request(self, stored_features):
+        assert client.post("/api/v1/inference/explain-batch", json={"segment": "nobody"}).status_code == 404
+        assert client.post("/api/v1/inference/explain-batch", json={}).status_code == 400
@@ -0,0 +1,132 @@
+"""
+Tests for fast-path churn scoring that bypasses prepare_features
+"""
+
+import contextlib
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from api.schemas.models import CustomerInput
+from api.serving import ChurnModelServer, FastPathScorer
+from models.churn_model import CHURN_FEATURE_COLUMNS
+from tests.test_explanations import make_features
+
+
+@pytest.fixture(scope="module")
+def server():
+    """A loaded churn model server"""
+    server = ChurnModelServer()
+    with contextlib.redirect_stdout(io.StringIO()):
+        server.ensure_loaded()
+    return server
+
+
+def make_customers(features: pd.DataFrame):
+    """Request customers carrying every feature of each row"""
+    return [
+        CustomerInput(customer_id=row.pop("customer_id"), features=row)
+        for row in features.to_dict(orient="records")
+    ]
+
+
+def assert_same_predictions(fast, slow):
+    assert [p.customer_id for p in fast] == [p.customer_id for p in slow]
+    np.testing.assert_allclose([p.churn_probability for p in fast], [p.churn_probability for p in slow], rtol=1e-6)
+    assert [p.risk_level for p in fast] == [p.risk_level for p in slow]
+    assert [p.churn_prediction for p in fast] == [p.churn_prediction for p in slow]
+
+
+class TestFastPathScorer:
+    """Row vectorization against the trained column order"""
+    
+    def test_vectorize_follows_trained_columns(self, server):
+        scorer = server.scorer
+        X = scorer.vectorize([
+            {CHURN_FEATURE_COLUMNS[3]: 5.0, "not_a_feature": 9.0},
+            {CHURN_FEATURE_COLUMNS[0]: float("nan"), CHURN_FEATURE_COLUMNS[1]: 2.0}
+        ])
+        
+        expected = np.zeros((2, len(scorer.feature_columns)))
+        expected[0, scorer.positions[CHURN_FEATURE_COLUMNS[3]]] = 5.0
+        expected[1, scorer.positions[CHURN_FEATURE_COLUMNS[1]]] = 2.0
+        np.testing.assert_array_equal(X, expected)
+    
+    def test_booster_matches_predict_proba(self, server):
+        model = server.ensure_loaded()
+        features = make_features(50, seed=3)
+        X = model.feature_matrix(features)
+        
+        np.testing.assert_allclose(server.scorer.predict_proba(X.to_numpy()), model.model.predict_proba(X)[:, 1],
+                                   rtol=1e-6)
+    
+    def test_estimator_without_booster(self, server):
+        """Non-XGBoost estimators fall back to their own predict_proba"""
+        from sklearn.linear_model import LogisticRegression
+        
+        model = server.ensure_loaded()
+        features = make_features(40, seed=5)
+        X = model.feature_matrix(features)
+        estimator = LogisticRegression(max_iter=500).fit(X, np.arange(40) % 2)
+        
+        stub = type("Stub", (), {"feature_columns": model.feature_columns, "model": estimator})()
+        scorer = FastPathScorer(stub)
+        
+        assert scorer.booster is None
+        np.testing.assert_allclose(scorer.predict_proba(X.to_numpy()), estimator.predict_proba(X)[:, 1])
+
+
+class TestFastPathParity:
+    """The fast path serves the same predictions as prepare_features"""
+    
+    def test_full_feature_rows(self, server):
+        customers = make_customers(make_features(100, seed=9))
+        
+        fast = server.score_fast(customers)
+        slow = server.to_predictions(server.predict_frame(server.build_feature_frame(customers)))
+        
+        assert_same_predictions(fast, slow)
+    
+    def test_partial_and_missing_values(self, server):
+        """Absent, unknown and NaN features are scored as 0 on both paths"""
+        customers = [
+            CustomerInput(customer_id="A", features={"total_transactions": 4, "days_since_last_transaction": 90}),
+            CustomerInput(customer_id="B", features={"total_transactions": float("nan"), "unknown_feature": 1.0,
+                                                     "avg_transactions_per_month": 12.0}),
+            CustomerInput(customer_id="C", features={"days_since_last_transaction": 2})
+        ]
+        
+        fast = server.score_fast(customers)
+        slow = server.to_predictions(server.predict_frame(server.build_feature_frame(customers)))
+        
+        assert_same_predictions(fast, slow)
+    
+    def test_stored_features_keep_request_order(self, server, monkeypatch):
+        features = make_features(10, seed=4)
+        lookup = features.set_index("customer_id")
+        monkeypatch.setattr(server, "feature_lookup", lambda ids: lookup.loc[[i for i in ids if i in lookup.index]])
+        
+        customers = [
+            CustomerInput(customer_id="CUST_000007"),
+            *make_customers(features.iloc[[2]]),
+            CustomerInput(customer_id="CUST_000001")
+        ]
+        
+        fast = server.score_fast(customers)
+        monkeypatch.setattr(server, "fast_path", False)
+        
+        assert [p.customer_id for p in fast] == ["CUST_000007", "CUST_000002", "CUST_000001"]
+        assert_same_predictions(fast, server.score(customers))
+
+
+def test_predictions_use_the_configured_threshold(monkeypatch):
+    monkeypatch.setattr("models.churn_model.settings.churn_threshold", 0.2)
+    predictions = ChurnModelServer.build_predictions(["a", "b"], np.array([0.1, 0.3]), ["Low", "Medium"])
+    assert [p.churn_prediction for p in predictions] == [False, True]
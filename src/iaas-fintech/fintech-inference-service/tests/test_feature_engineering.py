@@ -0,0 +1,132 @@
+"""
+Tests for the feature engineering engines
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from data.feature_engineering import FeatureEngineer
+
+
+CATEGORIES = ["grocery", "restaurant", "gas", "retail", "entertainment", "utilities", "income"]
+MERCHANTS = ["Walmart", "Kroger", "Starbucks", "Shell", "Amazon", "Netflix", "Salary Deposit"]
+MODES = ["Credit Card", "Debit Card", "UPI", "Cash"]
+LOCATIONS = ["New York", "Chicago", "Austin"]
+
+
+def make_transactions(num_customers: int = 40, seed: int = 7) -> pd.DataFrame:
+    """Synthetic transactions with unique timestamps per customer"""
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2024-01-01")
+    rows = []
+    
+    for i in range(num_customers):
+        # Mix of one-off, single-month and long-lived customers
+        n_transactions = [1, 2, 5][i] if i < 3 else int(rng.integers(3, 80))
+        span_minutes = 20 * 24 * 60 if i < 3 else 180 * 24 * 60
+        minutes = rng.choice(span_minutes, size=n_transactions, replace=False)
+        categories = rng.choice(CATEGORIES, size=n_transactions)
+        amounts = np.round(rng.uniform(5, 400, size=n_transactions), 2)
+        amounts = np.where(categories == "income", amounts * 10, -amounts)
+        if i == 3:
+            amounts = -np.abs(amounts)  # expenses only
+        
+        for j in range(n_transactions):
+            rows.append({
+                "transaction_id": f"TXN_{i:03d}_{j:03d}",
+                "customer_id": f"CUST_{i:06d}",
+                "transaction_date": start + pd.Timedelta(minutes=int(minutes[j])),
+                "amount": amounts[j],
+                "merchant": rng.choice(MERCHANTS[:4]),
+                "category": categories[j],
+                "mode": rng.choice(MODES),
+                "location": rng.choice(LOCATIONS),
+                "is_fraud": False
+            })
+    
+    # Interleave customers like the generator's date-sorted output
+    return pd.DataFrame(rows).sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+class TestVectorizedCustomerFeatures:
+    """Parity between the per-customer loop and the grouped engine"""
+    
+    def test_matches_iterative_engine(self):
+        """Vectorized engine reproduces every customer feature"""
+        transactions = make_transactions()
+        
+        expected = FeatureEngineer().create_customer_features(transactions.copy())
+        actual = FeatureEngineer(vectorized=True).create_customer_features(transactions.copy())
+        
+        assert set(actual.columns) == set(expected.columns)
+        assert actual["customer_id"].tolist() == expected["customer_id"].tolist()
+        
+        actual = actual[expected.columns]
+        for column in expected.columns:
+            if not pd.api.types.is_numeric_dtype(expected[column]):
+                assert actual[column].astype(str).tolist() == expected[column].astype(str).tolist(), column
+            else:
+                np.testing.assert_allclose(
+                    actual[column].astype(float), expected[column].astype(float),
+                    rtol=1e-7, atol=1e-9, err_msg=column
+                )
+    
+    def test_does_not_reorder_input(self):
+        """Input frame keeps its row order"""
+        transactions = make_transactions(num_customers=10)
+        original_ids = transactions["transaction_id"].tolist()
+        
+        FeatureEngineer(vectorized=True).create_customer_features(transactions)
+        
+        assert transactions["transaction_id"].tolist() == original_ids
+
+
+class TestStreamingTransactionFeatures:
+    """Parity between the iterrows loop and the sorted single-pass engine"""
+    
+    def test_matches_iterative_engine(self):
+        """Streaming engine reproduces every transaction feature"""
+        # The loop treats lower index labels as history, so feed it date order
+        transactions = make_transactions(num_customers=25).sort_values("transaction_date").reset_index(drop=True)
+        
+        expected = FeatureEngineer().create_transaction_features(transactions)
+        actual = FeatureEngineer(vectorized=True).create_transaction_features(transactions)
+        
+        assert list(actual.columns) == list(expected.columns)
+        assert actual["transaction_id"].tolist() == expected["transaction_id"].tolist()
+        
+        numeric_columns = expected.columns.drop(["transaction_id", "customer_id"])
+        np.testing.assert_allclose(
+            actual[numeric_columns].astype(float), expected[numeric_columns].astype(float),
+            rtol=1e-9, atol=1e-9
+        )
+    
+    def test_window_counts_include_boundary(self):
+        """A transaction exactly 7 days earlier counts toward the 7-day window"""
+        transactions = pd.DataFrame({
+            "transaction_id": ["T1", "T2", "T3"],
+            "customer_id": ["CUST_1"] * 3,
+            "transaction_date": pd.to_datetime(["2024-01-01 10:00", "2024-01-05 09:00", "2024-01-08 10:00"]),
+            "amount": [-10.0, -20.0, -30.0],
+            "merchant": ["A", "B", "A"],
+            "category": ["retail", "retail", "gas"],
+            "mode": ["Cash"] * 3,
+            "location": ["Austin"] * 3
+        })
+        
+        features = FeatureEngineer(vectorized=True).create_transaction_features(transactions)
+        
+        assert features["frequency_last_7_days"].tolist() == [0, 1, 2]
+        assert features["merchant_seen_before"].tolist() == [0, 0, 1]
+        assert features["category_seen_before"].tolist() == [0, 1, 0]
+        assert features["amount_vs_avg_ratio"].tolist() == [1, 2, 2]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,75 @@
+"""
+Tests for the incremental customer feature store
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from api.schemas.models import TransactionInput
+from data.feature_engineering import FeatureEngineer
+from data.feature_store import CustomerFeatureStore
+from models.churn_model import CHURN_FEATURE_COLUMNS
+from tests.test_feature_engineering import make_transactions
+
+
+class TestCustomerFeatureStore:
+    """Test running aggregates against the batch feature engineer"""
+    
+    def test_matches_batch_features(self):
+        """Store features equal the batch churn features"""
+        transactions = make_transactions()
+        
+        expected = FeatureEngineer(vectorized=True).create_customer_features(transactions.copy())
+        expected = expected.set_index("customer_id")[CHURN_FEATURE_COLUMNS]
+        
+        store = CustomerFeatureStore.from_transactions(transactions)
+        actual = store.to_frame().set_index("customer_id").loc[expected.index]
+        
+        assert set(actual.columns) == set(CHURN_FEATURE_COLUMNS)
+        np.testing.assert_allclose(
+            actual[CHURN_FEATURE_COLUMNS].astype(float), expected.astype(float), rtol=1e-7, atol=1e-7
+        )
+    
+    def test_update_with_transaction_input(self):
+        """Pydantic transactions update the customer's aggregates"""
+        store = CustomerFeatureStore()
+        for day, amount in [(1, -50.0), (3, -150.0), (40, 2000.0)]:
+            store.update(TransactionInput(
+                customer_id="CUST_1",
+                transaction_date=datetime(2024, 1, day) if day <= 31 else datetime(2024, 2, day - 31),
+                amount=amount,
+                merchant="Walmart",
+                category="grocery",
+                mode="Debit Card",
+                location="Austin"
+            ))
+        
+        features = store.get_features("CUST_1")
+        
+        assert features["total_transactions"] == 3
+        assert features["total_expenses"] == -200.0
+        assert features["net_cash_flow"] == 1800.0
+        assert features["grocery_total_spend"] == 1800.0
+        assert features["merchant_loyalty_score"] == 1.0
+        assert features["days_since_last_transaction"] == 0
+        assert store.get_features("UNKNOWN") is None
+    
+    def test_save_and_load(self, tmp_path):
+        """Store round-trips through disk"""
+        store = CustomerFeatureStore.from_transactions(make_transactions(num_customers=5))
+        path = store.save(tmp_path / "store.joblib")
+        
+        loaded = CustomerFeatureStore.load(path)
+        
+        pd.testing.assert_frame_equal(loaded.to_frame(), store.to_frame())
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,127 @@
+"""
+Tests for the declarative fraud rules
+"""
+
+import json
+import os
+
+import numpy as np
+import pytest
+import sys
+from pathlib import Path
+from fastapi.testclient import TestClient
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from api.fraud import StreamingFraudScorer, rule_columns
+from api.fraud_rules import DEFAULT_RULES, FraudRuleEngine, RuleSet, compile_condition, load_rules
+from api.main import app
+from tests.test_feature_engineering import make_transactions
+
+client = TestClient(app)
+
+SERVICE_ROOT = Path(__file__).parent.parent
+
+
+def write_rules(path: Path, spec: dict, mtime_ns: int) -> None:
+    path.write_text(json.dumps(spec))
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_shipped_rules_file_matches_the_defaults():
+    assert load_rules(SERVICE_ROOT / "config" / "fraud_rules.json").describe()["rules"] == \
+        RuleSet(DEFAULT_RULES).describe()["rules"]
+    assert load_rules(SERVICE_ROOT / "config" / "missing.json").version == "default"
+
+
+@pytest.mark.parametrize("spec, message", [
+    ({"rules": []}, "non-empty"),
+    ({"rules": [{"name": "a", "weight": 0.1, "when": {"feature": "colour", "op": "==", "value": 1}}]}, "feature"),
+    ({"rules": [{"name": "a", "weight": 0.1, "when": {"feature": "amount", "op": "~", "value": 1}}]}, "operator"),
+    ({"rules": [{"name": "a", "weight": 0.1, "when": {"feature": "merchant", "op": "in", "value": "ATM"}}]}, "list"),
+    ({"rules": [{"name": "a", "weight": "high", "when": {"feature": "amount", "op": ">", "value": 1}}]}, "weight"),
+    ({"rules": [{"name": "a", "weight": 0.1, "when": {"feature": "amount", "op": ">", "value": 1}},
+                {"name": "a", "weight": 0.2, "when": {"feature": "amount", "op": "<", "value": 1}}]}, "unique")
+])
+def test_invalid_rules_are_rejected(spec, message):
+    with pytest.raises(ValueError, match=message):
+        RuleSet(spec)
+
+
+def test_conditions_agree_on_rows_and_columns():
+    condition = compile_condition({"any": [
+        {"all": [{"feature": "amount", "op": "<", "value": 0}, {"feature": "hour", "op": "in", "value": [1, 2, 3]}]},
+        {"not": {"feature": "merchant", "op": "not_in", "value": ["ATM Withdrawal"]}}
+    ]})
+    columns = {
+        "amount": np.array([-5.0, -5.0, 5.0, 5.0]),
+        "hour": np.array([2, 9, 2, 9]),
+        "merchant": np.array(["Shop", "Shop", "Shop", "ATM Withdrawal"], dtype=object)
+    }
+    rows = [dict(zip(columns, values)) for values in zip(*columns.values())]
+    
+    assert condition.mask(columns).tolist() == [True, False, False, True]
+    assert [condition.test(row) for row in rows] == [True, False, False, True]
+    assert condition.features == {"amount", "hour", "merchant"}
+
+
+def test_vectorized_scores_match_row_by_row():
+    transactions = make_transactions()
+    scorer = StreamingFraudScorer()
+    arrays = scorer.frame_arrays(transactions)
+    features, zscore = scorer.features_batch(**arrays)
+    columns = rule_columns(features, zscore, arrays["seconds"], arrays["merchants"],
+                           arrays["categories"], arrays["locations"])
+    rules = RuleSet(DEFAULT_RULES)
+    
+    probabilities, masks = rules.score(columns)
+    for row in range(len(transactions)):
+        probability, matched = rules.score_one({name: column[row] for name, column in columns.items()})
+        assert probabilities[row] == probability
+        assert [name for name, mask in masks.items() if mask[row]] == matched
+
+
+def test_rules_file_changes_are_picked_up_without_restart(tmp_path):
+    path = tmp_path / "rules.json"
+    write_rules(path, DEFAULT_RULES, 1_000_000_000)
+    engine = FraudRuleEngine(path, check_seconds=0)
+    scorer = StreamingFraudScorer(rules=engine)
+    assert len(engine.current) == len(DEFAULT_RULES["rules"])
+    
+    # Everything over 10 is now suspicious
+    write_rules(path, {"rules": [{"name": "over_ten", "weight": 0.5,
+                                  "when": {"feature": "abs_amount", "op": ">", "value": 10}}]}, 2_000_000_000)
+    probability, _, factors = scorer.process("CUST_1", 0.0, -20.0, "Grocer", "grocery", "Austin")
+    assert factors == ["over_ten"] and probability == 0.5
+    assert engine.reloads == 2
+    
+    # A broken file is reported and the last good rules keep serving
+    path.write_text("{not json")
+    os.utime(path, ns=(3_000_000_000, 3_000_000_000))
+    assert engine.current.names == ["over_ten"]
+    assert "Invalid rules file" in engine.last_error
+    with pytest.raises(ValueError):
+        engine.reload()
+
+
+def test_backtest_reports_hits_and_precision():
+    transactions = make_transactions()
+    transactions["is_fraud"] = transactions["amount"].abs() > 1000
+    report = StreamingFraudScorer().backtest(transactions, RuleSet(DEFAULT_RULES)).set_index("rule")
+    
+    assert list(report.index) == [rule["name"] for rule in DEFAULT_RULES["rules"]] + ["any_rule", "flagged"]
+    assert report.loc["unusual_amount", "hits"] == transactions["is_fraud"].sum()
+    if report.loc["unusual_amount", "hits"]:
+        assert report.loc["unusual_amount", "precision"] == 1.0
+        assert report.loc["unusual_amount", "recall"] == 1.0
+
+
+def test_fraud_rules_endpoints():
+    response = client.get("/api/v1/inference/fraud-rules")
+    assert response.status_code == 200
+    assert [rule["name"] for rule in response.json()["rules"]] == [rule["name"] for rule in DEFAULT_RULES["rules"]]
+    
+    reloaded = client.post("/api/v1/inference/fraud-rules/reload")
+    assert reloaded.status_code == 200
+    assert reloaded.json()["version"] == response.json()["version"]
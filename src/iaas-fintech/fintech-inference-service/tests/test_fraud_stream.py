@@ -0,0 +1,220 @@
+"""
+Tests for the streaming fraud scorer
+"""
+
+import contextlib
+import io
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+import sys
+from pathlib import Path
+from fastapi.testclient import TestClient
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from api.fraud import StreamingFraudScorer, TRANSACTION_FEATURE_COLUMNS, to_seconds
+from api.main import app
+from data.feature_engineering import FeatureEngineer
+from tests.test_feature_engineering import make_transactions
+
+client = TestClient(app)
+
+
+def replay_features(transactions: pd.DataFrame, window: int = 64) -> pd.DataFrame:
+    scorer = StreamingFraudScorer(window=window)
+    rows = {row: features for row, features, _ in scorer.iter_replay(transactions)}
+    features = pd.DataFrame.from_dict(rows, orient="index").sort_index()
+    features.insert(0, "transaction_id", transactions["transaction_id"].to_numpy()[features.index])
+    return features
+
+
+def test_features_match_offline_engine():
+    transactions = make_transactions()
+    with contextlib.redirect_stdout(io.StringIO()):
+        offline = FeatureEngineer(vectorized=True).create_transaction_features(transactions)
+    
+    streamed = replay_features(transactions).set_index("transaction_id").loc[offline["transaction_id"]]
+    for column in TRANSACTION_FEATURE_COLUMNS:
+        np.testing.assert_allclose(streamed[column].to_numpy(dtype=float), offline[column].to_numpy(dtype=float),
+                                   rtol=1e-9, err_msg=column)
+
+
+def test_velocity_counts_are_bounded_by_the_window():
+    transactions = pd.DataFrame({
+        "transaction_id": [f"TXN_{i}" for i in range(10)],
+        "customer_id": "CUST_1",
+        "transaction_date": pd.date_range("2024-01-01", periods=10, freq="h"),
+        "amount": -20.0,
+        "merchant": "Shop",
+        "category": "retail",
+        "location": "Austin"
+    })
+    
+    assert replay_features(transactions)["frequency_last_7_days"].tolist() == list(range(10))
+    assert replay_features(transactions, window=4)["frequency_last_7_days"].max() == 4
+
+
+def test_risk_factors_from_history():
+    scorer = StreamingFraudScorer()
+    start = to_seconds(datetime(2024, 1, 1, 12))  # a Monday
+    for day in range(20):
+        scorer.process("CUST_1", start + day * 86_400, -50.0 - day % 5, "Grocer", "grocery", "Austin")
+    
+    probability, anomaly, factors = scorer.process("CUST_1", start + 20 * 86_400, -2500.0,
+                                                   "Unknown Merchant", "retail", "Miami")
+    assert set(factors) == {"unusual_amount", "high_risk_merchant", "amount_deviation", "new_location", "new_merchant"}
+    assert probability == scorer.rules.current.max_probability
+    assert anomaly > 3
+    
+    # The first transaction of a new customer has no history to deviate from
+    probability, anomaly, factors = scorer.process("CUST_2", start, -2500.0, "Grocer", "grocery", "Austin")
+    assert factors == ["unusual_amount"] and anomaly == 0.0
+
+
+def test_weekend_late_night_timing():
+    scorer = StreamingFraudScorer()
+    _, _, factors = scorer.process("CUST_1", to_seconds(datetime(2024, 1, 6, 23)), -10.0, "Grocer", "grocery", "Austin")
+    assert factors == ["unusual_timing"]
+    _, _, factors = scorer.process("CUST_2", to_seconds(datetime(2024, 1, 5, 23)), -10.0, "Grocer", "grocery", "Austin")
+    assert factors == []
+    
+    # Timing is judged on the transaction's local clock, not UTC (18:00 here)
+    local = datetime(2024, 1, 6, 23, tzinfo=timezone(timedelta(hours=5)))
+    _, _, factors = scorer.process("CUST_3", to_seconds(local), -10.0, "Grocer", "grocery", "Austin")
+    assert factors == ["unusual_timing"]
+    frame = pd.DataFrame({"transaction_id": ["T1"], "customer_id": ["CUST_4"], "transaction_date": [pd.Timestamp(local)],
+                          "amount": [-10.0], "merchant": ["Grocer"], "category": ["grocery"], "location": ["Austin"]})
+    assert scorer.backtest(frame).set_index("rule").loc["unusual_timing", "hits"] == 1
+
+
+def test_least_recently_active_customers_are_evicted():
+    scorer = StreamingFraudScorer(max_customers=2)
+    for customer_id in ["A", "B", "A", "C"]:
+        scorer.process(customer_id, 0.0, -10.0, "Grocer", "grocery", "Austin")
+    assert list(scorer.states) == ["A", "C"]
+
+
+def test_fraud_detection_endpoint_uses_history():
+    transaction = {
+        "customer_id": "STREAM_TEST_001",
+        "transaction_date": "2024-03-04T12:00:00",
+        "amount": -40.0,
+        "merchant": "Grocer",
+        "category": "grocery",
+        "mode": "Credit Card",
+        "location": "Austin"
+    }
+    first = client.post("/api/v1/inference/fraud-detection", json=transaction).json()
+    second = client.post("/api/v1/inference/fraud-detection",
+                         json={**transaction, "transaction_date": "2024-03-05T12:00:00", "location": "Miami"}).json()
+    
+    assert first["risk_factors"] == []
+    assert second["risk_factors"] == ["new_location"]
+    assert not second["fraud_prediction"]
+
+
+def test_out_of_order_arrivals_still_count_the_window():
+    scorer = StreamingFraudScorer()
+    day = 86_400
+    for seconds in [10 * day, 2 * day, 9 * day]:
+        scorer.process("CUST_1", seconds, -10.0, "Grocer", "grocery", "Austin")
+    
+    features, _ = scorer.observe("CUST_1", 11 * day, -10.0, "Grocer", "grocery", "Austin")
+    assert not scorer.states["CUST_1"].ordered
+    assert features["frequency_last_7_days"] == 2
+    assert features["frequency_last_30_days"] == 3
+
+
+def batch_columns(transactions: pd.DataFrame) -> dict:
+    seconds = transactions["transaction_date"].to_numpy().astype("datetime64[us]").astype(np.int64) / 1e6
+    return {
+        "customer_ids": transactions["customer_id"].to_numpy(),
+        "seconds": seconds,
+        "amounts": transactions["amount"].to_numpy(),
+        "merchants": transactions["merchant"].to_numpy(),
+        "categories": transactions["category"].to_numpy(),
+        "locations": transactions["location"].to_numpy()
+    }
+
+
+def test_batch_matches_one_at_a_time():
+    # History up to a point in time, then a shuffled batch of what came after
+    transactions = make_transactions().sort_values("transaction_date", kind="stable")
+    history = transactions.iloc[:len(transactions) * 3 // 5]
+    batch = transactions.drop(history.index).sample(frac=1, random_state=1).reset_index(drop=True)
+    
+    batched, streamed = StreamingFraudScorer(window=8), StreamingFraudScorer(window=8)
+    batched.replay(history)
+    streamed.replay(history)
+    
+    expected = {row: (features, zscore) for row, features, zscore in streamed.iter_replay(batch)}
+    columns = batch_columns(batch)
+    features, zscores = batched.features_batch(**columns)
+    for column in TRANSACTION_FEATURE_COLUMNS:
+        np.testing.assert_allclose(features[column], [expected[row][0][column] for row in range(len(batch))],
+                                   rtol=1e-9, err_msg=column)
+    np.testing.assert_allclose(zscores, [expected[row][1] for row in range(len(batch))], rtol=1e-7, atol=1e-9)
+    
+    # Scoring the arrays agrees with the per-transaction rules
+    probabilities, masks = batched.score_batch(features, zscores, columns["seconds"], columns["merchants"],
+                                               columns["categories"], columns["locations"])
+    for row in range(len(batch)):
+        probability, factors = batched.score(expected[row][0], expected[row][1], columns["seconds"][row],
+                                             columns["merchants"][row], columns["categories"][row],
+                                             columns["locations"][row])
+        assert probabilities[row] == probability
+        assert [name for name, mask in masks.items() if mask[row]] == factors
+    
+    # The state is only read
+    assert batched.processed == len(history)
+
+
+def test_update_many_matches_replay():
+    transactions = make_transactions()
+    replayed, updated = StreamingFraudScorer(), StreamingFraudScorer()
+    replayed.replay(transactions)
+    columns = batch_columns(transactions)
+    updated.update_many(list(columns["customer_ids"]), columns["seconds"], columns["amounts"],
+                        list(columns["merchants"]), list(columns["categories"]), list(columns["locations"]))
+    
+    for customer_id, state in replayed.states.items():
+        other = updated.states[customer_id]
+        assert list(state.timestamps) == list(other.timestamps)
+        assert state.merchants == other.merchants and state.count == other.count
+
+
+def test_fraud_batch_endpoint():
+    transaction = {
+        "customer_id": "BATCH_TEST_001",
+        "transaction_date": "2024-03-04T12:00:00",
+        "amount": -40.0,
+        "merchant": "Grocer",
+        "category": "grocery",
+        "mode": "Credit Card",
+        "location": "Austin"
+    }
+    transactions = [
+        transaction,
+        {**transaction, "transaction_date": "2024-03-05T12:00:00", "location": "Miami"},
+        {**transaction, "customer_id": "BATCH_TEST_002", "amount": -2500.0, "merchant": "Unknown Merchant"}
+    ]
+    response = client.post("/api/v1/inference/fraud-batch", json={"transactions": transactions})
+    assert response.status_code == 200
+    data = response.json()
+    
+    assert [p["risk_factors"] for p in data["predictions"]] == [[], ["new_location"], ["unusual_amount", "high_risk_merchant"]]
+    assert [p["fraud_prediction"] for p in data["predictions"]] == [False, False, True]
+    assert data["summary"]["total_transactions"] == 3
+    assert data["summary"]["flagged_transactions"] == 1
+    assert data["summary"]["risk_factor_counts"] == {"new_location": 1, "unusual_amount": 1, "high_risk_merchant": 1}
+    
+    # The batch joined the customers' history once the response was sent
+    followup = client.post("/api/v1/inference/fraud-batch", params={"update_state": False},
+                           json={"transactions": [{**transaction, "transaction_date": "2024-03-06T12:00:00"}]})
+    assert followup.json()["predictions"][0]["risk_factors"] == []
+    
+    empty = client.post("/api/v1/inference/fraud-batch", json={"transactions": []})
+    assert empty.status_code == 200 and empty.json()["summary"]["total_transactions"] == 0
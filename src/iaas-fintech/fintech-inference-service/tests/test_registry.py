@@ -0,0 +1,164 @@
+"""
+Tests for the model registry and hot-swap reload
+"""
+
+import contextlib
+import io
+import threading
+
+import numpy as np
+import pytest
+import sys
+from pathlib import Path
+from fastapi.testclient import TestClient
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from api import main, serving
+from api.main import app
+from api.schemas.models import CustomerInput
+from api.serving import ChurnModelServer
+from models.churn_model import ChurnPredictionModel, CHURN_FEATURE_COLUMNS
+from models.registry import ModelRegistry
+from tests.test_explanations import make_features
+
+client = TestClient(app)
+
+
+def train_model(seed: int) -> ChurnPredictionModel:
+    model = ChurnPredictionModel(model_path="../data/models")
+    with contextlib.redirect_stdout(io.StringIO()):
+        model.train(make_features(200, seed=seed))
+    return model
+
+
+@pytest.fixture(scope="module")
+def models():
+    """Two churn models trained on different customers"""
+    return train_model(seed=1), train_model(seed=2)
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    """An empty registry that the serving layer resolves artifacts from"""
+    registry = ModelRegistry(tmp_path)
+    monkeypatch.setattr(serving, "model_registry", registry)
+    monkeypatch.setattr(main, "model_registry", registry)
+    return registry
+
+
+def register(registry, model, activate=True):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return registry.register(model, activate=activate)
+
+
+class TestModelRegistry:
+    """Versioned artifacts, manifests and the active pointer"""
+    
+    def test_register_writes_versions_and_manifest(self, registry, models):
+        first = register(registry, models[0])
+        second = register(registry, models[1], activate=False)
+        
+        assert [first["version"], second["version"]] == ["v0001", "v0002"]
+        assert registry.active_version("churn_prediction") == "v0001"
+        assert [m["version"] for m in registry.versions("churn_prediction")] == ["v0001", "v0002"]
+        
+        manifest = registry.manifest("churn_prediction", "v0002")
+        assert manifest["feature_columns"] == models[1].feature_columns
+        assert manifest["training_metrics"]["accuracy"] == pytest.approx(models[1].training_metrics["accuracy"])
+        assert registry.artifact_path("churn_prediction").parent.name == "v0001"
+    
+    def test_activate(self, registry, models):
+        register(registry, models[0])
+        register(registry, models[1], activate=False)
+        
+        registry.activate("churn_prediction", "v0002")
+        assert registry.active_version("churn_prediction") == "v0002"
+        
+        with pytest.raises(ValueError):
+            registry.activate("churn_prediction", "v0009")
+        assert registry.active_version("churn_prediction") == "v0002"
+    
+    def test_empty_registry(self, registry):
+        assert registry.active_version("churn_prediction") is None
+        assert registry.artifact_path("churn_prediction") is None
+        assert registry.versions("churn_prediction") == []
+
+
+class TestHotSwap:
+    """Reloading swaps in the active version without disturbing in-flight requests"""
+    
+    def make_customers(self, n: int = 20):
+        rng = np.random.default_rng(0)
+        return [
+            CustomerInput(customer_id=f"CUST_{i}", features=dict(zip(CHURN_FEATURE_COLUMNS, row.tolist())))
+            for i, row in enumerate(rng.uniform(0, 100, size=(n, len(CHURN_FEATURE_COLUMNS))))
+        ]
+    
+    def test_reload_swaps_to_active_version(self, registry, models):
+        register(registry, models[0])
+        server = ChurnModelServer()
+        with contextlib.redirect_stdout(io.StringIO()):
+            server.load()
+            old = server.current()
+            assert old.manifest["version"] == "v0001"
+            assert not server.reload()
+            
+            register(registry, models[1])
+            assert server.reload()
+        
+        new = server.current()
+        assert new.manifest["version"] == "v0002"
+        assert new.version != old.version
+        
+        # A request that already holds the old bundle keeps scoring against it
+        X = old.scorer.vectorize([c.features for c in self.make_customers()])
+        np.testing.assert_allclose(old.scorer.predict_proba(X), models[0].model.predict_proba(X)[:, 1], rtol=1e-6)
+        np.testing.assert_allclose(new.scorer.predict_proba(X), models[1].model.predict_proba(X)[:, 1], rtol=1e-6)
+    
+    def test_requests_never_fail_during_reload(self, registry, models):
+        register(registry, models[0])
+        server = ChurnModelServer()
+        customers = self.make_customers()
+        with contextlib.redirect_stdout(io.StringIO()):
+            server.load()
+        
+        errors = []
+        stop = threading.Event()
+        
+        def score_until_stopped():
+            while not stop.is_set():
+                try:
+                    assert len(server.score(customers)) == len(customers)
+                except Exception as e:
+                    errors.append(e)
+        
+        thread = threading.Thread(target=score_until_stopped)
+        thread.start()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for model in (models[1], models[0], models[1]):
+                register(registry, model)
+                assert server.reload()
+        stop.set()
+        thread.join()
+        
+        assert errors == []
+        assert server.current().manifest["version"] == "v0004"
+
+
+class TestModelEndpoints:
+    """Model management endpoints backed by the registry"""
+    
+    def test_reload_unknown_version(self, registry, models):
+        register(registry, models[0])
+        response = client.post("/models/reload?version=v0042")
+        assert response.status_code == 404
+    
+    def test_status_reports_registry(self, registry, models):
+        register(registry, models[0])
+        register(registry, models[1], activate=False)
+        
+        data = client.get("/models/status").json()
+        assert data["registry"]["churn_prediction"]["active_version"] == "v0001"
+        assert data["registry"]["churn_prediction"]["versions"] == ["v0001", "v0002"]
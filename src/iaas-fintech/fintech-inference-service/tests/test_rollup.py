@@ -0,0 +1,132 @@
+"""
+Tests for the transaction rollup cube
+"""
+
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from data.rollup import TransactionRollup
+from tests.test_feature_engineering import make_transactions
+
+
+def scan_analytics(transactions: pd.DataFrame, start_date) -> dict:
+    """The original full-scan computation, used as the reference"""
+    filtered = transactions[transactions["transaction_date"] >= start_date]
+    
+    daily = filtered.groupby(filtered["transaction_date"].dt.date).agg({
+        "transaction_id": "count", "amount": ["sum", "mean"], "is_fraud": "sum"
+    }).reset_index()
+    daily.columns = ["date", "transaction_count", "total_amount", "avg_amount", "fraud_count"]
+    
+    category = filtered.groupby("category").agg({
+        "transaction_id": "count", "amount": ["sum", "mean"], "is_fraud": "sum"
+    }).reset_index()
+    category.columns = ["category", "transaction_count", "total_amount", "avg_amount", "fraud_count"]
+    
+    return {
+        "summary": {
+            "total_transactions": len(filtered),
+            "total_volume": float(filtered["amount"].sum()),
+            "avg_transaction_amount": float(filtered["amount"].mean()),
+            "std_transaction_amount": float(filtered["amount"].std()),
+            "fraud_transactions": int(filtered["is_fraud"].sum()),
+            "fraud_rate": float(filtered["is_fraud"].mean() * 100),
+            "unique_customers": filtered["customer_id"].nunique(),
+            "unique_merchants": filtered["merchant"].nunique()
+        },
+        "daily_trends": daily.to_dict("records"),
+        "category_breakdown": category.to_dict("records"),
+        "time_patterns": {
+            "hourly": filtered.groupby(filtered["transaction_date"].dt.hour)["transaction_id"].count().to_dict(),
+            "weekly": filtered.groupby(filtered["transaction_date"].dt.day_name())["transaction_id"].count().to_dict()
+        },
+        "payment_methods": filtered["mode"].value_counts().to_dict()
+    }
+
+
+def assert_records_close(actual, expected):
+    assert len(actual) == len(expected)
+    for actual_row, expected_row in zip(actual, expected):
+        assert actual_row.keys() == expected_row.keys()
+        for key, value in expected_row.items():
+            assert actual_row[key] == pytest.approx(value)
+
+
+@pytest.fixture(scope="module")
+def transactions():
+    df = make_transactions(num_customers=60)
+    df["is_fraud"] = np.random.default_rng(3).random(len(df)) < 0.05
+    return df
+
+
+@pytest.fixture(scope="module")
+def rollup(transactions):
+    return TransactionRollup(transactions)
+
+
+class TestTransactionRollup:
+    """Windowed analytics from the cube match a full scan"""
+    
+    @pytest.mark.parametrize("days", [1, 7, 30, 90, 365])
+    def test_matches_full_scan(self, rollup, transactions, days):
+        """Every derived section equals the full-scan result"""
+        start_date = rollup.end_date - timedelta(days=days)
+        actual = rollup.transaction_analytics(start_date)
+        expected = scan_analytics(transactions, start_date)
+        
+        for key, value in expected["summary"].items():
+            assert actual["summary"][key] == pytest.approx(value), key
+        assert_records_close(actual["daily_trends"], expected["daily_trends"])
+        assert_records_close(actual["category_breakdown"], expected["category_breakdown"])
+        assert actual["time_patterns"] == expected["time_patterns"]
+        assert actual["payment_methods"] == expected["payment_methods"]
+    
+    def test_top_merchants(self, rollup, transactions):
+        """Top merchants carry the same counts as value_counts"""
+        start_date = rollup.end_date - timedelta(days=30)
+        counts = transactions[transactions["transaction_date"] >= start_date]["merchant"].value_counts()
+        
+        top = rollup.transaction_analytics(start_date)["top_merchants"]
+        
+        assert list(top.values()) == counts.head(10).tolist()
+        assert all(counts[merchant] == count for merchant, count in top.items())
+    
+    def test_partial_first_hour(self, rollup, transactions):
+        """A window starting mid-hour excludes earlier transactions in that hour"""
+        start_date = rollup.end_date - timedelta(days=10, minutes=17)
+        expected = (transactions["transaction_date"] >= start_date).sum()
+        
+        assert rollup.transaction_analytics(start_date)["summary"]["total_transactions"] == expected
+    
+    def test_categorical_columns(self, transactions):
+        """Categorical columns (as read from storage) give the same analytics"""
+        categorical = transactions.astype({column: "category" for column in ["category", "mode", "merchant", "location"]})
+        start_date = TransactionRollup(transactions).end_date - timedelta(days=45, hours=5)
+        
+        actual = TransactionRollup(categorical).transaction_analytics(start_date)
+        expected = TransactionRollup(transactions).transaction_analytics(start_date)
+        
+        assert actual["summary"] == pytest.approx(expected["summary"])
+        assert actual["payment_methods"] == expected["payment_methods"]
+        assert_records_close(actual["category_breakdown"], expected["category_breakdown"])
+    
+    def test_empty_window(self, rollup):
+        """A window after the last transaction has no analytics"""
+        assert rollup.transaction_analytics(rollup.end_date + timedelta(hours=2)) == {}
+    
+    def test_cube_is_smaller_than_transactions(self, rollup, transactions):
+        """The cube never has more rows than transactions"""
+        assert len(rollup) <= len(transactions)
+        assert rollup.cube["count"].sum() == len(transactions)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
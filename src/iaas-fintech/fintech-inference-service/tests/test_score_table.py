@@ -0,0 +1,139 @@
+"""
+Tests for the precomputed churn score table and freshness-aware churn serving
+"""
+
+import asyncio
+import pytest
+import sys
+from pathlib import Path
+from fastapi.testclient import TestClient
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from api.main import app
+from api.jobs import BatchJobRunner, BatchJobStore
+from api.schemas.models import CustomerInput
+from api.routes.inference import stored_churn_scores
+from api.score_table import ChurnScoreTable
+from api.serving import churn_server, score_churn
+from data.storage import TableStorage, write_frame
+from tests.test_segmentation import make_segment_features
+
+client = TestClient(app)
+
+
+def write_customer_features(data_root: Path, n: int = 120, seed: int = 4) -> Path:
+    return write_frame(make_segment_features(n, seed=seed), TableStorage(data_root).path("customer_features", "parquet"))
+
+
+@pytest.fixture
+def scores(tmp_path, monkeypatch):
+    """A score table over a temporary customer_features table, served by the API"""
+    write_customer_features(tmp_path / "data")
+    runner = BatchJobRunner(BatchJobStore(tmp_path / "jobs.db"), tmp_path / "results", tmp_path / "data")
+    table = ChurnScoreTable(runner)
+    monkeypatch.setattr("api.routes.inference.churn_scores", table)
+    return table
+
+
+def live_scores(customer_ids):
+    features = make_segment_features(120, seed=4).set_index("customer_id")
+    return score_churn([CustomerInput(customer_id=customer_id, features=features.loc[customer_id].to_dict())
+                        for customer_id in customer_ids])
+
+
+def test_pass_scores_the_whole_base(scores, served_segments):
+    job = asyncio.run(scores.run_pass())
+    assert job["status"] == "completed", job["error"]
+    assert len(scores.current) == 120
+    
+    customer_ids = ["SEG_00000", "SEG_00057", "SEG_00119"]
+    stored = scores.lookup(customer_ids + ["UNKNOWN"], churn_server.current().version)
+    assert list(stored) == customer_ids
+    for live in live_scores(customer_ids):
+        assert stored[live.customer_id].churn_probability == pytest.approx(live.churn_probability)
+        assert stored[live.customer_id].risk_level == live.risk_level
+    assert scores.status()["hits"] == 3 and scores.status()["misses"] == 1
+
+
+def test_stale_scores_are_not_served(tmp_path, scores, served_segments):
+    asyncio.run(scores.run_pass())
+    version = churn_server.current().version
+    
+    assert scores.lookup(["SEG_00001"], "some-other-model") == {}
+    
+    scores.max_age_hours = 0
+    assert scores.lookup(["SEG_00001"], version) == {}
+    scores.max_age_hours = 36
+    
+    # Rewritten features make the whole pass stale until the next one
+    write_customer_features(tmp_path / "data", seed=5)
+    scores.refresh()
+    assert scores.lookup(["SEG_00001"], version) == {}
+    assert not scores.status()["features_current"]
+    
+    asyncio.run(scores.run_pass())
+    assert list(scores.lookup(["SEG_00001"], version)) == ["SEG_00001"]
+
+
+def test_old_passes_are_pruned(scores, served_segments):
+    jobs = [asyncio.run(scores.run_pass()) for _ in range(3)]
+    assert not Path(jobs[0]["results_path"]).exists()
+    assert all(Path(job["results_path"]).exists() for job in jobs[1:])
+    assert scores.current.job_id == jobs[-1]["job_id"]
+    # Pruned passes leave the job table too
+    assert [job["job_id"] for job in scores.runner.store.completed("scores", limit=-1)] == [
+        job["job_id"] for job in reversed(jobs[1:])
+    ]
+
+
+def test_prune_follows_the_current_setting(scores, served_segments, monkeypatch):
+    jobs = [asyncio.run(scores.run_pass()) for _ in range(2)]
+    monkeypatch.setattr("api.score_table.settings.score_table_keep_runs", 1)
+    assert scores.prune() == [Path(jobs[0]["results_path"])]
+
+
+def test_churn_endpoints_serve_fresh_scores(scores, served_segments):
+    refresh = client.post("/api/v1/inference/churn-scores/refresh")
+    assert refresh.status_code == 200
+    # The test client runs background tasks before returning
+    assert client.get("/api/v1/inference/churn-scores").json()["job_id"] == refresh.json()["job_id"]
+    
+    single = client.post("/api/v1/inference/churn-score", json={"customer_id": "SEG_00010"})
+    assert single.status_code == 200
+    assert scores.hits == 1
+    assert single.json()["churn_probability"] == pytest.approx(live_scores(["SEG_00010"])[0].churn_probability)
+    
+    # Request features are always scored live; stored and live results keep request order
+    live = live_scores(["SEG_00020"])[0]
+    features = make_segment_features(120, seed=4).set_index("customer_id").loc["SEG_00020"].to_dict()
+    batch = client.post("/api/v1/inference/churn-batch", json={"customers": [
+        {"customer_id": "SEG_00011"},
+        {"customer_id": "SEG_00020", "features": features},
+        {"customer_id": "SEG_00012"}
+    ]})
+    assert batch.status_code == 200
+    predictions = batch.json()["predictions"]
+    assert [p["customer_id"] for p in predictions] == ["SEG_00011", "SEG_00020", "SEG_00012"]
+    assert predictions[1]["churn_probability"] == pytest.approx(live.churn_probability)
+    assert scores.hits == 3
+
+
+def test_lookup_reads_only_the_snapshot(scores, served_segments, monkeypatch):
+    """Requests never touch the job table or the feature files; ``refresh`` does"""
+    asyncio.run(scores.run_pass())
+    monkeypatch.setattr(scores.runner.store, "completed", lambda *args, **kwargs: pytest.fail("job table queried"))
+    monkeypatch.setattr("api.score_table.source_version", lambda path: pytest.fail("feature files checked"))
+    
+    assert list(scores.lookup(["SEG_00003"], churn_server.current().version)) == ["SEG_00003"]
+    assert scores.status()["loaded"]
+
+
+def test_stored_scores_never_load_the_model(scores, served_segments, monkeypatch):
+    """Before the model is loaded, lookups skip the table instead of loading it on the event loop"""
+    asyncio.run(scores.run_pass())
+    monkeypatch.setattr(churn_server, "loaded", None)
+    monkeypatch.setattr(churn_server, "load", lambda: pytest.fail("model loaded on the event loop"))
+    
+    assert stored_churn_scores([CustomerInput(customer_id="SEG_00003")]) == {}
@@ -0,0 +1,129 @@
+"""
+Tests for the MiniBatchKMeans customer segmentation model and its endpoints
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+import sys
+from pathlib import Path
+from fastapi.testclient import TestClient
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from api.main import app
+from api.executor import inference_executor
+from api.serving import SegmentationServer, segment_server
+from models.segmentation_model import CustomerSegmentationModel, SEGMENT_FEATURE_COLUMNS
+
+client = TestClient(app)
+
+
+def make_segment_features(n: int = 2000, seed: int = 0) -> pd.DataFrame:
+    """Customer features drawn around five behavioral profiles"""
+    rng = np.random.default_rng(seed)
+    profiles = rng.uniform(1, 500, size=(5, len(SEGMENT_FEATURE_COLUMNS)))
+    profiles[:, SEGMENT_FEATURE_COLUMNS.index("total_expenses")] *= -20
+    group = rng.integers(5, size=n)
+    values = profiles[group] * rng.lognormal(0, 0.1, size=(n, len(SEGMENT_FEATURE_COLUMNS)))
+    features = pd.DataFrame(values, columns=SEGMENT_FEATURE_COLUMNS)
+    features.insert(0, "customer_id", [f"SEG_{i:05d}" for i in range(n)])
+    return features
+
+
+def train_segments(tmp_path: Path, n: int = 2000) -> CustomerSegmentationModel:
+    model = CustomerSegmentationModel(model_path=str(tmp_path))
+    model.train(make_segment_features(n))
+    return model
+
+
+def test_training_finds_the_profiles(tmp_path):
+    features = make_segment_features()
+    model = train_segments(tmp_path)
+    
+    assert sorted(model.segment_names) == sorted(["At Risk", "New Customer", "High Value", "Loyal", "Growth Potential"])
+    assert model.counts.sum() == len(features)
+    
+    # The centroid table agrees with the clusterer, and recovers the generating profiles
+    labels, confidence = model.assign(model.feature_matrix(features).to_numpy())
+    np.testing.assert_array_equal(labels, model.model.predict(model.index.transform(model.feature_matrix(features).to_numpy())))
+    assert len(np.unique(labels)) == 5
+    assert ((confidence >= 0.5) & (confidence <= 1)).all()
+    assert model.profiles()["customers"].sum() == len(features)
+
+
+def test_saved_model_assigns_the_same_and_can_be_updated(tmp_path):
+    model = train_segments(tmp_path)
+    path = model.save_model()
+    
+    loaded = CustomerSegmentationModel(model_path=str(tmp_path))
+    loaded.load_model(path, mmap_mode="r")
+    features = make_segment_features(200, seed=1)
+    X = loaded.feature_matrix(features).to_numpy()
+    np.testing.assert_array_equal(loaded.assign(X)[0], model.assign(X)[0])
+    
+    # New customers are folded in without retraining, even from read-only maps
+    before = loaded.counts.sum()
+    labels = loaded.partial_fit(features)
+    assert len(labels) == len(features)
+    assert loaded.counts.sum() == before + len(features)
+    assert not np.array_equal(loaded.index.centroids, model.index.centroids)
+
+
+def test_server_loads_pinned_artifact(tmp_path):
+    path = train_segments(tmp_path).save_model()
+    server = SegmentationServer(model_file=path)
+    assert server.load() and server.is_loaded
+    assert not server.reload()  # unchanged artifact
+
+
+def test_segment_endpoints(served_segments, monkeypatch):
+    features = make_segment_features(20, seed=2)
+    customers = [
+        {"customer_id": row.pop("customer_id"), "features": row}
+        for row in features.to_dict("records")
+    ]
+    
+    single = client.post("/api/v1/inference/segment", json=customers[0])
+    assert single.status_code == 200
+    assert single.json()["segment_name"] in served_segments.segment_names
+    assert "customers" in single.json()["characteristics"]
+    
+    batch = client.post("/api/v1/inference/segment-batch", json={"customers": customers})
+    assert batch.status_code == 200
+    data = batch.json()
+    assert [p["customer_id"] for p in data["predictions"]] == features["customer_id"].tolist()
+    assert data["segment_summary"]["total_customers"] == 20
+    assert sum(data["segment_summary"]["segment_counts"].values()) == 20
+    assert data["predictions"][0] == single.json()
+    
+    before = served_segments.counts.sum()
+    updated = client.post("/api/v1/inference/segment/partial-fit", json={"customers": customers})
+    assert updated.status_code == 200
+    assert served_segments.counts.sum() == before + 20
+    
+    # Worker processes would not see the update
+    monkeypatch.setattr(inference_executor, "kind", "process")
+    rejected = client.post("/api/v1/inference/segment/partial-fit", json={"customers": customers})
+    assert rejected.status_code == 409
+    assert served_segments.counts.sum() == before + 20
+    
+    missing = client.post("/api/v1/inference/segment", json={"customer_id": "NO_FEATURES_999"})
+    assert missing.status_code == 400
+
+
+def test_segment_endpoints_shed_load_when_saturated(served_segments, monkeypatch):
+    monkeypatch.setattr(inference_executor, "max_pending", 0)
+    customer = {"customer_id": "X", "features": {"total_transactions": 3}}
+    
+    assert client.post("/api/v1/inference/segment", json=customer).status_code == 503
+    assert client.post("/api/v1/inference/segment-batch", json={"customers": [customer]}).status_code == 503
+
+
+def test_segment_without_model(monkeypatch):
+    monkeypatch.setattr(segment_server, "model", None)
+    monkeypatch.setattr(segment_server, "pinned_file", None)
+    monkeypatch.setattr("api.serving.resolve_model_file", lambda model_name: None)
+    response = client.post("/api/v1/inference/segment", json={"customer_id": "X", "features": {"total_transactions": 3}})
+    assert response.status_code == 503
@@ -0,0 +1,137 @@
+"""
+Tests for the precomputed SHAP driver index
+"""
+
+import contextlib
+import io
+import os
+
+import numpy as np
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from api.explanations import ExplanationService
+from api.serving import ChurnModelServer
+from models.churn_model import ChurnPredictionModel
+from models.shap_index import ShapIndex, shap_index_path
+from tests.test_explanations import make_features
+
+
+@pytest.fixture(scope="module")
+def saved_model(tmp_path_factory):
+    """A churn model trained on 300 customers and saved, which also builds its index"""
+    features = make_features(300, seed=11)
+    model = ChurnPredictionModel(model_path=str(tmp_path_factory.mktemp("models")))
+    with contextlib.redirect_stdout(io.StringIO()):
+        model.train(features.copy())
+        model_file = model.save_model()
+    return model, Path(model_file), features
+
+
+class TestShapIndex:
+    """Index contents against SHAP values computed directly"""
+    
+    def test_saving_the_model_builds_the_index(self, saved_model):
+        _, model_file, features = saved_model
+        index = ShapIndex.load_for(model_file)
+        
+        assert index is not None
+        assert len(index) == len(features)
+        assert "CUST_000042" in index
+    
+    def test_lookup_matches_shap_values(self, saved_model):
+        model, model_file, features = saved_model
+        index = ShapIndex.load_for(model_file)
+        contributions, _ = model.shap_values(model.feature_matrix(features))
+        
+        for row in (0, 150, 299):
+            entry = index.lookup(features["customer_id"].iloc[row], top_k=4)
+            expected = np.argsort(-np.abs(contributions[row]), kind="stable")[:4]
+            
+            assert [d["feature_name"] for d in entry["drivers"]] == [model.feature_columns[i] for i in expected]
+            np.testing.assert_allclose([d["contribution"] for d in entry["drivers"]], contributions[row, expected],
+                                       rtol=1e-5)
+    
+    def test_global_stats_accumulate_across_batches(self, saved_model):
+        """Building in small batches gives the same global statistics as one pass"""
+        model, _, features = saved_model
+        contributions, _ = model.shap_values(model.feature_matrix(features))
+        
+        index = ShapIndex.build(model, features, model_version="test", top_k=3, batch_size=7)
+        drivers = {d["feature_name"]: d for d in index.global_drivers()}
+        
+        for i, feature in enumerate(model.feature_columns):
+            assert drivers[feature]["mean_abs_contribution"] == pytest.approx(np.abs(contributions[:, i]).mean())
+            assert drivers[feature]["mean_contribution"] == pytest.approx(contributions[:, i].mean(), abs=1e-9)
+            assert drivers[feature]["increases_risk_share"] == pytest.approx((contributions[:, i] > 0).mean())
+        assert sum(d["top_driver_share"] for d in drivers.values()) == pytest.approx(1.0)
+    
+    def test_index_for_other_artifact_is_ignored(self, saved_model, tmp_path):
+        """An index is only served for the exact artifact it was built from"""
+        _, model_file, _ = saved_model
+        copied = tmp_path / model_file.name
+        copied.write_bytes(model_file.read_bytes())
+        shap_index_path(copied).write_bytes(shap_index_path(model_file).read_bytes())
+        
+        os.utime(copied, ns=(0, 0))
+        assert ShapIndex.load_for(copied) is None
+    
+    def test_memory_mapped_index_matches(self, saved_model):
+        """A memory-mapped index answers exactly like one loaded into memory"""
+        _, model_file, features = saved_model
+        loaded = ShapIndex.load_for(model_file)
+        mapped = ShapIndex.load_for(model_file, mmap_mode="r")
+        
+        assert isinstance(mapped.top_contributions, np.memmap)
+        assert isinstance(mapped.sorted_ids, np.memmap)
+        for customer_id in ("CUST_000000", "CUST_000123", "CUST_000299"):
+            assert mapped.lookup(customer_id, top_k=5) == loaded.lookup(customer_id, top_k=5)
+        assert "CUST_UNKNOWN" not in mapped
+    
+    def test_rewriting_does_not_disturb_a_mapped_index(self, saved_model, tmp_path):
+        """Saving replaces the file, so readers that mapped the old one keep valid data"""
+        model, _, features = saved_model
+        path = tmp_path / "index.joblib"
+        ShapIndex.build(model, features, model_version="old", top_k=3).save(path)
+        
+        mapped = ShapIndex.load(path, mmap_mode="r")
+        expected = mapped.lookup("CUST_000010")
+        ShapIndex.build(model, features.iloc[:50], model_version="new", top_k=3).save(path)
+        
+        assert mapped.lookup("CUST_000010") == expected
+        assert len(ShapIndex.load(path)) == 50
+
+
+class TestIndexedExplanations:
+    """The explanation service answers stored customers from the index"""
+    
+    def test_index_answers_match_computed(self, saved_model):
+        _, model_file, features = saved_model
+        server = ChurnModelServer(model_file=model_file)
+        with contextlib.redirect_stdout(io.StringIO()):
+            server.load()
+        service = ExplanationService(server)
+        
+        indexed = service.explain_indexed("CUST_000007", top_k=5)
+        computed = service.explain_frame(features.iloc[[7]]).explanation(0, top_k=5)
+        
+        assert indexed.source == "index"
+        assert computed.source == "computed"
+        assert indexed.probability[1] == pytest.approx(computed.probability[1], rel=1e-5)
+        assert ([c.feature_name for c in indexed.feature_contributions] ==
+                [c.feature_name for c in computed.feature_contributions])
+        assert service.stats()["index"]["customers"] == len(features)
+    
+    def test_falls_back_when_index_cannot_answer(self, saved_model):
+        _, model_file, _ = saved_model
+        server = ChurnModelServer(model_file=model_file)
+        with contextlib.redirect_stdout(io.StringIO()):
+            server.load()
+        service = ExplanationService(server)
+        
+        assert service.explain_indexed("CUST_UNKNOWN") is None
+        assert service.explain_indexed("CUST_000007", top_k=50) is None
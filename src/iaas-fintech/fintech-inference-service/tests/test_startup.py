@@ -0,0 +1,115 @@
+"""
+Tests for the tracked startup phases and the readiness probe
+"""
+
+import asyncio
+import subprocess
+import sys
+from pathlib import Path
+
+import joblib
+from fastapi.testclient import TestClient
+from sklearn.tree import DecisionTreeClassifier
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from api.main import app, shutdown_event
+from api.routes import health
+from api.startup import StartupPhases, create_startup_phases
+
+client = TestClient(app)
+
+
+def test_phases_record_status_and_timing():
+    phases = StartupPhases({"a": True, "b": False, "c": False})
+    
+    async def run_all():
+        await phases.run("a", lambda: "loaded")
+        await phases.run("b", lambda: False)
+        return await phases.run("c", lambda: 1 / 0)
+    
+    assert asyncio.run(run_all()) is None
+    snapshot = phases.snapshot()
+    assert snapshot["a"]["status"] == "done"
+    assert snapshot["a"]["seconds"] >= 0
+    assert snapshot["b"]["status"] == "failed"
+    assert snapshot["c"]["status"] == "failed"
+    assert "division by zero" in snapshot["c"]["error"]
+    # Only required phases gate readiness
+    assert phases.finished and phases.ready
+
+
+def test_coroutine_phases_are_awaited():
+    phases = StartupPhases({"a": True})
+    
+    async def load():
+        return True
+    
+    assert asyncio.run(phases.run("a", load)) is True
+    assert phases.ready
+
+
+def test_not_ready_until_required_phases_are_done():
+    phases = StartupPhases({"a": True, "b": True})
+    assert not phases.ready and not phases.finished
+    
+    asyncio.run(phases.run("a", lambda: None))
+    assert not phases.ready
+    
+    phases.skip("b")
+    assert phases.finished and not phases.ready
+
+
+def test_ready_is_503_while_starting(monkeypatch):
+    monkeypatch.setattr(health, "startup_phases", create_startup_phases())
+    
+    response = client.get("/ready")
+    assert response.status_code == 503
+    data = response.json()
+    assert data["status"] == "not_ready"
+    assert data["phases"]["models"]["status"] == "pending"
+
+
+def test_ready_once_models_are_loaded(monkeypatch):
+    phases = create_startup_phases()
+    for name in phases.phases:
+        phases.phases[name]["status"] = "done"
+    monkeypatch.setattr(health, "startup_phases", phases)
+    monkeypatch.setattr(type(health.churn_server), "is_loaded", property(lambda self: True))
+    
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.json()["status"] == "ready"
+
+
+def test_shutdown_cancels_background_tasks(monkeypatch):
+    async def shut_down():
+        watch = asyncio.create_task(asyncio.sleep(3600))
+        monkeypatch.setattr(app.state, "score_watch_task", watch, raising=False)
+        await asyncio.sleep(0)
+        await shutdown_event()
+        return watch
+    
+    assert asyncio.run(shut_down()).cancelled()
+
+
+def test_loading_a_model_does_not_import_shap(tmp_path):
+    """The explainer is built on the first explanation, not on the readiness-gating model load"""
+    artifact = tmp_path / "model.joblib"
+    estimator = DecisionTreeClassifier(max_depth=2).fit([[0], [1], [2], [3]], [0, 0, 1, 1])
+    joblib.dump({"model": estimator, "feature_columns": ["x"]}, artifact)
+    
+    # A fresh interpreter, since this test session has imported shap already
+    script = "\n".join([
+        "import sys",
+        f"sys.path.insert(0, {str(Path(__file__).parent.parent / 'src')!r})",
+        "from models.churn_model import ChurnPredictionModel",
+        "model = ChurnPredictionModel()",
+        f"model.load_model({str(artifact)!r})",
+        "loaded = 'shap' in sys.modules",
+        "model.get_explainer()",
+        "print(loaded, 'shap' in sys.modules)"
+    ])
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+    assert result.stdout.split()[-2:] == ["False", "True"]
@@ -0,0 +1,132 @@
+"""
+Tests for Parquet/CSV table storage
+"""
+
+import os
+
+import pandas as pd
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from data.customer_store import CustomerDataStore
+from data.storage import TableStorage
+from tests.test_feature_engineering import make_transactions
+
+
+@pytest.fixture
+def transactions():
+    return make_transactions(num_customers=20)
+
+
+@pytest.fixture
+def customers(transactions):
+    customer_ids = transactions["customer_id"].unique()
+    return pd.DataFrame({
+        "customer_id": customer_ids,
+        "avg_monthly_spend": 1000,
+        "transaction_frequency": 10,
+        "preferred_categories": [["grocery", "retail"]] * len(customer_ids),
+        "churn_probability": 0.2,
+        "segment": "average_spender",
+        "signup_date": pd.Timestamp("2023-06-01")
+    })
+
+
+class TestTableStorage:
+    """Both backends return the same typed frames"""
+    
+    @pytest.mark.parametrize("file_format", ["parquet", "csv"])
+    def test_round_trip(self, tmp_path, transactions, file_format):
+        """Written tables read back with the explicit schema"""
+        storage = TableStorage(tmp_path, format=file_format)
+        path = storage.write(transactions, "transactions")
+        
+        df = storage.read("transactions")
+        
+        assert path.suffix == f".{file_format}"
+        assert isinstance(df["category"].dtype, pd.CategoricalDtype)
+        assert isinstance(df["merchant"].dtype, pd.CategoricalDtype)
+        assert pd.api.types.is_datetime64_any_dtype(df["transaction_date"])
+        assert df["is_fraud"].dtype == bool
+        pd.testing.assert_series_equal(df["amount"], transactions["amount"])
+        assert df["category"].astype(str).tolist() == transactions["category"].tolist()
+    
+    def test_formats_agree(self, tmp_path, transactions):
+        """CSV and Parquet reads are identical"""
+        from_csv = TableStorage(tmp_path / "csv", format="csv")
+        from_parquet = TableStorage(tmp_path / "parquet", format="parquet")
+        from_csv.write(transactions, "transactions")
+        from_parquet.write(transactions, "transactions")
+        
+        pd.testing.assert_frame_equal(from_csv.read("transactions"), from_parquet.read("transactions"))
+    
+    def test_column_projection(self, tmp_path, transactions):
+        """Only the requested columns are loaded, in the requested order"""
+        storage = TableStorage(tmp_path)
+        storage.write(transactions, "transactions")
+        
+        df = storage.read("transactions", columns=["amount", "customer_id"])
+        
+        assert list(df.columns) == ["amount", "customer_id"]
+    
+    def test_plain_columns_on_request(self, tmp_path, transactions):
+        """categorical=False decodes categoricals back to strings"""
+        storage = TableStorage(tmp_path)
+        storage.write(transactions, "transactions")
+        
+        df = storage.read("transactions", categorical=False)
+        
+        assert not isinstance(df["category"].dtype, pd.CategoricalDtype)
+        assert df["category"].tolist() == transactions["category"].tolist()
+    
+    def test_list_columns_match_csv_text(self, tmp_path, customers):
+        """List-valued customer columns are stored in their CSV text form"""
+        storage = TableStorage(tmp_path)
+        storage.write(customers, "customers")
+        
+        assert storage.read("customers")["preferred_categories"].iloc[0] == "['grocery', 'retail']"
+    
+    def test_newest_file_wins(self, tmp_path, transactions):
+        """Reads use whichever backend was written last"""
+        storage = TableStorage(tmp_path)
+        storage.write(transactions, "transactions")
+        csv_path = TableStorage(tmp_path, format="csv").write(transactions.iloc[:5], "transactions")
+        os.utime(csv_path, ns=(storage.path("transactions").stat().st_mtime_ns + 10**9,) * 2)
+        
+        assert len(storage.read("transactions")) == 5
+    
+    def test_missing_table(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            TableStorage(tmp_path).read("transactions")
+    
+    def test_migrate(self, tmp_path, transactions):
+        """CSV tables are rewritten as Parquet with the same contents"""
+        csv_storage = TableStorage(tmp_path, format="csv")
+        csv_storage.write(transactions, "transactions")
+        
+        written = TableStorage(tmp_path).migrate(remove_csv=True)
+        
+        assert written == [tmp_path / "raw" / "transactions.parquet"]
+        assert not csv_storage.path("transactions").exists()
+        assert len(TableStorage(tmp_path).read("transactions")) == len(transactions)
+    
+    def test_customer_data_store(self, tmp_path, transactions, customers):
+        """The API data store loads from storage and versions by file"""
+        storage = TableStorage(tmp_path)
+        storage.write(customers, "customers")
+        storage.write(transactions, "transactions")
+        storage.write(pd.DataFrame({"customer_id": customers["customer_id"], "total_transactions": 1}), "customer_features")
+        
+        store = CustomerDataStore.from_storage(storage)
+        customer_id = customers["customer_id"].iloc[0]
+        
+        assert len(store.get_transactions(customer_id)) == (transactions["customer_id"] == customer_id).sum()
+        assert CustomerDataStore.from_storage(storage).version == store.version
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])